@@ -0,0 +1,533 @@
+"""Async storage API for request handlers and SSE streams.
+
+The `storage` functions block: JSON storage does file I/O under `fcntl` locks and
+database storage uses synchronous SQLAlchemy sessions. Called from an async
+handler or from inside an SSE generator, a slow disk or database stalls every
+concurrent stream. This module exposes the same functions as coroutines:
+
+- JSON storage runs the `storage` functions on a bounded thread pool
+  (`STORAGE_THREADS`). Writes take a per-conversation asyncio lock, so appends
+  to one conversation keep their order and never hold several pool threads
+  waiting on the same file lock.
+- Database storage uses SQLAlchemy's async engine (asyncpg / aiomysql) with a
+  pooled `AsyncSession` per call. If the async driver is not installed, the
+  synchronous functions run on the thread pool instead, sized to the
+  connection pool (`DB_POOL_SIZE + DB_MAX_OVERFLOW`) so callers queue for a
+  thread rather than for a connection.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select, update
+
+from . import database, metrics, payload_codec, storage, turn_trace
+from .conversation_cache import get_conversation_cache
+from .models import Conversation as ConversationModel, Message as MessageModel
+
+logger = logging.getLogger(__name__)
+
+STORAGE_THREADS = int(os.getenv("STORAGE_THREADS", "8"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_conversation_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+_stats_lock = threading.Lock()
+_calls = 0
+_in_flight = 0
+_wait_total_ms = 0.0
+_wait_max_ms = 0.0
+
+
+def _executor_size() -> int:
+    if storage.is_using_database():
+        return max(1, database.DB_POOL_SIZE + database.DB_MAX_OVERFLOW)
+    return max(1, STORAGE_THREADS)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=_executor_size(), thread_name_prefix="storage")
+    return _executor
+
+
+async def _run(name: str, *args, **kwargs) -> Any:
+    """Run `storage.<name>` on the storage thread pool."""
+    global _calls, _in_flight, _wait_total_ms, _wait_max_ms
+    fn = getattr(storage, name)
+    submitted = time.perf_counter()
+    waited = []
+
+    def call():
+        global _wait_total_ms, _wait_max_ms
+        wait_ms = (time.perf_counter() - submitted) * 1000
+        waited.append(wait_ms)
+        with _stats_lock:
+            _wait_total_ms += wait_ms
+            _wait_max_ms = max(_wait_max_ms, wait_ms)
+        return fn(*args, **kwargs)
+
+    _calls += 1
+    _in_flight += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), call)
+    finally:
+        _in_flight -= 1
+        if waited:
+            # Time queued for a storage thread, on the operation's turn timeline span
+            turn_trace.annotate(queue=int(round(waited[0])))
+
+
+def _conversation_lock(conversation_id: str) -> asyncio.Lock:
+    lock = _conversation_locks.get(conversation_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _conversation_locks[conversation_id] = lock
+    return lock
+
+
+def _async_sessions():
+    """Async session factory, or None when storage calls should go through the thread pool."""
+    if not storage.is_using_database():
+        return None
+    return database.get_async_session_factory()
+
+
+# ==================== ASYNC DATABASE STORAGE ====================
+
+async def _adb_create_conversation(
+    sessions,
+    conversation_id: str,
+    models: Optional[List[str]],
+    chairman: Optional[str],
+    username: Optional[str],
+    execution_mode: Optional[str],
+    router_type: Optional[str],
+) -> Dict[str, Any]:
+    async with sessions() as session:
+        conversation = ConversationModel(
+            id=conversation_id,
+            title="New Conversation",
+            message_count=0,
+            models=storage._db_models_payload(models, execution_mode, router_type),
+            chairman=chairman,
+            username=username
+        )
+        session.add(conversation)
+        await session.commit()
+        await session.refresh(conversation)
+        return conversation.to_dict()
+
+
+async def _adb_get_conversation(sessions, conversation_id: str) -> Optional[Dict[str, Any]]:
+    async with sessions() as session:
+        conversation = await session.get(ConversationModel, conversation_id)
+        if conversation is None:
+            return None
+        messages = (await session.execute(
+            select(MessageModel.payload)
+            .where(MessageModel.conversation_id == conversation_id)
+            .order_by(MessageModel.seq)
+        )).scalars().all()
+        return conversation.to_dict([payload_codec.unpack(m) for m in messages])
+
+
+async def _adb_conversation_stamp(sessions, conversation_id: str) -> Optional[Tuple[int, str]]:
+    """Same as storage._db_conversation_stamp."""
+    async with sessions() as session:
+        row = (await session.execute(
+            select(ConversationModel.message_count, ConversationModel.title).where(ConversationModel.id == conversation_id)
+        )).first()
+        return None if row is None else (row[0] or 0, row[1])
+
+
+async def _adb_save_conversation(sessions, conversation: Dict[str, Any]):
+    async with sessions() as session:
+        db_conversation = await session.get(ConversationModel, conversation['id'], with_for_update=True)
+        if db_conversation is None:
+            return
+        messages = conversation.get('messages', [])
+        db_conversation.title = conversation.get('title', 'New Conversation')
+        db_conversation.models = storage._db_models_payload(
+            conversation.get('models'), conversation.get("execution_mode"), conversation.get("router_type")
+        )
+        db_conversation.chairman = conversation.get('chairman')
+        db_conversation.username = conversation.get('username')
+        db_conversation.message_count = len(messages)
+        await session.execute(delete(MessageModel).where(MessageModel.conversation_id == conversation['id']))
+        session.add_all(storage._db_message_rows(conversation['id'], messages))
+        await session.commit()
+
+
+async def _adb_append_message(sessions, conversation_id: str, message: Dict[str, Any]):
+    async with sessions() as session:
+        # Same as storage._db_append_message: the counter bump locks the row and yields the seq
+        result = await session.execute(
+            update(ConversationModel)
+            .where(ConversationModel.id == conversation_id)
+            .values(message_count=ConversationModel.message_count + 1)
+        )
+        if result.rowcount == 0:
+            await session.rollback()
+            raise ValueError(f"未找到对话 {conversation_id}")
+        count = (await session.execute(
+            select(ConversationModel.message_count).where(ConversationModel.id == conversation_id)
+        )).scalar_one()
+        session.add_all(storage._db_message_rows(conversation_id, [message], first_seq=count - 1))
+        await session.commit()
+
+
+async def _adb_update_title(sessions, conversation_id: str, title: str):
+    async with sessions() as session:
+        result = await session.execute(
+            update(ConversationModel).where(ConversationModel.id == conversation_id).values(title=title)
+        )
+        await session.commit()
+        if result.rowcount == 0:
+            raise ValueError(f"未找到对话 {conversation_id}")
+
+
+async def _adb_list_conversations(sessions, limit: Optional[int], offset: int) -> List[Dict[str, Any]]:
+    async with sessions() as session:
+        query = select(
+            ConversationModel.id,
+            ConversationModel.created_at,
+            ConversationModel.title,
+            ConversationModel.message_count,
+            ConversationModel.username,
+        ).order_by(ConversationModel.created_at.desc()).offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        return [
+            {
+                "id": conv.id,
+                "created_at": conv.created_at.isoformat() if conv.created_at else "",
+                "title": conv.title or "New Conversation",
+                "message_count": conv.message_count or 0,
+                "username": conv.username
+            }
+            for conv in await session.execute(query)
+        ]
+
+
+async def _adb_list_conversations_page(
+    sessions, limit: int, after: Optional[Tuple[str, str]], username: Optional[str]
+) -> List[Dict[str, Any]]:
+    async with sessions() as session:
+        query = select(
+            ConversationModel.id,
+            ConversationModel.created_at,
+            ConversationModel.title,
+            ConversationModel.message_count,
+            ConversationModel.username,
+        )
+        if username is not None:
+            query = query.where(ConversationModel.username == username)
+        if after is not None:
+            query = query.where(storage._db_after_clause(after))
+        query = query.order_by(ConversationModel.created_at.desc(), ConversationModel.id.desc()).limit(limit)
+        return [
+            {
+                "id": conv.id,
+                "created_at": conv.created_at.isoformat() if conv.created_at else "",
+                "title": conv.title or "New Conversation",
+                "message_count": conv.message_count or 0,
+                "username": conv.username
+            }
+            for conv in await session.execute(query)
+        ]
+
+
+def _message_page_query(conversation_id: str, offset: int, limit: Optional[int]):
+    query = select(MessageModel.payload).where(MessageModel.conversation_id == conversation_id)
+    if offset:
+        query = query.where(MessageModel.seq >= offset)
+    query = query.order_by(MessageModel.seq)
+    return query if limit is None else query.limit(limit)
+
+
+async def _adb_get_messages(
+    sessions, conversation_id: str, offset: int, limit: Optional[int]
+) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+    async with sessions() as session:
+        total = (await session.execute(
+            select(ConversationModel.message_count).where(ConversationModel.id == conversation_id)
+        )).scalar_one_or_none()
+        if total is None:
+            return None
+        messages = (await session.execute(_message_page_query(conversation_id, offset, limit))).scalars().all()
+        return [payload_codec.unpack(m) for m in messages], total
+
+
+async def _adb_get_conversation_window(sessions, conversation_id: str, limit: int) -> Optional[Dict[str, Any]]:
+    async with sessions() as session:
+        conversation = await session.get(ConversationModel, conversation_id)
+        if conversation is None:
+            return None
+        offset = max(0, conversation.message_count - limit)
+        messages = (await session.execute(_message_page_query(conversation_id, offset, limit))).scalars().all()
+        result = conversation.to_dict([payload_codec.unpack(m) for m in messages])
+        result["message_offset"] = offset
+        result["message_count"] = conversation.message_count
+        return result
+
+
+async def _adb_delete_conversation(sessions, conversation_id: str) -> bool:
+    async with sessions() as session:
+        await session.execute(delete(MessageModel).where(MessageModel.conversation_id == conversation_id))
+        result = await session.execute(delete(ConversationModel).where(ConversationModel.id == conversation_id))
+        await session.commit()
+        return result.rowcount > 0
+
+
+async def _adb_delete_all_conversations(sessions):
+    async with sessions() as session:
+        await session.execute(delete(MessageModel))
+        await session.execute(delete(ConversationModel))
+        await session.commit()
+
+
+# ==================== ASYNC API (mirrors storage) ====================
+
+def _timed(fn):
+    """Record the latency (including lock and queue waits) and turn span of an async storage operation."""
+    operation = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            with turn_trace.span("storage", operation):
+                return await fn(*args, **kwargs)
+        finally:
+            metrics.observe_storage(operation, time.perf_counter() - started)
+    return wrapper
+
+
+@_timed
+async def create_conversation(
+    conversation_id: str,
+    models: Optional[List[str]] = None,
+    chairman: Optional[str] = None,
+    username: Optional[str] = None,
+    execution_mode: Optional[str] = None,
+    router_type: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Async `storage.create_conversation`."""
+    sessions = _async_sessions()
+    async with _conversation_lock(conversation_id):
+        if sessions is None:
+            return await _run(
+                "create_conversation", conversation_id, models, chairman, username,
+                execution_mode=execution_mode, router_type=router_type,
+            )
+        conv = await _adb_create_conversation(
+            sessions, conversation_id, models, chairman, username, execution_mode, router_type
+        )
+    get_conversation_cache().invalidate(conversation_id)
+    return storage._normalize_conversation(conv)
+
+
+@_timed
+async def get_conversation(conversation_id: str) -> Optional[Dict[str, Any]]:
+    """Async `storage.get_conversation`."""
+    sessions = _async_sessions()
+    if sessions is None:
+        return await _run("get_conversation", conversation_id)
+    cache = get_conversation_cache()
+    if cache.enabled:
+        stamp = await _adb_conversation_stamp(sessions, conversation_id)
+        if stamp is None:
+            cache.invalidate(conversation_id, notify=False)
+            return None
+        conv = cache.get(conversation_id, stamp)
+        if conv is not None:
+            return conv
+    conv = await _adb_get_conversation(sessions, conversation_id)
+    conv = storage._normalize_conversation(conv) if conv else None
+    if conv is not None and cache.enabled:
+        cache.put(conversation_id, conv, stamp)
+    return conv
+
+
+@_timed
+async def save_conversation(conversation: Dict[str, Any]):
+    """Async `storage.save_conversation`."""
+    sessions = _async_sessions()
+    async with _conversation_lock(conversation["id"]):
+        if sessions is None:
+            await _run("save_conversation", conversation)
+        else:
+            await _adb_save_conversation(sessions, storage._normalize_conversation(conversation))
+            get_conversation_cache().invalidate(conversation["id"])
+
+
+@_timed
+async def list_conversations(limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+    """Async `storage.list_conversations`."""
+    sessions = _async_sessions()
+    if sessions is None:
+        return await _run("list_conversations", limit=limit, offset=offset)
+    return await _adb_list_conversations(sessions, limit, offset)
+
+
+@_timed
+async def list_conversations_page(
+    limit: int,
+    cursor: Optional[str] = None,
+    username: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Async `storage.list_conversations_page`."""
+    sessions = _async_sessions()
+    if sessions is None:
+        return await _run("list_conversations_page", limit, cursor=cursor, username=username)
+    after = storage.decode_cursor(cursor) if cursor else None
+    rows = await _adb_list_conversations_page(sessions, limit + 1, after, username)
+    if len(rows) <= limit:
+        return rows, None
+    return rows[:limit], storage.encode_cursor(rows[limit - 1]["created_at"], rows[limit - 1]["id"])
+
+
+@_timed
+async def get_conversation_window(conversation_id: str, limit: int) -> Optional[Dict[str, Any]]:
+    """Async `storage.get_conversation_window`."""
+    sessions = _async_sessions()
+    if sessions is None:
+        return await _run("get_conversation_window", conversation_id, limit)
+    conv = await _adb_get_conversation_window(sessions, conversation_id, limit)
+    if conv is None:
+        return None
+    offset = conv["message_offset"]
+    if offset > 0 and conv["messages"] and conv["messages"][0].get("role") != "user":
+        page = await _adb_get_messages(sessions, conversation_id, offset - 1, 1)
+        if page is not None:
+            conv["messages"] = page[0] + conv["messages"]
+            conv["message_offset"] = offset - 1
+    return storage._normalize_conversation(conv)
+
+
+@_timed
+async def get_messages(
+    conversation_id: str, offset: int = 0, limit: Optional[int] = None
+) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+    """Async `storage.get_messages`."""
+    sessions = _async_sessions()
+    if sessions is None:
+        return await _run("get_messages", conversation_id, offset, limit)
+    return await _adb_get_messages(sessions, conversation_id, offset, limit)
+
+
+@_timed
+async def count_messages(conversation_id: str) -> Optional[int]:
+    """Async `storage.count_messages`."""
+    sessions = _async_sessions()
+    if sessions is None:
+        return await _run("count_messages", conversation_id)
+    async with sessions() as session:
+        return (await session.execute(
+            select(ConversationModel.message_count).where(ConversationModel.id == conversation_id)
+        )).scalar_one_or_none()
+
+
+@_timed
+async def add_user_message(conversation_id: str, content: str, attachments: Optional[List[Dict[str, Any]]] = None):
+    """Async `storage.add_user_message`."""
+    sessions = _async_sessions()
+    async with _conversation_lock(conversation_id):
+        if sessions is None:
+            await _run("add_user_message", conversation_id, content, attachments)
+        else:
+            message = storage._user_message(content, attachments)
+            await _adb_append_message(sessions, conversation_id, message)
+            storage.cache_appended_message(conversation_id, message)
+
+
+@_timed
+async def add_assistant_message(
+    conversation_id: str,
+    stage1: List[Dict[str, Any]],
+    stage2: Optional[List[Dict[str, Any]]] = None,
+    stage3: Optional[Dict[str, Any]] = None,
+    metadata: Optional[Dict[str, Any]] = None
+):
+    """Async `storage.add_assistant_message`."""
+    sessions = _async_sessions()
+    async with _conversation_lock(conversation_id):
+        if sessions is None:
+            await _run("add_assistant_message", conversation_id, stage1, stage2, stage3, metadata)
+        else:
+            message = storage._assistant_message(stage1, stage2, stage3, metadata)
+            await _adb_append_message(sessions, conversation_id, message)
+            storage.cache_appended_message(conversation_id, message)
+
+
+@_timed
+async def update_conversation_title(conversation_id: str, title: str):
+    """Async `storage.update_conversation_title`."""
+    sessions = _async_sessions()
+    async with _conversation_lock(conversation_id):
+        if sessions is None:
+            await _run("update_conversation_title", conversation_id, title)
+        else:
+            await _adb_update_title(sessions, conversation_id, title)
+            storage.cache_title(conversation_id, title)
+
+
+@_timed
+async def delete_conversation(conversation_id: str) -> bool:
+    """Async `storage.delete_conversation`."""
+    sessions = _async_sessions()
+    async with _conversation_lock(conversation_id):
+        if sessions is None:
+            return await _run("delete_conversation", conversation_id)
+        deleted = await _adb_delete_conversation(sessions, conversation_id)
+    get_conversation_cache().invalidate(conversation_id)
+    return deleted
+
+
+@_timed
+async def delete_all_conversations():
+    """Async `storage.delete_all_conversations`."""
+    sessions = _async_sessions()
+    if sessions is None:
+        await _run("delete_all_conversations")
+    else:
+        await _adb_delete_all_conversations(sessions)
+        get_conversation_cache().clear()
+
+
+def stats() -> Dict[str, Any]:
+    """Thread pool usage (`queue_wait` is the time calls waited for a free storage thread) and cache hit counts."""
+    sessions = _async_sessions()
+    return {
+        "mode": "async_engine" if sessions is not None else "thread_pool",
+        "threads": _executor_size(),
+        "calls": _calls,
+        "in_flight": _in_flight,
+        "avg_queue_wait_ms": round(_wait_total_ms / _calls, 3) if _calls else None,
+        "max_queue_wait_ms": round(_wait_max_ms, 3),
+        "conversation_cache": get_conversation_cache().stats(),
+    }
+
+
+async def shutdown():
+    """Stop the storage thread pool and close pooled async connections."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        await asyncio.to_thread(functools.partial(executor.shutdown, wait=True))
+    await database.dispose_async_engine()
@@ -0,0 +1,202 @@
+"""Query-aware selection of attachment text for prompts.
+
+Attachments used to be cut at 50,000 characters and pasted whole into the
+prompt of every council model, so the end of a long document was never seen
+and short questions about it still cost ~12k tokens per model. Now:
+
+- each attachment's text is split into chunks of about ATTACHMENT_CHUNK_TOKENS
+  and BM25-indexed once (the index is keyed by the sha256 of the text and kept
+  in the attachment store, so every worker and later message reuses it)
+- at send time the chunks scoring best against the user's message are taken
+  until ATTACHMENT_CONTEXT_TOKENS is spent, across all attached files, and put
+  into the prompt in document order
+- attachments that fit the budget whole are included whole
+
+Selection runs once per message, before the council is queried, and counts
+tokens with the default encoding, so every model gets the same chunk set and
+rankings compare answers to the same evidence.
+
+Configuration (environment variables):
+- ATTACHMENT_CONTEXT_TOKENS: attachment tokens per message (default 12000)
+- ATTACHMENT_CHUNK_TOKENS: target chunk size in tokens (default 400)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from . import tokenizer_registry
+from .attachment_store import AttachmentStore
+
+logger = logging.getLogger(__name__)
+
+ATTACHMENT_CONTEXT_TOKENS = int(os.getenv("ATTACHMENT_CONTEXT_TOKENS", "12000"))
+ATTACHMENT_CHUNK_TOKENS = int(os.getenv("ATTACHMENT_CHUNK_TOKENS", "400"))
+
+# Bump when chunking or the index layout changes; older indexes are rebuilt
+INDEX_VERSION = 1
+BM25_K1 = 1.5
+BM25_B = 0.75
+GAP_MARKER = "[...]"
+
+# Latin words and digits, or runs of CJK characters (indexed as character bigrams)
+_TERM_PATTERN = re.compile(r"[0-9a-z]+|[\u3400-\u9fff\uf900-\ufaff]+")
+_CJK_PATTERN = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]")
+
+_MAX_CACHED_INDEXES = 32
+_indexes: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def terms(text: str) -> List[str]:
+    """BM25 terms: lowercased words, and bigrams of CJK text (which has no spaces)."""
+    result: List[str] = []
+    for token in _TERM_PATTERN.findall(text.lower()):
+        if _CJK_PATTERN.match(token):
+            if len(token) == 1:
+                result.append(token)
+            else:
+                result.extend(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            result.append(token)
+    return result
+
+
+def chunk_text(text: str, chunk_chars: Optional[int] = None) -> List[str]:
+    """Split text into chunks of about `chunk_chars`, on paragraph then line boundaries."""
+    limit = chunk_chars or ATTACHMENT_CHUNK_TOKENS * tokenizer_registry.CHARS_PER_TOKEN
+    pieces: List[str] = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        while len(paragraph) > limit:
+            cut = paragraph.rfind("\n", 0, limit)
+            if cut < limit // 2:
+                cut = paragraph.rfind(" ", 0, limit)
+            if cut < limit // 2:
+                cut = limit
+            pieces.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+        if paragraph:
+            pieces.append(paragraph)
+
+    chunks: List[str] = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) + len(piece) + 2 <= limit:
+            chunks[-1] = f"{chunks[-1]}\n\n{piece}"
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+def build_index(text: str) -> Dict[str, Any]:
+    chunks = chunk_text(text)
+    frequencies = [Counter(terms(chunk)) for chunk in chunks]
+    document_frequency: Counter = Counter()
+    for tf in frequencies:
+        document_frequency.update(tf.keys())
+    lengths = [sum(tf.values()) for tf in frequencies]
+    return {
+        "version": INDEX_VERSION,
+        "chunks": chunks,
+        "tokens": tokenizer_registry.count_tokens_many(chunks),
+        "tf": [dict(tf) for tf in frequencies],
+        "df": dict(document_frequency),
+        "avgdl": sum(lengths) / len(lengths) if lengths else 0.0,
+    }
+
+
+def get_index(store: AttachmentStore, text: str) -> Dict[str, Any]:
+    """Chunk index of `text`: from memory, the attachment store, or built (and stored) now."""
+    key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+
+    index = store.load_chunk_index(key)
+    if index is None or index.get("version") != INDEX_VERSION:
+        index = build_index(text)
+        store.save_chunk_index(key, index)
+
+    with _indexes_lock:
+        _indexes[key] = index
+        while len(_indexes) > _MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def bm25_scores(index: Dict[str, Any], query_terms: Sequence[str]) -> List[float]:
+    n = len(index["chunks"])
+    avgdl = index["avgdl"] or 1.0
+    weights = {}
+    for term in set(query_terms):
+        df = index["df"].get(term)
+        if df:
+            weights[term] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+    scores = []
+    for tf in index["tf"]:
+        length = sum(tf.values())
+        score = 0.0
+        for term, idf in weights.items():
+            f = tf.get(term)
+            if f:
+                score += idf * f * (BM25_K1 + 1) / (f + BM25_K1 * (1 - BM25_B + BM25_B * length / avgdl))
+        scores.append(score)
+    return scores
+
+
+def select_context(
+    store: AttachmentStore,
+    query: str,
+    texts: Sequence[str],
+    budget: Optional[int] = None,
+) -> List[str]:
+    """
+    Prompt text for each of `texts` (attachment contents) within a shared token budget.
+
+    Texts that all fit are returned unchanged. Otherwise chunks are ranked by BM25
+    against `query` across all texts (ties, e.g. no matching terms, go to earlier
+    chunks) and taken while they fit; each text gets its chosen chunks in document
+    order, gaps marked with "[...]".
+    """
+    budget = ATTACHMENT_CONTEXT_TOKENS if budget is None else budget
+    if sum(tokenizer_registry.count_tokens_many(texts)) <= budget:
+        return list(texts)
+    indexes = [get_index(store, text) for text in texts]
+
+    query_terms = terms(query)
+    candidates: List[Tuple[float, int, int]] = []
+    for doc, index in enumerate(indexes):
+        for position, score in enumerate(bm25_scores(index, query_terms)):
+            candidates.append((score, doc, position))
+    candidates.sort(key=lambda c: (-c[0], c[2], c[1]))
+
+    chosen: List[List[int]] = [[] for _ in texts]
+    remaining = budget
+    for _, doc, position in candidates:
+        tokens = indexes[doc]["tokens"][position]
+        if tokens <= remaining:
+            chosen[doc].append(position)
+            remaining -= tokens
+
+    selected = []
+    for index, positions in zip(indexes, chosen):
+        positions.sort()
+        parts: List[str] = []
+        for i, position in enumerate(positions):
+            if i == 0 and position > 0 or i > 0 and position != positions[i - 1] + 1:
+                parts.append(GAP_MARKER)
+            parts.append(index["chunks"][position])
+        if positions and positions[-1] != len(index["chunks"]) - 1:
+            parts.append(GAP_MARKER)
+        header = f"[Excerpts: {len(positions)} of {len(index['chunks'])} sections, selected for relevance to the question]"
+        selected.append("\n\n".join([header, *parts]))
+    return selected
@@ -0,0 +1,230 @@
+"""Content-addressed store for uploaded attachments.
+
+`/api/upload` used to return the parsed file (up to 50k characters, or a base64
+data URI of up to 20 MB) to the browser, which posted it back with every message.
+Uploads are now stored server-side under the sha256 of the uploaded bytes:
+
+    <ATTACHMENT_DIR>/<id[:2]>/<id>.json   metadata (written last: its presence marks a complete entry)
+    <ATTACHMENT_DIR>/<id[:2]>/<id>.txt    parsed text (TXT/MD), untruncated
+    <ATTACHMENT_DIR>/<id[:2]>/<id>.img    image bytes, as uploaded
+    <ATTACHMENT_DIR>/<id[:2]>/<id>.<settings>.prep   image as sent to models (see image_pipeline)
+    <ATTACHMENT_DIR>/<id[:2]>/<id>.pdf    PDF source
+    <ATTACHMENT_DIR>/<id[:2]>/<id>.pages/<n>.md   converted PDF pages (0-based), filled on demand
+    <ATTACHMENT_DIR>/<sha[:2]>/<sha>.chunks.json  retrieval index of a text (sha256 of the text)
+
+PDFs are not converted on upload; `document_parser` converts the pages a message
+actually uses in a process pool and caches them here page by page.
+
+The upload returns the id and messages reference it. The same file uploaded
+again (by anyone, under any name) is parsed and stored once; the browser can
+check `GET /api/attachments/{id}` with the hash it computed locally and skip
+the upload altogether.
+
+Configuration (environment variables):
+- ATTACHMENT_DIR: storage directory (default data/attachments)
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from . import image_pipeline
+from .file_parser import get_image_mime_type, is_image_file, parse_file
+
+logger = logging.getLogger(__name__)
+
+ATTACHMENT_DIR = os.getenv("ATTACHMENT_DIR", "data/attachments")
+
+# Cap for `load_content` text and the char_count shown for uploads (~12.5k tokens);
+# messages select relevant chunks instead (see attachment_retrieval)
+MAX_TEXT_CHARS = 50000
+TRUNCATION_NOTICE = "\n\n... [Content truncated due to length]"
+
+_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def attachment_id(data: bytes) -> str:
+    """Content address of an uploaded file."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def is_attachment_id(value: str) -> bool:
+    return bool(_ID_PATTERN.match(value or ""))
+
+
+def truncate_text(text: str) -> str:
+    if len(text) > MAX_TEXT_CHARS:
+        return text[:MAX_TEXT_CHARS] + TRUNCATION_NOTICE
+    return text
+
+
+class AttachmentStore:
+    """Attachments on disk, addressed by the sha256 of the uploaded bytes."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, aid: str, suffix: str) -> str:
+        if not is_attachment_id(aid):
+            raise ValueError(f"附件 ID 格式无效: {aid}")
+        return os.path.join(self.root, aid[:2], f"{aid}{suffix}")
+
+    @staticmethod
+    def _write(path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, aid: str) -> Optional[Dict[str, Any]]:
+        """Metadata of a stored attachment, or None."""
+        try:
+            with open(self._path(aid, ".json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, filename: str, data: bytes) -> Tuple[Dict[str, Any], bool]:
+        """
+        Store an uploaded file, parsing it only if its content is new.
+
+        Returns:
+            (metadata, created) - created is False when the content was already stored
+
+        Raises:
+            ValueError: If the file type is not supported
+        """
+        aid = attachment_id(data)
+        meta = self.get(aid)
+        if meta is not None:
+            return meta, False
+
+        if filename.lower().endswith(".pdf"):
+            # Converted later, page by page (see document_parser); page_count is filled in then
+            meta = {"id": aid, "filename": filename, "file_type": "pdf", "byte_size": len(data), "page_count": None}
+            self._write(self._path(aid, ".pdf"), data)
+            self.save_meta(meta)
+            return meta, True
+
+        if is_image_file(filename):
+            meta = {
+                "id": aid, "filename": filename, "file_type": "image", "byte_size": len(data),
+                "mime_type": get_image_mime_type(filename), "char_count": 0,
+            }
+            self._write(self._path(aid, ".img"), data)
+        else:
+            parsed, file_type = parse_file(filename, data)
+            meta = {"id": aid, "filename": filename, "file_type": file_type, "byte_size": len(data)}
+            meta["char_count"] = len(truncate_text(parsed))
+            self._write(self._path(aid, ".txt"), parsed.encode("utf-8"))
+        self.save_meta(meta)
+        return meta, True
+
+    def save_meta(self, meta: Dict[str, Any]) -> None:
+        self._write(self._path(meta["id"], ".json"), json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+
+    def source_path(self, aid: str) -> str:
+        """Path of a stored PDF (read by the conversion workers)."""
+        return self._path(aid, ".pdf")
+
+    def _page_path(self, aid: str, page: int) -> str:
+        return os.path.join(self._path(aid, ".pages"), f"{page}.md")
+
+    def cached_pages(self, aid: str) -> Set[int]:
+        try:
+            names = os.listdir(self._path(aid, ".pages"))
+        except FileNotFoundError:
+            return set()
+        return {int(name[:-3]) for name in names if name.endswith(".md") and name[:-3].isdigit()}
+
+    def save_pages(self, aid: str, pages: Dict[int, str]) -> None:
+        for page, text in pages.items():
+            self._write(self._page_path(aid, page), text.encode("utf-8"))
+
+    def read_pages(self, aid: str, pages: Iterable[int]) -> str:
+        """Converted text of the given PDF pages, in order (they must be cached)."""
+        texts: List[str] = []
+        for page in pages:
+            with open(self._page_path(aid, page), "r", encoding="utf-8") as f:
+                texts.append(f.read())
+        return "\n\n".join(texts)
+
+    def load_chunk_index(self, key: str) -> Optional[Dict[str, Any]]:
+        """Retrieval index of a text (see attachment_retrieval), keyed by the text's sha256."""
+        try:
+            with open(self._path(key, ".chunks.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save_chunk_index(self, key: str, index: Dict[str, Any]) -> None:
+        self._write(self._path(key, ".chunks.json"), json.dumps(index, ensure_ascii=False).encode("utf-8"))
+
+    def read_text(self, aid: str, pages: Optional[List[int]] = None) -> str:
+        """Full parsed text of a text attachment (of the given or all pages for a converted PDF)."""
+        meta = self.get(aid)
+        if meta is not None and meta["file_type"] == "pdf":
+            return self.read_pages(aid, range(meta["page_count"]) if pages is None else pages)
+        with open(self._path(aid, ".txt"), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def read_image(self, aid: str) -> bytes:
+        with open(self._path(aid, ".img"), "rb") as f:
+            return f.read()
+
+    def prompt_image(self, aid: str, meta: Optional[Dict[str, Any]] = None) -> Tuple[bytes, str]:
+        """
+        An image as it is sent to models: downscaled and stripped by `image_pipeline`,
+        processed once per image and settings. Returns (bytes, MIME type).
+        """
+        meta = meta or self.get(aid)
+        if not image_pipeline.available():
+            return self.read_image(aid), meta.get("mime_type") or "image/jpeg"
+        path = self._path(aid, f".{image_pipeline.settings_key()}.prep")
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            try:
+                data, _ = image_pipeline.prepare_image(self.read_image(aid))
+            except ValueError as e:
+                logger.warning("Sending image %s unprocessed: %s", aid, e)
+                return self.read_image(aid), meta.get("mime_type") or "image/jpeg"
+            self._write(path, data)
+        return data, "image/png" if data.startswith(b"\x89PNG") else "image/jpeg"
+
+    def load_content(self, aid: str, pages: Optional[List[int]] = None) -> Optional[Tuple[Dict[str, Any], str]]:
+        """
+        Metadata and prompt content of an attachment: truncated text, or a base64
+        data URI for images. None if the attachment does not exist. PDF pages
+        (all by default) must have been converted already.
+        """
+        meta = self.get(aid)
+        if meta is None:
+            return None
+        if meta["file_type"] == "image":
+            data, mime_type = self.prompt_image(aid, meta)
+            return {**meta, "mime_type": mime_type}, f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}"
+        return meta, truncate_text(self.read_text(aid, pages))
+
+
+_store: Optional[AttachmentStore] = None
+_store_lock = threading.Lock()
+
+
+def get_attachment_store() -> AttachmentStore:
+    """Process-wide attachment store."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = AttachmentStore(ATTACHMENT_DIR)
+    return _store
@@ -0,0 +1 @@
+"""Micro-benchmarks for hot paths (run with `python -m backend.benchmarks.<name>`)."""
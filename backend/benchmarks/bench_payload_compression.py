@@ -0,0 +1,178 @@
+"""Benchmark: stored payload size and latency with zstd compression.
+
+Usage:
+    python -m backend.benchmarks.bench_payload_compression [--messages N] [--from-storage]
+
+Part 1 compresses council messages one at a time (the way they are stored):
+pretty-printed JSON (legacy `.json` files), compact JSON, zstd at several levels
+and zstd with a dictionary trained on a disjoint half of the messages. Messages
+are synthetic Stage 1/2/3 turns unless `--from-storage` samples the configured
+storage instead (use that for numbers that reflect your own council output).
+
+Part 2 writes the same turns through the `storage` API (JSON logs and SQLite in
+a temp directory) with compression off and on, and reports the on-disk size and
+the get/append latency.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from .. import payload_codec, storage
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _vocabulary(rng: random.Random, size: int = 3000) -> List[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(2, 10))) for _ in range(size)]
+
+
+def _text(rng: random.Random, words: List[str], size: int) -> str:
+    """Markdown-ish prose with a Zipf-like word distribution."""
+    parts: List[str] = []
+    total = 0
+    while total < size:
+        picks = (min(int(rng.paretovariate(1.1)) - 1, len(words) - 1) for _ in range(rng.randint(6, 20)))
+        sentence = " ".join(words[i] for i in picks)
+        kind = rng.random()
+        if kind < 0.1:
+            line = f"## {sentence[:40].title()}"
+        elif kind < 0.3:
+            line = f"- **{sentence.split()[0]}**: {sentence}."
+        else:
+            line = sentence.capitalize() + "."
+        parts.append(line)
+        total += len(line) + 1
+    return "\n".join(parts)[:size]
+
+
+def synthetic_messages(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    words = _vocabulary(rng)
+    messages: List[Dict[str, Any]] = []
+    models = [f"provider/model-{i}" for i in range(4)]
+    while len(messages) < count:
+        messages.append({"role": "user", "content": _text(rng, words, rng.randint(80, 600))})
+        messages.append({
+            "role": "assistant",
+            "stage1": [{"model": m, "response": _text(rng, words, rng.randint(1500, 6000))} for m in models],
+            "stage2": [
+                {
+                    "model": m,
+                    "ranking": _text(rng, words, 1200) + "\n\nFINAL RANKING:\n1. Response A\n2. Response C",
+                    "parsed_ranking": ["Response A", "Response C", "Response B", "Response D"],
+                }
+                for m in models
+            ],
+            "stage3": {"model": models[0], "response": _text(rng, words, rng.randint(1000, 4000))},
+            "metadata": {"label_to_model": {f"Response {chr(65 + i)}": m for i, m in enumerate(models)}},
+        })
+    return messages[:count]
+
+
+def _per_message(fn: Callable[[Any], Any], items: List[Any]) -> float:
+    started = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - started) / len(items) * 1e6
+
+
+def bench_codecs(messages: List[Dict[str, Any]]) -> None:
+    train, test = messages[::2], messages[1::2]
+    plain = [json.dumps(m, ensure_ascii=False, separators=(",", ":")).encode("utf-8") for m in test]
+    pretty = sum(len(json.dumps(m, indent=2).encode("utf-8")) for m in test)
+    compact = sum(len(p) for p in plain)
+
+    print(f"{len(test)} messages, {compact / len(test) / 1024:.1f} KiB average (compact JSON)")
+    print(f"{'format':<22}{'bytes':>12}{'ratio':>8}{'compress us':>14}{'decompress us':>15}")
+    print(f"{'json indent=2':<22}{pretty:>12}{compact / pretty:>8.2f}")
+    print(f"{'json compact':<22}{compact:>12}{1.0:>8.2f}")
+    if zstandard is None:
+        print("zstandard is not installed; skipping zstd rows")
+        return
+
+    dictionary = payload_codec.train_dictionary(train, 112640)
+    configs = [(f"zstd -{level}", level, None) for level in (1, 3, 9, 19)]
+    configs.append(("zstd -3 + dictionary", 3, dictionary))
+    for name, level, dict_data in configs:
+        compressor = zstandard.ZstdCompressor(level=level, dict_data=dict_data)
+        decompressor = zstandard.ZstdDecompressor(dict_data=dict_data)
+        frames = [compressor.compress(p) for p in plain]
+        size = sum(len(f) for f in frames)
+        compress_us = _per_message(compressor.compress, plain)
+        decompress_us = _per_message(decompressor.decompress, frames)
+        print(f"{name:<22}{size:>12}{compact / size:>8.2f}{compress_us:>14.1f}{decompress_us:>15.1f}")
+
+
+def _disk_size(root: Path) -> int:
+    """Bytes of conversation data (the JSON listing index, `.index.sqlite3*`, is the same either way)."""
+    return sum(p.stat().st_size for p in root.rglob("*") if p.is_file() and not p.name.startswith(".index"))
+
+
+def bench_storage(messages: List[Dict[str, Any]], conversations: int, ops: int) -> None:
+    print(f"\n{conversations} conversations x {len(messages)} messages through `storage` (ms per operation)")
+    print(f"{'backend':<8}{'compression':<13}{'disk KiB':>10}{'get':>10}{'append':>10}")
+    rng = random.Random(0)
+    for backend in ("json", "sqlite"):
+        for compression in ("none", "zstd"):
+            if compression == "zstd" and zstandard is None:
+                continue
+            with tempfile.TemporaryDirectory() as root:
+                storage.DATA_DIR = str(Path(root) / "json")
+                storage.SQLITE_PATH = str(Path(root) / "council.sqlite3")
+                storage.is_using_database = lambda: False
+                storage.is_using_sqlite = lambda backend=backend: backend == "sqlite"
+                payload_codec.PAYLOAD_COMPRESSION = compression
+                storage.get_conversation_cache().clear()
+                storage.get_conversation_cache().max_entries = 0  # time the backend, not the cache
+
+                ids = [str(uuid.uuid4()) for _ in range(conversations)]
+                for cid in ids:
+                    storage.create_conversation(cid)
+                    for message in messages:
+                        storage._append_message(cid, message)
+
+                started = time.perf_counter()
+                for _ in range(ops):
+                    storage.get_conversation(rng.choice(ids))
+                get = (time.perf_counter() - started) / ops * 1000
+                started = time.perf_counter()
+                for _ in range(ops):
+                    storage._append_message(rng.choice(ids), rng.choice(messages))
+                append = (time.perf_counter() - started) / ops * 1000
+                if backend == "sqlite":
+                    storage._sqlite().close()
+                size = _disk_size(Path(root)) / 1024
+                print(f"{backend:<8}{compression:<13}{size:>10.0f}{get:>10.3f}{append:>10.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=400, help="messages for the codec comparison")
+    parser.add_argument("--from-storage", action="store_true", help="sample messages from the configured storage")
+    parser.add_argument("--conversations", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=6, help="messages per conversation in part 2")
+    parser.add_argument("--ops", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.from_storage:
+        messages = list(payload_codec._stored_messages(args.messages))
+    else:
+        messages = synthetic_messages(args.messages)
+    bench_codecs(messages)
+    bench_storage(synthetic_messages(args.turns, seed=1), args.conversations, args.ops)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark: encoding one stage's requests per model vs once (`request_body`).
+
+Usage:
+    python -m backend.benchmarks.bench_request_body [--models N] [--images N] [--image-kb KB]
+
+Builds a Stage 1 style message list (history, search results and base64 images)
+and encodes the request for every council model two ways: the previous
+`json=payload` path (httpx runs json.dumps and encodes the result per model), and
+SharedBody.for_model. Reports CPU time per stage, the memory held by the bodies
+while all requests are in flight, and the peak while encoding (tracemalloc;
+orjson over-allocates its output buffer while encoding).
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import os
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from ..request_body import SharedBody, orjson
+
+
+def stage_messages(images: int, image_kb: int) -> List[Dict[str, Any]]:
+    history = []
+    for turn in range(6):
+        history.append({"role": "user", "content": f"Question {turn}: " + "context " * 200})
+        history.append({"role": "assistant", "content": "Answer with **markdown** and ✓ ünïcödé. " * 150})
+    image_parts = [
+        {"type": "image_url", "image_url": {"url": "data:image/jpeg;base64," + base64.b64encode(os.urandom(image_kb * 1024)).decode()}}
+        for _ in range(images)
+    ]
+    return [
+        {"role": "system", "content": "Web search results:\n" + "result snippet " * 2000},
+        *history,
+        {"role": "user", "content": [{"type": "text", "text": "Compare these images"}, *image_parts]},
+    ]
+
+
+def per_model_json(models: List[str], messages: List[Dict[str, Any]]) -> List[bytes]:
+    # What httpx does for json=payload
+    return [
+        json.dumps({"model": m, "messages": messages, "max_tokens": 8192}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        for m in models
+    ]
+
+
+def shared(models: List[str], messages: List[Dict[str, Any]]) -> List[Any]:
+    body = SharedBody({"messages": messages, "max_tokens": 8192})
+    return [body.for_model(m) for m in models]
+
+
+def measure(fn: Callable[[List[str], List[Dict[str, Any]]], List[Any]], models, messages, repeat: int):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(models, messages)
+    cpu_ms = (time.perf_counter() - started) / repeat * 1000
+
+    tracemalloc.start()
+    bodies = fn(models, messages)
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del bodies
+    return cpu_ms, held / 1024 / 1024, peak / 1024 / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", type=int, default=5)
+    parser.add_argument("--images", type=int, default=3)
+    parser.add_argument("--image-kb", type=int, default=800, help="size of each image before base64")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    messages = stage_messages(args.images, args.image_kb)
+    models = [f"provider/model-{i}" for i in range(args.models)]
+    size = len(json.dumps(messages)) / 1024 / 1024
+    print(f"{args.models} models, {size:.1f} MiB of messages, orjson {'on' if orjson else 'off'}")
+    print(f"{'encoding':<22}{'ms per stage':>14}{'held MiB':>10}{'peak MiB':>10}")
+    for name, fn in (("json per model", per_model_json), ("SharedBody", shared)):
+        cpu_ms, held, peak = measure(fn, models, messages, args.repeat)
+        print(f"{name:<22}{cpu_ms:>14.1f}{held:>10.1f}{peak:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
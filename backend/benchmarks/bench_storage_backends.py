@@ -0,0 +1,82 @@
+"""Benchmark: JSON file storage vs SQLite storage.
+
+Usage:
+    python -m backend.benchmarks.bench_storage_backends [--conversations N] [--messages N] [--ops N]
+
+Creates N conversations with a few messages each in a temp directory, then
+times listing (first page and everything), random gets and appends through the
+public `storage` API for each backend.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from .. import storage
+
+PAGE = 50
+
+
+def _assistant_stage1():
+    return [{"model": f"m{i}", "response": "lorem ipsum " * 150} for i in range(3)]
+
+
+def _use_backend(name: str, root: Path) -> None:
+    storage.DATA_DIR = str(root / "json")
+    storage.SQLITE_PATH = str(root / "council.sqlite3")
+    storage.is_using_database = lambda: False
+    storage.is_using_sqlite = lambda: name == "sqlite"
+
+
+def _time(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def bench(name: str, root: Path, conversations: int, messages: int, ops: int) -> None:
+    _use_backend(name, root)
+    rng = random.Random(0)
+    ids = [str(uuid.uuid4()) for _ in range(conversations)]
+    stage1 = _assistant_stage1()
+
+    started = time.perf_counter()
+    for cid in ids:
+        storage.create_conversation(cid, username="bench")
+    create = (time.perf_counter() - started) / conversations * 1000
+    for cid in ids:
+        for n in range(messages // 2):
+            storage.add_user_message(cid, f"question {n}")
+            storage.add_assistant_message(cid, stage1)
+
+    list_page = _time(lambda: storage.list_conversations(limit=PAGE), 20)
+    list_all = _time(storage.list_conversations, 3)
+    sample = [rng.choice(ids) for _ in range(ops)]
+    get = _time(lambda: storage.get_conversation(rng.choice(sample)), ops)
+    append = _time(lambda: storage.add_assistant_message(rng.choice(sample), stage1), ops)
+
+    print(f"{name:<8}{create:>12.3f}{list_page:>12.3f}{list_all:>12.1f}{get:>12.3f}{append:>12.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=10_000)
+    parser.add_argument("--messages", type=int, default=4, help="messages per conversation before timing")
+    parser.add_argument("--ops", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{args.conversations} conversations x {args.messages} messages (times in ms per operation)")
+    print(f"{'backend':<8}{'create':>12}{'list page':>12}{'list all':>12}{'get':>12}{'append':>12}")
+    for name in ("json", "sqlite"):
+        with tempfile.TemporaryDirectory() as root:
+            bench(name, Path(root), args.conversations, args.messages, args.ops)
+
+
+if __name__ == "__main__":
+    main()
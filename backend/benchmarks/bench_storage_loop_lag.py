@@ -0,0 +1,97 @@
+"""Benchmark: event-loop lag with blocking storage calls vs the async storage API.
+
+Usage:
+    python -m backend.benchmarks.bench_storage_loop_lag [--streams N] [--turns N] [--io-delay-ms MS]
+
+Simulates N concurrent chat streams, each loading its conversation and appending
+user/assistant messages, against JSON storage in a temp directory. "blocking"
+calls `storage` directly from the coroutines (as the handlers used to);
+"async" goes through `async_storage`. `--io-delay-ms` adds a sleep to every
+storage call to emulate a slow disk or database. A lag monitor samples the
+loop every 5 ms while the streams run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import tempfile
+import time
+import uuid
+
+from .. import async_storage, storage
+from ..loop_monitor import LoopLagMonitor
+
+STORAGE_CALLS = ("get_conversation", "add_user_message", "add_assistant_message")
+
+
+def _slow(fn, delay: float):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        time.sleep(delay)
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+async def _stream(api, conversation_id: str, turns: int, blocking: bool) -> None:
+    stage1 = [{"model": f"m{i}", "response": "x" * 4000} for i in range(4)]
+    for turn in range(turns):
+        if blocking:
+            api.get_conversation(conversation_id)
+            api.add_user_message(conversation_id, f"question {turn}")
+            api.add_assistant_message(conversation_id, stage1)
+        else:
+            await api.get_conversation(conversation_id)
+            await api.add_user_message(conversation_id, f"question {turn}")
+            await api.add_assistant_message(conversation_id, stage1)
+        # Model tokens arriving between storage calls
+        await asyncio.sleep(0)
+
+
+async def _run(mode: str, streams: int, turns: int) -> None:
+    ids = [str(uuid.uuid4()) for _ in range(streams)]
+    for conversation_id in ids:
+        storage.create_conversation(conversation_id)
+
+    monitor = LoopLagMonitor(interval_ms=5)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    monitor.reset()
+
+    api = storage if mode == "blocking" else async_storage
+    started = time.perf_counter()
+    await asyncio.gather(*(_stream(api, cid, turns, mode == "blocking") for cid in ids))
+    elapsed = time.perf_counter() - started
+    await asyncio.sleep(0.02)
+    await monitor.stop()
+
+    lag = monitor.stats()
+    print(
+        f"{mode:<10}{elapsed * 1000:>12.1f}{lag['p50_ms']:>12.2f}{lag['p99_ms']:>12.2f}{lag['max_ms']:>12.2f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, default=32)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--io-delay-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        storage.DATA_DIR = data_dir
+        storage.is_using_database = lambda: False
+        if args.io_delay_ms > 0:
+            for name in STORAGE_CALLS:
+                setattr(storage, name, _slow(getattr(storage, name), args.io_delay_ms / 1000))
+
+        print(f"{args.streams} streams x {args.turns} turns, +{args.io_delay_ms} ms per storage call")
+        print(f"{'mode':<10}{'total ms':>12}{'lag p50':>12}{'lag p99':>12}{'lag max':>12}")
+        for mode in ("blocking", "async"):
+            asyncio.run(_run(mode, args.streams, args.turns))
+            asyncio.run(async_storage.shutdown())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Benchmark: memory backends - mmap vector index vs per-conversation Chroma stores.
+
+Usage:
+    python -m backend.benchmarks.bench_vector_index [--conversations N] [--rows N]
+
+Uses deterministic random 384-dim vectors (the MiniLM dimension) instead of a real
+embedding model, so only storage and search are measured. The Chroma columns are
+skipped when chromadb is not installed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from ..vector_index import VectorIndex
+
+DIM = 384
+
+
+class RandomEmbeddings:
+    """Stable pseudo-embeddings: the same text always maps to the same vector."""
+
+    def _vector(self, text: str) -> List[float]:
+        rng = np.random.default_rng(zlib.crc32(text.encode()))
+        return rng.standard_normal(DIM, dtype=np.float32).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:>12.2f}"
+
+
+def bench_mmap(root: Path, data, queries) -> None:
+    embeddings = RandomEmbeddings()
+    index = VectorIndex(root / "mmap")
+    started = time.perf_counter()
+    for conversation_id, texts in data.items():
+        index.add(conversation_id, texts, embeddings.embed_documents(texts))
+    build = time.perf_counter() - started
+
+    started = time.perf_counter()
+    index = VectorIndex(root / "mmap")
+    cold_open = time.perf_counter() - started
+
+    vectors = [(cid, embeddings.embed_query(q)) for cid, q in queries]
+    started = time.perf_counter()
+    for cid, vector in vectors:
+        index.search(cid, vector, k=3)
+    search = (time.perf_counter() - started) / len(vectors)
+
+    files = sum(1 for p in (root / "mmap").rglob("*") if p.is_file())
+    print(f"{'mmap':<10}{_ms(build)}{_ms(cold_open)}{_ms(search)}{files:>10}")
+
+
+def bench_chroma(root: Path, data, queries) -> None:
+    try:
+        import chromadb  # noqa: F401
+        from langchain_community.vectorstores import Chroma
+    except ImportError:
+        print(f"{'chroma':<10}{'(chromadb not installed)':>36}")
+        return
+
+    embeddings = RandomEmbeddings()
+
+    def open_store(cid: str):
+        return Chroma(
+            collection_name=f"conv_{cid}",
+            embedding_function=embeddings,
+            persist_directory=str(root / "chroma" / cid),
+        )
+
+    started = time.perf_counter()
+    for conversation_id, texts in data.items():
+        open_store(conversation_id).add_texts(texts)
+    build = time.perf_counter() - started
+
+    # Cold open: one store per queried conversation, as CouncilMemorySystem did before pooling
+    started = time.perf_counter()
+    stores = {cid: open_store(cid) for cid, _ in queries}
+    cold_open = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for cid, query in queries:
+        stores[cid].similarity_search(query, k=3)
+    search = (time.perf_counter() - started) / len(queries)
+
+    files = sum(1 for p in (root / "chroma").rglob("*") if p.is_file())
+    print(f"{'chroma':<10}{_ms(build)}{_ms(cold_open)}{_ms(search)}{files:>10}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=500)
+    parser.add_argument("--rows", type=int, default=30, help="exchanges per conversation")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    data = {
+        f"conv-{c:05d}": [f"User: question {c}-{r}\nAssistant: answer {rng.random()}" for r in range(args.rows)]
+        for c in range(args.conversations)
+    }
+    ids = list(data)
+    queries = [(rng.choice(ids), f"follow-up {i}") for i in range(args.queries)]
+
+    print(f"{args.conversations} conversations x {args.rows} rows, dim {DIM}, {args.queries} queries")
+    print(f"{'backend':<10}{'build ms':>12}{'open ms':>12}{'search ms':>12}{'files':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        bench_mmap(root, data, queries)
+        bench_chroma(root, data, queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -58,14 +58,23 @@ if not CHAIRMAN_MODEL:
 # Data directory for conversation storage
 DATA_DIR = os.getenv("DATA_DIR", "data/conversations")
 
+# JSON storage file format for new conversations: "jsonl" (append-only log) or "json" (legacy
+# whole-file rewrites). Existing .json conversations stay readable either way.
+CONVERSATION_FORMAT = os.getenv("CONVERSATION_FORMAT", "jsonl").lower()
+
 # Timeout settings (in seconds)
 DEFAULT_TIMEOUT = float(os.getenv("DEFAULT_TIMEOUT", "120.0"))
 TITLE_GENERATION_TIMEOUT = float(os.getenv("TITLE_GENERATION_TIMEOUT", "180.0"))
 
+# TOON savings statistics: fraction of requests for which JSON-vs-TOON token savings are
+# measured (1.0 = every request, 0.0 = never). Measurement runs in a worker thread.
+TOON_STATS_SAMPLE_RATE = float(os.getenv("TOON_STATS_SAMPLE_RATE", "1.0"))
+
 # Storage backend configuration (Feature 2: Multi-Database Support)
 DATABASE_TYPE = os.getenv("DATABASE_TYPE", "json").lower()
 POSTGRESQL_URL = os.getenv("POSTGRESQL_URL", "")
 MYSQL_URL = os.getenv("MYSQL_URL", "")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "data/llmcouncil.sqlite3")
 
 # Authentication configuration - default FALSE for easy open source setup
 AUTH_ENABLED = os.getenv("AUTH_ENABLED", "false").lower() == "true"
@@ -122,7 +131,7 @@ def reload_config():
     global ENABLE_EXA, EXA_API_KEY, ENABLE_BRAVE, BRAVE_API_KEY
     global ENABLE_OPENAI_EMBEDDINGS, OPENAI_API_KEY
     global ENABLE_MEMORY, ENABLE_LANGGRAPH
-    global DATABASE_TYPE, POSTGRESQL_URL, MYSQL_URL
+    global DATABASE_TYPE, POSTGRESQL_URL, MYSQL_URL, SQLITE_PATH
     global GOOGLE_DRIVE_FOLDER_ID, GOOGLE_SERVICE_ACCOUNT_FILE, GOOGLE_DRIVE_ENABLED
     global DATA_DIR, DEFAULT_TIMEOUT, TITLE_GENERATION_TIMEOUT, MAX_COUNCIL_MODELS
 
@@ -183,6 +192,7 @@ def reload_config():
     DATABASE_TYPE = os.getenv("DATABASE_TYPE", "json").lower()
     POSTGRESQL_URL = os.getenv("POSTGRESQL_URL", "")
     MYSQL_URL = os.getenv("MYSQL_URL", "")
+    SQLITE_PATH = os.getenv("SQLITE_PATH", "data/llmcouncil.sqlite3")
 
     # Authentication
     AUTH_ENABLED = os.getenv("AUTH_ENABLED", "false").lower() == "true"
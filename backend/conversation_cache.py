@@ -0,0 +1,238 @@
+"""
+In-process write-through cache of recently used conversations.
+
+A streaming turn reads the conversation in the handler and then appends the
+user message, the title and the assistant message. Without a cache every read
+re-parses the whole log or reloads every message row. `storage` keeps the
+conversations it has loaded here and applies its own writes to the cached copy,
+so repeated reads of a hot conversation are memory lookups.
+
+Each entry carries a stamp: a cheap fingerprint of the stored conversation
+(the file's inode/size/mtime for JSON storage, `(message_count, title)` for the
+databases) that `storage` reads before serving a cached copy. A write made by
+another worker changes the stamp, so the stale entry is reloaded, and the cache
+stays correct with several workers. Entries also carry a version that is bumped
+on every write through this process.
+
+Listeners registered with `add_invalidation_listener` are called with the
+conversation id after every local write or delete (`None` after a clear). They
+can publish the id to the other workers (e.g. over Redis pub/sub), which call
+`invalidate(..., notify=False)` so their copies are dropped without waiting for
+the stamp check.
+
+Configuration (environment variables):
+- CONVERSATION_CACHE_SIZE: maximum number of cached conversations (default 128, 0 disables)
+- CONVERSATION_CACHE_MAX_MB: approximate memory budget in MB (default 64)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CONVERSATION_CACHE_SIZE = int(os.getenv("CONVERSATION_CACHE_SIZE", "128"))
+CONVERSATION_CACHE_MAX_MB = float(os.getenv("CONVERSATION_CACHE_MAX_MB", "64"))
+
+
+def approx_size(value: Any) -> int:
+    """Rough memory footprint of a JSON-like value (string lengths plus a fixed overhead per node)."""
+    if isinstance(value, str):
+        return len(value) + 48
+    if isinstance(value, dict):
+        return 64 + sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return 56 + sum(approx_size(v) for v in value)
+    return 24
+
+
+def _copy(conversation: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy handed to callers: they may rebind keys or extend the message list without touching the entry."""
+    copy = dict(conversation)
+    copy["messages"] = list(conversation.get("messages") or [])
+    return copy
+
+
+@dataclass
+class _Entry:
+    conversation: Dict[str, Any]
+    stamp: Any
+    size: int
+    version: int = 0
+
+
+class ConversationCache:
+    """Thread-safe LRU of conversation dicts bounded by entry count and approximate size."""
+
+    def __init__(self, max_entries: int = CONVERSATION_CACHE_SIZE, max_bytes: int = int(CONVERSATION_CACHE_MAX_MB * 1024 * 1024)):
+        self.max_entries = max(0, max_entries)
+        self.max_bytes = max(0, max_bytes)
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[Optional[str]], None]] = []
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def get(self, conversation_id: str, stamp: Any) -> Optional[Dict[str, Any]]:
+        """Cached copy of a conversation if its stamp still matches the stored one."""
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is None or entry.stamp != stamp:
+                if entry is not None:
+                    self._drop(conversation_id)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(conversation_id)
+            self.hits += 1
+            return _copy(entry.conversation)
+
+    def put(self, conversation_id: str, conversation: Dict[str, Any], stamp: Any) -> None:
+        """Cache a conversation just read from storage, with the stamp read before loading it."""
+        if not self.enabled:
+            return
+        entry = _Entry(_copy(conversation), stamp, approx_size(conversation))
+        with self._lock:
+            previous = self._entries.get(conversation_id)
+            if previous is not None:
+                entry.version = previous.version
+                self._drop(conversation_id)
+            if entry.size > self.max_bytes:
+                return
+            self._entries[conversation_id] = entry
+            self._bytes += entry.size
+            self._evict()
+
+    def version(self, conversation_id: str) -> Optional[int]:
+        """Number of writes applied to the cached copy (None if not cached)."""
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            return None if entry is None else entry.version
+
+    def append_message(self, conversation_id: str, message: Dict[str, Any], stamp: Any, expect: Any = None) -> None:
+        """Write-through of an appended message; see `update`."""
+        def apply(conversation: Dict[str, Any]) -> int:
+            conversation["messages"].append(message)
+            return approx_size(message)
+
+        self.update(conversation_id, apply, stamp, expect)
+
+    def set_title(self, conversation_id: str, title: str, stamp: Any, expect: Any = None) -> None:
+        """Write-through of a title change; see `update`."""
+        def apply(conversation: Dict[str, Any]) -> int:
+            delta = approx_size(title) - approx_size(conversation.get("title") or "")
+            conversation["title"] = title
+            return delta
+
+        self.update(conversation_id, apply, stamp, expect)
+
+    def update(
+        self,
+        conversation_id: str,
+        apply: Callable[[Dict[str, Any]], int],
+        stamp: Any,
+        expect: Any = None,
+    ) -> None:
+        """
+        Apply a write this process just made to the cached copy (if any).
+
+        `apply` mutates the cached conversation and returns the size delta.
+        `stamp` is the stored conversation's stamp after the write, or a function
+        deriving it from the entry's stamp. If `expect` is given it is the stamp
+        observed just before the write; when it differs from the entry's (another
+        worker wrote in between) the entry is dropped instead of patched.
+        """
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is not None:
+                if expect is not None and entry.stamp != expect:
+                    self._drop(conversation_id)
+                else:
+                    delta = apply(entry.conversation)
+                    entry.stamp = stamp(entry.stamp) if callable(stamp) else stamp
+                    entry.version += 1
+                    entry.size += delta
+                    self._bytes += delta
+                    self._entries.move_to_end(conversation_id)
+                    self._evict()
+        self._notify(conversation_id)
+
+    def invalidate(self, conversation_id: str, notify: bool = True) -> None:
+        """Drop a conversation (after a delete or a full rewrite, or on a message from another worker)."""
+        with self._lock:
+            self._drop(conversation_id)
+        if notify:
+            self._notify(conversation_id)
+
+    def clear(self, notify: bool = True) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if notify:
+            self._notify(None)
+
+    def add_invalidation_listener(self, listener: Callable[[Optional[str]], None]) -> None:
+        """Register a callback run with the conversation id (None for all) after each local write."""
+        self._listeners.append(listener)
+
+    def remove_invalidation_listener(self, listener: Callable[[Optional[str]], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __contains__(self, conversation_id: str) -> bool:
+        with self._lock:
+            return conversation_id in self._entries
+
+    def _drop(self, conversation_id: str) -> None:
+        entry = self._entries.pop(conversation_id, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+    def _notify(self, conversation_id: Optional[str]) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(conversation_id)
+            except Exception as e:
+                logger.warning("Conversation cache invalidation listener failed: %s", e)
+
+
+_cache: Optional[ConversationCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_conversation_cache() -> ConversationCache:
+    """Process-wide conversation cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ConversationCache()
+    return _cache
@@ -0,0 +1,140 @@
+"""Append-only JSONL log format for conversation files.
+
+Rewriting a whole conversation JSON file for every message makes each turn cost
+O(history). In the log format (`<id>.jsonl`) a conversation is a sequence of records:
+
+    {"op": "snapshot", "data": {...full conversation...}}
+    {"op": "message", "data": {...message...}}
+    {"op": "title", "data": "New title"}
+
+The file always starts with a snapshot; messages and title changes are appended.
+Readers rebuild the current state by replaying the records after the snapshot.
+Once `COMPACT_EVERY` records have been appended, the file is compacted into a
+single snapshot (written to a temp file and atomically renamed).
+
+With PAYLOAD_COMPRESSION=zstd, snapshot and message data is stored as a
+`{"_zstd": "<base64>"}` envelope (see `payload_codec`); both forms are read.
+
+Existing `.json` conversations stay readable. Convert them with:
+    python -m backend.conversation_log migrate [--data-dir data/conversations]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import payload_codec
+
+logger = logging.getLogger(__name__)
+
+LOG_SUFFIX = ".jsonl"
+COMPACT_EVERY = int(os.getenv("CONVERSATION_LOG_COMPACT_EVERY", "32"))
+
+
+# Records whose data is compressed when PAYLOAD_COMPRESSION is on (titles are too short to bother)
+_PACKED_OPS = ("snapshot", "message")
+
+
+def _encode(record: Dict[str, Any]) -> str:
+    if record.get("op") in _PACKED_OPS:
+        record = {**record, "data": payload_codec.pack(record["data"])}
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def apply_record(conversation: Optional[Dict[str, Any]], record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Apply one log record to a conversation state."""
+    op = record.get("op")
+    if op == "snapshot":
+        return payload_codec.unpack(record["data"])
+    if conversation is None:
+        raise ValueError("Conversation log does not start with a snapshot")
+    if op == "message":
+        conversation.setdefault("messages", []).append(payload_codec.unpack(record["data"]))
+    elif op == "title":
+        conversation["title"] = record["data"]
+    else:
+        logger.warning("Ignoring unknown conversation log record: %s", op)
+    return conversation
+
+
+def replay(f) -> Tuple[Optional[Dict[str, Any]], int]:
+    """
+    Rebuild a conversation from an open log file.
+
+    Returns:
+        (conversation or None if empty, number of records after the snapshot)
+    """
+    conversation = None
+    pending = 0
+    for line in f:
+        if not line.endswith("\n"):
+            # Torn final append (crash mid-write): not committed
+            break
+        record = json.loads(line)
+        conversation = apply_record(conversation, record)
+        pending = 0 if record.get("op") == "snapshot" else pending + 1
+    return conversation, pending
+
+
+def snapshot_text(conversation: Dict[str, Any]) -> str:
+    return _encode({"op": "snapshot", "data": conversation})
+
+
+def record_text(records: List[Dict[str, Any]]) -> str:
+    return "".join(_encode(r) for r in records)
+
+
+def write_snapshot(path: str, conversation: Dict[str, Any]) -> None:
+    """Atomically replace `path` with a single-snapshot log."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(snapshot_text(conversation))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def migrate_directory(data_dir: str, remove_json: bool = True) -> int:
+    """
+    Convert `<id>.json` conversations in `data_dir` to the log format.
+
+    Returns:
+        Number of converted conversations
+    """
+    converted = 0
+    for filename in sorted(os.listdir(data_dir)):
+        if not filename.endswith(".json"):
+            continue
+        json_path = os.path.join(data_dir, filename)
+        log_path = json_path[:-len(".json")] + LOG_SUFFIX
+        if os.path.exists(log_path):
+            continue
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                conversation = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("Skipping malformed conversation file %s: %s", json_path, e)
+            continue
+        write_snapshot(log_path, conversation)
+        if remove_json:
+            os.remove(json_path)
+        converted += 1
+    return converted
+
+
+if __name__ == "__main__":
+    from .config import DATA_DIR
+
+    parser = argparse.ArgumentParser(description="Conversation log tools")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--keep-json", action="store_true", help="keep the original .json files")
+    args = parser.parse_args()
+
+    count = migrate_directory(args.data_dir, remove_json=not args.keep_json)
+    print(f"Converted {count} conversations to {LOG_SUFFIX}")
+    print("Run `python -m backend.metadata_index rebuild` afterwards to refresh the listing index.")
@@ -2,8 +2,12 @@
 
 import re
 import json
+import random
+import asyncio
 import logging
 import contextvars
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import List, Dict, Any, Tuple, Optional
 
 from .toon_encoder import (
@@ -15,70 +19,220 @@ from .toon_encoder import (
 
 logger = logging.getLogger(__name__)
 
-# Request-scoped token stats using contextvars (thread/async safe)
-_token_stats_var: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar(
+STAGES_WITH_STATS = ("stage1", "stage2", "stage3")
+# Provider-reported token counts (see record_usage)
+USAGE_KEYS = ("prompt_tokens", "completion_tokens", "cached_tokens")
+USAGE_COUNTS = (*USAGE_KEYS, "calls")
+
+# Request-scoped TOON state using contextvars (thread/async safe).
+# The state dict is created by reset_token_stats() and mutated in place, so stage tasks
+# spawned with asyncio.create_task (which copy the context) still report into it.
+_token_stats_var: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
     'token_stats',
-    default={"stage1": None, "stage2": None, "stage3": None, "total": None}
+    default=None
 )
 
+# Savings statistics re-serialize payloads to JSON and tokenize both forms, which is
+# pure CPU work - keep it off the event loop.
+_stats_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="toon-stats")
+
+
+def _new_request_state() -> Dict[str, Any]:
+    return {
+        "stats": {"stage1": None, "stage2": None, "stage3": None, "total": None},
+        "usage": {"stages": {}, "models": {}},  # token counts reported by the providers
+        "pending": {},  # stage_name -> Future[stats dict]
+        "sampled": TOON_STATS_SAMPLE_RATE >= 1.0 or random.random() < TOON_STATS_SAMPLE_RATE,
+        "stage1_block": None,  # (key, toon_text, label_to_model)
+        "chairman_block": None,  # (key, toon_text)
+    }
+
+
+def _request_state() -> Dict[str, Any]:
+    state = _token_stats_var.get()
+    if state is None:
+        state = _new_request_state()
+        _token_stats_var.set(state)
+    return state
+
 
 def reset_token_stats():
     """Reset token stats for a new request. Must be called at start of each request."""
-    _token_stats_var.set({
-        "stage1": None,
-        "stage2": None,
-        "stage3": None,
-        "total": None
-    })
+    _token_stats_var.set(_new_request_state())
+
+
+def _resolve_finished_stats(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Move finished background computations into the stats dict and update the total."""
+    stats = state["stats"]
+    pending = state["pending"]
+    for stage_name, future in list(pending.items()):
+        if not future.done():
+            continue
+        del pending[stage_name]
+        try:
+            stats[stage_name] = future.result()
+        except Exception as e:
+            logger.warning("[TOON] Savings stats for %s failed: %s", stage_name, e)
+
+    stages_with_stats = [s for s in STAGES_WITH_STATS if stats.get(s)]
+    if stages_with_stats:
+        stats["total"] = aggregate_token_stats(*[stats[s] for s in stages_with_stats])
+
+    stages = state["usage"]["stages"]
+    if stages:
+        total = {key: sum(counts[key] for counts in stages.values()) for key in USAGE_COUNTS}
+        stats["usage"] = {
+            "stages": {name: counts.copy() for name, counts in stages.items()},
+            "models": {name: counts.copy() for name, counts in state["usage"]["models"].items()},
+            "total": total,
+        }
+    return stats.copy()
+
+
+def record_usage(stage_name: str, model: str, response: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Add a model response's provider-reported token usage to this turn's stats.
+
+    Usage is summed per stage and per model (token_stats["usage"]), so a turn
+    shows where its tokens went. `cached_tokens` are prompt tokens served from
+    the provider's prompt cache.
+
+    Returns:
+        The response's usage dict (to keep with the stage result), or None
+    """
+    usage = (response or {}).get('usage')
+    if not usage:
+        return None
+    buckets = _request_state()["usage"]
+    for counts in (
+        buckets["stages"].setdefault(stage_name, dict.fromkeys(USAGE_COUNTS, 0)),
+        buckets["models"].setdefault(model, dict.fromkeys(USAGE_COUNTS, 0)),
+    ):
+        for key in USAGE_KEYS:
+            counts[key] += usage.get(key) or 0
+        counts["calls"] += 1
+    return usage
+
+
+def _usage_field(usage: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"usage": usage} if usage else {}
 
 
 def get_token_stats() -> Dict[str, Any]:
-    """Get accumulated token stats for current request."""
-    return _token_stats_var.get().copy()
+    """
+    Get accumulated token stats for current request (non-blocking snapshot).
+
+    Stats still being computed in the background are omitted; use
+    collect_token_stats() to wait for them.
+    """
+    state = _token_stats_var.get()
+    if state is None:
+        return {"stage1": None, "stage2": None, "stage3": None, "total": None}
+    return _resolve_finished_stats(state)
+
+
+async def collect_token_stats(timeout: float = 5.0) -> Dict[str, Any]:
+    """Wait (up to timeout seconds) for background stats of this request, then return them."""
+    state = _token_stats_var.get()
+    if state is None:
+        return get_token_stats()
+
+    pending = list(state["pending"].values())
+    if pending:
+        done, not_done = await asyncio.wait(
+            [asyncio.wrap_future(f) for f in pending], timeout=timeout
+        )
+        if not_done:
+            logger.warning("[TOON] %d savings computations still running after %.1fs", len(not_done), timeout)
+    return _resolve_finished_stats(state)
 
 
-def format_with_toon(data: List[Dict], stage_name: str) -> Tuple[str, Dict]:
+def format_with_toon(data: List[Dict], stage_name: str) -> str:
     """
     Format data with TOON and track token savings.
 
+    Savings statistics are computed in a worker thread (for sampled requests only,
+    see TOON_STATS_SAMPLE_RATE) and picked up by collect_token_stats().
+
     Args:
         data: List of dicts to format
         stage_name: Name of stage for stats tracking (stage1, stage2, stage3)
 
     Returns:
-        Tuple of (formatted_text, stats_dict)
+        TOON-formatted text
     """
-    current_stats = _token_stats_var.get()
-
     logger.info(f"[TOON] format_with_toon called for {stage_name} with {len(data) if data else 0} items")
 
     if not data:
-        return "", {"json_tokens": 0, "toon_tokens": 0, "saved_percent": 0.0}
+        return ""
 
     # Encode to TOON
     toon_text = encode_for_llm(data)
 
-    # Calculate stats
-    stats = get_savings_stats(data, toon_text)
+    state = _request_state()
+    if state["sampled"]:
+        future: Future = _stats_executor.submit(get_savings_stats, data, toon_text)
+        state["pending"][stage_name] = future
 
-    # Store stats for this stage (create new dict to avoid mutation issues)
-    new_stats = current_stats.copy()
-    new_stats[stage_name] = stats
+    return toon_text
 
-    # Update total
-    stages_with_stats = [s for s in ["stage1", "stage2", "stage3"]
-                        if new_stats.get(s)]
-    if stages_with_stats:
-        new_stats["total"] = aggregate_token_stats(
-            *[new_stats[s] for s in stages_with_stats]
-        )
 
-    # Update the context var
-    _token_stats_var.set(new_stats)
+def encode_stage1_block(stage1_results: List[Dict[str, Any]]) -> Tuple[str, Dict[str, str]]:
+    """
+    Encode non-empty Stage 1 responses with anonymized labels, once per request.
+
+    Every Stage 2 reviewer gets the same encoded block; token savings are tracked
+    under "stage2" the first time it is built.
+
+    Args:
+        stage1_results: Results from Stage 1
+
+    Returns:
+        Tuple of (TOON text, label_to_model mapping)
+    """
+    valid_stage1 = [r for r in stage1_results if r.get('response') and r['response'].strip()]
+    key = tuple((r['model'], r['response']) for r in valid_stage1)
+
+    state = _request_state()
+    cached = state.get("stage1_block")
+    if cached is not None and cached[0] == key:
+        return cached[1], cached[2]
+
+    # Create anonymized labels for responses (Response A, Response B, etc.)
+    labels = [f"Response {chr(65 + i)}" for i in range(len(valid_stage1))]
+    label_to_model = {label: result['model'] for label, result in zip(labels, valid_stage1)}
+    responses_data = [
+        {"label": label, "content": result['response']}
+        for label, result in zip(labels, valid_stage1)
+    ]
+
+    toon_text = format_with_toon(responses_data, "stage2")
+    state["stage1_block"] = (key, toon_text, label_to_model)
+    return toon_text, label_to_model
+
+
+def encode_chairman_stage1_block(stage1_results: List[Dict[str, Any]]) -> str:
+    """
+    Encode Stage 1 responses for the chairman (`{model, response}` rows), once per request.
+
+    Unlike the Stage 2 block the chairman sees real model names. The tokens are not
+    tracked again, since the same responses were already counted for Stage 2.
+    """
+    stage1_data = [
+        {"model": result['model'], "response": result['response']}
+        for result in stage1_results
+        if result.get('response')
+    ]
+    key = tuple((r['model'], r['response']) for r in stage1_data)
 
-    logger.debug(f"[TOON] {stage_name}: JSON={stats['json_tokens']} TOON={stats['toon_tokens']} Saved={stats['saved_percent']}%")
+    state = _request_state()
+    cached = state.get("chairman_block")
+    if cached is not None and cached[0] == key:
+        return cached[1]
 
-    return toon_text, stats
+    toon_text = encode_for_llm(stage1_data)
+    state["chairman_block"] = (key, toon_text)
+    return toon_text
 
 
 def safe_serialize(obj: Any) -> str:
@@ -95,48 +249,34 @@ def safe_serialize(obj: Any) -> str:
         return s.encode('unicode_escape').decode('ascii')
 from .config import (
     COUNCIL_MODELS, CHAIRMAN_MODEL, TITLE_GENERATION_TIMEOUT,
-    ENABLE_MEMORY
+    ENABLE_MEMORY, TOON_STATS_SAMPLE_RATE
 )
 from .tools import get_available_tools
 from . import web_search as web_search_module
 from .memory import CouncilMemorySystem
+from .memory_queue import aenqueue_exchange
 from . import runtime_settings
 from . import router_dispatch
+from . import metrics
+from . import turn_trace
 
 
-def build_context_prompt(conversation_history: List[Dict[str, Any]], user_query: str) -> str:
+def build_history_messages(conversation_history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
-    Build a prompt with conversation history context.
+    Previous turns as chat messages: the user's messages and the council's final answers.
 
-    Args:
-        conversation_history: List of previous messages in the conversation
-        user_query: The current user question
-
-    Returns:
-        A formatted prompt with context
+    They are append-only across turns, so putting them first (and everything that
+    changes per turn after them) keeps a prefix that providers can cache.
     """
-    if not conversation_history:
-        return user_query
-
-    context_parts = []
+    messages = []
     for msg in conversation_history:
         if msg.get('role') == 'user':
-            context_parts.append(f"用户: {msg.get('content', '')}")
+            messages.append({"role": "user", "content": msg.get('content', '')})
         elif msg.get('role') == 'assistant':
             # Include only the final answer from stage3 for context
             if msg.get('stage3') and msg['stage3'].get('response'):
-                context_parts.append(f"委员会答复: {msg['stage3']['response']}")
-
-    if not context_parts:
-        return user_query
-
-    context = "\n\n".join(context_parts)
-    return f"""历史对话:
-{context}
-
-当前追问: {user_query}
-
-请结合历史对话上下文回答当前追问。"""
+                messages.append({"role": "assistant", "content": msg['stage3']['response']})
+    return messages
 
 
 def build_multimodal_messages(
@@ -144,23 +284,29 @@ def build_multimodal_messages(
     images: Optional[List[Dict[str, str]]] = None,
     conversation_history: Optional[List[Dict[str, Any]]] = None,
     router_type: Optional[str] = None,
+    context: Optional[List[str]] = None,
 ) -> List[Dict[str, Any]]:
     """
     Build messages array for LLM API, supporting both text and images.
 
+    Layout, most stable first (for provider-side prompt caching):
+    1. previous turns (see build_history_messages)
+    2. the current turn: per-turn context (memory, tool results) in fixed order,
+       then the query rendered with the Stage 1 template, then images
+
     Args:
         user_query: The user's text question
         images: Optional list of image dicts with 'content' (base64 data URI) and 'filename'
         conversation_history: Optional list of previous messages for context
+        context: Optional context blocks for this turn, in the order given
 
     Returns:
         List of message dicts ready for OpenRouter API
     """
-    # Build the text prompt with context
-    full_query = build_context_prompt(conversation_history or [], user_query)
+    # {full_query}: this turn's context and question (history precedes as separate messages)
+    full_query = "\n\n".join([*(context or []), user_query])
 
-    # Apply runtime Stage 1 prompt template (defaults to "{full_query}" which preserves
-    # current behavior if user hasn't customized it).
+    # Apply runtime Stage 1 prompt template (defaults to "{full_query}").
     settings = runtime_settings.get_runtime_settings()
     template = settings.stage1_prompt_template or "{full_query}"
     try:
@@ -172,7 +318,33 @@ def build_multimodal_messages(
     # Build message content (text-only for Ollama, multimodal for OpenRouter).
     content = router_dispatch.build_message_content(router_type, text_prompt, images)
 
-    return [{"role": "user", "content": content}]
+    return [*build_history_messages(conversation_history or []), {"role": "user", "content": content}]
+
+
+def _tool_context(tool_outputs: List[Dict[str, str]]) -> Optional[str]:
+    if not tool_outputs:
+        return None
+    return """IMPORTANT: Use the following real-time search results to answer the user's question.
+This data is current and should be used as the primary source for your response.
+
+Search Results:
+""" + "\n".join(
+        f"- {item['tool']}: {item['result']}" for item in tool_outputs
+    )
+
+
+async def _memory_context(conversation_id: Optional[str], user_query: str) -> Optional[str]:
+    """Relevant past exchanges from the memory system (Feature 4), if enabled."""
+    if not (ENABLE_MEMORY and conversation_id):
+        return None
+    try:
+        with turn_trace.span("memory", "lookup"):
+            memory = await asyncio.to_thread(CouncilMemorySystem, conversation_id)
+            memory_ctx = await memory.aget_context(user_query)
+    except Exception as e:
+        logger.warning("Memory context retrieval failed: %s", e)
+        return None
+    return f"Relevant past exchanges:\n{memory_ctx}" if memory_ctx else None
 
 
 # Tool detection helpers (Feature 4)
@@ -290,6 +462,7 @@ async def optimize_search_query(
             messages=messages,
             stage="SEARCH_OPTIMIZE",
         )
+        record_usage("search", chairman_model, response)
 
         if response and response.get('content'):
             optimized_query = response['content'].strip()
@@ -338,7 +511,7 @@ def run_tavily_direct(query: str, provider: str = None) -> List[Dict[str, str]]:
     tool_name = search_tool.name
     try:
         logger.info("[WEB_SEARCH] Executing %s search (provider=%s): %s", tool_name, provider or "auto", query[:100])
-        output = search_tool.invoke(query)
+        output = _call_tool(search_tool, query, "invoke")
         if output:
             try:
                 output_str = json.dumps(output, ensure_ascii=False)
@@ -375,15 +548,19 @@ async def run_web_search_direct(
     if p in {"tavily", "exa"}:
         return run_tavily_direct(query, provider=p)
 
+    started = time.perf_counter()
     try:
-        results = await web_search_module.perform_web_search(
-            query,
-            provider=p,
-            max_results=max_results,
-            full_content_results=full_content_results,
-        )
+        with turn_trace.span("tool", f"web_search:{p}"):
+            results = await web_search_module.perform_web_search(
+                query,
+                provider=p,
+                max_results=max_results,
+                full_content_results=full_content_results,
+            )
+        metrics.observe_tool(f"web_search:{p}", time.perf_counter() - started, ok=True)
         return [{"tool": f"web_search:{p}", "result": results}]
     except Exception as e:
+        metrics.observe_tool(f"web_search:{p}", time.perf_counter() - started, ok=False)
         logger.error("[WEB_SEARCH] provider=%s failed: %s", p, e)
         return [{"tool": f"web_search:{p}", "result": "[System Note: Web search failed.]"}]
 
@@ -434,6 +611,19 @@ def extract_ticker_candidates(text: str) -> List[str]:
     return candidates
 
 
+def _call_tool(tool, arg: str, method: str = "run") -> Any:
+    """Call a LangChain tool (`tool.run` or `tool.invoke`), recording its latency and span."""
+    started = time.perf_counter()
+    ok = False
+    try:
+        with turn_trace.span("tool", tool.name):
+            output = getattr(tool, method)(arg)
+        ok = True
+        return output
+    finally:
+        metrics.observe_tool(tool.name, time.perf_counter() - started, ok)
+
+
 def run_stock_for_tickers(stock_tool, tickers: List[str], limit: int) -> List[Dict[str, str]]:
     """Run stock tool for a list of tickers and return valid price outputs."""
     results: List[Dict[str, str]] = []
@@ -446,7 +636,7 @@ def run_stock_for_tickers(stock_tool, tickers: List[str], limit: int) -> List[Di
             continue
         seen.add(ticker)
         try:
-            output = stock_tool.run(ticker)
+            output = _call_tool(stock_tool, ticker)
             if not output:
                 continue
             output_str = safe_serialize(output)
@@ -488,7 +678,7 @@ def run_tools_for_query(query: str, limit: int = 3) -> List[Dict[str, str]]:
         # Fallback: try to infer tickers from web search output
         if not results and stock_tool and web_tool:
             try:
-                web_output = web_tool.run(query)
+                web_output = _call_tool(web_tool, query)
                 inferred_tickers = extract_ticker_candidates(str(web_output))
                 if inferred_tickers:
                     results.extend(run_stock_for_tickers(stock_tool, inferred_tickers, limit))
@@ -510,7 +700,7 @@ def run_tools_for_query(query: str, limit: int = 3) -> List[Dict[str, str]]:
         search_tool = tavily_tool or exa_tool or web_tool
         try:
             logger.debug("[TOOLS] Calling %s...", search_tool.name)
-            output = search_tool.invoke(query)
+            output = _call_tool(search_tool, query, "invoke")
             if output:
                 output_str = safe_serialize(output)
                 logger.debug("[TOOLS] %s returned %d chars", search_tool.name, len(output_str))
@@ -534,7 +724,7 @@ def run_tools_for_query(query: str, limit: int = 3) -> List[Dict[str, str]]:
         if tool.name in ("wikipedia", "arxiv") and not _has_research_signal(query):
             continue
         try:
-            output = tool.run(query)
+            output = _call_tool(tool, query)
             if output:
                 output_str = safe_serialize(output)
                 if len(output_str) > 500:
@@ -547,6 +737,7 @@ def run_tools_for_query(query: str, limit: int = 3) -> List[Dict[str, str]]:
     return results
 
 
+@metrics.timed_stage("stage1")
 async def stage1_collect_responses(
     user_query: str,
     conversation_history: List[Dict[str, Any]] = None,
@@ -568,8 +759,6 @@ async def stage1_collect_responses(
     Returns:
         Tuple of (stage1_results, tool_outputs)
     """
-    # Build messages with optional image support
-    messages = build_multimodal_messages(user_query, images, conversation_history, router_type=router_type)
     settings = runtime_settings.get_runtime_settings()
 
     # Add tool context if the query suggests tool usage (Feature 4)
@@ -578,25 +767,10 @@ async def stage1_collect_responses(
     if requires_tools(user_query):
         tool_outputs = run_tools_for_query(user_query)
         logger.debug("[STAGE1] tool_outputs: %d results", len(tool_outputs))
-        if tool_outputs:
-            tool_text = """IMPORTANT: Use the following real-time search results to answer the user's question.
-This data is current and should be used as the primary source for your response.
 
-Search Results:
-""" + "\n".join(
-                f"- {item['tool']}: {item['result']}" for item in tool_outputs
-            )
-            messages.insert(0, {"role": "system", "content": tool_text})
-
-    # Add memory context if enabled (Feature 4)
-    if ENABLE_MEMORY and conversation_id:
-        try:
-            memory = CouncilMemorySystem(conversation_id)
-            memory_ctx = memory.get_context(user_query)
-            if memory_ctx:
-                messages.insert(0, {"role": "system", "content": f"Relevant past exchanges:\n{memory_ctx}"})
-        except Exception as e:
-            logger.warning("Memory context retrieval failed: %s", e)
+    # Build messages with optional image support; per-turn context goes after the history
+    context = [c for c in (await _memory_context(conversation_id, user_query), _tool_context(tool_outputs)) if c]
+    messages = build_multimodal_messages(user_query, images, conversation_history, router_type=router_type, context=context)
 
     # Use provided models or fall back to default
     council_models = models if models else COUNCIL_MODELS
@@ -620,6 +794,7 @@ Search Results:
     # Format results - include both successes and errors
     stage1_results = []
     for model, response in responses.items():
+        usage = record_usage("stage1", model, response)
         if response is None:
             # Shouldn't happen with new error handling, but safety fallback
             stage1_results.append({
@@ -640,12 +815,14 @@ Search Results:
             # Successful response
             stage1_results.append({
                 "model": model,
-                "response": response.get('content', '')
+                "response": response.get('content', ''),
+                **_usage_field(usage),
             })
 
     return stage1_results, tool_outputs
 
 
+@metrics.timed_stage("stage1")
 async def stage1_collect_responses_streaming(
     user_query: str,
     conversation_history: List[Dict[str, Any]] = None,
@@ -672,8 +849,6 @@ async def stage1_collect_responses_streaming(
     Yields:
         Dict with 'model', 'response', and optionally 'tool_outputs' keys
     """
-    # Build messages with optional image support
-    messages = build_multimodal_messages(user_query, images, conversation_history, router_type=router_type)
     settings = runtime_settings.get_runtime_settings()
 
     # Add tool context
@@ -709,27 +884,14 @@ async def stage1_collect_responses_streaming(
         tool_outputs = run_tools_for_query(user_query)
         logger.debug("[STAGE1-STREAM] tool_outputs: %d results", len(tool_outputs))
 
-    if tool_outputs:
-        tool_text = """IMPORTANT: Use the following real-time search results to answer the user's question.
-This data is current and should be used as the primary source for your response.
-
-Search Results:
-""" + "\n".join(
-            f"- {item['tool']}: {item['result']}" for item in tool_outputs
-        )
-        messages.insert(0, {"role": "system", "content": tool_text})
+    tool_text = _tool_context(tool_outputs)
+    if tool_text:
         logger.info("[STAGE1-STREAM] Injected search context: %d chars", len(tool_text))
         logger.debug("[STAGE1-STREAM] Search context preview: %s...", tool_text[:500])
 
-    # Add memory context if enabled (Feature 4)
-    if ENABLE_MEMORY and conversation_id:
-        try:
-            memory = CouncilMemorySystem(conversation_id)
-            memory_ctx = memory.get_context(user_query)
-            if memory_ctx:
-                messages.insert(0, {"role": "system", "content": f"Relevant past exchanges:\n{memory_ctx}"})
-        except Exception as e:
-            logger.warning("Memory context retrieval failed (streaming): %s", e)
+    # Build messages with optional image support; per-turn context goes after the history
+    context = [c for c in (await _memory_context(conversation_id, user_query), tool_text) if c]
+    messages = build_multimodal_messages(user_query, images, conversation_history, router_type=router_type, context=context)
 
     # Use provided models or fall back to default
     council_models = models if models else COUNCIL_MODELS
@@ -749,6 +911,7 @@ Search Results:
         messages,
         temperature=settings.council_temperature,
     ):
+        usage = record_usage("stage1", model, response)
         if response is None:
             # Shouldn't happen with new error handling, but safety fallback
             yield {
@@ -769,10 +932,12 @@ Search Results:
             # Successful response
             yield {
                 "model": model,
-                "response": response.get('content', '')
+                "response": response.get('content', ''),
+                **_usage_field(usage),
             }
 
 
+@metrics.timed_stage("stage2")
 async def stage2_collect_rankings(
     user_query: str,
     stage1_results: List[Dict[str, Any]],
@@ -805,24 +970,9 @@ async def stage2_collect_rankings(
         logger.info("[STAGE2] Filtered %d empty responses, using %d valid responses",
                    len(stage1_results) - len(valid_stage1), len(valid_stage1))
 
-    # Create anonymized labels for responses (Response A, Response B, etc.)
-    labels = [chr(65 + i) for i in range(len(valid_stage1))]  # A, B, C, ...
-
-    # Create mapping from label to model name
-    label_to_model = {
-        f"Response {label}": result['model']
-        for label, result in zip(labels, valid_stage1)
-    }
-
-    # Build the ranking prompt - use TOON for token efficiency
-    # Prepare data for TOON encoding
-    responses_data = [
-        {"label": f"Response {label}", "content": result['response']}
-        for label, result in zip(labels, valid_stage1)
-    ]
-
-    # Format with TOON and track stats
-    responses_toon, _ = format_with_toon(responses_data, "stage2")
+    # Build the ranking prompt - anonymized Stage 1 responses in TOON for token efficiency
+    # (encoded once per request and shared by all reviewers)
+    responses_toon, label_to_model = encode_stage1_block(valid_stage1)
 
     # For the prompt, use a readable format that includes TOON
     responses_text = f"""The responses are provided in TOON (Token-Oriented Object Notation) format for efficiency:
@@ -878,6 +1028,7 @@ async def stage2_collect_rankings(
     stage2_results = []
     failed_count = 0
     for model, response in responses.items():
+        usage = record_usage("stage2", model, response)
         if response is None:
             # Shouldn't happen with new error handling
             failed_count += 1
@@ -905,7 +1056,8 @@ async def stage2_collect_rankings(
                 stage2_results.append({
                     "model": model,
                     "ranking": full_text,
-                    "parsed_ranking": parsed
+                    "parsed_ranking": parsed,
+                    **_usage_field(usage),
                 })
             else:
                 failed_count += 1
@@ -925,6 +1077,7 @@ async def stage2_collect_rankings(
     return stage2_results, label_to_model
 
 
+@metrics.timed_stage("stage3")
 async def stage3_synthesize_final(
     user_query: str,
     stage1_results: List[Dict[str, Any]],
@@ -959,14 +1112,8 @@ async def stage3_synthesize_final(
         }
 
     # Build comprehensive context for chairman using TOON for efficiency
-    # Prepare stage1 data for TOON (use encode_for_llm directly since we already
-    # counted these tokens in stage2_collect_rankings - avoid double-counting)
-    stage1_data = [
-        {"model": result['model'], "response": result['response']}
-        for result in stage1_results
-        if result.get('response')
-    ]
-    stage1_toon = encode_for_llm(stage1_data)
+    # (encoded once per request; its tokens were already counted in Stage 2)
+    stage1_toon = encode_chairman_stage1_block(stage1_results)
     stage1_text = f"Data in TOON format:\n{stage1_toon}"
 
     # Handle empty Stage 2 results gracefully
@@ -978,7 +1125,7 @@ async def stage3_synthesize_final(
             for result in stage2_results
             if result.get('ranking')
         ]
-        stage2_toon, _ = format_with_toon(stage2_data, "stage3")
+        stage2_toon = format_with_toon(stage2_data, "stage3")
         stage2_text = f"Data in TOON format:\n{stage2_toon}"
     else:
         stage2_text = ""
@@ -1028,6 +1175,7 @@ async def stage3_synthesize_final(
         stage="STAGE3",
         temperature=settings.chairman_temperature,
     )
+    usage = record_usage("stage3", chairman_model, response)
 
     # Check if response failed (None or error response)
     response_failed = response is None or response.get('error')
@@ -1053,6 +1201,7 @@ async def stage3_synthesize_final(
                 stage="STAGE3_FALLBACK",
                 temperature=settings.chairman_temperature,
             )
+            fallback_usage = record_usage("stage3", fallback_model, fallback_response)
 
             # Check if fallback succeeded (not None and not error)
             if fallback_response and not fallback_response.get('error') and fallback_response.get('content'):
@@ -1061,7 +1210,8 @@ async def stage3_synthesize_final(
                     "model": fallback_model,
                     "response": fallback_response.get('content', ''),
                     "fallback_used": True,
-                    "original_chairman": chairman_model
+                    "original_chairman": chairman_model,
+                    **_usage_field(fallback_usage),
                 }
             else:
                 fail_reason = fallback_response.get('error_message') if fallback_response else '无响应'
@@ -1083,7 +1233,8 @@ async def stage3_synthesize_final(
 
     return {
         "model": chairman_model,
-        "response": response.get('content', '')
+        "response": response.get('content', ''),
+        **_usage_field(usage),
     }
 
 
@@ -1202,6 +1353,7 @@ Title:"""
         timeout=TITLE_GENERATION_TIMEOUT,
         stage="TITLE",
     )
+    record_usage("title", CHAIRMAN_MODEL, response)
 
     if response is None:
         # Fallback to a generic title
@@ -1272,8 +1424,8 @@ async def run_full_council(
     # Save exchange to memory if enabled (Feature 4)
     if ENABLE_MEMORY and conversation_id:
         try:
-            memory = CouncilMemorySystem(conversation_id)
-            memory.save_exchange(user_query, stage3_result.get("response", ""))
+            with turn_trace.span("memory", "enqueue"):
+                await aenqueue_exchange(conversation_id, user_query, stage3_result.get("response", ""))
         except Exception as e:
             logger.warning("Memory save failed: %s", e)
 
@@ -1282,7 +1434,7 @@ async def run_full_council(
         "label_to_model": label_to_model,
         "aggregate_rankings": aggregate_rankings,
         "tool_outputs": tool_outputs,
-        "token_stats": get_token_stats()
+        "token_stats": await collect_token_stats()
     }
 
     return stage1_results, stage2_results, stage3_result, metadata
@@ -0,0 +1,221 @@
+"""Off-loop PDF conversion with a per-page cache.
+
+`pymupdf4llm.to_markdown` is CPU-bound and holds the GIL; run inline in a request
+handler it froze the server for every user while a large PDF was converted.
+PDFs are now converted in a process pool, a few pages per task, and each page
+is cached in the attachment store (keyed by the sha256 of the file), so:
+
+- only the pages a message asks for are converted (`pages="1-5,8"`)
+- pages already converted - by an earlier message or another user uploading
+  the same file - are never converted again
+- callers get progress events as batches finish
+- a document gets at most PDF_PARSE_TIMEOUT seconds per request; batches still
+  running at the deadline (at most PDF_PAGES_PER_TASK pages each) finish in the
+  background and their pages are cached for the next attempt
+
+Configuration (environment variables):
+- PDF_PARSE_WORKERS: conversion processes (default min(4, CPU count))
+- PDF_PARSE_TIMEOUT: seconds allowed per document and request (default 120)
+- PDF_PAGES_PER_TASK: pages converted per pool task (default 8)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import weakref
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .attachment_store import AttachmentStore, truncate_text
+
+logger = logging.getLogger(__name__)
+
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARSE_TIMEOUT = float(os.getenv("PDF_PARSE_TIMEOUT", "120"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+
+_RANGE_PATTERN = re.compile(r"^(\d+)(?:\s*-\s*(\d+))?$")
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+_document_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _page_count(path: str) -> int:
+    """Runs in a worker process."""
+    import pymupdf
+
+    with pymupdf.open(path) as doc:
+        return doc.page_count
+
+
+def _convert_pages(path: str, pages: List[int]) -> List[str]:
+    """Markdown of the given 0-based pages, in order. Runs in a worker process."""
+    import pymupdf
+    import pymupdf4llm
+
+    with pymupdf.open(path) as doc:
+        chunks = pymupdf4llm.to_markdown(doc, pages=pages, page_chunks=True, show_progress=False)
+    return [chunk["text"] for chunk in chunks]
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # spawn: forking a process that runs an event loop and thread pools is not safe
+                _executor = ProcessPoolExecutor(
+                    max_workers=max(1, PDF_PARSE_WORKERS),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _executor
+
+
+def shutdown() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def parse_page_range(spec: Optional[str], page_count: int) -> List[int]:
+    """
+    0-based page numbers selected by a 1-based, inclusive spec like "1-5,8".
+    An empty spec selects every page; ranges are clipped to the document.
+
+    Raises:
+        ValueError: If the spec is malformed or selects no page
+    """
+    if not spec or not spec.strip():
+        return list(range(page_count))
+    selected = set()
+    for part in spec.split(","):
+        match = _RANGE_PATTERN.match(part.strip())
+        if not match:
+            raise ValueError(f"页码范围格式无效: {spec}（示例: 1-5,8）")
+        first = int(match.group(1))
+        last = int(match.group(2) or first)
+        if first < 1 or last < first:
+            raise ValueError(f"页码范围格式无效: {spec}（示例: 1-5,8）")
+        selected.update(range(first - 1, min(last, page_count)))
+    if not selected:
+        raise ValueError(f"页码范围 {spec} 超出文档页数（共 {page_count} 页）")
+    return sorted(selected)
+
+
+def _document_lock(aid: str) -> asyncio.Lock:
+    lock = _document_locks.get(aid)
+    if lock is None:
+        lock = asyncio.Lock()
+        _document_locks[aid] = lock
+    return lock
+
+
+async def page_count(store: AttachmentStore, aid: str) -> int:
+    """Page count of a stored PDF (counted once, then kept in its metadata)."""
+    meta = await asyncio.to_thread(store.get, aid)
+    if meta.get("page_count") is None:
+        loop = asyncio.get_running_loop()
+        meta["page_count"] = await loop.run_in_executor(_get_executor(), _page_count, store.source_path(aid))
+        await asyncio.to_thread(store.save_meta, meta)
+    return meta["page_count"]
+
+
+def _progress(done: int, total: int) -> Dict[str, Any]:
+    return {"type": "progress", "done": done, "total": total}
+
+
+async def convert_pages(
+    store: AttachmentStore,
+    aid: str,
+    pages: List[int],
+    timeout: Optional[float] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Convert the given pages of a stored PDF that are not cached yet.
+
+    Yields {"type": "progress", "done": n, "total": len(pages)} once up front and
+    after every finished batch; when the generator is exhausted all pages are cached.
+
+    Raises:
+        asyncio.TimeoutError: If the pages are not converted within `timeout`
+            (default PDF_PARSE_TIMEOUT) seconds
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + (PDF_PARSE_TIMEOUT if timeout is None else timeout)
+    # One conversion per document per worker; a concurrent request waits and then finds the pages cached
+    async with _document_lock(aid):
+        cached = await asyncio.to_thread(store.cached_pages, aid)
+        missing = [page for page in pages if page not in cached]
+        done = len(pages) - len(missing)
+        yield _progress(done, len(pages))
+        if not missing:
+            return
+
+        path = store.source_path(aid)
+        batches = [missing[i:i + PDF_PAGES_PER_TASK] for i in range(0, len(missing), PDF_PAGES_PER_TASK)]
+        executor = _get_executor()
+
+        def save(batch: List[int], future) -> None:
+            # Also runs for batches that finish after the deadline, so their work is kept
+            if future.cancelled() or future.exception() is not None:
+                return
+            store.save_pages(aid, dict(zip(batch, future.result())))
+
+        running: Dict[asyncio.Future, List[int]] = {}
+        try:
+            for batch in batches:
+                future = executor.submit(_convert_pages, path, batch)
+                future.add_done_callback(lambda f, batch=batch: save(batch, f))
+                running[asyncio.wrap_future(future)] = batch
+            while running:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                finished, _ = await asyncio.wait(running, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for future in finished:
+                    batch = running.pop(future)
+                    future.result()
+                    done += len(batch)
+                if finished:
+                    yield _progress(done, len(pages))
+        finally:
+            # Batches not started yet are dropped; running ones finish and are cached by `save`
+            for future in running:
+                future.cancel()
+
+
+async def prepare_pdf(
+    store: AttachmentStore,
+    aid: str,
+    page_spec: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Count the pages of a stored PDF and convert the selected ones, yielding
+    progress events and finally {"type": "complete", "pages": [...], "char_count": n}.
+
+    Raises:
+        ValueError: If `page_spec` is invalid
+        asyncio.TimeoutError: If conversion exceeds the time limit
+    """
+    count = await page_count(store, aid)
+    pages = parse_page_range(page_spec, count)
+    async for event in convert_pages(store, aid, pages, timeout):
+        yield event
+    text = await asyncio.to_thread(store.read_pages, aid, pages)
+    char_count = len(truncate_text(text))
+    if len(pages) == count:
+        # Whole document converted: later lookups by hash can skip the upload
+        meta = await asyncio.to_thread(store.get, aid)
+        if meta.get("char_count") is None:
+            meta["char_count"] = char_count
+            await asyncio.to_thread(store.save_meta, meta)
+    yield {"type": "complete", "pages": pages, "char_count": char_count}
@@ -0,0 +1,213 @@
+"""Persistent embedding cache keyed by model id + SHA-256 of the text.
+
+Retries, repeated questions, re-saved exchanges and re-indexing after migrations
+embed the same texts again. `CachedEmbeddings` wraps any LangChain-style embeddings
+object and serves repeats from a SQLite file (`EMBEDDING_CACHE_PATH`, default
+`data/embedding_cache.sqlite3`). Vectors are stored as float16 blobs; results
+are always returned at float16 precision so a text embeds identically whether
+or not it was cached. The least recently used entries are evicted once the
+stored vectors exceed `EMBEDDING_CACHE_MAX_MB` (0 disables the cache).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = Path(os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache.sqlite3"))
+CACHE_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "256"))
+
+# Evict down to this fraction of the limit, so eviction doesn't run on every insert
+_EVICT_TARGET = 0.9
+
+Vector = List[float]
+
+
+def cache_key(model: str, text: str) -> bytes:
+    return hashlib.sha256(model.encode("utf-8") + b"\0" + text.encode("utf-8")).digest()
+
+
+def pack_vector(vector: Sequence[float]) -> bytes:
+    return struct.pack(f"<{len(vector)}e", *vector)
+
+
+def unpack_vector(blob: bytes) -> Vector:
+    return list(struct.unpack(f"<{len(blob) // 2}e", blob))
+
+
+class EmbeddingCache:
+    """SQLite-backed LRU store of float16 vectors, bounded by total blob size."""
+
+    def __init__(self, path: Path = CACHE_PATH, max_bytes: int = int(CACHE_MAX_MB * 1024 * 1024)):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key BLOB PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        row = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0), COUNT(*) FROM embeddings").fetchone()
+        self._bytes, self._entries = row[0], row[1]
+
+    def get_many(self, keys: Sequence[bytes]) -> Dict[bytes, Vector]:
+        """Look up vectors; found entries are marked as recently used."""
+        if not keys:
+            return {}
+        unique = list(dict.fromkeys(keys))
+        found: Dict[bytes, Vector] = {}
+        with self._lock:
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[bytes(key)] = unpack_vector(blob)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in found]
+                )
+            hits = sum(1 for k in keys if k in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, items: Dict[bytes, bytes]) -> None:
+        """Store packed vectors and evict least recently used entries over the size limit."""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for key, blob in items.items():
+                    old = self._conn.execute("SELECT LENGTH(vector) FROM embeddings WHERE key = ?", (key,)).fetchone()
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                        (key, blob, now),
+                    )
+                    if old is None:
+                        self._entries += 1
+                        self._bytes += len(blob)
+                    else:
+                        self._bytes += len(blob) - old[0]
+                self._evict()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                row = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0), COUNT(*) FROM embeddings").fetchone()
+                self._bytes, self._entries = row[0], row[1]
+                raise
+
+    def _evict(self) -> None:
+        if self._bytes <= self.max_bytes:
+            return
+        target = self.max_bytes * _EVICT_TARGET
+        # Walk the last_used index from the oldest entry and stop once enough is freed,
+        # so only the evicted keys are read
+        cursor = self._conn.execute("SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used")
+        evicted = []
+        try:
+            while self._bytes > target:
+                rows = cursor.fetchmany(256)
+                if not rows:
+                    break
+                for key, size in rows:
+                    if self._bytes <= target:
+                        break
+                    evicted.append((key,))
+                    self._bytes -= size
+                    self._entries -= 1
+        finally:
+            cursor.close()
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+        logger.debug("[EMBEDDINGS] Evicted %d cached vectors", len(evicted))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "entries": self._entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings:
+    """Embeddings wrapper that serves repeated texts from an `EmbeddingCache`."""
+
+    def __init__(self, embeddings: Any, cache: EmbeddingCache, model_name: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name
+
+    def embed_documents(self, texts: List[str]) -> List[Vector]:
+        keys = [cache_key(self.model_name, t) for t in texts]
+        try:
+            found = self.cache.get_many(keys)
+        except sqlite3.Error as e:
+            logger.warning("[EMBEDDINGS] Cache lookup failed: %s", e)
+            found = {}
+
+        missing = list(dict.fromkeys(k for k in keys if k not in found))
+        if missing:
+            first_text = {}
+            for key, text in zip(keys, texts):
+                first_text.setdefault(key, text)
+            vectors = self.embeddings.embed_documents([first_text[k] for k in missing])
+            packed = {k: pack_vector(v) for k, v in zip(missing, vectors)}
+            try:
+                self.cache.put_many(packed)
+            except sqlite3.Error as e:
+                logger.warning("[EMBEDDINGS] Cache write failed: %s", e)
+            for key, blob in packed.items():
+                found[key] = unpack_vector(blob)
+
+        return [found[k] for k in keys]
+
+    def embed_query(self, text: str) -> Vector:
+        return self.embed_documents([text])[0]
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache(create: bool = True) -> Optional[EmbeddingCache]:
+    """Process-wide cache (None when disabled via EMBEDDING_CACHE_MAX_MB=0 or unavailable)."""
+    global _cache
+    if CACHE_MAX_MB <= 0:
+        return None
+    if _cache is None and create:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = EmbeddingCache()
+                except (OSError, sqlite3.Error) as e:
+                    logger.warning("[EMBEDDINGS] Cache disabled, cannot open %s: %s", CACHE_PATH, e)
+                    return None
+    return _cache
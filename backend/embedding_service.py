@@ -0,0 +1,208 @@
+"""Micro-batched embedding service.
+
+Embedding one string per call wastes most of a CPU forward pass. This service runs
+the embedding model in one dedicated worker thread and groups concurrent requests
+into micro-batches, bounded by size (`EMBEDDING_BATCH_MAX_SIZE` texts) and time
+(`EMBEDDING_BATCH_MAX_WAIT_MS` after the first request of a batch arrives).
+
+Callers get a `concurrent.futures.Future`; async code awaits it via `aembed`, and
+`BatchedEmbeddings` adapts the service to the LangChain embeddings interface so
+vector stores use it transparently.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "10"))
+
+Vector = List[float]
+
+
+@dataclass
+class _Request:
+    texts: List[str]
+    future: Future
+    submitted_at: float = field(default_factory=time.monotonic)
+
+
+class EmbeddingService:
+    """Single worker thread serving embedding requests in micro-batches."""
+
+    def __init__(
+        self,
+        embeddings: Any,
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_wait_ms: float = BATCH_MAX_WAIT_MS,
+    ):
+        self.embeddings = embeddings
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        self._requests = 0
+        self._texts = 0
+        self._batches = 0
+        self._max_batch = 0
+        self._errors = 0
+        self._wait_total = 0.0
+        self._compute_total = 0.0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, texts: Sequence[str]) -> Future:
+        """Queue texts for embedding; the future resolves to one vector per text."""
+        future: Future = Future()
+        texts = list(texts)
+        if not texts:
+            future.set_result([])
+            return future
+        if self._closed:
+            future.set_exception(RuntimeError("Embedding service is shut down"))
+            return future
+        self._ensure_started()
+        self._queue.put(_Request(texts, future))
+        return future
+
+    def embed(self, texts: Sequence[str], timeout: Optional[float] = None) -> List[Vector]:
+        """Blocking embed (for use from worker threads, never from the event loop)."""
+        return self.submit(texts).result(timeout=timeout)
+
+    async def aembed(self, texts: Sequence[str]) -> List[Vector]:
+        """Embed without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(texts))
+
+    def _next_batch(self, first: _Request) -> tuple[List[_Request], bool]:
+        """Collect requests after `first` until the size or time bound is hit."""
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+            size += len(item.texts)
+        return batch, False
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, stop = self._next_batch(first)
+            self._process(batch)
+
+    def _process(self, batch: List[_Request]) -> None:
+        live = [r for r in batch if r.future.set_running_or_notify_cancel()]
+        if not live:
+            return
+
+        texts = [t for r in live for t in r.texts]
+        started = time.monotonic()
+        try:
+            vectors = self.embeddings.embed_documents(texts)
+            if len(vectors) != len(texts):
+                raise RuntimeError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+        except Exception as e:
+            logger.warning("[EMBEDDINGS] Batch of %d texts failed: %s", len(texts), e)
+            with self._stats_lock:
+                self._errors += 1
+            for r in live:
+                r.future.set_exception(e)
+            return
+
+        finished = time.monotonic()
+        offset = 0
+        for r in live:
+            r.future.set_result(vectors[offset:offset + len(r.texts)])
+            offset += len(r.texts)
+
+        with self._stats_lock:
+            self._batches += 1
+            self._requests += len(live)
+            self._texts += len(texts)
+            self._max_batch = max(self._max_batch, len(texts))
+            self._compute_total += finished - started
+            for r in live:
+                self._wait_total += started - r.submitted_at
+                latency = finished - r.submitted_at
+                self._latency_total += latency
+                self._latency_max = max(self._latency_max, latency)
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch-size and latency metrics since start."""
+        with self._stats_lock:
+            batches = self._batches or 1
+            requests = self._requests or 1
+            return {
+                "requests": self._requests,
+                "texts": self._texts,
+                "batches": self._batches,
+                "errors": self._errors,
+                "queue_depth": self._queue.qsize(),
+                "avg_batch_size": round(self._texts / batches, 2),
+                "max_batch_size": self._max_batch,
+                "avg_queue_wait_ms": round(self._wait_total / requests * 1000, 2),
+                "avg_batch_compute_ms": round(self._compute_total / batches * 1000, 2),
+                "avg_latency_ms": round(self._latency_total / requests * 1000, 2),
+                "max_latency_ms": round(self._latency_max * 1000, 2),
+            }
+
+    def shutdown(self, timeout: Optional[float] = 5.0) -> None:
+        """Finish queued work and stop the worker thread."""
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+
+class BatchedEmbeddings:
+    """LangChain-compatible embeddings that route through an `EmbeddingService`."""
+
+    def __init__(self, service: EmbeddingService):
+        self.service = service
+
+    def embed_documents(self, texts: List[str]) -> List[Vector]:
+        return self.service.embed(texts)
+
+    def embed_query(self, text: str) -> Vector:
+        return self.service.embed([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[Vector]:
+        return await self.service.aembed(texts)
+
+    async def aembed_query(self, text: str) -> Vector:
+        return (await self.service.aembed([text]))[0]
@@ -0,0 +1,94 @@
+"""Image preprocessing for multimodal prompts.
+
+Uploaded images (up to 20 MB) used to be base64-encoded as-is and embedded in
+the request to every council model. Providers downscale large images anyway
+(most to ~1.5-2k pixels on the long side), so the extra bytes only cost upload
+time and request size, once per model. Before an image goes into a prompt it is:
+
+- rotated upright per its EXIF orientation, then stripped of all metadata
+  (EXIF, GPS, ICC profiles, comments)
+- downscaled so its longer side is at most IMAGE_MAX_DIMENSION pixels
+- re-encoded as JPEG at IMAGE_QUALITY, or PNG if it has transparency
+  (animated GIFs keep their first frame)
+
+The result is cached next to the original in the attachment store, keyed by the
+image's sha256 and these settings, so each image is processed once.
+
+Requires Pillow; without it images are sent unchanged.
+
+Configuration (environment variables):
+- IMAGE_MAX_DIMENSION: longest side in pixels (default 1568)
+- IMAGE_QUALITY: JPEG quality 1-95 (default 85)
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+import os
+from typing import Tuple
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1568"))
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))
+
+_warned_missing = False
+
+
+def available() -> bool:
+    global _warned_missing
+    if Image is None:
+        if not _warned_missing:
+            logger.warning("Pillow is not installed; images are sent to models without resizing")
+            _warned_missing = True
+        return False
+    return True
+
+
+def settings_key() -> str:
+    """Identifies the output of the current settings (part of the cache key)."""
+    return f"{IMAGE_MAX_DIMENSION}q{IMAGE_QUALITY}"
+
+
+def _has_alpha(image) -> bool:
+    if image.mode in ("RGBA", "LA"):
+        return image.getextrema()[-1][0] < 255
+    return image.mode == "P" and "transparency" in image.info
+
+
+def prepare_image(data: bytes) -> Tuple[bytes, str]:
+    """
+    Downscaled, metadata-free re-encoding of an image.
+
+    Returns:
+        (image bytes, MIME type)
+
+    Raises:
+        ValueError: If the data is not a readable image
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except Exception as e:
+        raise ValueError(f"无法读取图片: {e}") from e
+
+    image = ImageOps.exif_transpose(image)
+    transparent = _has_alpha(image)
+    image = image.convert("RGBA" if transparent else "RGB")
+    if max(image.size) > IMAGE_MAX_DIMENSION:
+        image.thumbnail((IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION), Image.LANCZOS)
+
+    # A fresh save without exif=/icc_profile= writes no metadata
+    out = io.BytesIO()
+    if transparent:
+        image.save(out, format="PNG", optimize=True)
+        return out.getvalue(), "image/png"
+    image.save(out, format="JPEG", quality=IMAGE_QUALITY, optimize=True, progressive=True)
+    return out.getvalue(), "image/jpeg"
@@ -0,0 +1,74 @@
+"""Event-loop lag monitor.
+
+A background task sleeps for a fixed interval and records how late it wakes up.
+Any blocking call on the event loop (file I/O, a synchronous DB query, CPU-heavy
+parsing) shows up as lag, and the same lag is added to every concurrent request
+and SSE stream. Stats are exposed at `GET /api/storage/stats`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+LOOP_LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "100"))
+LOOP_LAG_SAMPLES = 1000
+
+
+class LoopLagMonitor:
+    """Measures scheduling delay of the running event loop."""
+
+    def __init__(self, interval_ms: float = LOOP_LAG_INTERVAL_MS, samples: int = LOOP_LAG_SAMPLES):
+        self.interval = interval_ms / 1000
+        self._samples: Deque[float] = deque(maxlen=samples)
+        self._max_ms = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, time.perf_counter() - expected) * 1000)
+
+    def record(self, lag_ms: float) -> None:
+        self._samples.append(lag_ms)
+        self._max_ms = max(self._max_ms, lag_ms)
+
+    def reset(self) -> None:
+        self._samples.clear()
+        self._max_ms = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        samples = sorted(self._samples)
+        if not samples:
+            return {"samples": 0, "avg_ms": None, "p50_ms": None, "p99_ms": None, "max_ms": None}
+
+        def pct(p: float) -> float:
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 2)
+
+        return {
+            "samples": len(samples),
+            "avg_ms": round(sum(samples) / len(samples), 2),
+            "p50_ms": pct(0.50),
+            "p99_ms": pct(0.99),
+            "max_ms": round(self._max_ms, 2),
+        }
+
+
+loop_lag_monitor = LoopLagMonitor()
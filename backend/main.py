@@ -1,10 +1,10 @@
 """FastAPI backend for LLM Council."""
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Depends, Header
+from fastapi import FastAPI, HTTPException, UploadFile, File, Depends, Header, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 from urllib.parse import urlparse
@@ -36,16 +36,21 @@ def get_version() -> str:
 
 VERSION = get_version()
 
-from . import storage
+from . import async_storage
+from . import memory
+from . import memory_queue
 from .council import (
     run_full_council, generate_conversation_title,
     stage1_collect_responses, stage1_collect_responses_streaming,
     stage2_collect_rankings, stage3_synthesize_final,
-    calculate_aggregate_rankings, reset_token_stats, get_token_stats
+    calculate_aggregate_rankings, reset_token_stats, collect_token_stats, get_token_stats
 )
-from .file_parser import parse_file, get_supported_extensions, is_image_file
+from .file_parser import get_supported_extensions, is_image_file
+from .attachment_store import get_attachment_store, is_attachment_id
+from . import attachment_retrieval, document_parser, metrics, turn_trace
 from .auth import LoginRequest, authenticate, validate_auth_token, validate_token, get_usernames, validate_jwt_config
-from .config import AUTH_ENABLED, MIN_CHAIRMAN_CONTEXT, ROUTER_TYPE
+from .config import AUTH_ENABLED, ENABLE_MEMORY, MIN_CHAIRMAN_CONTEXT, ROUTER_TYPE
+from .loop_monitor import loop_lag_monitor
 from .gdrive import upload_to_drive, get_drive_status, is_drive_configured
 from .database import init_database
 from .runtime_settings import (
@@ -114,6 +119,25 @@ async def startup_event():
     validate_jwt_config()
     # Initialize database tables if using database storage (Feature 2: Multi-DB support)
     init_database()
+    loop_lag_monitor.start()
+    # Load the embedding model in the background so the first council turn doesn't pay for it
+    if ENABLE_MEMORY:
+        loop = asyncio.get_running_loop()
+        loop.run_in_executor(None, memory.warm_up)
+        # Replay memory saves that were queued but not written before the last shutdown
+        loop.run_in_executor(None, memory_queue.get_memory_queue().start)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers (pending memory saves are flushed first)."""
+    await asyncio.to_thread(memory_queue.get_memory_queue().shutdown)
+    memory.shutdown()
+    document_parser.shutdown()
+    await async_storage.shutdown()
+    await loop_lag_monitor.stop()
+    metrics.shutdown()
+
 
 # Enable CORS for local development
 app.add_middleware(
@@ -132,6 +156,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -145,11 +170,19 @@ class CreateConversationRequest(BaseModel):
 
 
 class FileAttachment(BaseModel):
-    """File attachment with parsed content."""
+    """File attachment: the id returned by /api/upload, or (legacy clients) the parsed content itself."""
     filename: str = Field(max_length=255, pattern=r'^[^/\\<>:"|?*\x00-\x1f]+$')  # Safe filename
     file_type: str = Field(max_length=20)  # 'pdf', 'txt', 'md', or 'image'
-    content: str = Field(max_length=5_000_000)  # 5MB limit per file (base64)
+    id: Optional[str] = Field(default=None, pattern=r'^[0-9a-f]{64}$')  # sha256 attachment id
+    content: Optional[str] = Field(default=None, max_length=5_000_000)  # 5MB limit per file (base64)
     mime_type: Optional[str] = Field(default=None, max_length=100)
+    pages: Optional[str] = Field(default=None, max_length=100, pattern=r'^[0-9,\- ]*$')  # PDF page range, e.g. "1-5,8"
+
+    @model_validator(mode='after')
+    def require_id_or_content(self):
+        if self.id is None and self.content is None:
+            raise ValueError("附件必须包含 id 或 content")
+        return self
 
 
 class SendMessageRequest(BaseModel):
@@ -166,7 +199,7 @@ class SendMessageRequest(BaseModel):
         """Validate total size of all attachments (max 20MB total)."""
         if v is None:
             return v
-        total_size = sum(len(att.content) for att in v)
+        total_size = sum(len(att.content or "") for att in v)
         max_total_size = 20_000_000  # 20MB total
         if total_size > max_total_size:
             raise ValueError(f"附件总大小（{total_size / 1_000_000:.1f}MB）超过上限（20MB）")
@@ -197,6 +230,17 @@ class Conversation(BaseModel):
     chairman: Optional[str] = None
     username: Optional[str] = None
     execution_mode: Optional[str] = None
+    # Set when only a window of the messages was requested: index of the first
+    # returned message and the total number of messages in the conversation.
+    message_offset: int = 0
+    message_count: Optional[int] = None
+
+
+class MessagePage(BaseModel):
+    """A window of a conversation's messages."""
+    messages: List[Dict[str, Any]]
+    offset: int
+    total: int
 
 
 class UpdateRuntimeSettingsRequest(BaseModel):
@@ -221,11 +265,32 @@ async def root():
     return {"status": "ok", "service": "LLM Council API", "version": VERSION}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus metrics (see backend/metrics.py)."""
+    if not metrics.enabled():
+        raise HTTPException(status_code=503, detail="指标未启用：请安装 prometheus-client 并设置 METRICS_ENABLED=true")
+    body, content_type = await asyncio.to_thread(metrics.render)
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/api/version")
 async def get_api_version():
     """Get API version."""
     return {"version": VERSION}
 
+
+@app.get("/api/memory/stats")
+async def get_memory_stats_endpoint(current_user: str = Depends(get_current_user)):
+    """Get memory embedding batch metrics and write-behind queue depth."""
+    return {**memory.get_memory_stats(), "write_queue": memory_queue.get_memory_queue().stats()}
+
+
+@app.get("/api/storage/stats")
+async def get_storage_stats_endpoint(current_user: str = Depends(get_current_user)):
+    """Get storage thread pool usage and event-loop lag."""
+    return {**async_storage.stats(), "event_loop_lag": loop_lag_monitor.stats()}
+
 # ==================== Runtime Settings (Non-secret) ====================
 
 
@@ -900,10 +965,36 @@ async def get_auth_status():
 
 # ==================== Conversation Endpoints ====================
 
+DEFAULT_PAGE_SIZE = 50
+
+
 @app.get("/api/conversations", response_model=List[ConversationMetadata])
-async def list_conversations(current_user: str = Depends(get_current_user)):
-    """List all conversations (metadata only). Requires authentication."""
-    return storage.list_conversations()
+async def list_conversations(
+    response: Response,
+    limit: Optional[int] = Query(default=None, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None, max_length=512),
+    username: Optional[str] = Query(default=None, max_length=255),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    List conversations (metadata only), newest first. Requires authentication.
+
+    With `cursor`, `username` or `limit` (and no `offset`) the list is keyset-paginated:
+    the `X-Next-Cursor` response header holds the cursor for the next page and is
+    absent on the last page. Without any of them every conversation is returned.
+    """
+    if offset or (limit is None and cursor is None and username is None):
+        return await async_storage.list_conversations(limit=limit, offset=offset)
+    try:
+        rows, next_cursor = await async_storage.list_conversations_page(
+            limit or DEFAULT_PAGE_SIZE, cursor=cursor, username=username
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
 
 
 @app.post("/api/conversations", response_model=Conversation)
@@ -930,7 +1021,7 @@ async def create_conversation(
     conversation_id = str(uuid.uuid4())
     # Use authenticated user if not specified in request
     username = request.username or current_user
-    conversation = storage.create_conversation(
+    conversation = await async_storage.create_conversation(
         conversation_id,
         models=request.models,
         chairman=request.chairman,
@@ -944,25 +1035,56 @@ async def create_conversation(
 @app.get("/api/conversations/{conversation_id}", response_model=Conversation)
 async def get_conversation(
     conversation_id: str,
+    messages_limit: Optional[int] = Query(default=None, ge=1, le=500),
     current_user: str = Depends(get_current_user)
 ):
-    """Get a specific conversation with all its messages. Requires authentication."""
-    conversation = storage.get_conversation(conversation_id)
+    """
+    Get a specific conversation. Requires authentication.
+
+    With `messages_limit` only the most recent messages are returned (starting at a
+    user message); `message_offset`/`message_count` describe the window and older
+    messages are fetched from `/api/conversations/{id}/messages`.
+    """
+    if messages_limit is None:
+        conversation = await async_storage.get_conversation(conversation_id)
+    else:
+        conversation = await async_storage.get_conversation_window(conversation_id, messages_limit)
     if conversation is None:
         raise HTTPException(status_code=404, detail="未找到对话")
     return conversation
 
 
+@app.get("/api/conversations/{conversation_id}/messages", response_model=MessagePage)
+async def get_conversation_messages(
+    conversation_id: str,
+    before: Optional[int] = Query(default=None, ge=0),
+    limit: int = Query(default=20, ge=1, le=500),
+    current_user: str = Depends(get_current_user)
+):
+    """Messages `[before - limit, before)` of a conversation (the latest `limit` without `before`)."""
+    if before is None:
+        before = await async_storage.count_messages(conversation_id)
+        if before is None:
+            raise HTTPException(status_code=404, detail="未找到对话")
+    offset = max(0, before - limit)
+    page = await async_storage.get_messages(conversation_id, offset=offset, limit=before - offset)
+    if page is None:
+        raise HTTPException(status_code=404, detail="未找到对话")
+    messages, total = page
+    return {"messages": messages, "offset": offset, "total": total}
+
+
 @app.delete("/api/conversations/{conversation_id}")
 async def delete_conversation(
     conversation_id: str,
     current_user: str = Depends(get_current_user)
 ):
     """Delete a specific conversation. Requires authentication."""
-    conversation = storage.get_conversation(conversation_id)
+    conversation = await async_storage.get_conversation(conversation_id)
     if conversation is None:
         raise HTTPException(status_code=404, detail="未找到对话")
-    storage.delete_conversation(conversation_id)
+    await async_storage.delete_conversation(conversation_id)
+    await asyncio.to_thread(memory.release_store, conversation_id)
     return {"status": "deleted", "id": conversation_id}
 
 
@@ -976,11 +1098,11 @@ async def update_title(
     Update the title of a conversation (Feature 5). Requires authentication.
     Works with all storage backends: JSON, PostgreSQL, MySQL.
     """
-    conversation = storage.get_conversation(conversation_id)
+    conversation = await async_storage.get_conversation(conversation_id)
     if conversation is None:
         raise HTTPException(status_code=404, detail="未找到对话")
 
-    storage.update_conversation_title(conversation_id, request.title)
+    await async_storage.update_conversation_title(conversation_id, request.title)
 
     return {
         "success": True,
@@ -992,19 +1114,37 @@ async def update_title(
 @app.delete("/api/conversations")
 async def delete_all_conversations(current_user: str = Depends(get_current_user)):
     """Delete all conversations. Requires authentication."""
-    storage.delete_all_conversations()
+    await async_storage.delete_all_conversations()
     return {"status": "deleted", "count": "all"}
 
 
+def _pdf_error(e: Exception) -> HTTPException:
+    if isinstance(e, asyncio.TimeoutError):
+        return HTTPException(
+            status_code=504,
+            detail=f"PDF 解析超时（{document_parser.PDF_PARSE_TIMEOUT:.0f} 秒），请选择较少的页码后重试"
+        )
+    if isinstance(e, ValueError):
+        return HTTPException(status_code=400, detail=str(e))
+    return HTTPException(status_code=500, detail=f"解析文件失败: {str(e)}")
+
+
 @app.post("/api/upload")
 async def upload_file(
     file: UploadFile = File(...),
+    pages: Optional[str] = None,
+    stream: bool = False,
     current_user: str = Depends(get_current_user)
 ):
     """
-    Upload and parse a file (PDF, TXT, MD, or images). Requires authentication.
-    Returns the parsed content that can be attached to a message.
-    For images, returns base64 data URI.
+    Upload a file (PDF, TXT, MD, or images) to the attachment store. Requires authentication.
+    Returns the attachment id (sha256 of the file) and metadata; messages reference the id.
+    Content that is already stored is not parsed again.
+
+    PDFs are converted off the event loop, only the pages selected by `pages`
+    ("1-5,8", default all). With `stream=true` the response is an SSE stream of
+    {"type": "progress", "done", "total"} events ending in {"type": "complete", "data": <attachment>}
+    or {"type": "error", "message"}.
     """
     # Check file extension
     supported = get_supported_extensions()
@@ -1029,31 +1169,44 @@ async def upload_file(
                 detail="图片文件过大，最大 20MB。"
             )
 
-        # Parse the file
-        parsed_content, file_type = parse_file(filename, file_content)
+        # Parse (only if new) and store off the event loop
+        store = get_attachment_store()
+        meta, _ = await asyncio.to_thread(store.put, filename, file_content)
+        if meta["file_type"] == "image":
+            # Downscale and strip now, so the first message does not wait for it
+            await asyncio.to_thread(store.prompt_image, meta["id"], meta)
+        if meta["file_type"] != "pdf":
+            return {**meta, "filename": filename}
 
-        # Build response
-        response = {
-            "filename": filename,
-            "file_type": file_type,
-            "content": parsed_content,
-        }
+        events = document_parser.prepare_pdf(store, meta["id"], pages)
 
-        # For images, add mime_type and byte size instead of char_count
-        if file_type == 'image':
-            from .file_parser import get_image_mime_type
-            response["mime_type"] = get_image_mime_type(filename)
-            response["byte_size"] = len(file_content)
-            response["char_count"] = 0  # For compatibility with existing frontend
-        else:
-            # Truncate text content if too long (to avoid token limits)
-            max_chars = 50000  # ~12.5k tokens approximately
-            if len(parsed_content) > max_chars:
-                parsed_content = parsed_content[:max_chars] + "\n\n... [Content truncated due to length]"
-                response["content"] = parsed_content
-            response["char_count"] = len(parsed_content)
+        async def attachment(complete: Dict[str, Any]) -> Dict[str, Any]:
+            stored = await asyncio.to_thread(store.get, meta["id"])
+            return {**stored, "filename": filename, "pages": pages or None, "char_count": complete["char_count"]}
 
-        return response
+        if not stream:
+            try:
+                async for event in events:
+                    if event["type"] == "complete":
+                        return await attachment(event)
+            except Exception as e:
+                raise _pdf_error(e)
+
+        async def event_generator():
+            try:
+                async for event in events:
+                    if event["type"] == "complete":
+                        yield f"data: {json.dumps({'type': 'complete', 'data': await attachment(event)})}\n\n"
+                    else:
+                        yield f"data: {json.dumps(event)}\n\n"
+            except Exception as e:
+                yield f"data: {json.dumps({'type': 'error', 'message': _pdf_error(e).detail})}\n\n"
+
+        return StreamingResponse(
+            metrics.track_stream(event_generator()),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
     except HTTPException:
         raise
@@ -1064,6 +1217,76 @@ async def upload_file(
         )
 
 
+@app.get("/api/attachments/{attachment_id}")
+async def get_attachment(attachment_id: str, current_user: str = Depends(get_current_user)):
+    """
+    Metadata of a stored attachment. Requires authentication.
+    Clients look up the sha256 of a file here first and only upload it on 404.
+    """
+    if not is_attachment_id(attachment_id):
+        raise HTTPException(status_code=400, detail="附件 ID 格式无效")
+    meta = await asyncio.to_thread(get_attachment_store().get, attachment_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="未找到附件")
+    return meta
+
+
+async def resolve_attachments(attachments: Optional[List[FileAttachment]], query: str = "") -> Optional[List[FileAttachment]]:
+    """
+    Load the content of attachments sent by id from the attachment store (400 if one is unknown).
+    Text attachments that do not fit ATTACHMENT_CONTEXT_TOKENS together are cut down
+    to the chunks most relevant to `query` (see attachment_retrieval).
+    """
+    if not attachments:
+        return attachments
+    store = get_attachment_store()
+    resolved = []
+    for att in attachments:
+        if att.id is None:
+            resolved.append(att)
+            continue
+        meta = await asyncio.to_thread(store.get, att.id)
+        if meta is None:
+            raise HTTPException(status_code=400, detail=f"未找到附件 {att.filename}，请重新上传")
+        if meta["file_type"] == "image":
+            meta, content = await asyncio.to_thread(store.load_content, att.id)
+        else:
+            pages = None
+            if meta["file_type"] == "pdf":
+                # Usually converted at upload already; this only converts what is still missing
+                try:
+                    async for event in document_parser.prepare_pdf(store, att.id, att.pages):
+                        if event["type"] == "complete":
+                            pages = event["pages"]
+                except Exception as e:
+                    raise _pdf_error(e)
+            content = await asyncio.to_thread(store.read_text, att.id, pages)
+        resolved.append(att.model_copy(update={
+            "file_type": meta["file_type"],
+            "content": content,
+            "mime_type": meta.get("mime_type"),
+        }))
+
+    texts = [i for i, att in enumerate(resolved) if att.file_type != "image" and att.content]
+    if texts:
+        selected = await asyncio.to_thread(
+            attachment_retrieval.select_context, store, query, [resolved[i].content for i in texts]
+        )
+        for i, content in zip(texts, selected):
+            resolved[i] = resolved[i].model_copy(update={"content": content})
+    return resolved
+
+
+def attachment_refs(attachments: Optional[List[FileAttachment]]) -> Optional[List[Dict[str, Any]]]:
+    """What a stored user message keeps of its attachments: ids and names, never the content."""
+    refs = [
+        {"id": att.id, "filename": att.filename, "file_type": att.file_type, **({"pages": att.pages} if att.pages else {})}
+        for att in attachments or []
+        if att.id is not None
+    ]
+    return refs or None
+
+
 def separate_attachments(attachments: Optional[List[FileAttachment]]) -> Tuple[List[FileAttachment], List[Dict[str, str]]]:
     """
     Separate text attachments from image attachments.
@@ -1133,26 +1356,31 @@ async def send_message(
     Supports temporary mode (Feature 5): if request.temporary=True,
     conversation is not saved to storage.
     """
+    attachments = await resolve_attachments(request.attachments, request.content)
+
     # Separate image attachments from text attachments
-    _, image_attachments = separate_attachments(request.attachments)
+    _, image_attachments = separate_attachments(attachments)
 
     # Build full query with text attachments only (images handled separately)
-    full_query = build_query_with_attachments(request.content, request.attachments)
+    full_query = build_query_with_attachments(request.content, attachments)
+    trace = turn_trace.start()
 
     # For temporary mode, skip conversation existence check and storage operations
     if request.temporary:
         # Run the 3-stage council process without saving
         try:
-            stage1_results, stage2_results, stage3_result, metadata = await run_full_council(
-                full_query,
-                conversation_history=None,
-                images=image_attachments if image_attachments else None,
-                conversation_id=None  # No conversation_id for temporary chat
-            )
+            with metrics.council_in_flight():
+                stage1_results, stage2_results, stage3_result, metadata = await run_full_council(
+                    full_query,
+                    conversation_history=None,
+                    images=image_attachments if image_attachments else None,
+                    conversation_id=None  # No conversation_id for temporary chat
+                )
         except ValueError as e:
             # Translate configuration errors (e.g., no council models) to 400
             raise HTTPException(status_code=400, detail=str(e))
 
+        metadata["timeline"] = trace.snapshot()
         return {
             "stage1": stage1_results,
             "stage2": stage2_results,
@@ -1163,20 +1391,22 @@ async def send_message(
 
     # Normal mode: save to storage
     # Check if conversation exists
-    conversation = storage.get_conversation(conversation_id)
+    conversation = await async_storage.get_conversation(conversation_id)
     if conversation is None:
         raise HTTPException(status_code=404, detail="未找到对话")
 
     # Check if this is the first message
     is_first_message = len(conversation["messages"]) == 0
 
-    # Add user message (store original content, not with attachments)
-    storage.add_user_message(conversation_id, request.content)
+    # Add user message (original content; attachments only by id)
+    await async_storage.add_user_message(
+        conversation_id, request.content, attachments=attachment_refs(request.attachments)
+    )
 
     # If this is the first message, generate a title
     if is_first_message:
         title = await generate_conversation_title(request.content)
-        storage.update_conversation_title(conversation_id, title)
+        await async_storage.update_conversation_title(conversation_id, title)
 
     # Get conversation history for context (exclude the just-added user message)
     conversation_history = conversation["messages"]  # History before current question
@@ -1184,18 +1414,20 @@ async def send_message(
     # Run the 3-stage council process with full query including attachments
     images_for_council = image_attachments if image_attachments else None
     try:
-        stage1_results, stage2_results, stage3_result, metadata = await run_full_council(
-            full_query,
-            conversation_history,
-            images=images_for_council,
-            conversation_id=conversation_id  # For memory system
-        )
+        with metrics.council_in_flight():
+            stage1_results, stage2_results, stage3_result, metadata = await run_full_council(
+                full_query,
+                conversation_history,
+                images=images_for_council,
+                conversation_id=conversation_id  # For memory system
+            )
     except ValueError as e:
         # Translate configuration errors (e.g., no council models) to 400
         raise HTTPException(status_code=400, detail=str(e))
 
     # Add assistant message with all stages and metadata
-    storage.add_assistant_message(
+    metadata["timeline"] = trace.snapshot()
+    await async_storage.add_assistant_message(
         conversation_id,
         stage1_results,
         stage2_results,
@@ -1224,18 +1456,20 @@ async def send_message_stream(
     Supports multimodal queries with image attachments.
     """
     # Check if conversation exists
-    conversation = storage.get_conversation(conversation_id)
+    conversation = await async_storage.get_conversation(conversation_id)
     if conversation is None:
         raise HTTPException(status_code=404, detail="未找到对话")
 
     # Check if this is the first message
     is_first_message = len(conversation["messages"]) == 0
 
+    attachments = await resolve_attachments(request.attachments, request.content)
+
     # Separate image attachments from text attachments
-    _, image_attachments = separate_attachments(request.attachments)
+    _, image_attachments = separate_attachments(attachments)
 
     # Build full query with text attachments only (images handled separately)
-    full_query = build_query_with_attachments(request.content, request.attachments)
+    full_query = build_query_with_attachments(request.content, attachments)
 
     # Get conversation history for context (before adding new message)
     conversation_history = conversation["messages"]
@@ -1262,13 +1496,17 @@ async def send_message_stream(
         title_task = None
         stage2_task = None
         stage3_task = None
+        # Per-call spans of this turn (model calls, tools, memory, storage)
+        trace = turn_trace.start()
 
         try:
             # Reset token stats for this request
             reset_token_stats()
 
-            # Add user message (store original content, not with attachments)
-            storage.add_user_message(conversation_id, request.content)
+            # Add user message (original content; attachments only by id)
+            await async_storage.add_user_message(
+                conversation_id, request.content, attachments=attachment_refs(request.attachments)
+            )
 
             # Start title generation in parallel (don't await yet)
             if is_first_message:
@@ -1317,13 +1555,14 @@ async def send_message_stream(
 
             # Execution mode: chat_only stops after Stage 1
             if execution_mode == "chat_only":
-                token_stats = get_token_stats()
+                token_stats = await collect_token_stats()
                 metadata = {
                     "execution_mode": execution_mode,
                     "tool_outputs": tool_outputs,
                     "token_stats": token_stats,
+                    "timeline": trace.snapshot(),
                 }
-                storage.add_assistant_message(
+                await async_storage.add_assistant_message(
                     conversation_id,
                     stage1_results,
                     None,
@@ -1332,14 +1571,15 @@ async def send_message_stream(
                 )
                 message_saved = True
 
-                if token_stats.get('total'):
+                if token_stats.get('total') or token_stats.get('usage'):
                     yield f"data: {json.dumps({'type': 'token_stats', 'data': token_stats})}\n\n"
 
                 if title_task:
                     title = await title_task
-                    storage.update_conversation_title(conversation_id, title)
+                    await async_storage.update_conversation_title(conversation_id, title)
                     yield f"data: {json.dumps({'type': 'title_complete', 'data': {'title': title}})}\n\n"
 
+                yield f"data: {json.dumps({'type': 'timeline', 'data': trace.snapshot()})}\n\n"
                 yield f"data: {json.dumps({'type': 'complete'})}\n\n"
                 return
 
@@ -1382,15 +1622,16 @@ async def send_message_stream(
 
             # Execution mode: chat_ranking stops after Stage 2
             if execution_mode == "chat_ranking":
-                token_stats = get_token_stats()
+                token_stats = await collect_token_stats()
                 metadata = {
                     "execution_mode": execution_mode,
                     "label_to_model": label_to_model,
                     "aggregate_rankings": aggregate_rankings,
                     "tool_outputs": tool_outputs,
                     "token_stats": token_stats,
+                    "timeline": trace.snapshot(),
                 }
-                storage.add_assistant_message(
+                await async_storage.add_assistant_message(
                     conversation_id,
                     stage1_results,
                     stage2_results,
@@ -1399,14 +1640,15 @@ async def send_message_stream(
                 )
                 message_saved = True
 
-                if token_stats.get('total'):
+                if token_stats.get('total') or token_stats.get('usage'):
                     yield f"data: {json.dumps({'type': 'token_stats', 'data': token_stats})}\n\n"
 
                 if title_task:
                     title = await title_task
-                    storage.update_conversation_title(conversation_id, title)
+                    await async_storage.update_conversation_title(conversation_id, title)
                     yield f"data: {json.dumps({'type': 'title_complete', 'data': {'title': title}})}\n\n"
 
+                yield f"data: {json.dumps({'type': 'timeline', 'data': trace.snapshot()})}\n\n"
                 yield f"data: {json.dumps({'type': 'complete'})}\n\n"
                 return
 
@@ -1440,14 +1682,14 @@ async def send_message_stream(
             stage3_end_time = time.time()
             stage3_duration = stage3_end_time - stage3_start_time
 
-            # Get accumulated token stats from TOON encoding
-            token_stats = get_token_stats()
+            # Get accumulated token stats from TOON encoding (waits for background stats)
+            token_stats = await collect_token_stats()
 
             # CRITICAL FIX: Save assistant message IMMEDIATELY after stage3 completes
             # This ensures the message is saved even if client disconnects during streaming
             # Previously, save was at the end of generator which never executed on disconnect
-            metadata = {'label_to_model': label_to_model, 'aggregate_rankings': aggregate_rankings, 'tool_outputs': tool_outputs, 'token_stats': token_stats}
-            storage.add_assistant_message(
+            metadata = {'label_to_model': label_to_model, 'aggregate_rankings': aggregate_rankings, 'tool_outputs': tool_outputs, 'token_stats': token_stats, 'timeline': trace.snapshot()}
+            await async_storage.add_assistant_message(
                 conversation_id,
                 stage1_results,
                 stage2_results,
@@ -1456,19 +1698,27 @@ async def send_message_stream(
             )
             message_saved = True  # Mark as saved to prevent duplicate save in finally
 
+            if ENABLE_MEMORY:
+                try:
+                    with turn_trace.span("memory", "enqueue"):
+                        await memory_queue.aenqueue_exchange(conversation_id, full_query, stage3_result.get("response", ""))
+                except Exception as e:
+                    logger.warning("[STREAMING] Memory save failed: %s", e)
+
             yield f"data: {json.dumps({'type': 'stage3_complete', 'data': stage3_result, 'timestamp': stage3_end_time, 'duration': stage3_duration})}\n\n"
 
             # Send token stats event (TOON encoding savings)
-            if token_stats.get('total'):
+            if token_stats.get('total') or token_stats.get('usage'):
                 yield f"data: {json.dumps({'type': 'token_stats', 'data': token_stats})}\n\n"
 
             # Wait for title generation if it was started
             if title_task:
                 title = await title_task
-                storage.update_conversation_title(conversation_id, title)
+                await async_storage.update_conversation_title(conversation_id, title)
                 yield f"data: {json.dumps({'type': 'title_complete', 'data': {'title': title}})}\n\n"
 
-            # Send completion event
+            # Send the turn's timeline (includes the saves above), then completion
+            yield f"data: {json.dumps({'type': 'timeline', 'data': trace.snapshot()})}\n\n"
             yield f"data: {json.dumps({'type': 'complete'})}\n\n"
 
         except asyncio.CancelledError:
@@ -1515,6 +1765,8 @@ async def send_message_stream(
                     'aggregate_rankings': aggregate_rankings,
                     'tool_outputs': tool_outputs,
                     'partial': True,  # Mark as partial results
+                    'token_stats': get_token_stats(),  # Usage of the stages that ran
+                    'timeline': trace.snapshot(),
                     'stages_completed': {
                         'stage1': len(stage1_results) > 0,
                         'stage2': len(stage2_results) > 0,
@@ -1522,19 +1774,20 @@ async def send_message_stream(
                     }
                 }
                 try:
-                    storage.add_assistant_message(
+                    # Shielded so a repeated cancellation can't abandon the write mid-way
+                    await asyncio.shield(async_storage.add_assistant_message(
                         conversation_id,
                         stage1_results,
                         stage2_results,
                         stage3_result,
                         partial_metadata
-                    )
+                    ))
                     logger.info("[STREAMING] Partial results saved successfully for conversation %s", conversation_id)
                 except Exception as save_error:
                     logger.error("[STREAMING] Failed to save partial results: %s", save_error)
 
     return StreamingResponse(
-        event_generator(),
+        metrics.track_stream(event_generator(), council=True),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -2,14 +2,34 @@
 
 Memory feature requires optional dependencies (sentence-transformers, chromadb).
 If not installed, memory is gracefully disabled.
+
+The embedding model is loaded once per process (see `warm_up`) and per-conversation
+Chroma stores are kept open in a small LRU pool, so constructing a
+`CouncilMemorySystem` on every turn is cheap. All embedding calls go through a
+micro-batching `EmbeddingService` worker thread.
+
+`MEMORY_BACKEND=mmap` replaces the Chroma stores with the shared memory-mapped
+index in `vector_index` (needs only NumPy and the embedding model).
 """
 
 from __future__ import annotations
 
+import asyncio
+import logging
 import os
-from typing import Optional
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
 from pathlib import Path
 
+from .embedding_cache import CachedEmbeddings, get_embedding_cache
+from .embedding_service import BatchedEmbeddings, EmbeddingService
+from . import vector_index
+
+logger = logging.getLogger(__name__)
+
 # Try to import heavy dependencies - they are optional
 _MEMORY_AVAILABLE = False
 try:
@@ -20,38 +40,293 @@ except ImportError:
     HuggingFaceEmbeddings = None
     Chroma = None
 
+try:
+    import chromadb
+except ImportError:
+    chromadb = None
+
+LOCAL_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+MEMORY_DIR = Path("./data/memory")
+
+# "chroma" (one store per conversation) or "mmap" (shared memory-mapped index)
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "chroma").lower()
+TOP_K = 3
+
+# Open vector store pool limits
+MAX_OPEN_STORES = int(os.getenv("MEMORY_MAX_OPEN_STORES", "32"))
+STORE_IDLE_SECONDS = float(os.getenv("MEMORY_STORE_IDLE_SECONDS", "600"))
+
+_embeddings_lock = threading.Lock()
+_embeddings: Optional[Tuple[Tuple[Any, ...], Any]] = None  # (config key, instance)
+_service: Optional[EmbeddingService] = None
+
+
+def _embeddings_config() -> Tuple[Any, ...]:
+    use_openai = os.getenv("ENABLE_OPENAI_EMBEDDINGS", "false").lower() == "true"
+    return (use_openai, os.getenv("OPENAI_API_KEY") if use_openai else None)
+
+
+def _create_embeddings(use_openai: bool, api_key: Optional[str]):
+    if use_openai and api_key:
+        try:
+            from langchain_openai import OpenAIEmbeddings
+
+            return OpenAIEmbeddings(api_key=api_key)
+        except Exception:
+            # Fall back to local embeddings on failure
+            pass
+
+    # Free local embeddings
+    try:
+        return HuggingFaceEmbeddings(model_name=LOCAL_EMBEDDING_MODEL)
+    except Exception as e:
+        logger.warning("[MEMORY] Failed to load embeddings model: %s", e)
+        return None
+
 
 def get_embeddings():
-    """Return embeddings implementation based on env flags."""
+    """
+    Return the process-wide embeddings implementation based on env flags.
+
+    The instance is wrapped in the persistent embedding cache when that is enabled.
+    """
+    global _embeddings
     if not _MEMORY_AVAILABLE:
         return None
 
-    if os.getenv("ENABLE_OPENAI_EMBEDDINGS", "false").lower() == "true":
-        api_key = os.getenv("OPENAI_API_KEY")
-        if api_key:
-            try:
-                from langchain_openai import OpenAIEmbeddings
+    key = _embeddings_config()
+    cached = _embeddings
+    if cached is not None and cached[0] == key:
+        return cached[1]
 
-                return OpenAIEmbeddings(api_key=api_key)
-            except Exception:
-                # Fall back to local embeddings on failure
-                pass
+    with _embeddings_lock:
+        if _embeddings is not None and _embeddings[0] == key:
+            return _embeddings[1]
+        started = time.monotonic()
+        instance = _create_embeddings(*key)
+        if instance is not None:
+            logger.info("[MEMORY] Embeddings loaded in %.2fs", time.monotonic() - started)
+            cache = get_embedding_cache()
+            if cache is not None:
+                instance = CachedEmbeddings(instance, cache, embedding_model_id(instance))
+        # Failures are cached too, so a broken model isn't reloaded on every turn
+        _embeddings = (key, instance)
+        return instance
 
-    # Free local embeddings
-    try:
-        return HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    except Exception:
+
+def embedding_model_id(embeddings: Any) -> str:
+    """Identifier of the model behind an embeddings instance (for index headers and caches)."""
+    for attr in ("model_name", "model"):
+        value = getattr(embeddings, attr, None)
+        if isinstance(value, str) and value:
+            return value
+    return type(embeddings).__name__
+
+
+def get_embedding_service() -> Optional[EmbeddingService]:
+    """Return the batching service wrapping the current embeddings (None if unavailable)."""
+    global _service
+    embeddings = get_embeddings()
+    if embeddings is None:
         return None
 
+    replaced = False
+    with _embeddings_lock:
+        if _service is None or _service.embeddings is not embeddings:
+            if _service is not None:
+                _service.shutdown(timeout=0)
+                replaced = True
+            _service = EmbeddingService(embeddings)
+        service = _service
+    if replaced:
+        # Pooled stores embed through the old service; reopen them with the new one
+        _store_pool.clear()
+    return service
+
+
+class _StorePool:
+    """LRU pool of open per-conversation Chroma stores with idle eviction; evicted stores are closed."""
+
+    def __init__(self, max_open: int, idle_seconds: float):
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        self._stores: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id: str, embeddings: Any) -> "_ChromaHandle":
+        now = time.monotonic()
+        with self._lock:
+            entry = self._stores.get(conversation_id)
+            if entry is not None:
+                self._stores[conversation_id] = (entry[0], now)
+                self._stores.move_to_end(conversation_id)
+                handle = entry[0]
+            else:
+                handle = None
+            evicted = self._evict_idle(now)
+        _close_handles(evicted)
+
+        if handle is not None:
+            return handle
+
+        handle = _open_store(conversation_id, embeddings)
+        evicted = []
+        with self._lock:
+            # Another thread may have opened it meanwhile; keep the first one. The
+            # duplicate is not closed: chromadb shares one System per path between them.
+            existing = self._stores.get(conversation_id)
+            if existing is not None:
+                return existing[0]
+            self._stores[conversation_id] = (handle, now)
+            while len(self._stores) > self.max_open:
+                evicted_id, (evicted_handle, _) = self._stores.popitem(last=False)
+                evicted.append(evicted_handle)
+                logger.debug("[MEMORY] Evicted store %s (pool full)", evicted_id)
+        _close_handles(evicted)
+        return handle
+
+    def _evict_idle(self, now: float) -> List["_ChromaHandle"]:
+        stale = [cid for cid, (_, used) in self._stores.items() if now - used > self.idle_seconds]
+        evicted = []
+        for cid in stale:
+            evicted.append(self._stores.pop(cid)[0])
+            logger.debug("[MEMORY] Evicted idle store %s", cid)
+        return evicted
+
+    def evict_idle(self) -> None:
+        with self._lock:
+            evicted = self._evict_idle(time.monotonic())
+        _close_handles(evicted)
+
+    def discard(self, conversation_id: str) -> None:
+        with self._lock:
+            entry = self._stores.pop(conversation_id, None)
+        if entry is not None:
+            _close_handles([entry[0]])
+
+    def clear(self) -> None:
+        with self._lock:
+            evicted = [handle for handle, _ in self._stores.values()]
+            self._stores.clear()
+        _close_handles(evicted)
+
+    def __len__(self) -> int:
+        return len(self._stores)
+
+
+class _ChromaHandle:
+    """A conversation's Chroma store with the chromadb client and collection it was opened on."""
+
+    def __init__(self, conversation_id: str, embeddings: Any):
+        if chromadb is None:
+            raise ImportError("chromadb is required for MEMORY_BACKEND=chroma")
+        store_path = MEMORY_DIR / conversation_id
+        store_path.mkdir(parents=True, exist_ok=True)
+        name = f"conv_{conversation_id}"
+        self.client = chromadb.PersistentClient(path=str(store_path))
+        self.collection = self.client.get_or_create_collection(name, embedding_function=None)
+        self.store = Chroma(client=self.client, collection_name=name, embedding_function=embeddings)
+
+    def close(self) -> None:
+        _close_chroma_client(self.client)
+
+
+def _close_chroma_client(client: Any) -> None:
+    """
+    Release a persistent chromadb client's SQLite connections and HNSW segments.
+
+    chromadb keeps one `System` per path in a class-level cache, so dropping the
+    client object alone leaves everything open. Use `close()` where the installed
+    release has it; otherwise stop the system and remove it from that cache.
+    """
+    close = getattr(client, "close", None)
+    if callable(close):
+        close()
+        return
+    system = getattr(client, "_system", None)
+    if system is not None:
+        system.stop()
+    identifier = getattr(client, "_identifier", None)
+    for cache_name in ("_identifier_to_system", "_identifer_to_system"):
+        cache = getattr(type(client), cache_name, None)
+        if isinstance(cache, dict):
+            cache.pop(identifier, None)
+
+
+def _close_handles(handles: List[_ChromaHandle]) -> None:
+    for handle in handles:
+        try:
+            handle.close()
+        except Exception as e:
+            logger.warning("[MEMORY] Failed to close vector store: %s", e)
+
+
+def _open_store(conversation_id: str, embeddings: Any) -> _ChromaHandle:
+    return _ChromaHandle(conversation_id, embeddings)
+
+
+_store_pool = _StorePool(MAX_OPEN_STORES, STORE_IDLE_SECONDS)
+
+
+def release_store(conversation_id: str) -> None:
+    """Close the pooled vector store of a conversation and drop its rows from the mmap index (after it was deleted)."""
+    _store_pool.discard(conversation_id)
+    if MEMORY_BACKEND == "mmap" and vector_index.NUMPY_AVAILABLE:
+        try:
+            vector_index.remove_conversation(conversation_id)
+        except Exception as e:
+            logger.warning("[MEMORY] Failed to remove %s from the vector index: %s", conversation_id, e)
+
+
+def warm_up() -> bool:
+    """
+    Load the embedding model ahead of the first request (call at startup, off the event loop).
+
+    Returns:
+        True if embeddings are ready
+    """
+    if not _MEMORY_AVAILABLE or os.getenv("ENABLE_MEMORY", "true").lower() != "true":
+        return False
+    service = get_embedding_service()
+    if service is None:
+        return False
+    try:
+        # Run one tiny query so lazy model initialisation happens now, not on the first turn
+        service.embed(["warm up"])
+    except Exception as e:
+        logger.warning("[MEMORY] Embeddings warm-up failed: %s", e)
+    return True
+
+
+def get_memory_stats() -> dict:
+    """Embedding batch and cache metrics and open store count."""
+    service = _service
+    cache = get_embedding_cache(create=False)
+    return {
+        "open_stores": len(_store_pool),
+        "embeddings": service.stats() if service is not None else None,
+        "embedding_cache": cache.stats() if cache is not None else None,
+    }
+
+
+def shutdown() -> None:
+    """Stop the embedding worker and close the open vector stores (called on application shutdown)."""
+    service = _service
+    if service is not None:
+        service.shutdown()
+    _store_pool.clear()
+
 
 class CouncilMemorySystem:
-    """Lightweight per-conversation memory backed by Chroma."""
+    """Lightweight per-conversation memory backed by Chroma or the mmap vector index."""
 
     def __init__(self, conversation_id: str):
         self.enabled = os.getenv("ENABLE_MEMORY", "true").lower() == "true"
         self.conversation_id = conversation_id
         self.retriever = None
         self.vectorstore = None
+        self.collection = None  # chromadb collection behind the Chroma store
+        self.embeddings = None
 
         # Disable if dependencies aren't available
         if not _MEMORY_AVAILABLE:
@@ -61,21 +336,26 @@ class CouncilMemorySystem:
         if not self.enabled:
             return
 
-        embeddings = get_embeddings()
-        if embeddings is None:
+        service = get_embedding_service()
+        if service is None:
             self.enabled = False
             return
 
+        self.embeddings = BatchedEmbeddings(service)
         try:
-            store_path = Path("./data/memory") / conversation_id
-            store_path.mkdir(parents=True, exist_ok=True)
-
-            self.vectorstore = Chroma(
-                collection_name=f"conv_{conversation_id}",
-                embedding_function=embeddings,
-                persist_directory=str(store_path),
-            )
-            self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 3})
+            if MEMORY_BACKEND == "mmap":
+                if not vector_index.NUMPY_AVAILABLE:
+                    raise ImportError("numpy is required for MEMORY_BACKEND=mmap")
+                self.vectorstore = vector_index.ConversationIndex(
+                    vector_index.get_vector_index(embedding_model_id(service.embeddings)),
+                    conversation_id,
+                    self.embeddings,
+                )
+                return
+            handle = _store_pool.get(conversation_id, self.embeddings)
+            self.vectorstore = handle.store
+            self.collection = handle.collection
+            self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": TOP_K})
         except Exception:
             self.enabled = False
             self.vectorstore = None
@@ -83,9 +363,12 @@ class CouncilMemorySystem:
 
     def get_context(self, query: str) -> str:
         """Retrieve relevant context for a query."""
-        if not self.enabled or self.retriever is None:
+        if not self.enabled or self.vectorstore is None:
             return ""
         try:
+            if self.retriever is None:
+                texts = self.vectorstore.search(query, k=TOP_K)
+                return "\n".join(t for t in texts if t).strip()
             docs = self.retriever.get_relevant_documents(query)
             if not docs:
                 return ""
@@ -96,6 +379,27 @@ class CouncilMemorySystem:
             # logging.error(f"Error retrieving memory context: {e}")
             return ""
 
+    async def aget_context(self, query: str) -> str:
+        """
+        Async `get_context`.
+
+        The query embedding is awaited on the batching service (no thread waits for
+        the batch); only the vector search runs in a worker thread.
+        """
+        if not self.enabled or self.vectorstore is None:
+            return ""
+        try:
+            vector = await self.embeddings.aembed_query(query)
+            if self.retriever is None:
+                texts = await asyncio.to_thread(self.vectorstore.search_by_vector, vector, TOP_K)
+            else:
+                docs = await asyncio.to_thread(self.vectorstore.similarity_search_by_vector, vector, k=TOP_K)
+                texts = [doc.page_content for doc in docs]
+            return "\n".join(t for t in texts if t).strip()
+        except Exception as e:
+            logger.debug("[MEMORY] Context lookup failed: %s", e)
+            return ""
+
     def save_exchange(self, user_msg: str, assistant_msg: str):
         """Persist a user/assistant exchange."""
         if not self.enabled or self.vectorstore is None:
@@ -105,3 +409,27 @@ class CouncilMemorySystem:
             self.vectorstore.add_texts([content])
         except Exception:
             return
+
+    def add_embedded(self, texts: List[str], vectors: List[List[float]]) -> None:
+        """Store texts with precomputed embeddings (used by the write-behind queue; errors propagate)."""
+        if not self.enabled or self.vectorstore is None:
+            raise RuntimeError("Memory is disabled")
+        if self.retriever is None:
+            self.vectorstore.add_embedded(texts, vectors)
+        else:
+            self.collection.upsert(
+                ids=[str(uuid.uuid4()) for _ in texts],
+                embeddings=vectors,
+                documents=texts,
+            )
+
+    async def asave_exchange(self, user_msg: str, assistant_msg: str):
+        """Async `save_exchange` that keeps the embedding and store write off the event loop."""
+        if not self.enabled or self.vectorstore is None:
+            return
+        content = f"User: {user_msg}\nAssistant: {assistant_msg}"
+        try:
+            vectors = await self.embeddings.aembed_documents([content])
+            await asyncio.to_thread(self.add_embedded, [content], vectors)
+        except Exception as e:
+            logger.debug("[MEMORY] Saving exchange failed: %s", e)
@@ -0,0 +1,287 @@
+"""Durable write-behind queue for conversation memory saves.
+
+Saving an exchange to memory (embedding plus a vector store write) used to run on
+the request path. Exchanges are now appended to a journal file and handed to a
+background worker thread, which:
+
+- collects pending exchanges into batches (`MEMORY_QUEUE_BATCH_SIZE`) and embeds
+  each batch with a single call, across conversations;
+- retries failed writes with exponential backoff, up to `MEMORY_QUEUE_MAX_RETRIES`;
+- replays journal entries that were not written before a crash or restart;
+- drains the queue on shutdown (`shutdown`).
+
+The journal (`MEMORY_QUEUE_FILE`, default `data/memory_queue.jsonl`) holds one
+`{"id", "c", "u", "a"}` line per exchange and one `{"done": id}` line once it is
+stored; it is truncated whenever the queue becomes empty.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from . import memory
+
+logger = logging.getLogger(__name__)
+
+QUEUE_FILE = Path(os.getenv("MEMORY_QUEUE_FILE", "data/memory_queue.jsonl"))
+BATCH_SIZE = int(os.getenv("MEMORY_QUEUE_BATCH_SIZE", "16"))
+MAX_RETRIES = int(os.getenv("MEMORY_QUEUE_MAX_RETRIES", "5"))
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+
+
+@dataclass
+class _Exchange:
+    id: str
+    conversation_id: str
+    user_msg: str
+    assistant_msg: str
+    attempts: int = 0
+
+    @property
+    def text(self) -> str:
+        return f"User: {self.user_msg}\nAssistant: {self.assistant_msg}"
+
+
+class MemoryWriteQueue:
+    """Background writer for memory exchanges backed by a journal file."""
+
+    def __init__(self, journal_path: Path = QUEUE_FILE, batch_size: int = BATCH_SIZE, max_retries: int = MAX_RETRIES):
+        self.journal_path = Path(journal_path)
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max_retries
+        self._queue: "queue.Queue[Optional[_Exchange]]" = queue.Queue()
+        self._pending: "OrderedDict[str, _Exchange]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._enqueued = 0
+        self._written = 0
+        self._retries = 0
+        self._dropped = 0
+        self._last_error: Optional[str] = None
+
+    # ---- journal ----
+
+    def _append_journal(self, records: List[Dict[str, Any]]) -> None:
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _replay_journal(self) -> List[_Exchange]:
+        if not self.journal_path.exists():
+            return []
+        entries: "OrderedDict[str, _Exchange]" = OrderedDict()
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if "done" in record:
+                    entries.pop(record["done"], None)
+                elif "id" in record:
+                    entries[record["id"]] = _Exchange(record["id"], record["c"], record["u"], record["a"])
+        return list(entries.values())
+
+    # ---- lifecycle ----
+
+    def start(self) -> None:
+        """Start the worker and re-queue exchanges left in the journal."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            replayed = self._replay_journal()
+            for item in replayed:
+                self._pending[item.id] = item
+                self._queue.put(item)
+            if not replayed and self.journal_path.exists():
+                self.journal_path.unlink()
+            self._thread = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+            self._thread.start()
+        if replayed:
+            logger.info("[MEMORY] Replaying %d unsaved exchanges from %s", len(replayed), self.journal_path)
+
+    def enqueue(self, conversation_id: str, user_msg: str, assistant_msg: str) -> None:
+        """Record an exchange durably and schedule it for storage."""
+        item = _Exchange(uuid.uuid4().hex, conversation_id, user_msg, assistant_msg)
+        self.start()
+        with self._lock:
+            self._append_journal([{"id": item.id, "c": conversation_id, "u": user_msg, "a": assistant_msg}])
+            self._pending[item.id] = item
+            self._enqueued += 1
+        self._queue.put(item)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued exchange is stored or dropped. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: Optional[float] = 30.0) -> None:
+        """Drain the queue (bounded by timeout) and stop the worker; leftovers stay in the journal."""
+        if self._thread is None:
+            return
+        if not self.flush(timeout):
+            logger.warning("[MEMORY] %d exchanges not written before shutdown; kept in journal", len(self._pending))
+        with self._lock:
+            self._stopping = True
+            self._idle.notify_all()
+        self._queue.put(None)
+        self._thread.join(5)
+        self._thread = None
+
+    # ---- worker ----
+
+    def _next_batch(self) -> Optional[List[_Exchange]]:
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._process(batch)
+
+    def _process(self, batch: List[_Exchange]) -> None:
+        try:
+            service = memory.get_embedding_service()
+            if service is None:
+                raise RuntimeError("Embeddings unavailable")
+            vectors = service.embed([item.text for item in batch])
+        except Exception as e:
+            self._fail(batch, e)
+            return
+
+        by_conversation: Dict[str, List[int]] = defaultdict(list)
+        for i, item in enumerate(batch):
+            by_conversation[item.conversation_id].append(i)
+
+        # Each conversation is stored (and retried) on its own so one bad store can't duplicate others
+        for conversation_id, positions in by_conversation.items():
+            items = [batch[i] for i in positions]
+            try:
+                store = memory.CouncilMemorySystem(conversation_id)
+                store.add_embedded([item.text for item in items], [vectors[i] for i in positions])
+            except Exception as e:
+                self._fail(items, e)
+                continue
+            self._complete(items)
+
+    def _fail(self, items: List[_Exchange], error: Exception) -> None:
+        self._last_error = str(error)
+        logger.warning("[MEMORY] Failed to write %d exchanges: %s", len(items), error)
+        self._schedule_retry(items)
+
+    def _complete(self, batch: List[_Exchange]) -> None:
+        with self._lock:
+            self._append_journal([{"done": item.id} for item in batch])
+            for item in batch:
+                self._pending.pop(item.id, None)
+            self._written += len(batch)
+            self._on_progress()
+
+    def _schedule_retry(self, batch: List[_Exchange]) -> None:
+        retry: List[_Exchange] = []
+        with self._lock:
+            for item in batch:
+                item.attempts += 1
+                if item.attempts > self.max_retries or self._stopping:
+                    if item.attempts > self.max_retries:
+                        logger.error("[MEMORY] Dropping exchange %s after %d attempts", item.id, item.attempts)
+                        self._append_journal([{"done": item.id}])
+                        self._dropped += 1
+                    self._pending.pop(item.id, None)
+                else:
+                    retry.append(item)
+            self._retries += len(retry)
+            self._on_progress()
+
+        if retry:
+            attempts = min(item.attempts for item in retry)
+            delay = min(RETRY_BASE_SECONDS * (2 ** (attempts - 1)), RETRY_MAX_SECONDS)
+            timer = threading.Timer(delay, lambda: [self._queue.put(item) for item in retry])
+            timer.daemon = True
+            timer.start()
+
+    def _on_progress(self) -> None:
+        """Wake flush() waiters and compact the journal once nothing is pending (lock held)."""
+        if not self._pending and not self._stopping:
+            try:
+                self.journal_path.unlink()
+            except FileNotFoundError:
+                pass
+            self._idle.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": len(self._pending),
+            "enqueued": self._enqueued,
+            "written": self._written,
+            "retries": self._retries,
+            "dropped": self._dropped,
+            "last_error": self._last_error,
+        }
+
+
+_queue: Optional[MemoryWriteQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_memory_queue() -> MemoryWriteQueue:
+    """Process-wide write-behind queue."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = MemoryWriteQueue()
+    return _queue
+
+
+def enqueue_exchange(conversation_id: str, user_msg: str, assistant_msg: str) -> None:
+    """Schedule a user/assistant exchange for memory storage (non-blocking apart from the journal append)."""
+    if not conversation_id or not assistant_msg:
+        return
+    if memory.get_embedding_service() is None:
+        # Memory dependencies or model unavailable: nothing could ever be written
+        return
+    get_memory_queue().enqueue(conversation_id, user_msg, assistant_msg)
+
+
+async def aenqueue_exchange(conversation_id: str, user_msg: str, assistant_msg: str) -> None:
+    """`enqueue_exchange` with the journal fsync kept off the event loop."""
+    await asyncio.to_thread(enqueue_exchange, conversation_id, user_msg, assistant_msg)
@@ -0,0 +1,306 @@
+"""Conversation metadata index for JSON file storage.
+
+Listing conversations used to open and parse every conversation file, including
+all Stage 1/2/3 payloads, just to show id, title, message count and username.
+This SQLite sidecar (`<DATA_DIR>/.index.sqlite3`) keeps one row per conversation
+(`.json` file or `.jsonl` log) with exactly those fields, plus the file's mtime
+and size so that drift from the files on disk can be detected. Storage writes update it in a transaction right
+after the file write; listing is a single indexed query that reads only the
+requested page.
+
+Check or rebuild the index with:
+    python -m backend.metadata_index verify [--repair]
+    python -m backend.metadata_index rebuild
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .conversation_log import LOG_SUFFIX, replay
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = ".index.sqlite3"
+SCHEMA_VERSION = "1"
+
+
+def conversation_summary(conversation: Dict[str, Any]) -> Dict[str, Any]:
+    """Metadata fields kept in the index for a conversation dict."""
+    return {
+        "id": conversation["id"],
+        "created_at": conversation.get("created_at") or "",
+        "title": conversation.get("title", "New Conversation"),
+        "message_count": len(conversation.get("messages") or []),
+        "username": conversation.get("username"),
+    }
+
+
+class MetadataIndex:
+    """SQLite index of conversation metadata for one data directory."""
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self.path = os.path.join(data_dir, INDEX_FILENAME)
+        self._lock = threading.Lock()
+        os.makedirs(data_dir, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS conversations (
+                id TEXT PRIMARY KEY,
+                created_at TEXT NOT NULL,
+                title TEXT NOT NULL,
+                message_count INTEGER NOT NULL,
+                username TEXT,
+                file_mtime_ns INTEGER NOT NULL,
+                file_size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_conversations_created ON conversations (created_at DESC, id DESC);
+            CREATE INDEX IF NOT EXISTS idx_conversations_user ON conversations (username, created_at DESC);
+            CREATE TABLE IF NOT EXISTS index_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """
+        )
+
+    # ---- writes ----
+
+    def upsert(self, summary: Dict[str, Any], file_path: str) -> None:
+        """Record a conversation after its file was written."""
+        st = os.stat(file_path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO conversations "
+                "(id, created_at, title, message_count, username, file_mtime_ns, file_size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    summary["id"], summary["created_at"], summary["title"], summary["message_count"],
+                    summary["username"], st.st_mtime_ns, st.st_size,
+                ),
+            )
+
+    def update(
+        self,
+        conversation_id: str,
+        file_path: str,
+        title: Optional[str] = None,
+        add_messages: int = 0,
+    ) -> bool:
+        """
+        Apply an appended title change and/or new messages without re-reading the conversation.
+
+        Returns:
+            False if the conversation is not in the index (caller should upsert instead)
+        """
+        st = os.stat(file_path)
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE conversations SET message_count = message_count + ?, title = COALESCE(?, title), "
+                "file_mtime_ns = ?, file_size = ? WHERE id = ?",
+                (add_messages, title, st.st_mtime_ns, st.st_size, conversation_id),
+            )
+        return cursor.rowcount > 0
+
+    def delete(self, conversation_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM conversations")
+
+    # ---- reads ----
+
+    def is_built(self) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM index_meta WHERE key = 'schema'").fetchone()
+        return row is not None and row[0] == SCHEMA_VERSION
+
+    def list(self, limit: Optional[int] = None, offset: int = 0, username: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Conversations newest first; only the requested page is read."""
+        sql = "SELECT id, created_at, title, message_count, username FROM conversations"
+        params: List[Any] = []
+        if username is not None:
+            sql += " WHERE username = ?"
+            params.append(username)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else limit, offset]
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {"id": r[0], "created_at": r[1], "title": r[2], "message_count": r[3], "username": r[4]}
+            for r in rows
+        ]
+
+    def page(
+        self,
+        limit: int,
+        after: Optional[Tuple[str, str]] = None,
+        username: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Keyset page, newest first: conversations ordered after the (created_at, id) position `after`."""
+        sql = "SELECT id, created_at, title, message_count, username FROM conversations"
+        conditions: List[str] = []
+        params: List[Any] = []
+        if username is not None:
+            conditions.append("username = ?")
+            params.append(username)
+        if after is not None:
+            conditions.append("(created_at < ? OR (created_at = ? AND id < ?))")
+            params += [after[0], after[0], after[1]]
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {"id": r[0], "created_at": r[1], "title": r[2], "message_count": r[3], "username": r[4]}
+            for r in rows
+        ]
+
+    def message_count(self, conversation_id: str) -> Optional[int]:
+        """Indexed message count of a conversation (None if it is not indexed)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT message_count FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    # ---- maintenance ----
+
+    def _conversation_files(self) -> Iterator[Tuple[str, str]]:
+        """(conversation id, path) pairs; a `.jsonl` log takes precedence over a legacy `.json` file."""
+        files: Dict[str, str] = {}
+        for filename in os.listdir(self.data_dir):
+            for suffix in (".json", LOG_SUFFIX):
+                if filename.endswith(suffix):
+                    conversation_id = filename[:-len(suffix)]
+                    if suffix == LOG_SUFFIX or conversation_id not in files:
+                        files[conversation_id] = os.path.join(self.data_dir, filename)
+        return iter(files.items())
+
+    def _read_summary(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                conversation = replay(f)[0] if path.endswith(LOG_SUFFIX) else json.load(f)
+            return conversation_summary(conversation)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("Skipping malformed conversation file %s: %s", path, e)
+            return None
+
+    def rebuild(self) -> int:
+        """Re-create the index from the conversation files. Returns the number of rows."""
+        rows = []
+        for _, path in self._conversation_files():
+            summary = self._read_summary(path)
+            if summary is None:
+                continue
+            st = os.stat(path)
+            rows.append((
+                summary["id"], summary["created_at"], summary["title"], summary["message_count"],
+                summary["username"], st.st_mtime_ns, st.st_size,
+            ))
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM conversations")
+                self._conn.executemany("INSERT OR REPLACE INTO conversations VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO index_meta (key, value) VALUES ('schema', ?)", (SCHEMA_VERSION,)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        logger.info("Rebuilt conversation index with %d entries", len(rows))
+        return len(rows)
+
+    def verify(self, repair: bool = False) -> Dict[str, List[str]]:
+        """
+        Compare the index with the files on disk (stat only, files are parsed only when they differ).
+
+        Returns:
+            Conversation ids that are missing from the index, stale, or indexed without a file
+        """
+        with self._lock:
+            indexed = {
+                row[0]: (row[1], row[2])
+                for row in self._conn.execute("SELECT id, file_mtime_ns, file_size FROM conversations")
+            }
+
+        report: Dict[str, List[str]] = {"missing": [], "stale": [], "orphaned": []}
+        on_disk = set()
+        for conversation_id, path in self._conversation_files():
+            on_disk.add(conversation_id)
+            st = os.stat(path)
+            entry = indexed.get(conversation_id)
+            if entry is None:
+                report["missing"].append(conversation_id)
+            elif entry != (st.st_mtime_ns, st.st_size):
+                report["stale"].append(conversation_id)
+            else:
+                continue
+            if repair:
+                summary = self._read_summary(path)
+                if summary is not None:
+                    self.upsert(summary, path)
+        report["orphaned"] = sorted(set(indexed) - on_disk)
+        if repair:
+            for conversation_id in report["orphaned"]:
+                self.delete(conversation_id)
+        return report
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_indexes: Dict[str, MetadataIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_metadata_index(data_dir: str) -> MetadataIndex:
+    """Index for a data directory, built from the files on first use."""
+    key = os.path.realpath(data_dir)
+    index = _indexes.get(key)
+    if index is not None:
+        return index
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = MetadataIndex(data_dir)
+            if not index.is_built():
+                index.rebuild()
+            _indexes[key] = index
+    return index
+
+
+if __name__ == "__main__":
+    from .config import DATA_DIR
+
+    parser = argparse.ArgumentParser(description="Conversation metadata index tools")
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--repair", action="store_true", help="fix differences found by verify")
+    args = parser.parse_args()
+
+    index = MetadataIndex(args.data_dir)
+    if args.command == "rebuild":
+        print(f"Indexed {index.rebuild()} conversations")
+    else:
+        result = index.verify(repair=args.repair)
+        for kind, ids in result.items():
+            print(f"{kind}: {len(ids)}" + (f" ({', '.join(ids[:10])}{', ...' if len(ids) > 10 else ''})" if ids else ""))
@@ -0,0 +1,319 @@
+"""Prometheus metrics, exported at `GET /metrics`.
+
+Covers:
+- upstream model requests: latency per call (including 429 retries), time to
+  first byte per attempt, errors by `error_type`, and every 429 received
+- council stages: duration of Stage 1, 2 and 3
+- in-flight councils and open SSE streams
+- tool calls and storage operations
+
+Labels stay low-cardinality. Models other than the configured council and
+chairman models are reported as "other" (requests may name any model), and
+nothing per user or conversation becomes a label. Recording an observation
+takes a lock and an add, so it is cheap enough for the request path.
+
+Several workers (e.g. `uvicorn --workers N`): point PROMETHEUS_MULTIPROC_DIR at
+an empty directory shared by the workers, and clear it before they start. Each
+process writes its samples there, and /metrics on any worker reports the sum.
+
+Requires prometheus_client. Without it, recording is a no-op and /metrics
+returns 503.
+
+Configuration (environment variables):
+- METRICS_ENABLED: "false" turns recording and /metrics off (default true)
+- PROMETHEUS_MULTIPROC_DIR: see above
+"""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import inspect
+import os
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from . import config, turn_trace
+
+try:
+    import prometheus_client
+    from prometheus_client import Counter, Gauge, Histogram
+except ImportError:
+    prometheus_client = None
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Model calls take seconds to minutes; tools and storage milliseconds to seconds
+_UPSTREAM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+_FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+if prometheus_client is not None:
+    UPSTREAM_SECONDS = Histogram(
+        "council_upstream_request_seconds",
+        "Model request latency, including retries after 429",
+        ["router", "model", "outcome"],
+        buckets=_UPSTREAM_BUCKETS,
+    )
+    UPSTREAM_TTFB_SECONDS = Histogram(
+        "council_upstream_ttfb_seconds",
+        "Time from sending a model request to receiving the response headers, per attempt",
+        ["router", "model"],
+        buckets=_UPSTREAM_BUCKETS,
+    )
+    UPSTREAM_ERRORS = Counter(
+        "council_upstream_errors_total",
+        "Failed model requests by error_type",
+        ["router", "error_type"],
+    )
+    UPSTREAM_RATE_LIMITED = Counter(
+        "council_upstream_rate_limited_total",
+        "HTTP 429 responses from upstream, including ones that were retried",
+        ["router"],
+    )
+    STAGE_SECONDS = Histogram(
+        "council_stage_seconds",
+        "Duration of completed council stages",
+        ["stage"],
+        buckets=_UPSTREAM_BUCKETS,
+    )
+    COUNCILS_IN_FLIGHT = Gauge(
+        "council_councils_in_flight",
+        "Council turns being processed",
+        multiprocess_mode="livesum",
+    )
+    SSE_CONNECTIONS = Gauge(
+        "council_sse_connections",
+        "Open server-sent event streams",
+        multiprocess_mode="livesum",
+    )
+    TOOL_SECONDS = Histogram(
+        "council_tool_seconds",
+        "Tool call latency",
+        ["tool", "outcome"],
+        buckets=_FAST_BUCKETS,
+    )
+    STORAGE_SECONDS = Histogram(
+        "council_storage_operation_seconds",
+        "Storage operation latency (async storage API)",
+        ["operation"],
+        buckets=_FAST_BUCKETS,
+    )
+else:
+    UPSTREAM_SECONDS = UPSTREAM_TTFB_SECONDS = UPSTREAM_ERRORS = UPSTREAM_RATE_LIMITED = None
+    STAGE_SECONDS = COUNCILS_IN_FLIGHT = SSE_CONNECTIONS = TOOL_SECONDS = STORAGE_SECONDS = None
+
+
+def enabled() -> bool:
+    return METRICS_ENABLED and prometheus_client is not None
+
+
+def model_label(model: str) -> str:
+    """The model id if it is a configured council/chairman model, else "other"."""
+    if model == config.CHAIRMAN_MODEL or model in config.COUNCIL_MODELS:
+        return model
+    return "other"
+
+
+class UpstreamCall:
+    """
+    Metrics of one model request (all its attempts), and its span in the turn
+    timeline (see turn_trace).
+
+    Pass `hooks` as httpx `event_hooks` and `extensions` to the request so each
+    attempt's time to first byte (and, over a real connection, connect time) is
+    recorded. Call `rate_limited()` for every 429, and `finish(result)` with the
+    client's result dict once the call is over (`cancelled()` if it was cut off).
+    """
+
+    __slots__ = (
+        "router", "model", "_model_id", "_stage", "_traced", "_started", "_first_request",
+        "_attempt_started", "_headers_at", "_attempts", "_connect_started", "_connect_seconds",
+    )
+
+    def __init__(self, router: str, model: str, stage: Optional[str] = None):
+        self.router = router
+        self.model = model_label(model)
+        self._model_id = model
+        self._stage = stage
+        self._traced = turn_trace.current() is not None
+        self._started = time.perf_counter()
+        self._first_request: Optional[float] = None
+        self._attempt_started: Optional[float] = None
+        self._headers_at: Optional[float] = None
+        self._attempts = 0
+        self._connect_started: Optional[float] = None
+        self._connect_seconds = 0.0
+
+    @property
+    def hooks(self) -> Dict[str, Any]:
+        if not (enabled() or self._traced):
+            return {}
+        return {"request": [self._on_request], "response": [self._on_response]}
+
+    @property
+    def extensions(self) -> Dict[str, Any]:
+        """httpcore trace callback for connect timing, only while a turn is traced."""
+        return {"trace": self._on_trace} if self._traced else {}
+
+    async def _on_request(self, request) -> None:
+        self._attempt_started = time.perf_counter()
+        if self._first_request is None:
+            self._first_request = self._attempt_started
+        self._attempts += 1
+
+    async def _on_response(self, response) -> None:
+        self._headers_at = time.perf_counter()
+        if self._attempt_started is not None and enabled():
+            UPSTREAM_TTFB_SECONDS.labels(self.router, self.model).observe(self._headers_at - self._attempt_started)
+
+    async def _on_trace(self, event: str, info: Dict[str, Any]) -> None:
+        if event == "connection.connect_tcp.started":
+            self._connect_started = time.perf_counter()
+        elif event in ("connection.connect_tcp.complete", "connection.start_tls.complete") and self._connect_started:
+            # TLS completes after TCP; the later event wins
+            self._connect_seconds = time.perf_counter() - self._connect_started
+
+    def rate_limited(self) -> None:
+        if enabled():
+            UPSTREAM_RATE_LIMITED.labels(self.router).inc()
+
+    def finish(self, result: Optional[Dict[str, Any]]) -> None:
+        if result is None:
+            error_type = "unknown"
+        elif result.get("error"):
+            error_type = result.get("error_type") or "unknown"
+        else:
+            error_type = None
+        ended = time.perf_counter()
+        if enabled():
+            UPSTREAM_SECONDS.labels(self.router, self.model, "error" if error_type else "ok").observe(
+                ended - self._started
+            )
+            if error_type:
+                UPSTREAM_ERRORS.labels(self.router, error_type).inc()
+        self._add_span(ended, error_type)
+
+    def cancelled(self) -> None:
+        self._add_span(time.perf_counter(), "cancelled")
+
+    def _add_span(self, ended: float, error: Optional[str]) -> None:
+        if not self._traced:
+            return
+        headers_at = self._headers_at
+        if headers_at is not None and self._attempt_started is not None and headers_at < self._attempt_started:
+            # The last attempt got no response
+            headers_at = None
+        turn_trace.add(
+            "model",
+            self._model_id,
+            self._started,
+            ended,
+            stage=self._stage,
+            queue=turn_trace.to_ms(self._first_request - self._started) if self._first_request is not None else None,
+            connect=turn_trace.to_ms(self._connect_seconds) if self._connect_seconds else None,
+            ttfb=turn_trace.to_ms(headers_at - self._attempt_started) if headers_at is not None else None,
+            completion=turn_trace.to_ms(ended - headers_at) if headers_at is not None else None,
+            retries=self._attempts - 1 if self._attempts > 1 else None,
+            error=error,
+        )
+
+
+def count_error(router: str, error_type: str) -> None:
+    """Count a failure not produced by a request (e.g. a model cut off by a stage timeout)."""
+    if enabled():
+        UPSTREAM_ERRORS.labels(router, error_type).inc()
+
+
+def _observe_stage(stage: str, started: float) -> None:
+    ended = time.perf_counter()
+    if enabled():
+        STAGE_SECONDS.labels(stage).observe(ended - started)
+    turn_trace.add("stage", stage, started, ended)
+
+
+def timed_stage(stage: str):
+    """
+    Decorator recording the duration of a council stage function (a coroutine or
+    an async generator) when it completes, as a metric and as a span of the turn
+    timeline; raised or cancelled stages are not recorded.
+    """
+    def decorate(fn):
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def stream(*args, **kwargs):
+                started = time.perf_counter()
+                items = fn(*args, **kwargs)
+                try:
+                    async for item in items:
+                        yield item
+                finally:
+                    await items.aclose()
+                _observe_stage(stage, started)
+            return stream
+
+        @functools.wraps(fn)
+        async def run(*args, **kwargs):
+            started = time.perf_counter()
+            result = await fn(*args, **kwargs)
+            _observe_stage(stage, started)
+            return result
+        return run
+    return decorate
+
+
+@contextlib.contextmanager
+def _in_progress(gauge):
+    if not enabled():
+        yield
+        return
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+def council_in_flight():
+    """Context manager counting a council turn as in flight."""
+    return _in_progress(COUNCILS_IN_FLIGHT)
+
+
+async def track_stream(events: AsyncIterator[str], council: bool = False) -> AsyncIterator[str]:
+    """Wrap an SSE generator so it counts as an open stream (and an in-flight council)."""
+    with _in_progress(SSE_CONNECTIONS), (council_in_flight() if council else contextlib.nullcontext()):
+        try:
+            async for event in events:
+                yield event
+        finally:
+            # Closing the wrapper (client disconnect) must run the wrapped generator's cleanup
+            await events.aclose()
+
+
+def observe_tool(tool: str, seconds: float, ok: bool) -> None:
+    if enabled():
+        TOOL_SECONDS.labels(tool, "ok" if ok else "error").observe(seconds)
+
+
+def observe_storage(operation: str, seconds: float) -> None:
+    if enabled():
+        STORAGE_SECONDS.labels(operation).observe(seconds)
+
+
+def render() -> Tuple[bytes, str]:
+    """The exposition text for /metrics and its content type."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import CollectorRegistry, multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def shutdown() -> None:
+    """Drop this worker's live gauges from the shared multiprocess directory."""
+    if enabled() and os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(os.getpid())
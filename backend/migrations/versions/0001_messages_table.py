@@ -0,0 +1,158 @@
+"""Store conversation messages in a messages table
+
+Moves `conversations.messages` (one JSON array per conversation) into a
+`messages` table with one row per message ordered by `seq`, and adds the
+`conversations.message_count` counter used for listing.
+
+Works on databases created by `init_database()` before this change as well as
+on empty ones. Messages are copied in batches of conversations.
+
+Revision ID: 0001_messages_table
+Revises:
+Create Date: 2026-10-19
+"""
+
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_messages_table"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 200
+
+conversations = sa.table(
+    "conversations",
+    sa.column("id", sa.String),
+    sa.column("messages", sa.JSON),
+    sa.column("message_count", sa.Integer),
+)
+messages = sa.table(
+    "messages",
+    sa.column("conversation_id", sa.String),
+    sa.column("seq", sa.Integer),
+    sa.column("role", sa.String),
+    sa.column("payload", sa.JSON),
+)
+
+
+def _create_conversations_table() -> None:
+    op.create_table(
+        "conversations",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("title", sa.String(500), nullable=False),
+        sa.Column("message_count", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("models", sa.JSON, nullable=True),
+        sa.Column("chairman", sa.String(255), nullable=True),
+        sa.Column("username", sa.String(255), nullable=True),
+    )
+    op.create_index("ix_conversations_id", "conversations", ["id"])
+    op.create_index("idx_created_at", "conversations", ["created_at"])
+    op.create_index("idx_title", "conversations", ["title"])
+    op.create_index("idx_username", "conversations", ["username"])
+
+
+def _load(value):
+    # Some MySQL drivers hand JSON columns back as text
+    if isinstance(value, str):
+        return json.loads(value)
+    return value or []
+
+
+def _copy_messages(bind) -> None:
+    last_id = ""
+    while True:
+        rows = bind.execute(
+            sa.select(conversations.c.id, conversations.c.messages)
+            .where(conversations.c.id > last_id)
+            .order_by(conversations.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            return
+        for conversation_id, payload in rows:
+            items = _load(payload)
+            if items:
+                bind.execute(messages.insert(), [
+                    {"conversation_id": conversation_id, "seq": seq, "role": m.get("role", ""), "payload": m}
+                    for seq, m in enumerate(items)
+                ])
+            bind.execute(
+                conversations.update()
+                .where(conversations.c.id == conversation_id)
+                .values(message_count=len(items))
+            )
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if inspector.has_table("conversations"):
+        columns = {c["name"] for c in inspector.get_columns("conversations")}
+        if "message_count" not in columns:
+            op.add_column(
+                "conversations", sa.Column("message_count", sa.Integer, nullable=False, server_default="0")
+            )
+    else:
+        columns = set()
+        _create_conversations_table()
+
+    if not inspector.has_table("messages"):
+        op.create_table(
+            "messages",
+            sa.Column("id", sa.BigInteger().with_variant(sa.Integer, "sqlite"), primary_key=True, autoincrement=True),
+            sa.Column(
+                "conversation_id",
+                sa.String(36),
+                sa.ForeignKey("conversations.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("seq", sa.Integer, nullable=False),
+            sa.Column("role", sa.String(20), nullable=False),
+            sa.Column("payload", sa.JSON, nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+            sa.UniqueConstraint("conversation_id", "seq", name="uq_messages_conversation_seq"),
+        )
+
+    if "messages" in columns:
+        _copy_messages(bind)
+        op.drop_column("conversations", "messages")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    op.add_column("conversations", sa.Column("messages", sa.JSON, nullable=True))
+
+    last_id = ""
+    while True:
+        ids = bind.execute(
+            sa.select(conversations.c.id)
+            .where(conversations.c.id > last_id)
+            .order_by(conversations.c.id)
+            .limit(BATCH_SIZE)
+        ).scalars().all()
+        if not ids:
+            break
+        for conversation_id in ids:
+            payloads = bind.execute(
+                sa.select(messages.c.payload)
+                .where(messages.c.conversation_id == conversation_id)
+                .order_by(messages.c.seq)
+            ).scalars().all()
+            bind.execute(
+                conversations.update()
+                .where(conversations.c.id == conversation_id)
+                .values(messages=[_load(p) for p in payloads])
+            )
+        last_id = ids[-1]
+
+    op.alter_column("conversations", "messages", existing_type=sa.JSON, nullable=False)
+    op.drop_table("messages")
+    op.drop_column("conversations", "message_count")
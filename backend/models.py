@@ -1,14 +1,16 @@
 """SQLAlchemy models for PostgreSQL and MySQL."""
 
-from sqlalchemy import Column, String, Text, DateTime, JSON, Index
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer, String, DateTime, JSON, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from .database import Base
 
 
 class Conversation(Base):
     """
-    Conversation model - stores conversation metadata and messages.
+    Conversation model - stores conversation metadata.
 
+    Messages are rows of the `messages` table; `message_count` is maintained on
+    every append so listing never has to load them.
     Compatible with both PostgreSQL and MySQL.
     """
 
@@ -21,11 +23,7 @@ class Conversation(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     title = Column(String(500), nullable=False, default="New Conversation")
-
-    # Messages stored as JSON
-    # PostgreSQL: Uses native JSONB (faster)
-    # MySQL: Uses JSON type (MySQL 5.7.8+)
-    messages = Column(JSON, nullable=False, default=list)
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Custom fields for model selection
     models = Column(JSON, nullable=True)  # List of council model IDs
@@ -39,18 +37,45 @@ class Conversation(Base):
         Index("idx_username", "username"),
     )
 
-    def to_dict(self):
-        """Convert model to dictionary."""
+    def to_dict(self, messages=None):
+        """Convert model to dictionary (messages are loaded separately)."""
         return {
             "id": self.id,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
             "title": self.title,
-            "messages": self.messages or [],
+            "messages": messages if messages is not None else [],
             "models": self.models,
             "chairman": self.chairman,
             "username": self.username,
         }
 
     def __repr__(self):
-        return f"<Conversation(id={self.id}, title={self.title}, messages={len(self.messages or [])})>"
+        return f"<Conversation(id={self.id}, title={self.title}, messages={self.message_count})>"
+
+
+class Message(Base):
+    """
+    One message of a conversation, ordered by `seq` (0-based position).
+
+    `payload` holds the message dict exactly as the API returns it
+    (user content, or assistant stage1/stage2/stage3/metadata).
+    """
+
+    __tablename__ = "messages"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    conversation_id = Column(
+        String(36), ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False
+    )
+    seq = Column(Integer, nullable=False)
+    role = Column(String(20), nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("conversation_id", "seq", name="uq_messages_conversation_seq"),
+    )
+
+    def __repr__(self):
+        return f"<Message(conversation_id={self.conversation_id}, seq={self.seq}, role={self.role})>"
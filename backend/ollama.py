@@ -1,9 +1,12 @@
 """Ollama API client for making LLM requests."""
 
+import asyncio
 import logging
 import httpx
 from typing import List, Dict, Any, Union, TypedDict, Literal
 from .config import OLLAMA_HOST, DEFAULT_TIMEOUT
+from . import metrics
+from .request_body import ModelBody, SharedBody
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +18,7 @@ class SuccessResponse(TypedDict, total=False):
     """Successful response from Ollama."""
     content: str
     reasoning_details: Any
+    usage: Dict[str, Any]
 
 
 class ErrorResponse(TypedDict):
@@ -28,11 +32,53 @@ class ErrorResponse(TypedDict):
 QueryResponse = Union[SuccessResponse, ErrorResponse]
 
 
+# Ollama reports durations in nanoseconds
+_DURATION_FIELDS = {
+    'total_duration': 'total_ms',
+    'load_duration': 'load_ms',
+    'prompt_eval_duration': 'prompt_eval_ms',
+    'eval_duration': 'eval_ms',
+}
+
+
+def parse_usage(data: Dict[str, Any]) -> Dict[str, Any] | None:
+    """
+    Token counts and timings from an /api/chat response, in the same shape as
+    openrouter.parse_usage plus durations in milliseconds, or None if absent.
+
+    Ollama reuses its KV cache for a repeated prompt prefix and then counts only
+    the newly evaluated tokens in prompt_eval_count, so cached_tokens is always 0.
+    """
+    if 'prompt_eval_count' not in data and 'eval_count' not in data:
+        return None
+    usage: Dict[str, Any] = {
+        'prompt_tokens': data.get('prompt_eval_count') or 0,
+        'completion_tokens': data.get('eval_count') or 0,
+        'cached_tokens': 0,
+    }
+    for field, key in _DURATION_FIELDS.items():
+        if data.get(field) is not None:
+            usage[key] = round(data[field] / 1e6, 1)
+    return usage
+
+
+def shared_body(messages: List[Dict[str, str]], temperature: float | None = None) -> SharedBody:
+    """Everything in an /api/chat request except the model, encoded once per stage."""
+    fields: Dict[str, Any] = {
+        "messages": messages,
+        "stream": False,
+    }
+    if temperature is not None:
+        fields["options"] = {"temperature": temperature}
+    return SharedBody(fields)
+
+
 async def query_model(
     model: str,
     messages: List[Dict[str, str]],
     timeout: float = None,
     temperature: float | None = None,
+    body: SharedBody | None = None,
 ) -> QueryResponse:
     """
     Query a single model via Ollama API.
@@ -42,9 +88,11 @@ async def query_model(
         messages: List of message dicts with 'role' and 'content'
         timeout: Request timeout in seconds (defaults to DEFAULT_TIMEOUT from config)
         temperature: Optional temperature for response generation
+        body: Pre-encoded request shared with the other models of a stage (see shared_body)
 
     Returns:
-        On success: dict with 'content' (str) and optional 'reasoning_details'
+        On success: dict with 'content' (str), optional 'reasoning_details' and
+        'usage' (see parse_usage)
         On error: dict with 'error' (True), 'error_type', and 'error_message'
 
         Error types: 'connection', 'not_found', 'http', 'timeout', 'unknown'
@@ -54,19 +102,29 @@ async def query_model(
     
     url = f"http://{OLLAMA_HOST}/api/chat"
     
-    payload = {
-        "model": model,
-        "messages": messages,
-        "stream": False,
-    }
-    if temperature is not None:
-        payload["options"] = {"temperature": temperature}
+    if body is None:
+        body = shared_body(messages, temperature)
+    request_body = body.for_model(model)
 
+    call = metrics.UpstreamCall("ollama", model)
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        result = await _post(model, url, request_body, timeout, call)
+    except asyncio.CancelledError:
+        call.cancelled()
+        raise
+    call.finish(result)
+    return result
+
+
+async def _post(model: str, url: str, request_body: ModelBody, timeout: float, call: metrics.UpstreamCall) -> QueryResponse:
+    """query_model's request; returns the response or error dict."""
+    try:
+        async with httpx.AsyncClient(timeout=timeout, event_hooks=call.hooks) as client:
             response = await client.post(
                 url,
-                json=payload
+                headers=request_body.headers,
+                content=request_body,
+                extensions=call.extensions,
             )
             response.raise_for_status()
 
@@ -75,7 +133,8 @@ async def query_model(
 
             return {
                 'content': message.get('content'),
-                'reasoning_details': None  # Ollama API doesn't provide this
+                'reasoning_details': None,  # Ollama API doesn't provide this
+                'usage': parse_usage(data),
             }
 
     except httpx.ConnectError as e:
@@ -133,8 +192,9 @@ async def query_models_parallel(
     """
     import asyncio
 
-    # Create tasks for all models
-    tasks = [query_model(model, messages, temperature=temperature) for model in models]
+    # Encode the shared request once; only the model id differs per request
+    body = shared_body(messages, temperature)
+    tasks = [query_model(model, messages, body=body) for model in models]
 
     # Wait for all to complete
     responses = await asyncio.gather(*tasks)
@@ -163,12 +223,13 @@ async def query_models_streaming(
 
     start_time = time.time()
     logger.debug("[PARALLEL] Starting %d model queries at t=0.0s", len(models))
+    body = shared_body(messages, temperature)
 
     # Create named tasks so we can identify which model completed
     async def query_with_name(model: str):
         req_start = time.time() - start_time
         logger.debug("[PARALLEL] Starting request to %s at t=%.2fs", model, req_start)
-        response = await query_model(model, messages, temperature=temperature)
+        response = await query_model(model, messages, body=body)
         req_end = time.time() - start_time
         logger.debug("[PARALLEL] Got response from %s at t=%.2fs", model, req_end)
         return (model, response)
@@ -229,9 +290,11 @@ async def query_models_with_stage_timeout(
         logger.info("[%s] Starting with stage_timeout=%.1fs, min_results=%d",
                    stage, stage_timeout, min_results)
 
+    body = shared_body(messages, temperature)
+
     # Create named tasks
     async def query_with_name(model: str):
-        response = await query_model(model, messages, temperature=temperature)
+        response = await query_model(model, messages, body=body)
         return (model, response)
 
     # Create ALL tasks at once
@@ -303,6 +366,7 @@ async def query_models_with_stage_timeout(
                 'error_type': 'stage_timeout',
                 'error_message': f'模型在阶段超时内未响应（{stage_timeout}s）'
             }
+            metrics.count_error("ollama", "stage_timeout")
 
     total_time = time.time() - start_time
     success_count = sum(1 for r in results.values() if r and not r.get('error'))
@@ -4,8 +4,10 @@ import logging
 import httpx
 import asyncio
 from typing import List, Dict, Any, Optional, Union
-from . import config
+from urllib.parse import urlparse
+from . import config, metrics
 from .config import DEFAULT_TIMEOUT, validate_openrouter_config
+from .request_body import ModelBody, SharedBody
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +16,10 @@ MAX_RETRIES = 2  # Reduced to avoid long delays
 INITIAL_BACKOFF_SECONDS = 2.0  # Start with 2 second backoff
 MAX_BACKOFF_SECONDS = 30.0  # Cap at 30 seconds
 
+# Models whose providers cache prompts only at explicit `cache_control` breakpoints
+# (OpenRouter passes them through). OpenAI, DeepSeek and others cache automatically.
+CACHE_HINT_MODEL_PREFIXES = ("anthropic/", "google/gemini")
+
 
 def build_message_content(
     text: str,
@@ -51,6 +57,88 @@ def build_message_content(
     return content
 
 
+def _is_openrouter() -> bool:
+    host = urlparse(config.OPENROUTER_API_URL or "").hostname or ""
+    return host == "openrouter.ai" or host.endswith(".openrouter.ai")
+
+
+def _takes_cache_hints(model: str) -> bool:
+    return model.startswith(CACHE_HINT_MODEL_PREFIXES) and _is_openrouter()
+
+
+def with_cache_breakpoint(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Mark the end of the conversation history as cacheable.
+
+    Messages are laid out most stable first (see council.build_multimodal_messages):
+    everything before the final user message is repeated unchanged on the next turn.
+    The original messages are not modified.
+    """
+    if len(messages) < 2:
+        return messages
+    last = messages[-2]
+    content = last.get("content")
+    if isinstance(content, str):
+        parts = [{"type": "text", "text": content}]
+    elif isinstance(content, list) and content:
+        parts = list(content)
+    else:
+        return messages
+    parts[-1] = {**parts[-1], "cache_control": {"type": "ephemeral"}}
+    return [*messages[:-2], {**last, "content": parts}, messages[-1]]
+
+
+class StageBody:
+    """
+    The encoded requests of one stage.
+
+    Every model gets the same fields apart from its id, except that models taking
+    cache hints get a copy of the messages with a cache breakpoint. Each variant is
+    encoded once, when the first model needing it asks.
+    """
+
+    def __init__(self, messages: List[Dict[str, Any]], temperature: float | None = None):
+        self._messages = messages
+        self._temperature = temperature
+        self._bodies: Dict[bool, SharedBody] = {}
+
+    def _fields(self, cache_hints: bool) -> Dict[str, Any]:
+        fields: Dict[str, Any] = {
+            "messages": with_cache_breakpoint(self._messages) if cache_hints else self._messages,
+            "max_tokens": 8192,  # Limit to avoid credit issues
+        }
+        if self._temperature is not None:
+            fields["temperature"] = self._temperature
+        if _is_openrouter():
+            # Token counts (including cached prompt tokens) in the response
+            fields["usage"] = {"include": True}
+        return fields
+
+    def for_model(self, model: str) -> ModelBody:
+        cache_hints = _takes_cache_hints(model)
+        if cache_hints not in self._bodies:
+            self._bodies[cache_hints] = SharedBody(self._fields(cache_hints))
+        return self._bodies[cache_hints].for_model(model)
+
+
+def shared_body(messages: List[Dict[str, Any]], temperature: float | None = None) -> StageBody:
+    """Everything in a chat completion request except the model, encoded once per stage."""
+    return StageBody(messages, temperature)
+
+
+def parse_usage(data: Dict[str, Any]) -> Optional[Dict[str, int]]:
+    """Token counts from an OpenAI-style `usage` object, or None if absent."""
+    usage = data.get('usage')
+    if not isinstance(usage, dict):
+        return None
+    details = usage.get('prompt_tokens_details') or {}
+    return {
+        'prompt_tokens': usage.get('prompt_tokens') or 0,
+        'completion_tokens': usage.get('completion_tokens') or 0,
+        'cached_tokens': details.get('cached_tokens') or 0,
+    }
+
+
 async def query_model(
     model: str,
     messages: List[Dict[str, Any]],
@@ -58,6 +146,7 @@ async def query_model(
     stage: str = None,
     retry_on_rate_limit: bool = True,
     temperature: float | None = None,
+    body: Optional[StageBody] = None,
 ) -> Optional[Dict[str, Any]]:
     """
     Query a single model via OpenAI 兼容 API with retry on rate limits.
@@ -70,9 +159,12 @@ async def query_model(
         timeout: Request timeout in seconds (defaults to DEFAULT_TIMEOUT from config)
         stage: Optional stage identifier for debugging (e.g., "STAGE1", "STAGE2", "STAGE3")
         retry_on_rate_limit: If True, retry on 429 errors with exponential backoff
+        body: Pre-encoded `messages`/`temperature` shared with the other models of a
+              stage (see shared_body); encoded here if not given
 
     Returns:
-        Response dict with 'content' and optional 'reasoning_details', or None if failed
+        Response dict with 'content', optional 'reasoning_details' and 'usage'
+        (see parse_usage), or None if failed
 
     Raises:
         ValueError: If OPENROUTER_API_KEY is not configured
@@ -86,30 +178,45 @@ async def query_model(
     if stage:
         logger.debug("[%s] Querying model: %s", stage, model)
 
+    if body is None:
+        body = shared_body(messages, temperature)
+    request_body = body.for_model(model)
     headers = {
         "Authorization": f"Bearer {config.OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
+        **request_body.headers,
     }
 
-    payload = {
-        "model": model,
-        "messages": messages,
-        "max_tokens": 8192,  # Limit to avoid credit issues
-    }
-    if temperature is not None:
-        payload["temperature"] = temperature
+    call = metrics.UpstreamCall("openrouter", model, stage)
+    try:
+        result = await _post_with_retries(model, request_body, headers, timeout, stage, retry_on_rate_limit, call)
+    except asyncio.CancelledError:
+        call.cancelled()
+        raise
+    call.finish(result)
+    return result
+
 
-    # Retry loop for rate limits
+async def _post_with_retries(
+    model: str,
+    request_body: ModelBody,
+    headers: Dict[str, str],
+    timeout: float,
+    stage: Optional[str],
+    retry_on_rate_limit: bool,
+    call: metrics.UpstreamCall,
+) -> Dict[str, Any]:
+    """query_model's request, retried on 429; returns the response or error dict."""
     retries = 0
     backoff = INITIAL_BACKOFF_SECONDS
 
     while True:
         try:
-            async with httpx.AsyncClient(timeout=timeout) as client:
+            async with httpx.AsyncClient(timeout=timeout, event_hooks=call.hooks) as client:
                 response = await client.post(
                     config.OPENROUTER_API_URL,
                     headers=headers,
-                    json=payload
+                    content=request_body,
+                    extensions=call.extensions,
                 )
                 response.raise_for_status()
 
@@ -118,7 +225,8 @@ async def query_model(
 
                 return {
                     'content': message.get('content'),
-                    'reasoning_details': message.get('reasoning_details')
+                    'reasoning_details': message.get('reasoning_details'),
+                    'usage': parse_usage(data),
                 }
 
         except httpx.ConnectError as e:
@@ -129,6 +237,9 @@ async def query_model(
                 'error_message': '无法连接到 API'
             }
         except httpx.HTTPStatusError as e:
+            if e.response.status_code == 429:
+                call.rate_limited()
+
             # Handle 429 rate limit with retry
             if e.response.status_code == 429 and retry_on_rate_limit and retries < MAX_RETRIES:
                 retries += 1
@@ -213,8 +324,9 @@ async def query_models_parallel(
     if stage:
         logger.debug("[%s] Querying %d models in parallel...", stage, len(models))
 
-    # Create tasks for all models
-    tasks = [query_model(model, messages, stage=stage, temperature=temperature) for model in models]
+    # Encode the shared request once; only the model id differs per request
+    body = shared_body(messages, temperature)
+    tasks = [query_model(model, messages, stage=stage, body=body) for model in models]
 
     # Wait for all to complete
     responses = await asyncio.gather(*tasks)
@@ -243,12 +355,13 @@ async def query_models_streaming(
 
     start_time = time.time()
     logger.debug("[PARALLEL] Starting %d model queries at t=0.0s", len(models))
+    body = shared_body(messages, temperature)
 
     # Create named tasks so we can identify which model completed
     async def query_with_name(model: str):
         req_start = time.time() - start_time
         logger.debug("[PARALLEL] Starting request to %s at t=%.2fs", model, req_start)
-        response = await query_model(model, messages, temperature=temperature)
+        response = await query_model(model, messages, body=body)
         req_end = time.time() - start_time
         logger.debug("[PARALLEL] Got response from %s at t=%.2fs", model, req_end)
         return (model, response)
@@ -310,9 +423,11 @@ async def query_models_with_stage_timeout(
         logger.info("[%s] Starting with stage_timeout=%.1fs, min_results=%d",
                    stage, stage_timeout, min_results)
 
+    body = shared_body(messages, temperature)
+
     # Create named tasks
     async def query_with_name(model: str):
-        response = await query_model(model, messages, stage=stage, temperature=temperature)
+        response = await query_model(model, messages, stage=stage, body=body)
         return (model, response)
 
     # Create ALL tasks at once
@@ -393,6 +508,7 @@ async def query_models_with_stage_timeout(
                 'error_message': f'模型在阶段超时内未响应（{stage_timeout}s）'
             }
             logger.warning("[%s] Model %s timed out at stage level", stage, model)
+            metrics.count_error("openrouter", "stage_timeout")
 
     total_time = time.time() - start_time
     success_count = sum(1 for r in results.values() if r and not r.get('error'))
@@ -0,0 +1,226 @@
+"""Optional zstd compression for stored conversation payloads.
+
+Stage 1 answers, Stage 2 critiques and tool outputs are long, repetitive text;
+with PAYLOAD_COMPRESSION=zstd they are stored compressed and decompressed
+transparently on read:
+
+- JSON storage: `.jsonl` message and snapshot records carry `{"_zstd": "<base64>"}`
+  instead of the plain data (see `conversation_log`)
+- SQLite storage: `messages.payload` holds the zstd frame as a BLOB
+- PostgreSQL/MySQL: the `payload` JSON column holds the same `{"_zstd": ...}` envelope
+
+Reads always understand both forms, so compression can be switched on or off at
+any time; existing data is rewritten lazily (log compaction) or never.
+
+A dictionary trained on our own council output compresses single messages far
+better than plain zstd (short frames have no history to match against). Train one
+from the stored conversations with:
+
+    python -m backend.payload_codec train [--size 112640] [--max-samples 5000]
+
+which writes `<dict_id>.zdict` into PAYLOAD_ZSTD_DICT_DIR; set PAYLOAD_ZSTD_DICT
+to that file name to compress with it. Frames record their dictionary id, and
+every dictionary in the directory stays usable for reading, so keep old ones
+after switching to a new dictionary.
+
+Configuration (environment variables):
+- PAYLOAD_COMPRESSION: "none" (default) or "zstd" (requires `zstandard`)
+- PAYLOAD_COMPRESSION_LEVEL: zstd level (default 3)
+- PAYLOAD_COMPRESSION_MIN_BYTES: payloads smaller than this stay plain (default 256)
+- PAYLOAD_ZSTD_DICT_DIR: directory of trained dictionaries (default data/zstd_dicts)
+- PAYLOAD_ZSTD_DICT: dictionary file to compress with (name in the directory, or a path)
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, Optional, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_COMPRESSION = os.getenv("PAYLOAD_COMPRESSION", "none").lower()
+PAYLOAD_COMPRESSION_LEVEL = int(os.getenv("PAYLOAD_COMPRESSION_LEVEL", "3"))
+PAYLOAD_COMPRESSION_MIN_BYTES = int(os.getenv("PAYLOAD_COMPRESSION_MIN_BYTES", "256"))
+PAYLOAD_ZSTD_DICT_DIR = os.getenv("PAYLOAD_ZSTD_DICT_DIR", "data/zstd_dicts")
+PAYLOAD_ZSTD_DICT = os.getenv("PAYLOAD_ZSTD_DICT", "")
+
+# Key of the JSON envelope holding a base64 zstd frame
+ENVELOPE_KEY = "_zstd"
+DICT_SUFFIX = ".zdict"
+
+# zstandard (de)compressors must not be shared between threads
+_local = threading.local()
+_dictionaries: Dict[int, Any] = {}
+_dictionaries_lock = threading.Lock()
+_warned_missing = False
+
+
+def compression_enabled() -> bool:
+    global _warned_missing
+    if PAYLOAD_COMPRESSION != "zstd":
+        return False
+    if zstandard is None:
+        if not _warned_missing:
+            logger.warning("PAYLOAD_COMPRESSION=zstd but zstandard is not installed; storing payloads uncompressed")
+            _warned_missing = True
+        return False
+    return True
+
+
+def _dict_path(name: str) -> str:
+    return name if os.path.dirname(name) else os.path.join(PAYLOAD_ZSTD_DICT_DIR, name)
+
+
+def _load_dictionary(path: str):
+    with open(path, "rb") as f:
+        dictionary = zstandard.ZstdCompressionDict(f.read())
+    with _dictionaries_lock:
+        _dictionaries[dictionary.dict_id()] = dictionary
+    return dictionary
+
+
+def _dictionary(dict_id: int):
+    """Dictionary with the given id, loaded from PAYLOAD_ZSTD_DICT_DIR (or the configured file)."""
+    dictionary = _dictionaries.get(dict_id)
+    if dictionary is not None:
+        return dictionary
+    candidates = [os.path.join(PAYLOAD_ZSTD_DICT_DIR, f"{dict_id}{DICT_SUFFIX}")]
+    if PAYLOAD_ZSTD_DICT:
+        candidates.append(_dict_path(PAYLOAD_ZSTD_DICT))
+    for path in candidates:
+        if os.path.exists(path):
+            dictionary = _load_dictionary(path)
+            if dictionary.dict_id() == dict_id:
+                return dictionary
+    raise RuntimeError(f"无法解压存储的消息：缺少 zstd 字典 {dict_id}（应位于 {PAYLOAD_ZSTD_DICT_DIR}）")
+
+
+def _compressor():
+    key = (PAYLOAD_COMPRESSION_LEVEL, PAYLOAD_ZSTD_DICT)
+    compressors = getattr(_local, "compressors", None)
+    if compressors is None:
+        compressors = _local.compressors = {}
+    compressor = compressors.get(key)
+    if compressor is None:
+        dictionary = _load_dictionary(_dict_path(PAYLOAD_ZSTD_DICT)) if PAYLOAD_ZSTD_DICT else None
+        compressor = zstandard.ZstdCompressor(level=PAYLOAD_COMPRESSION_LEVEL, dict_data=dictionary)
+        compressors[key] = compressor
+    return compressor
+
+
+def _decompressor(dict_id: int):
+    decompressors = getattr(_local, "decompressors", None)
+    if decompressors is None:
+        decompressors = _local.decompressors = {}
+    decompressor = decompressors.get(dict_id)
+    if decompressor is None:
+        dictionary = _dictionary(dict_id) if dict_id else None
+        decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+        decompressors[dict_id] = decompressor
+    return decompressor
+
+
+def compress_bytes(data: bytes) -> Optional[bytes]:
+    """zstd frame of `data`, or None if compression is off, `data` is small or did not shrink."""
+    if len(data) < PAYLOAD_COMPRESSION_MIN_BYTES or not compression_enabled():
+        return None
+    frame = _compressor().compress(data)
+    return frame if len(frame) < len(data) else None
+
+
+def decompress_bytes(frame: bytes) -> bytes:
+    if zstandard is None:
+        raise RuntimeError("存储的消息使用 zstd 压缩，但未安装 zstandard（pip install zstandard）")
+    dict_id = zstandard.get_frame_parameters(frame).dict_id
+    return _decompressor(dict_id).decompress(frame)
+
+
+def _dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def pack(value: Any) -> Any:
+    """JSON-safe form of `value`: a `{"_zstd": ...}` envelope when compression pays off, else `value` itself."""
+    if not compression_enabled():
+        return value
+    frame = compress_bytes(_dumps(value))
+    if frame is None:
+        return value
+    return {ENVELOPE_KEY: base64.b64encode(frame).decode("ascii")}
+
+
+def unpack(value: Any) -> Any:
+    """Inverse of `pack` (plain values pass through)."""
+    if isinstance(value, dict) and len(value) == 1 and ENVELOPE_KEY in value:
+        return json.loads(decompress_bytes(base64.b64decode(value[ENVELOPE_KEY])))
+    return value
+
+
+def encode_payload(value: Any) -> Union[str, bytes]:
+    """Column value for a payload stored as text: JSON text, or a zstd frame (BLOB) when compressed."""
+    data = _dumps(value)
+    frame = compress_bytes(data)
+    return frame if frame is not None else data.decode("utf-8")
+
+
+def decode_payload(raw: Union[str, bytes]) -> Any:
+    """Inverse of `encode_payload`."""
+    if isinstance(raw, bytes):
+        return json.loads(decompress_bytes(raw))
+    return json.loads(raw)
+
+
+def train_dictionary(samples: Iterable[Any], size: int = 112640):
+    """Train a zstd dictionary on JSON-serializable samples (e.g. stored messages)."""
+    if zstandard is None:
+        raise RuntimeError("训练 zstd 字典需要安装 zstandard（pip install zstandard）")
+    return zstandard.train_dictionary(size, [_dumps(sample) for sample in samples])
+
+
+def save_dictionary(dictionary, directory: Optional[str] = None) -> str:
+    """Write a trained dictionary as `<dict_id>.zdict` and return its path."""
+    directory = directory or PAYLOAD_ZSTD_DICT_DIR
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{dictionary.dict_id()}{DICT_SUFFIX}")
+    with open(path, "wb") as f:
+        f.write(dictionary.as_bytes())
+    return path
+
+
+def _stored_messages(max_samples: int):
+    from . import storage
+
+    count = 0
+    for summary in storage.list_conversations():
+        conversation = storage.get_conversation(summary["id"])
+        for message in (conversation or {}).get("messages") or []:
+            yield message
+            count += 1
+            if count >= max_samples:
+                return
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stored payload compression tools")
+    parser.add_argument("command", choices=["train"])
+    parser.add_argument("--size", type=int, default=112640, help="dictionary size in bytes")
+    parser.add_argument("--max-samples", type=int, default=5000, help="messages to train on")
+    parser.add_argument("--out-dir", default=PAYLOAD_ZSTD_DICT_DIR)
+    args = parser.parse_args()
+
+    samples = list(_stored_messages(args.max_samples))
+    if len(samples) < 10:
+        parser.error(f"only {len(samples)} stored messages; need more conversations to train a dictionary")
+    path = save_dictionary(train_dictionary(samples, args.size), args.out_dir)
+    print(f"Trained on {len(samples)} messages: {path}")
+    print(f"Set PAYLOAD_ZSTD_DICT={os.path.basename(path)} to compress new payloads with it.")
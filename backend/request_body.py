@@ -0,0 +1,74 @@
+"""Request bodies shared by every model of a council stage.
+
+All models of a stage get the same request apart from the `model` field, and
+the messages can be large (conversation history, search results, attachment
+excerpts, base64 images). Passing `json=payload` to httpx encoded the whole
+body again for every model and kept one copy per in-flight request.
+
+`SharedBody` encodes everything except `model` once, with orjson when it is
+installed. `for_model` splices a model id in front of those bytes without
+copying them. httpx sends the resulting `ModelBody` as `content=`, with an
+explicit Content-Length, so it is not sent chunked.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, AsyncIterator, Dict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON (orjson if available)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value)
+        except TypeError:
+            # e.g. integers beyond 64 bits or non-str keys; the stdlib handles those
+            pass
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class ModelBody:
+    """The body of one model's request: `{"model": ...,` followed by the shared bytes."""
+
+    __slots__ = ("_prefix", "_shared")
+
+    def __init__(self, prefix: bytes, shared: bytes):
+        self._prefix = prefix
+        self._shared = shared
+
+    def __len__(self) -> int:
+        return len(self._prefix) + len(self._shared)
+
+    def __bytes__(self) -> bytes:
+        return self._prefix + self._shared
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        # A fresh iterator per send, so a retried request can send the body again
+        yield self._prefix
+        yield self._shared
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Content-Type": "application/json", "Content-Length": str(len(self))}
+
+
+class SharedBody:
+    """Request fields common to all models, encoded once."""
+
+    __slots__ = ("_shared",)
+
+    def __init__(self, fields: Dict[str, Any]):
+        if "model" in fields:
+            raise ValueError("SharedBody fields must not include 'model'")
+        encoded = dumps(fields)
+        # `{"a":1}` -> `,"a":1}` (or just `}`), appended after the model field
+        self._shared = b"," + encoded[1:] if len(encoded) > 2 else b"}"
+
+    def for_model(self, model: str) -> ModelBody:
+        return ModelBody(b'{"model":' + dumps(model), self._shared)
@@ -8,6 +8,10 @@ Supported router types:
 - "ollama"
 
 No fallback is implemented here; the selected router is authoritative.
+
+Successful responses from both routers carry the provider's token counts as
+`usage` ({prompt_tokens, completion_tokens, cached_tokens}; Ollama adds
+durations), which the council stages record in token_stats.
 """
 
 from __future__ import annotations
@@ -31,14 +31,14 @@ SETTINGS_FILE = Path(
 
 DEFAULT_STAGE1_PROMPT_TEMPLATE = "{full_query}"
 
-DEFAULT_STAGE2_PROMPT_TEMPLATE = """你正在评估以下问题的不同回答：
-
-问题：{user_query}
-
-以下是不同模型的回答（已匿名）：
+# The large responses block comes first and the question after it, so requests
+# for the same responses (retries, re-runs) share a long cacheable prefix.
+DEFAULT_STAGE2_PROMPT_TEMPLATE = """以下是不同模型针对同一问题的回答（已匿名）：
 
 {responses_text}
 
+你正在评估上述回答。问题：{user_query}
+
 你的任务：
 1. 先分别评估每个回答，说明其做得好的地方与不足之处。
 2. 最后在回答末尾给出最终排序。
@@ -0,0 +1,311 @@
+"""SQLite conversation storage (DATABASE_TYPE=sqlite).
+
+A single-node option between JSON files and a PostgreSQL/MySQL server: one file
+(`SQLITE_PATH`, default `data/llmcouncil.sqlite3`) in WAL mode, so readers never
+block the writer. Messages live in their own table, one row per message keyed
+by (conversation_id, seq), so appending a message is one INSERT plus a counter
+update instead of rewriting the conversation. Listing reads only the
+conversations table. With PAYLOAD_COMPRESSION=zstd message payloads are stored
+as zstd BLOBs (see `payload_codec`).
+
+Every query is a constant SQL string with `?` parameters; each thread keeps its
+own connection, whose statement cache keeps them prepared across calls.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .payload_codec import decode_payload, encode_payload
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    title TEXT NOT NULL,
+    username TEXT,
+    settings TEXT NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_conversations_created ON conversations (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_conversations_user ON conversations (username, created_at DESC);
+CREATE TABLE IF NOT EXISTS messages (
+    conversation_id TEXT NOT NULL REFERENCES conversations (id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (conversation_id, seq)
+) WITHOUT ROWID;
+"""
+
+# Conversation keys stored in their own columns / table; everything else goes into `settings`
+_COLUMNS = ("id", "created_at", "title", "username", "messages")
+
+_SELECT_CONVERSATION = "SELECT id, created_at, title, username, settings FROM conversations WHERE id = ?"
+_SELECT_MESSAGES = "SELECT payload FROM messages WHERE conversation_id = ? ORDER BY seq"
+_INSERT_CONVERSATION = (
+    "INSERT INTO conversations (id, created_at, title, username, settings, message_count) VALUES (?, ?, ?, ?, ?, ?)"
+)
+_INSERT_MESSAGE = "INSERT INTO messages (conversation_id, seq, role, payload) VALUES (?, ?, ?, ?)"
+_SELECT_MESSAGE_COUNT = "SELECT message_count FROM conversations WHERE id = ?"
+_SELECT_STAMP = "SELECT message_count, title FROM conversations WHERE id = ?"
+_BUMP_MESSAGE_COUNT = "UPDATE conversations SET message_count = message_count + 1 WHERE id = ?"
+_UPDATE_TITLE = "UPDATE conversations SET title = ? WHERE id = ?"
+_SELECT_MESSAGE_PAGE = "SELECT payload FROM messages WHERE conversation_id = ? AND seq >= ? ORDER BY seq LIMIT ?"
+_LIST = (
+    "SELECT id, created_at, title, message_count, username FROM conversations "
+    "ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?"
+)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class SqliteStorage:
+    """Conversation store in one SQLite database file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Each connection is used by its own thread only; close() may run elsewhere
+            conn = sqlite3.connect(
+                self.path, isolation_level=None, timeout=30, cached_statements=128, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Transaction that takes the write lock up front (no upgrade deadlocks between readers)."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # ---- conversations ----
+
+    def create_conversation(
+        self,
+        conversation_id: str,
+        models: Optional[List[str]] = None,
+        chairman: Optional[str] = None,
+        username: Optional[str] = None,
+        execution_mode: Optional[str] = None,
+        router_type: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        conversation = {
+            "id": conversation_id,
+            "created_at": datetime.utcnow().isoformat(),
+            "title": "New Conversation",
+            "messages": [],
+            "models": models,
+            "chairman": chairman,
+            "username": username,
+            "execution_mode": execution_mode,
+            "router_type": router_type,
+        }
+        settings = {k: v for k, v in conversation.items() if k not in _COLUMNS}
+        self._conn().execute(
+            _INSERT_CONVERSATION,
+            (conversation_id, conversation["created_at"], conversation["title"], username, _dumps(settings), 0),
+        )
+        return conversation
+
+    def get_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._conn()
+        # One read transaction so the row and its messages come from the same snapshot
+        conn.execute("BEGIN")
+        try:
+            row = conn.execute(_SELECT_CONVERSATION, (conversation_id,)).fetchone()
+            if row is None:
+                return None
+            messages = [decode_payload(r[0]) for r in conn.execute(_SELECT_MESSAGES, (conversation_id,))]
+        finally:
+            conn.execute("COMMIT")
+
+        conversation = {"id": row[0], "created_at": row[1], "title": row[2], "messages": messages, "username": row[3]}
+        conversation.update(json.loads(row[4]))
+        return conversation
+
+    def get_conversation_window(self, conversation_id: str, limit: int) -> Optional[Dict[str, Any]]:
+        """Conversation with only its last `limit` messages (plus `message_offset` / `message_count`)."""
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            row = conn.execute(_SELECT_CONVERSATION, (conversation_id,)).fetchone()
+            if row is None:
+                return None
+            total = conn.execute(_SELECT_MESSAGE_COUNT, (conversation_id,)).fetchone()[0]
+            offset = max(0, total - limit)
+            messages = [
+                decode_payload(r[0]) for r in conn.execute(_SELECT_MESSAGE_PAGE, (conversation_id, offset, limit))
+            ]
+        finally:
+            conn.execute("COMMIT")
+
+        conversation = {"id": row[0], "created_at": row[1], "title": row[2], "messages": messages, "username": row[3]}
+        conversation.update(json.loads(row[4]))
+        conversation["message_offset"] = offset
+        conversation["message_count"] = total
+        return conversation
+
+    def count_messages(self, conversation_id: str) -> Optional[int]:
+        """Number of messages in a conversation (None if not found)."""
+        row = self._conn().execute(_SELECT_MESSAGE_COUNT, (conversation_id,)).fetchone()
+        return None if row is None else row[0]
+
+    def conversation_stamp(self, conversation_id: str) -> Optional[Tuple[int, str]]:
+        """`(message_count, title)` of a conversation, the cache stamp `storage` checks (None if not found)."""
+        row = self._conn().execute(_SELECT_STAMP, (conversation_id,)).fetchone()
+        return None if row is None else (row[0], row[1])
+
+    def get_messages(
+        self, conversation_id: str, offset: int = 0, limit: Optional[int] = None
+    ) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        """Messages at positions offset .. offset + limit - 1, and the total count (None if not found)."""
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            row = conn.execute(_SELECT_MESSAGE_COUNT, (conversation_id,)).fetchone()
+            if row is None:
+                return None
+            rows = conn.execute(
+                _SELECT_MESSAGE_PAGE, (conversation_id, offset, -1 if limit is None else limit)
+            ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        return [decode_payload(r[0]) for r in rows], row[0]
+
+    def save_conversation(self, conversation: Dict[str, Any]) -> None:
+        """Replace a conversation's fields and messages."""
+        settings = {k: v for k, v in conversation.items() if k not in _COLUMNS}
+        messages = conversation.get("messages") or []
+        with self._write() as conn:
+            updated = conn.execute(
+                "UPDATE conversations SET title = ?, username = ?, settings = ?, message_count = ? WHERE id = ?",
+                (
+                    conversation.get("title", "New Conversation"), conversation.get("username"),
+                    _dumps(settings), len(messages), conversation["id"],
+                ),
+            ).rowcount
+            if not updated:
+                conn.execute(
+                    _INSERT_CONVERSATION,
+                    (
+                        conversation["id"], conversation.get("created_at") or datetime.utcnow().isoformat(),
+                        conversation.get("title", "New Conversation"), conversation.get("username"),
+                        _dumps(settings), len(messages),
+                    ),
+                )
+            conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation["id"],))
+            conn.executemany(
+                _INSERT_MESSAGE,
+                [(conversation["id"], seq, m.get("role", ""), encode_payload(m)) for seq, m in enumerate(messages)],
+            )
+
+    def append_message(self, conversation_id: str, message: Dict[str, Any]) -> None:
+        with self._write() as conn:
+            row = conn.execute(_SELECT_MESSAGE_COUNT, (conversation_id,)).fetchone()
+            if row is None:
+                raise ValueError(f"未找到对话 {conversation_id}")
+            conn.execute(_INSERT_MESSAGE, (conversation_id, row[0], message.get("role", ""), encode_payload(message)))
+            conn.execute(_BUMP_MESSAGE_COUNT, (conversation_id,))
+
+    def update_title(self, conversation_id: str, title: str) -> None:
+        if not self._conn().execute(_UPDATE_TITLE, (title, conversation_id)).rowcount:
+            raise ValueError(f"未找到对话 {conversation_id}")
+
+    def list_conversations(self, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(_LIST, (-1 if limit is None else limit, offset)).fetchall()
+        return [
+            {"id": r[0], "created_at": r[1], "title": r[2], "message_count": r[3], "username": r[4]}
+            for r in rows
+        ]
+
+    def list_conversations_page(
+        self,
+        limit: int,
+        after: Optional[Tuple[str, str]] = None,
+        username: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Keyset page, newest first, after the (created_at, id) position `after`."""
+        sql = "SELECT id, created_at, title, message_count, username FROM conversations"
+        conditions: List[str] = []
+        params: List[Any] = []
+        if username is not None:
+            conditions.append("username = ?")
+            params.append(username)
+        if after is not None:
+            conditions.append("(created_at < ? OR (created_at = ? AND id < ?))")
+            params += [after[0], after[0], after[1]]
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+        return [
+            {"id": r[0], "created_at": r[1], "title": r[2], "message_count": r[3], "username": r[4]}
+            for r in self._conn().execute(sql, params)
+        ]
+
+    def delete_conversation(self, conversation_id: str) -> bool:
+        with self._write() as conn:
+            return conn.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,)).rowcount > 0
+
+    def delete_all_conversations(self) -> None:
+        with self._write() as conn:
+            conn.execute("DELETE FROM messages")
+            conn.execute("DELETE FROM conversations")
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+_stores: Dict[str, SqliteStorage] = {}
+_stores_lock = threading.Lock()
+
+
+def get_sqlite_storage(path: str) -> SqliteStorage:
+    """Store for a database file, created (with its schema) on first use."""
+    key = os.path.realpath(path)
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                store = SqliteStorage(path)
+                _stores[key] = store
+                logger.info("Using SQLite storage at %s", path)
+    return store
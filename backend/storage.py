@@ -3,20 +3,35 @@ Storage layer with automatic switching between Database (PostgreSQL/MySQL) and J
 
 Based on DATABASE_TYPE environment variable (Feature 2):
 - "postgresql" or "mysql": Use database storage
+- "sqlite": Use a local SQLite file in WAL mode (see `sqlite_storage`)
 - "json" (default): Use JSON file storage (backward compatible)
+
+JSON storage writes new conversations as append-only `.jsonl` logs (see
+`conversation_log`); legacy `.json` files are still read and are converted on
+their next write.
+
+`get_conversation` is served from a write-through cache of recently used
+conversations (see `conversation_cache`), validated against a cheap stamp of
+the stored conversation on every read.
 """
 
+import base64
 import json
 import logging
 import os
 import sys
-from contextlib import contextmanager
+from contextlib import ExitStack, contextmanager
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Generator
+from typing import List, Dict, Any, Optional, Generator, Tuple
 from pathlib import Path
-from .config import DATA_DIR, DATABASE_TYPE, ROUTER_TYPE
-from .database import is_using_database, SessionLocal
-from .models import Conversation as ConversationModel
+from sqlalchemy import and_, func, literal, or_, select
+from . import conversation_log, payload_codec
+from .conversation_cache import get_conversation_cache
+from .config import CONVERSATION_FORMAT, DATA_DIR, DATABASE_TYPE, ROUTER_TYPE, SQLITE_PATH
+from .database import is_using_database, is_using_sqlite, SessionLocal
+from .models import Conversation as ConversationModel, Message as MessageModel
+from .metadata_index import conversation_summary, get_metadata_index
+from .sqlite_storage import get_sqlite_storage
 
 logger = logging.getLogger(__name__)
 
@@ -109,12 +124,13 @@ def validate_conversation_id(conversation_id: str) -> bool:
     return bool(re.match(uuid_pattern, conversation_id.lower()))
 
 
-def get_conversation_path(conversation_id: str) -> str:
+def get_conversation_path(conversation_id: str, suffix: str = ".json") -> str:
     """
     Get the file path for a conversation with path traversal protection.
 
     Args:
         conversation_id: UUID of the conversation
+        suffix: ".json" (whole-file format) or ".jsonl" (append-only log format)
 
     Returns:
         Safe file path within DATA_DIR
@@ -126,7 +142,7 @@ def get_conversation_path(conversation_id: str) -> str:
     if not validate_conversation_id(conversation_id):
         raise ValueError(f"对话 ID 格式无效: {conversation_id}")
 
-    path = os.path.join(DATA_DIR, f"{conversation_id}.json")
+    path = os.path.join(DATA_DIR, f"{conversation_id}{suffix}")
 
     # Double-check: ensure resolved path is within DATA_DIR
     real_path = os.path.realpath(path)
@@ -160,72 +176,251 @@ def _json_create_conversation(
         "router_type": router_type,
     }
 
+    if CONVERSATION_FORMAT == "jsonl":
+        path = get_conversation_path(conversation_id, conversation_log.LOG_SUFFIX)
+        with _locked_log(path, create=True) as f:
+            f.write(conversation_log.snapshot_text(conversation))
+            f.flush()
+            _metadata_index().upsert(conversation_summary(conversation), path)
+        return conversation
+
     path = get_conversation_path(conversation_id)
     with open(path, 'w') as f:
         with file_lock(f, exclusive=True):
             json.dump(conversation, f, indent=2)
+            f.flush()
+            _metadata_index().upsert(conversation_summary(conversation), path)
 
     return conversation
 
 
-def _json_get_conversation(conversation_id: str) -> Optional[Dict[str, Any]]:
-    """Get conversation from JSON file with shared lock."""
+def _existing_conversation_path(conversation_id: str) -> Optional[str]:
+    """Path of a stored conversation: the `.jsonl` log if present, else the legacy `.json` file."""
+    log_path = get_conversation_path(conversation_id, conversation_log.LOG_SUFFIX)
+    if os.path.exists(log_path):
+        return log_path
     path = get_conversation_path(conversation_id)
+    return path if os.path.exists(path) else None
+
+
+def _trim_torn_tail(fd: int) -> None:
+    """Cut a torn final record (crash mid-append) so the next append starts on a new line."""
+    size = os.fstat(fd).st_size
+    if size == 0:
+        return
+    os.lseek(fd, size - 1, os.SEEK_SET)
+    if os.read(fd, 1) == b"\n":
+        return
+    end = size - 1
+    while end > 0:
+        start = max(0, end - 65536)
+        os.lseek(fd, start, os.SEEK_SET)
+        newline = os.read(fd, end - start).rfind(b"\n")
+        if newline >= 0:
+            os.ftruncate(fd, start + newline + 1)
+            return
+        end = start
+    os.ftruncate(fd, 0)
+
+
+@contextmanager
+def _locked_log(path: str, create: bool = False):
+    """
+    Open a conversation log for appending under an exclusive lock.
+
+    Compaction replaces the file, so after acquiring the lock we check that `path`
+    still refers to the locked file and retry otherwise. Unless `create` is set the
+    log must already exist (FileNotFoundError otherwise), so an append racing a
+    delete cannot bring back a log without its snapshot.
+    """
+    flags = os.O_RDWR | os.O_APPEND | (os.O_CREAT if create else 0)
+    while True:
+        with os.fdopen(os.open(path, flags, 0o644), 'a', encoding='utf-8') as f:
+            with file_lock(f, exclusive=True):
+                try:
+                    current = os.stat(path).st_ino
+                except FileNotFoundError:
+                    current = None
+                if current == os.fstat(f.fileno()).st_ino:
+                    _trim_torn_tail(f.fileno())
+                    yield f
+                    return
 
-    if not os.path.exists(path):
+
+# Records appended to each log since its last snapshot, per process (path -> (inode, count))
+_log_pending: Dict[str, Any] = {}
+
+
+def _json_get_conversation(conversation_id: str) -> Optional[Dict[str, Any]]:
+    """Get conversation from JSON file or log with shared lock."""
+    path = _existing_conversation_path(conversation_id)
+
+    if path is None:
         return None
 
-    with open(path, 'r') as f:
+    with open(path, 'r', encoding='utf-8') as f:
         with file_lock(f, exclusive=False):
+            if path.endswith(conversation_log.LOG_SUFFIX):
+                return conversation_log.replay(f)[0]
             return json.load(f)
 
 
+def _json_append_records(
+    conversation_id: str,
+    records: List[Dict[str, Any]],
+    title: Optional[str] = None,
+    add_messages: int = 0,
+):
+    """
+    Append message/title records to a conversation.
+
+    Logs get the records appended (and are compacted every COMPACT_EVERY records);
+    legacy `.json` conversations are rewritten, converting them to the log format
+    unless CONVERSATION_FORMAT=json.
+
+    Returns:
+        The log's stamps just before and just after the append (both taken under
+        the lock), or None if a legacy file was rewritten
+    """
+    path = _existing_conversation_path(conversation_id)
+    if path is None:
+        raise ValueError(f"未找到对话 {conversation_id}")
+
+    if not path.endswith(conversation_log.LOG_SUFFIX):
+        conversation = _json_get_conversation(conversation_id)
+        for record in records:
+            conversation_log.apply_record(conversation, record)
+        _json_save_conversation(conversation)
+        return None
+
+    with ExitStack() as stack:
+        try:
+            f = stack.enter_context(_locked_log(path))
+        except FileNotFoundError:
+            # Deleted after it was looked up
+            raise ValueError(f"未找到对话 {conversation_id}") from None
+        before = _file_stamp(os.fstat(f.fileno()))
+        f.write(conversation_log.record_text(records))
+        f.flush()
+
+        inode = os.fstat(f.fileno()).st_ino
+        known = _log_pending.get(path)
+        if known is not None and known[0] == inode:
+            pending = known[1] + len(records)
+        else:
+            with open(path, 'r', encoding='utf-8') as reader:
+                pending = conversation_log.replay(reader)[1]
+
+        if pending >= conversation_log.COMPACT_EVERY:
+            with open(path, 'r', encoding='utf-8') as reader:
+                conversation = conversation_log.replay(reader)[0]
+            conversation_log.write_snapshot(path, conversation)
+            _log_pending[path] = (os.stat(path).st_ino, 0)
+            after = _file_stamp(os.stat(path))
+        else:
+            _log_pending[path] = (inode, pending)
+            after = _file_stamp(os.fstat(f.fileno()))
+
+        if not _metadata_index().update(conversation_id, path, title=title, add_messages=add_messages):
+            _metadata_index().upsert(conversation_summary(_json_get_conversation(conversation_id)), path)
+        return before, after
+
+
+def _file_stamp(st: os.stat_result) -> Tuple[int, int, int]:
+    """Cache stamp of a conversation file: replaced (compaction), appended or rewritten files all differ."""
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _json_conversation_stamp(conversation_id: str) -> Optional[Tuple[int, int, int]]:
+    path = _existing_conversation_path(conversation_id)
+    if path is None:
+        return None
+    try:
+        return _file_stamp(os.stat(path))
+    except FileNotFoundError:
+        return None
+
+
 def _json_save_conversation(conversation: Dict[str, Any]):
-    """Save conversation to JSON file with exclusive lock."""
+    """Save a whole conversation (as a log snapshot, or a JSON file in legacy format) with exclusive lock."""
     ensure_data_dir()
 
-    path = get_conversation_path(conversation['id'])
+    json_path = get_conversation_path(conversation['id'])
+    log_path = get_conversation_path(conversation['id'], conversation_log.LOG_SUFFIX)
+    if CONVERSATION_FORMAT == "jsonl" or os.path.exists(log_path):
+        with _locked_log(log_path, create=True) as f:
+            conversation_log.write_snapshot(log_path, conversation)
+            _log_pending[log_path] = (os.stat(log_path).st_ino, 0)
+            _metadata_index().upsert(conversation_summary(conversation), log_path)
+        if os.path.exists(json_path):
+            os.remove(json_path)
+        return
+
+    path = json_path
     with open(path, 'w') as f:
         with file_lock(f, exclusive=True):
             json.dump(conversation, f, indent=2)
+            f.flush()
+            # Update the index while still holding the file lock, so index order matches write order
+            _metadata_index().upsert(conversation_summary(conversation), path)
 
 
-def _json_list_conversations() -> List[Dict[str, Any]]:
-    """List all conversations from JSON files with shared locks."""
+def _metadata_index():
+    """Metadata index for the current DATA_DIR."""
     ensure_data_dir()
+    return get_metadata_index(DATA_DIR)
 
-    conversations = []
-    for filename in os.listdir(DATA_DIR):
-        if filename.endswith('.json'):
-            path = os.path.join(DATA_DIR, filename)
-            try:
-                with open(path, 'r') as f:
-                    with file_lock(f, exclusive=False):
-                        data = json.load(f)
-                        conversations.append({
-                            "id": data["id"],
-                            "created_at": data["created_at"],
-                            "title": data.get("title", "New Conversation"),
-                            "message_count": len(data["messages"]),
-                            "username": data.get("username")
-                        })
-            except (json.JSONDecodeError, KeyError) as e:
-                logger.warning("Skipping malformed conversation file %s: %s", filename, e)
-                continue
-
-    conversations.sort(key=lambda x: x["created_at"], reverse=True)
-    return conversations
 
+def _json_list_conversations(limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+    """List conversations from the metadata index (no conversation files are opened)."""
+    return _metadata_index().list(limit=limit, offset=offset)
+
+
+def _json_get_conversation_window(conversation_id: str, limit: int) -> Optional[Dict[str, Any]]:
+    """Conversation with only its last `limit` messages (the file is still read whole)."""
+    conversation = _json_get_conversation(conversation_id)
+    if conversation is None:
+        return None
+    messages = conversation.get("messages") or []
+    offset = max(0, len(messages) - limit)
+    conversation["messages"] = messages[offset:]
+    conversation["message_offset"] = offset
+    conversation["message_count"] = len(messages)
+    return conversation
+
+
+def _json_get_messages(
+    conversation_id: str, offset: int = 0, limit: Optional[int] = None
+) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+    conversation = _json_get_conversation(conversation_id)
+    if conversation is None:
+        return None
+    messages = conversation.get("messages") or []
+    end = None if limit is None else offset + limit
+    return messages[offset:end], len(messages)
 
-def _json_delete_conversation(conversation_id: str) -> bool:
-    """Delete conversation from JSON file."""
-    path = get_conversation_path(conversation_id)
 
-    if not os.path.exists(path):
-        return False
+def _json_count_messages(conversation_id: str) -> Optional[int]:
+    count = _metadata_index().message_count(conversation_id)
+    if count is not None:
+        return count
+    page = _json_get_messages(conversation_id, 0, 0)
+    return None if page is None else page[1]
 
-    os.remove(path)
-    return True
+
+def _json_delete_conversation(conversation_id: str) -> bool:
+    """Delete conversation from JSON file and/or log."""
+    deleted = False
+    for suffix in (".json", conversation_log.LOG_SUFFIX):
+        path = get_conversation_path(conversation_id, suffix)
+        if os.path.exists(path):
+            os.remove(path)
+            _log_pending.pop(path, None)
+            deleted = True
+
+    if deleted:
+        _metadata_index().delete(conversation_id)
+    return deleted
 
 
 def _json_delete_all_conversations():
@@ -233,13 +428,26 @@ def _json_delete_all_conversations():
     ensure_data_dir()
 
     for filename in os.listdir(DATA_DIR):
-        if filename.endswith('.json'):
+        if filename.endswith(('.json', conversation_log.LOG_SUFFIX)):
             path = os.path.join(DATA_DIR, filename)
             os.remove(path)
+    _log_pending.clear()
+    _metadata_index().clear()
 
 
 # ==================== DATABASE STORAGE (Feature 2) ====================
 
+def _db_models_payload(
+    models: Optional[List[str]],
+    execution_mode: Optional[str],
+    router_type: Optional[str],
+) -> Any:
+    """Value of the `models` column; conversation settings are embedded without changing the DB schema."""
+    if execution_mode is not None or router_type is not None:
+        return {"models": models, "execution_mode": execution_mode, "router_type": router_type}
+    return models
+
+
 def _db_create_conversation(
     conversation_id: str,
     models: Optional[List[str]] = None,
@@ -249,17 +457,13 @@ def _db_create_conversation(
     router_type: Optional[str] = None,
 ) -> Dict[str, Any]:
     """Create conversation in database."""
-    models_payload: Any = models
-    if execution_mode is not None or router_type is not None:
-        models_payload = {"models": models, "execution_mode": execution_mode, "router_type": router_type}
-
     db = SessionLocal()
     try:
         conversation = ConversationModel(
             id=conversation_id,
             title="New Conversation",
-            messages=[],
-            models=models_payload,
+            message_count=0,
+            models=_db_models_payload(models, execution_mode, router_type),
             chairman=chairman,
             username=username
         )
@@ -271,6 +475,60 @@ def _db_create_conversation(
         db.close()
 
 
+def _db_message_query(db, conversation_id: str, offset: int = 0, limit: Optional[int] = None):
+    """Messages of a conversation in order; pages are `seq` ranges on the (conversation_id, seq) index."""
+    query = db.query(MessageModel.payload).filter(MessageModel.conversation_id == conversation_id)
+    if offset:
+        query = query.filter(MessageModel.seq >= offset)
+    query = query.order_by(MessageModel.seq)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def _db_get_messages(
+    conversation_id: str, offset: int = 0, limit: Optional[int] = None
+) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+    """Read a page of messages (positions offset .. offset + limit - 1) and the total count."""
+    db = SessionLocal()
+    try:
+        total = db.query(ConversationModel.message_count).filter(ConversationModel.id == conversation_id).scalar()
+        if total is None:
+            return None
+        return [payload_codec.unpack(row.payload) for row in _db_message_query(db, conversation_id, offset, limit)], total
+    finally:
+        db.close()
+
+
+def _db_count_messages(conversation_id: str) -> Optional[int]:
+    db = SessionLocal()
+    try:
+        return db.query(ConversationModel.message_count).filter(ConversationModel.id == conversation_id).scalar()
+    finally:
+        db.close()
+
+
+def _db_get_conversation_window(conversation_id: str, limit: int) -> Optional[Dict[str, Any]]:
+    """Conversation with only its last `limit` messages."""
+    db = SessionLocal()
+    try:
+        conversation = db.query(ConversationModel).filter(
+            ConversationModel.id == conversation_id
+        ).first()
+
+        if conversation is None:
+            return None
+
+        offset = max(0, conversation.message_count - limit)
+        messages = [payload_codec.unpack(row.payload) for row in _db_message_query(db, conversation_id, offset, limit)]
+        result = conversation.to_dict(messages)
+        result["message_offset"] = offset
+        result["message_count"] = conversation.message_count
+        return result
+    finally:
+        db.close()
+
+
 def _db_get_conversation(conversation_id: str) -> Optional[Dict[str, Any]]:
     """Get conversation from database."""
     db = SessionLocal()
@@ -282,73 +540,195 @@ def _db_get_conversation(conversation_id: str) -> Optional[Dict[str, Any]]:
         if conversation is None:
             return None
 
-        return conversation.to_dict()
+        messages = [payload_codec.unpack(row.payload) for row in _db_message_query(db, conversation_id)]
+        return conversation.to_dict(messages)
+    finally:
+        db.close()
+
+
+def _db_conversation_stamp(conversation_id: str) -> Optional[Tuple[int, str]]:
+    """Cache stamp of a conversation row: `(message_count, title)`, the columns every append / retitle changes."""
+    db = SessionLocal()
+    try:
+        row = db.query(ConversationModel.message_count, ConversationModel.title).filter(
+            ConversationModel.id == conversation_id
+        ).first()
+        return None if row is None else (row[0] or 0, row[1])
     finally:
         db.close()
 
 
 def _db_save_conversation(conversation: Dict[str, Any]):
-    """Save conversation to database."""
+    """Save a whole conversation to database (replaces its messages)."""
     db = SessionLocal()
     try:
         db_conversation = db.query(ConversationModel).filter(
             ConversationModel.id == conversation['id']
-        ).first()
+        ).with_for_update().first()
 
         if db_conversation:
+            messages = conversation.get('messages', [])
             db_conversation.title = conversation.get('title', 'New Conversation')
-            db_conversation.messages = conversation.get('messages', [])
-            models_value: Any = conversation.get('models')
-            if conversation.get("execution_mode") is not None or conversation.get("router_type") is not None:
-                models_value = {
-                    "models": models_value,
-                    "execution_mode": conversation.get("execution_mode"),
-                    "router_type": conversation.get("router_type"),
-                }
-            db_conversation.models = models_value
+            db_conversation.models = _db_models_payload(
+                conversation.get('models'), conversation.get("execution_mode"), conversation.get("router_type")
+            )
             db_conversation.chairman = conversation.get('chairman')
             db_conversation.username = conversation.get('username')
+            db_conversation.message_count = len(messages)
+            db.query(MessageModel).filter(
+                MessageModel.conversation_id == conversation['id']
+            ).delete(synchronize_session=False)
+            db.add_all(_db_message_rows(conversation['id'], messages))
             db.commit()
     finally:
         db.close()
 
 
-def _db_list_conversations() -> List[Dict[str, Any]]:
-    """List all conversations from database."""
+def _db_message_rows(conversation_id: str, messages: List[Dict[str, Any]], first_seq: int = 0) -> List[MessageModel]:
+    return [
+        MessageModel(conversation_id=conversation_id, seq=first_seq + i, role=m.get("role", ""), payload=payload_codec.pack(m))
+        for i, m in enumerate(messages)
+    ]
+
+
+def _db_append_message(conversation_id: str, message: Dict[str, Any]):
+    """
+    Append a message with a single INSERT.
+
+    Bumping `message_count` first locks the conversation row, so concurrent appends
+    to the same conversation are serialized and get consecutive `seq` values.
+    """
+    db = SessionLocal()
+    try:
+        updated = db.query(ConversationModel).filter(ConversationModel.id == conversation_id).update(
+            {ConversationModel.message_count: ConversationModel.message_count + 1},
+            synchronize_session=False,
+        )
+        if not updated:
+            db.rollback()
+            raise ValueError(f"未找到对话 {conversation_id}")
+        count = db.query(ConversationModel.message_count).filter(ConversationModel.id == conversation_id).scalar()
+        db.add_all(_db_message_rows(conversation_id, [message], first_seq=count - 1))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _db_update_title(conversation_id: str, title: str):
+    """Update the title column only."""
     db = SessionLocal()
     try:
-        conversations = db.query(ConversationModel).order_by(
+        updated = db.query(ConversationModel).filter(ConversationModel.id == conversation_id).update(
+            {ConversationModel.title: title}, synchronize_session=False
+        )
+        db.commit()
+        if not updated:
+            raise ValueError(f"未找到对话 {conversation_id}")
+    finally:
+        db.close()
+
+
+def _db_list_conversations(limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+    """List conversations from database (metadata columns only)."""
+    db = SessionLocal()
+    try:
+        query = db.query(
+            ConversationModel.id,
+            ConversationModel.created_at,
+            ConversationModel.title,
+            ConversationModel.message_count,
+            ConversationModel.username,
+        ).order_by(
             ConversationModel.created_at.desc()
-        ).all()
+        ).offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
 
         return [
             {
                 "id": conv.id,
                 "created_at": conv.created_at.isoformat() if conv.created_at else "",
                 "title": conv.title or "New Conversation",
-                "message_count": len(conv.messages) if conv.messages else 0,
+                "message_count": conv.message_count or 0,
                 "username": conv.username
             }
-            for conv in conversations
+            for conv in query
         ]
     finally:
         db.close()
 
 
-def _db_delete_conversation(conversation_id: str) -> bool:
-    """Delete conversation from database."""
+def _db_after_clause(after: Tuple[str, str]):
+    """
+    Keyset condition for rows ordered after the cursor position `after`.
+
+    The anchor's `created_at` is read back from the row itself, so the comparison
+    uses the stored value rather than a re-parsed `isoformat()` string (which does
+    not match what e.g. `CURRENT_TIMESTAMP` stored on SQLite). The cursor's own
+    timestamp is only used if the anchor conversation was deleted meanwhile.
+    """
+    created_at, conversation_id = after
+    try:
+        cursor_time = datetime.fromisoformat(created_at)
+    except ValueError as e:
+        raise ValueError("无效的分页游标") from e
+    anchor = func.coalesce(
+        select(ConversationModel.created_at).where(ConversationModel.id == conversation_id).scalar_subquery(),
+        literal(cursor_time, ConversationModel.created_at.type),
+    )
+    return or_(
+        ConversationModel.created_at < anchor,
+        and_(ConversationModel.created_at == anchor, ConversationModel.id < conversation_id),
+    )
+
+
+def _db_list_conversations_page(
+    limit: int,
+    after: Optional[Tuple[str, str]] = None,
+    username: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Keyset page of conversations, newest first, after the (created_at, id) position `after`."""
     db = SessionLocal()
     try:
-        conversation = db.query(ConversationModel).filter(
-            ConversationModel.id == conversation_id
-        ).first()
+        query = db.query(
+            ConversationModel.id,
+            ConversationModel.created_at,
+            ConversationModel.title,
+            ConversationModel.message_count,
+            ConversationModel.username,
+        )
+        if username is not None:
+            query = query.filter(ConversationModel.username == username)
+        if after is not None:
+            query = query.filter(_db_after_clause(after))
+        query = query.order_by(ConversationModel.created_at.desc(), ConversationModel.id.desc()).limit(limit)
+
+        return [
+            {
+                "id": conv.id,
+                "created_at": conv.created_at.isoformat() if conv.created_at else "",
+                "title": conv.title or "New Conversation",
+                "message_count": conv.message_count or 0,
+                "username": conv.username
+            }
+            for conv in query
+        ]
+    finally:
+        db.close()
 
-        if conversation is None:
-            return False
 
-        db.delete(conversation)
+def _db_delete_conversation(conversation_id: str) -> bool:
+    """Delete conversation (and its messages) from database."""
+    db = SessionLocal()
+    try:
+        db.query(MessageModel).filter(
+            MessageModel.conversation_id == conversation_id
+        ).delete(synchronize_session=False)
+        deleted = db.query(ConversationModel).filter(
+            ConversationModel.id == conversation_id
+        ).delete(synchronize_session=False)
         db.commit()
-        return True
+        return deleted > 0
     finally:
         db.close()
 
@@ -357,12 +737,17 @@ def _db_delete_all_conversations():
     """Delete all conversations from database."""
     db = SessionLocal()
     try:
-        db.query(ConversationModel).delete()
+        db.query(MessageModel).delete(synchronize_session=False)
+        db.query(ConversationModel).delete(synchronize_session=False)
         db.commit()
     finally:
         db.close()
 
 
+def _sqlite():
+    return get_sqlite_storage(SQLITE_PATH)
+
+
 # ==================== UNIFIED API (Auto-switches based on DATABASE_TYPE) ====================
 
 def create_conversation(
@@ -385,11 +770,14 @@ def create_conversation(
     Returns:
         New conversation dict
     """
-    if is_using_database():
+    if is_using_sqlite():
+        conv = _sqlite().create_conversation(conversation_id, models, chairman, username, execution_mode, router_type)
+    elif is_using_database():
         conv = _db_create_conversation(conversation_id, models, chairman, username, execution_mode, router_type)
     else:
         conv = _json_create_conversation(conversation_id, models, chairman, username, execution_mode, router_type)
 
+    get_conversation_cache().invalidate(conversation_id)
     return _normalize_conversation(conv)
 
 
@@ -403,7 +791,28 @@ def get_conversation(conversation_id: str) -> Optional[Dict[str, Any]]:
     Returns:
         Conversation dict or None if not found
     """
-    if is_using_database():
+    cache = get_conversation_cache()
+    if not cache.enabled:
+        return _load_conversation(conversation_id)
+
+    # The stamp is read before loading, so a write landing in between only makes the entry miss next time
+    stamp = conversation_stamp(conversation_id)
+    if stamp is None:
+        cache.invalidate(conversation_id, notify=False)
+        return None
+    conv = cache.get(conversation_id, stamp)
+    if conv is not None:
+        return conv
+    conv = _load_conversation(conversation_id)
+    if conv is not None:
+        cache.put(conversation_id, conv, stamp)
+    return conv
+
+
+def _load_conversation(conversation_id: str) -> Optional[Dict[str, Any]]:
+    if is_using_sqlite():
+        conv = _sqlite().get_conversation(conversation_id)
+    elif is_using_database():
         conv = _db_get_conversation(conversation_id)
     else:
         conv = _json_get_conversation(conversation_id)
@@ -411,6 +820,21 @@ def get_conversation(conversation_id: str) -> Optional[Dict[str, Any]]:
     return _normalize_conversation(conv) if conv else None
 
 
+def conversation_stamp(conversation_id: str) -> Optional[Tuple[Any, ...]]:
+    """
+    Cheap fingerprint of a stored conversation that changes with every write.
+
+    Returns:
+        `(inode, size, mtime_ns)` of the JSON file/log, or `(message_count, title)`
+        of the database row; None if the conversation does not exist
+    """
+    if is_using_sqlite():
+        return _sqlite().conversation_stamp(conversation_id)
+    if is_using_database():
+        return _db_conversation_stamp(conversation_id)
+    return _json_conversation_stamp(conversation_id)
+
+
 def save_conversation(conversation: Dict[str, Any]):
     """
     Save a conversation to storage.
@@ -418,10 +842,13 @@ def save_conversation(conversation: Dict[str, Any]):
     Args:
         conversation: Conversation dict to save
     """
-    if is_using_database():
+    if is_using_sqlite():
+        _sqlite().save_conversation(conversation)
+    elif is_using_database():
         _db_save_conversation(_normalize_conversation(conversation))
     else:
         _json_save_conversation(conversation)
+    get_conversation_cache().invalidate(conversation['id'])
 
 
 def _infer_router_type_from_models(models: Optional[List[str]]) -> Optional[str]:
@@ -462,36 +889,212 @@ def _normalize_conversation(conversation: Optional[Dict[str, Any]]) -> Optional[
     return conversation
 
 
-def list_conversations() -> List[Dict[str, Any]]:
+def list_conversations(limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
     """
-    List all conversations (metadata only).
+    List conversations (metadata only), newest first.
+
+    Args:
+        limit: Maximum number of conversations to return (None for all)
+        offset: Number of conversations to skip
 
     Returns:
         List of conversation metadata dicts
     """
+    if is_using_sqlite():
+        return _sqlite().list_conversations(limit, offset)
     if is_using_database():
-        return _db_list_conversations()
-    return _json_list_conversations()
+        return _db_list_conversations(limit, offset)
+    return _json_list_conversations(limit, offset)
+
+
+def encode_cursor(created_at: str, conversation_id: str) -> str:
+    """Opaque list cursor for the (created_at, id) position of a conversation."""
+    raw = json.dumps([created_at, conversation_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Decode a list cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        created_at, conversation_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError("无效的分页游标") from e
+    if not isinstance(created_at, str) or not isinstance(conversation_id, str):
+        raise ValueError("无效的分页游标")
+    return created_at, conversation_id
+
+
+def list_conversations_page(
+    limit: int,
+    cursor: Optional[str] = None,
+    username: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    List one page of conversations (metadata only), newest first.
 
+    Pages are keyset ranges on (created_at, id), so each page costs the same
+    regardless of how far the client has scrolled.
+
+    Args:
+        limit: Page size
+        cursor: `next_cursor` of the previous page (None for the first page)
+        username: Only conversations created by this user
 
-def add_user_message(conversation_id: str, content: str):
+    Returns:
+        (conversations, next_cursor or None on the last page)
+    """
+    after = decode_cursor(cursor) if cursor else None
+    if is_using_sqlite():
+        rows = _sqlite().list_conversations_page(limit + 1, after, username)
+    elif is_using_database():
+        rows = _db_list_conversations_page(limit + 1, after, username)
+    else:
+        rows = _metadata_index().page(limit + 1, after, username)
+
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(last["created_at"], last["id"])
+
+
+def get_conversation_window(conversation_id: str, limit: int) -> Optional[Dict[str, Any]]:
+    """
+    Load a conversation with only its most recent messages.
+
+    The window is widened by one message if it would otherwise start with an
+    assistant reply, so every turn is shown with its question.
+
+    Returns:
+        Conversation dict whose `messages` are positions `message_offset` onwards,
+        with `message_count` the total number of messages; None if not found
+    """
+    if is_using_sqlite():
+        conv = _sqlite().get_conversation_window(conversation_id, limit)
+    elif is_using_database():
+        conv = _db_get_conversation_window(conversation_id, limit)
+    else:
+        conv = _json_get_conversation_window(conversation_id, limit)
+    if conv is None:
+        return None
+
+    offset = conv["message_offset"]
+    if offset > 0 and conv["messages"] and conv["messages"][0].get("role") != "user":
+        page = get_messages(conversation_id, offset - 1, 1)
+        if page is not None:
+            conv["messages"] = page[0] + conv["messages"]
+            conv["message_offset"] = offset - 1
+    return _normalize_conversation(conv)
+
+
+def get_messages(
+    conversation_id: str, offset: int = 0, limit: Optional[int] = None
+) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+    """
+    Read a window of a conversation's messages.
+
+    Args:
+        conversation_id: Conversation identifier
+        offset: Position of the first message to return
+        limit: Maximum number of messages (None for all remaining)
+
+    Returns:
+        (messages, total message count), or None if the conversation does not exist
+    """
+    if is_using_sqlite():
+        return _sqlite().get_messages(conversation_id, offset, limit)
+    if is_using_database():
+        return _db_get_messages(conversation_id, offset, limit)
+    return _json_get_messages(conversation_id, offset, limit)
+
+
+def count_messages(conversation_id: str) -> Optional[int]:
+    """
+    Number of messages in a conversation without loading them.
+
+    Returns:
+        Message count, or None if the conversation does not exist
+    """
+    if is_using_sqlite():
+        return _sqlite().count_messages(conversation_id)
+    if is_using_database():
+        return _db_count_messages(conversation_id)
+    return _json_count_messages(conversation_id)
+
+
+def rebuild_metadata_index() -> int:
+    """Rebuild the JSON storage metadata index from the conversation files."""
+    return _metadata_index().rebuild()
+
+
+def verify_metadata_index(repair: bool = False) -> Dict[str, List[str]]:
+    """Compare the JSON storage metadata index with the files on disk (optionally repairing it)."""
+    return _metadata_index().verify(repair=repair)
+
+
+def add_user_message(conversation_id: str, content: str, attachments: Optional[List[Dict[str, Any]]] = None):
     """
     Add a user message to a conversation.
 
     Args:
         conversation_id: Conversation identifier
         content: User message content
+        attachments: Optional attachment references ({"id", "filename", "file_type"})
     """
-    conversation = get_conversation(conversation_id)
-    if conversation is None:
-        raise ValueError(f"未找到对话 {conversation_id}")
+    _append_message(conversation_id, _user_message(content, attachments))
+
 
-    conversation["messages"].append({
+def _user_message(content: str, attachments: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    message = {
         "role": "user",
         "content": content
-    })
+    }
+    if attachments:
+        message["attachments"] = attachments
+    return message
+
+
+def _append_message(conversation_id: str, message: Dict[str, Any]):
+    """Append a message (a JSON log record or a single row insert; the conversation is never rewritten)."""
+    if is_using_sqlite():
+        _sqlite().append_message(conversation_id, message)
+        stamps = None
+    elif is_using_database():
+        _db_append_message(conversation_id, message)
+        stamps = None
+    else:
+        stamps = _json_append_records(conversation_id, [{"op": "message", "data": message}], add_messages=1)
+        if stamps is None:
+            get_conversation_cache().invalidate(conversation_id)
+            return
+    cache_appended_message(conversation_id, message, stamps)
+
 
-    save_conversation(conversation)
+def cache_appended_message(conversation_id: str, message: Dict[str, Any], stamps: Optional[Tuple[Any, Any]] = None):
+    """
+    Apply an appended message to the cached conversation.
+
+    `stamps` are the file stamps around a JSON append; database stamps are
+    derived from the entry's own (`message_count` + 1).
+    """
+    # Cache what a reload would return, not the caller's (mutable) objects
+    message = json.loads(json.dumps(message))
+    if stamps is None:
+        get_conversation_cache().append_message(conversation_id, message, lambda s: (s[0] + 1, s[1]))
+    else:
+        get_conversation_cache().append_message(conversation_id, message, stamps[1], expect=stamps[0])
+
+
+def cache_title(conversation_id: str, title: str, stamps: Optional[Tuple[Any, Any]] = None):
+    """Apply a title change to the cached conversation (see `cache_appended_message`)."""
+    if stamps is None:
+        get_conversation_cache().set_title(conversation_id, title, lambda s: (s[0], title))
+    else:
+        get_conversation_cache().set_title(conversation_id, title, stamps[1], expect=stamps[0])
 
 
 def add_assistant_message(
@@ -513,10 +1116,16 @@ def add_assistant_message(
         stage3: Final synthesized response (optional)
         metadata: Optional metadata including label_to_model and aggregate_rankings
     """
-    conversation = get_conversation(conversation_id)
-    if conversation is None:
-        raise ValueError(f"未找到对话 {conversation_id}")
+    _append_message(conversation_id, _assistant_message(stage1, stage2, stage3, metadata))
+
 
+def _assistant_message(
+    stage1: List[Dict[str, Any]],
+    stage2: Optional[List[Dict[str, Any]]] = None,
+    stage3: Optional[Dict[str, Any]] = None,
+    metadata: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Build an assistant message, omitting stages that were not run."""
     message = {
         "role": "assistant",
         "stage1": stage1,
@@ -530,9 +1139,7 @@ def add_assistant_message(
     if metadata:
         message["metadata"] = metadata
 
-    conversation["messages"].append(message)
-
-    save_conversation(conversation)
+    return message
 
 
 def update_conversation_title(conversation_id: str, title: str):
@@ -543,12 +1150,18 @@ def update_conversation_title(conversation_id: str, title: str):
         conversation_id: Conversation identifier
         title: New title for the conversation
     """
-    conversation = get_conversation(conversation_id)
-    if conversation is None:
-        raise ValueError(f"未找到对话 {conversation_id}")
-
-    conversation["title"] = title
-    save_conversation(conversation)
+    if is_using_sqlite():
+        _sqlite().update_title(conversation_id, title)
+        stamps = None
+    elif is_using_database():
+        _db_update_title(conversation_id, title)
+        stamps = None
+    else:
+        stamps = _json_append_records(conversation_id, [{"op": "title", "data": title}], title=title)
+        if stamps is None:
+            get_conversation_cache().invalidate(conversation_id)
+            return
+    cache_title(conversation_id, title, stamps)
 
 
 def delete_conversation(conversation_id: str) -> bool:
@@ -561,19 +1174,22 @@ def delete_conversation(conversation_id: str) -> bool:
     Returns:
         True if deleted, False if not found
     """
-    if is_using_database():
-        return _db_delete_conversation(conversation_id)
-
-    path = get_conversation_path(conversation_id)
-    if os.path.exists(path):
-        os.remove(path)
-        return True
-    return False
+    if is_using_sqlite():
+        deleted = _sqlite().delete_conversation(conversation_id)
+    elif is_using_database():
+        deleted = _db_delete_conversation(conversation_id)
+    else:
+        deleted = _json_delete_conversation(conversation_id)
+    get_conversation_cache().invalidate(conversation_id)
+    return deleted
 
 
 def delete_all_conversations():
     """Delete all conversations."""
-    if is_using_database():
+    if is_using_sqlite():
+        _sqlite().delete_all_conversations()
+    elif is_using_database():
         _db_delete_all_conversations()
     else:
         _json_delete_all_conversations()
+    get_conversation_cache().clear()
@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _fresh_conversation_cache():
+    """Tests reuse conversation ids across temporary stores; start each one with an empty cache."""
+    from ..conversation_cache import get_conversation_cache
+
+    get_conversation_cache().clear(notify=False)
+    yield
+    get_conversation_cache().clear(notify=False)
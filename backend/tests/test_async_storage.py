@@ -0,0 +1,186 @@
+"""Tests for the async storage API and the event-loop lag monitor."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    from .. import storage as storage_module
+
+    monkeypatch.setattr(storage_module, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(storage_module, "is_using_database", lambda: False)
+    return storage_module
+
+
+@pytest.mark.asyncio
+async def test_json_round_trip(storage):
+    from .. import async_storage
+
+    cid = "00000000-0000-0000-0000-000000000001"
+    await async_storage.create_conversation(cid, username="u", execution_mode="chat_only")
+    await async_storage.add_user_message(cid, "hello")
+    await async_storage.add_assistant_message(cid, stage1=[{"model": "m", "response": "hi"}])
+    await async_storage.update_conversation_title(cid, "Greeting")
+
+    conversation = await async_storage.get_conversation(cid)
+    assert conversation["title"] == "Greeting"
+    assert conversation["execution_mode"] == "chat_only"
+    assert [m["role"] for m in conversation["messages"]] == ["user", "assistant"]
+    assert [c["id"] for c in await async_storage.list_conversations()] == [cid]
+
+    assert await async_storage.delete_conversation(cid)
+    assert await async_storage.get_conversation(cid) is None
+    assert async_storage.stats()["mode"] == "thread_pool"
+
+
+@pytest.mark.asyncio
+async def test_slow_storage_does_not_block_the_loop(storage, monkeypatch):
+    from .. import async_storage
+
+    def slow_get(conversation_id):
+        time.sleep(0.2)
+        return None
+
+    monkeypatch.setattr(storage, "get_conversation", slow_get)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    result, _ = await asyncio.gather(async_storage.get_conversation("x"), ticker())
+    assert result is None
+    assert ticks == 10
+
+
+@pytest.mark.asyncio
+async def test_writes_to_one_conversation_keep_their_order(storage, monkeypatch):
+    from .. import async_storage
+
+    written = []
+
+    def add_user_message(conversation_id, content, attachments=None):
+        # Earlier writes are slower: without the per-conversation lock they would finish last
+        time.sleep(0.05 - 0.01 * int(content))
+        written.append(content)
+
+    monkeypatch.setattr(storage, "add_user_message", add_user_message)
+    await asyncio.gather(*(async_storage.add_user_message("c", str(i)) for i in range(5)))
+    assert written == ["0", "1", "2", "3", "4"]
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_monitor_sees_blocking_calls():
+    from ..loop_monitor import LoopLagMonitor
+
+    monitor = LoopLagMonitor(interval_ms=5)
+    monitor.start()
+    await asyncio.sleep(0.02)
+    time.sleep(0.1)
+    await asyncio.sleep(0.02)
+    await monitor.stop()
+
+    stats = monitor.stats()
+    assert stats["samples"] >= 2
+    assert stats["max_ms"] >= 80
+
+
+@pytest_asyncio.fixture
+async def async_db(tmp_path, monkeypatch):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from .. import async_storage, database, storage as storage_module
+    from .. import models  # noqa: F401
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'council.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(database.Base.metadata.create_all)
+    monkeypatch.setattr(storage_module, "is_using_database", lambda: True)
+    monkeypatch.setattr(database, "get_async_session_factory", lambda: async_sessionmaker(engine, expire_on_commit=False))
+
+    def no_thread_pool(name, *args, **kwargs):
+        raise AssertionError(f"{name} went through the thread pool")
+
+    monkeypatch.setattr(async_storage, "_run", no_thread_pool)
+    yield async_storage
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_async_engine_round_trip(async_db):
+    cid = "00000000-0000-0000-0000-000000000001"
+    await async_db.create_conversation(cid, models=["a/b"], username="u", execution_mode="chat_only")
+    await async_db.add_user_message(cid, "hello")
+    await async_db.add_assistant_message(cid, stage1=[{"model": "a/b", "response": "hi"}])
+    await async_db.update_conversation_title(cid, "Greeting")
+
+    conversation = await async_db.get_conversation(cid)
+    assert conversation["title"] == "Greeting"
+    assert conversation["execution_mode"] == "chat_only"
+    assert [m["role"] for m in conversation["messages"]] == ["user", "assistant"]
+    assert [(c["id"], c["message_count"]) for c in await async_db.list_conversations()] == [(cid, 2)]
+
+    conversation["messages"] = conversation["messages"][:1]
+    await async_db.save_conversation(conversation)
+    await async_db.add_user_message(cid, "next")
+    assert [m["content"] for m in (await async_db.get_conversation(cid))["messages"]] == ["hello", "next"]
+
+    assert await async_db.delete_conversation(cid)
+    assert await async_db.get_conversation(cid) is None
+    with pytest.raises(ValueError):
+        await async_db.add_user_message(cid, "gone")
+
+
+@pytest.mark.asyncio
+async def test_async_engine_pages_and_windows(async_db):
+    ids = [f"00000000-0000-0000-0000-{n:012d}" for n in range(5)]
+    for cid in ids:
+        await async_db.create_conversation(cid)
+    for n in range(4):
+        await async_db.add_user_message(ids[0], f"q{n}")
+        await async_db.add_assistant_message(ids[0], stage1=[], stage3={"response": f"a{n}"})
+
+    seen, cursor = [], None
+    for _ in range(10):
+        rows, cursor = await async_db.list_conversations_page(2, cursor=cursor)
+        seen += [c["id"] for c in rows]
+        if cursor is None:
+            break
+    assert seen == [c["id"] for c in await async_db.list_conversations()]
+    assert sorted(seen) == ids
+
+    window = await async_db.get_conversation_window(ids[0], 3)
+    assert (window["message_offset"], window["message_count"]) == (4, 8)
+    assert window["messages"][0]["content"] == "q2"
+    messages, total = await async_db.get_messages(ids[0], offset=1, limit=2)
+    assert ([m["role"] for m in messages], total) == (["assistant", "user"], 8)
+    assert await async_db.count_messages(ids[0]) == 8
+    assert await async_db.get_messages("missing") is None
+
+    await async_db.delete_all_conversations()
+    assert await async_db.list_conversations() == []
+
+
+@pytest.mark.asyncio
+async def test_async_engine_serves_reads_from_the_write_through_cache(async_db, monkeypatch):
+    cid = "00000000-0000-0000-0000-000000000001"
+    await async_db.create_conversation(cid)
+    assert await async_db.get_conversation(cid) is not None
+
+    async def no_reload(sessions, conversation_id):
+        raise AssertionError("conversation reloaded although it was cached")
+
+    monkeypatch.setattr(async_db, "_adb_get_conversation", no_reload)
+    await async_db.add_user_message(cid, "hello")
+    await async_db.update_conversation_title(cid, "Greeting")
+    conversation = await async_db.get_conversation(cid)
+    assert (conversation["title"], [m["content"] for m in conversation["messages"]]) == ("Greeting", ["hello"])
+    assert async_db.stats()["conversation_cache"]["hits"] == 1
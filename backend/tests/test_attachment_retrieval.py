@@ -0,0 +1,66 @@
+"""Tests for query-aware selection of attachment text."""
+
+from __future__ import annotations
+
+import pytest
+
+from .. import attachment_retrieval, tokenizer_registry
+from ..attachment_store import AttachmentStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(attachment_retrieval, "_indexes", attachment_retrieval.OrderedDict())
+    return AttachmentStore(str(tmp_path / "attachments"))
+
+
+def _document(sections: int, needle_at: int) -> str:
+    filler = "The committee reviewed routine operational matters and approved the minutes. " * 12
+    paragraphs = [f"Section {n}. {filler}" for n in range(sections)]
+    paragraphs[needle_at] = f"Section {needle_at}. The zanzibar pipeline failed because the gasket overheated."
+    return "\n\n".join(paragraphs)
+
+
+def test_chunks_follow_paragraphs_and_stay_bounded():
+    text = "\n\n".join(["short paragraph"] * 5 + ["word " * 300])
+    chunks = attachment_retrieval.chunk_text(text, chunk_chars=200)
+    assert chunks[0].count("short paragraph") == 5
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert "".join(chunks).replace("\n", "").replace(" ", "") == text.replace("\n", "").replace(" ", "")
+
+
+def test_cjk_text_is_indexed_as_bigrams():
+    assert attachment_retrieval.terms("Gasket 过热导致 failure") == ["gasket", "过热", "热导", "导致", "failure"]
+
+
+def test_small_attachments_are_kept_whole(store):
+    texts = ["first file", "second file"]
+    assert attachment_retrieval.select_context(store, "anything", texts, budget=1000) == texts
+
+
+def test_relevant_chunks_fit_the_budget_in_document_order(store):
+    text = _document(sections=60, needle_at=57)
+    budget = 1000
+
+    [selected] = attachment_retrieval.select_context(store, "Why did the zanzibar pipeline fail?", [text], budget)
+
+    assert "zanzibar pipeline failed" in selected
+    assert selected.startswith("[Excerpts:")
+    body = selected.split("\n\n", 1)[1]
+    assert tokenizer_registry.count_tokens(body) <= budget + 50  # chunk separators and gap markers
+    numbers = [int(part.split(".")[0]) for part in body.split("Section ")[1:]]
+    assert numbers == sorted(numbers) and 57 in numbers
+
+
+def test_index_is_built_once_and_shared_through_the_store(store, monkeypatch):
+    builds = []
+    build = attachment_retrieval.build_index
+    monkeypatch.setattr(attachment_retrieval, "build_index", lambda text: builds.append(1) or build(text))
+    text = _document(sections=40, needle_at=3)
+
+    first = attachment_retrieval.select_context(store, "zanzibar", [text], budget=500)
+    attachment_retrieval._indexes.clear()  # another worker: nothing in memory
+    second = attachment_retrieval.select_context(store, "zanzibar", [text], budget=500)
+
+    assert first == second
+    assert builds == [1]
@@ -0,0 +1,85 @@
+"""Tests for the content-addressed attachment store and the upload / send paths using it."""
+
+from __future__ import annotations
+
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from .. import attachment_store
+from ..attachment_store import AttachmentStore, attachment_id
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256))
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = AttachmentStore(str(tmp_path / "attachments"))
+    monkeypatch.setattr(attachment_store, "_store", store)
+    return store
+
+
+def test_same_content_is_parsed_and_stored_once(store, monkeypatch):
+    parses = []
+    parse = attachment_store.parse_file
+    monkeypatch.setattr(attachment_store, "parse_file", lambda name, data: parses.append(name) or parse(name, data))
+
+    meta, created = store.put("notes.txt", b"hello council")
+    again, created_again = store.put("copy-of-notes.txt", b"hello council")
+
+    assert (created, created_again) == (True, False)
+    assert parses == ["notes.txt"]
+    assert meta == again and meta["id"] == attachment_id(b"hello council")
+    assert store.load_content(meta["id"]) == (meta, "hello council")
+
+
+def test_text_is_stored_whole_and_truncated_for_prompts(store):
+    text = "x" * (attachment_store.MAX_TEXT_CHARS + 10)
+    meta, _ = store.put("long.md", text.encode())
+    assert store.read_text(meta["id"]) == text
+    content = store.load_content(meta["id"])[1]
+    assert content.endswith(attachment_store.TRUNCATION_NOTICE)
+    assert meta["char_count"] == len(content)
+
+
+def test_images_are_kept_as_bytes_and_served_as_data_uris(store):
+    meta, _ = store.put("chart.png", PNG)
+    assert (meta["file_type"], meta["mime_type"], meta["byte_size"]) == ("image", "image/png", len(PNG))
+    assert store.read_image(meta["id"]) == PNG
+    assert store.load_content(meta["id"])[1].startswith("data:image/png;base64,")
+    assert store.get("0" * 64) is None
+    with pytest.raises(ValueError):
+        store.get("../../etc/passwd")
+
+
+@pytest.mark.asyncio
+async def test_upload_returns_an_id_and_messages_resolve_it(store):
+    from ..main import FileAttachment, attachment_refs, get_attachment, resolve_attachments, upload_file
+
+    uploaded = await upload_file(UploadFile(io.BytesIO(b"quarterly numbers"), filename="report.txt"), current_user="u")
+    assert "content" not in uploaded
+    assert (await get_attachment(uploaded["id"], current_user="u"))["file_type"] == "txt"
+
+    attachments = [FileAttachment(filename="report.txt", file_type="txt", id=uploaded["id"])]
+    resolved = await resolve_attachments(attachments)
+    assert resolved[0].content == "quarterly numbers"
+    assert attachment_refs(attachments) == [{"id": uploaded["id"], "filename": "report.txt", "file_type": "txt"}]
+
+    with pytest.raises(HTTPException) as missing:
+        await resolve_attachments([FileAttachment(filename="gone.txt", file_type="txt", id="f" * 64)])
+    assert missing.value.status_code == 400
+    with pytest.raises(HTTPException) as unknown:
+        await get_attachment("f" * 64, current_user="u")
+    assert unknown.value.status_code == 404
+
+
+def test_attachment_needs_an_id_or_content():
+    from pydantic import ValidationError
+    from ..main import FileAttachment
+
+    assert FileAttachment(filename="a.txt", file_type="txt", content="inline").content == "inline"
+    with pytest.raises(ValidationError):
+        FileAttachment(filename="a.txt", file_type="txt")
+    with pytest.raises(ValidationError):
+        FileAttachment(filename="a.txt", file_type="txt", id="not-a-sha256")
@@ -0,0 +1,133 @@
+"""Tests for the write-through conversation cache."""
+
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from ..conversation_cache import ConversationCache, get_conversation_cache
+
+CID = "00000000-0000-0000-0000-000000000001"
+
+
+@pytest.fixture(params=["json", "sqlite", "database"])
+def storage(request, tmp_path, monkeypatch):
+    from .. import storage as storage_module
+
+    monkeypatch.setattr(storage_module, "DATA_DIR", str(tmp_path / "conversations"))
+    monkeypatch.setattr(storage_module, "is_using_database", lambda: False)
+    monkeypatch.setattr(storage_module, "is_using_sqlite", lambda: False)
+    engine = None
+    if request.param == "sqlite":
+        monkeypatch.setattr(storage_module, "SQLITE_PATH", str(tmp_path / "council.sqlite3"))
+        monkeypatch.setattr(storage_module, "is_using_sqlite", lambda: True)
+    elif request.param == "database":
+        from ..database import Base
+        from .. import models  # noqa: F401
+
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine)
+        monkeypatch.setattr(storage_module, "SessionLocal", sessionmaker(bind=engine, autoflush=False))
+        monkeypatch.setattr(storage_module, "is_using_database", lambda: True)
+    yield storage_module
+    if request.param == "sqlite":
+        storage_module._sqlite().close()
+    if engine is not None:
+        engine.dispose()
+
+
+@pytest.fixture
+def loads(storage, monkeypatch):
+    """Conversation ids actually loaded from the backend (cache misses)."""
+    seen = []
+    load = storage._load_conversation
+    monkeypatch.setattr(storage, "_load_conversation", lambda cid: seen.append(cid) or load(cid))
+    return seen
+
+
+def _write_elsewhere(storage, message):
+    """Append the way another worker would: straight to the backend, bypassing this process's cache."""
+    if storage.is_using_sqlite():
+        storage._sqlite().append_message(CID, message)
+    elif storage.is_using_database():
+        storage._db_append_message(CID, message)
+    else:
+        storage._json_append_records(CID, [{"op": "message", "data": message}], add_messages=1)
+
+
+def test_streaming_turn_reads_the_conversation_once(storage, loads):
+    storage.create_conversation(CID)
+    history = storage.get_conversation(CID)["messages"]
+
+    storage.add_user_message(CID, "hello")
+    storage.update_conversation_title(CID, "Greeting")
+    storage.add_assistant_message(CID, stage1=[], stage3={"response": "hi"})
+    conversation = storage.get_conversation(CID)
+
+    assert loads == [CID]
+    assert history == []
+    assert conversation["title"] == "Greeting"
+    assert [m["role"] for m in conversation["messages"]] == ["user", "assistant"]
+    assert get_conversation_cache().version(CID) == 3
+
+
+def test_write_by_another_worker_is_reloaded(storage, loads):
+    storage.create_conversation(CID)
+    storage.add_user_message(CID, "mine")
+    assert storage.get_conversation(CID) is not None
+
+    _write_elsewhere(storage, {"role": "user", "content": "theirs"})
+    # A local write after the foreign one must not patch the stale copy either
+    storage.add_user_message(CID, "mine again")
+
+    assert [m["content"] for m in storage.get_conversation(CID)["messages"]] == ["mine", "theirs", "mine again"]
+    assert loads == [CID, CID]
+
+
+def test_delete_invalidates_and_notifies(storage):
+    notified = []
+    cache = get_conversation_cache()
+    cache.add_invalidation_listener(notified.append)
+    try:
+        storage.create_conversation(CID)
+        storage.get_conversation(CID)
+        assert CID in cache
+
+        assert storage.delete_conversation(CID)
+        assert CID not in cache
+        assert storage.get_conversation(CID) is None
+        assert notified[-1] == CID
+    finally:
+        cache.remove_invalidation_listener(notified.append)
+
+
+def test_lru_is_bounded_by_entries_and_size():
+    cache = ConversationCache(max_entries=2, max_bytes=10_000)
+    for n in range(3):
+        cache.put(str(n), {"id": str(n), "messages": []}, stamp=n)
+    assert "0" not in cache and "1" in cache and "2" in cache
+
+    cache.get("1", stamp=1)
+    cache.put("3", {"id": "3", "messages": []}, stamp=3)
+    assert "1" in cache and "2" not in cache
+    assert cache.stats()["evictions"] == 2
+
+    cache.append_message("1", {"role": "user", "content": "x" * 20_000}, stamp=lambda s: s + 1)
+    assert "1" not in cache
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_stamp_mismatch_misses_and_remote_invalidation_does_not_echo():
+    cache = ConversationCache(max_entries=4, max_bytes=10_000)
+    notified = []
+    cache.add_invalidation_listener(notified.append)
+
+    cache.put("a", {"id": "a", "messages": []}, stamp=(0, "t"))
+    assert cache.get("a", stamp=(1, "t")) is None
+    assert "a" not in cache
+
+    cache.put("a", {"id": "a", "messages": []}, stamp=(0, "t"))
+    cache.invalidate("a", notify=False)
+    assert "a" not in cache and notified == []
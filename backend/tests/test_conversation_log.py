@@ -0,0 +1,125 @@
+"""Tests for the append-only JSONL conversation log."""
+
+from __future__ import annotations
+
+import json
+import os
+
+import pytest
+
+
+def _cid(n: int) -> str:
+    return f"00000000-0000-0000-0000-{n:012d}"
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    from .. import storage as storage_module
+
+    monkeypatch.setattr(storage_module, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(storage_module, "is_using_database", lambda: False)
+    monkeypatch.setattr(storage_module, "CONVERSATION_FORMAT", "jsonl")
+    storage_module._log_pending.clear()
+    return storage_module
+
+
+def _lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_messages_are_appended_not_rewritten(storage, tmp_path):
+    storage.create_conversation(_cid(1), username="u")
+    storage.add_user_message(_cid(1), "hello")
+    storage.add_assistant_message(_cid(1), stage1=[{"model": "m", "response": "hi"}])
+    storage.update_conversation_title(_cid(1), "Greeting")
+
+    path = os.path.join(tmp_path, f"{_cid(1)}.jsonl")
+    assert [r["op"] for r in _lines(path)] == ["snapshot", "message", "message", "title"]
+
+    conversation = storage.get_conversation(_cid(1))
+    assert conversation["title"] == "Greeting"
+    assert [m["role"] for m in conversation["messages"]] == ["user", "assistant"]
+
+    listed = storage.list_conversations()
+    assert listed[0]["message_count"] == 2
+    assert listed[0]["title"] == "Greeting"
+
+
+def test_log_is_compacted(storage, tmp_path, monkeypatch):
+    from .. import conversation_log
+
+    monkeypatch.setattr(conversation_log, "COMPACT_EVERY", 3)
+    storage.create_conversation(_cid(1))
+    for n in range(4):
+        storage.add_user_message(_cid(1), f"m{n}")
+
+    path = os.path.join(tmp_path, f"{_cid(1)}.jsonl")
+    assert [r["op"] for r in _lines(path)] == ["snapshot", "message"]
+    assert [m["content"] for m in storage.get_conversation(_cid(1))["messages"]] == ["m0", "m1", "m2", "m3"]
+
+
+def test_torn_final_line_is_ignored(storage, tmp_path):
+    storage.create_conversation(_cid(1))
+    storage.add_user_message(_cid(1), "kept")
+    path = os.path.join(tmp_path, f"{_cid(1)}.jsonl")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op":"message","data":{"role":"user","con')
+
+    assert [m["content"] for m in storage.get_conversation(_cid(1))["messages"]] == ["kept"]
+
+
+def test_append_after_torn_line_discards_it(storage, tmp_path):
+    storage.create_conversation(_cid(1))
+    storage.add_user_message(_cid(1), "kept")
+    path = os.path.join(tmp_path, f"{_cid(1)}.jsonl")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op":"message","data":{"role":"user","con')
+
+    storage.add_user_message(_cid(1), "after crash")
+    assert [m["content"] for m in storage.get_conversation(_cid(1))["messages"]] == ["kept", "after crash"]
+    assert [r["op"] for r in _lines(path)] == ["snapshot", "message", "message"]
+
+
+def test_append_racing_delete_does_not_recreate_log(storage, tmp_path, monkeypatch):
+    storage.create_conversation(_cid(1))
+    path = os.path.join(tmp_path, f"{_cid(1)}.jsonl")
+    lookup = storage._existing_conversation_path
+
+    def delete_after_lookup(conversation_id):
+        found = lookup(conversation_id)
+        storage.delete_conversation(conversation_id)
+        return found
+
+    monkeypatch.setattr(storage, "_existing_conversation_path", delete_after_lookup)
+    with pytest.raises(ValueError):
+        storage.add_user_message(_cid(1), "late")
+    assert not os.path.exists(path)
+
+
+def test_legacy_json_is_read_and_converted_on_write(storage, tmp_path):
+    json_path = os.path.join(tmp_path, f"{_cid(1)}.json")
+    with open(json_path, "w") as f:
+        json.dump({"id": _cid(1), "created_at": "2026-01-01", "title": "old", "messages": []}, f)
+
+    assert storage.get_conversation(_cid(1))["title"] == "old"
+    storage.add_user_message(_cid(1), "hello")
+
+    assert not os.path.exists(json_path)
+    assert storage.get_conversation(_cid(1))["messages"] == [{"role": "user", "content": "hello"}]
+    assert storage.delete_conversation(_cid(1))
+    assert not any(name.startswith(_cid(1)) for name in os.listdir(tmp_path))
+
+
+def test_migrate_directory(tmp_path):
+    from ..conversation_log import migrate_directory, replay
+
+    conversation = {"id": _cid(1), "created_at": "2026-01-01", "title": "t", "messages": [{"role": "user"}]}
+    with open(tmp_path / f"{_cid(1)}.json", "w") as f:
+        json.dump(conversation, f)
+
+    assert migrate_directory(str(tmp_path)) == 1
+    assert not (tmp_path / f"{_cid(1)}.json").exists()
+    with open(tmp_path / f"{_cid(1)}.jsonl", encoding="utf-8") as f:
+        assert replay(f) == (conversation, 0)
+    assert migrate_directory(str(tmp_path)) == 0
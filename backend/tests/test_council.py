@@ -57,12 +57,27 @@ class TestMultimodalCouncil:
 
         messages = build_multimodal_messages(text_query, images, conversation_history=history)
 
-        assert len(messages) == 1
-        # The content should include context from history in the text part
-        content = messages[0]["content"]
+        # History comes first as chat turns, so it forms a stable (cacheable) prefix
+        assert messages[:2] == [
+            {"role": "user", "content": "What is Python?"},
+            {"role": "assistant", "content": "Python is a programming language."},
+        ]
+        content = messages[2]["content"]
         assert isinstance(content, list)
-        text_part = content[0]["text"]
-        assert "Previous conversation" in text_part or "Python" in text_part
+        assert content[0]["text"] == text_query
+
+    def test_turn_context_follows_history_in_fixed_order(self):
+        """Per-turn context sits in the final user message, after the history."""
+        from ..council import build_multimodal_messages
+
+        history = [{"role": "user", "content": "Earlier"}]
+        messages = build_multimodal_messages(
+            "Now?", conversation_history=history, context=["Relevant past exchanges:\nm", "Search Results:\nt"]
+        )
+
+        assert [m["role"] for m in messages] == ["user", "user"]
+        assert messages[-1]["content"] == "Relevant past exchanges:\nm\n\nSearch Results:\nt\n\nNow?"
+        assert all(m["role"] != "system" for m in messages)
 
     def test_build_context_prompt_multiple_images(self):
         """Test building context with multiple images."""
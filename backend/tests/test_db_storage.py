@@ -0,0 +1,129 @@
+"""Tests for SQLAlchemy database storage with the normalised messages table.
+
+Runs against in-memory SQLite through SQLAlchemy; the queries are the same ones
+issued to PostgreSQL/MySQL.
+"""
+
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+def _cid(n: int) -> str:
+    return f"00000000-0000-0000-0000-{n:012d}"
+
+
+@pytest.fixture
+def db(monkeypatch):
+    from .. import storage
+    from ..database import Base
+    from .. import models  # noqa: F401
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(storage, "SessionLocal", sessionmaker(bind=engine, autoflush=False))
+    monkeypatch.setattr(storage, "is_using_database", lambda: True)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+    yield storage, engine, statements
+    engine.dispose()
+
+
+def test_round_trip(db):
+    storage, _, _ = db
+    storage.create_conversation(_cid(1), models=["a/b"], username="u", execution_mode="chat_ranking")
+    storage.add_user_message(_cid(1), "hello")
+    storage.add_assistant_message(_cid(1), stage1=[{"model": "a/b", "response": "hi"}], stage2=[])
+    storage.update_conversation_title(_cid(1), "Greeting")
+
+    conversation = storage.get_conversation(_cid(1))
+    assert conversation["title"] == "Greeting"
+    assert conversation["execution_mode"] == "chat_ranking"
+    assert conversation["messages"] == [
+        {"role": "user", "content": "hello"},
+        {"role": "assistant", "stage1": [{"model": "a/b", "response": "hi"}], "stage2": []},
+    ]
+    listed = storage.list_conversations()
+    assert [(c["id"], c["title"], c["message_count"]) for c in listed] == [(_cid(1), "Greeting", 2)]
+
+
+def test_append_is_an_insert_and_list_reads_the_counter(db):
+    storage, _, statements = db
+    storage.create_conversation(_cid(1))
+    storage.add_user_message(_cid(1), "first")
+
+    statements.clear()
+    storage.add_user_message(_cid(1), "second")
+    writes = [s for s in statements if not s.startswith("SELECT")]
+    assert len(writes) == 2
+    assert writes[0].startswith("UPDATE conversations") and "message_count" in writes[0]
+    assert writes[1].startswith("INSERT INTO messages")
+    assert not any("payload" in s for s in statements if s.startswith("SELECT"))
+
+    statements.clear()
+    assert storage.list_conversations()[0]["message_count"] == 2
+    assert not any("messages" in s for s in statements)
+
+
+def test_paginated_message_reads(db):
+    storage, _, _ = db
+    storage.create_conversation(_cid(1))
+    for n in range(5):
+        storage.add_user_message(_cid(1), f"m{n}")
+
+    page, total = storage._db_get_messages(_cid(1), offset=2, limit=2)
+    assert [m["content"] for m in page] == ["m2", "m3"]
+    assert total == 5
+
+
+def test_save_replaces_messages_and_delete_removes_them(db):
+    storage, engine, _ = db
+    storage.create_conversation(_cid(1))
+    for n in range(3):
+        storage.add_user_message(_cid(1), f"m{n}")
+
+    conversation = storage.get_conversation(_cid(1))
+    conversation["messages"] = conversation["messages"][:1]
+    storage.save_conversation(conversation)
+    storage.add_user_message(_cid(1), "next")
+    assert [m["content"] for m in storage.get_conversation(_cid(1))["messages"]] == ["m0", "next"]
+
+    assert storage.delete_conversation(_cid(1))
+    assert not storage.delete_conversation(_cid(1))
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM messages")).scalar() == 0
+
+    with pytest.raises(ValueError):
+        storage.add_user_message(_cid(1), "gone")
+
+
+def _legacy_engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE conversations (id VARCHAR(36) PRIMARY KEY, messages JSON NOT NULL)"))
+    return engine
+
+
+def test_init_database_migrates_legacy_schema(monkeypatch):
+    from .. import database
+
+    monkeypatch.setattr(database, "engine", _legacy_engine())
+    upgrades = []
+    monkeypatch.setattr(database, "upgrade_schema", lambda: upgrades.append(True))
+    monkeypatch.setattr(database.Base.metadata, "create_all", lambda bind: None)
+
+    database.init_database()
+    assert upgrades == [True]
+
+
+def test_upgrade_schema_without_alembic_explains_the_manual_step(monkeypatch):
+    import sys
+    from .. import database
+
+    monkeypatch.setitem(sys.modules, "alembic", None)
+    with pytest.raises(RuntimeError, match="alembic"):
+        database.upgrade_schema()
@@ -0,0 +1,108 @@
+"""Tests for off-loop PDF conversion (pymupdf is replaced by a fake page converter)."""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from .. import attachment_store, document_parser
+from ..attachment_store import AttachmentStore
+
+# A "PDF" for the fake converter: pages separated by form feeds
+PDF = b"%PDF-1.7\n" + b"\f".join(f"page {n}".encode() for n in range(1, 21))
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = AttachmentStore(str(tmp_path / "attachments"))
+    monkeypatch.setattr(attachment_store, "_store", store)
+    return store
+
+
+@pytest.fixture
+def converted(monkeypatch):
+    """Pages converted by the fake converter, one list per batch."""
+    batches = []
+
+    def convert(path, pages):
+        batches.append(list(pages))
+        with open(path, "rb") as f:
+            texts = f.read().decode().split("\f")
+        return [f"# {texts[page]}" for page in pages]
+
+    def count(path):
+        with open(path, "rb") as f:
+            return f.read().count(b"\f") + 1
+
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(document_parser, "_convert_pages", convert)
+    monkeypatch.setattr(document_parser, "_page_count", count)
+    monkeypatch.setattr(document_parser, "_executor", executor)
+    monkeypatch.setattr(document_parser, "PDF_PAGES_PER_TASK", 4)
+    yield batches
+    executor.shutdown(wait=True)
+
+
+def test_page_ranges_are_one_based_and_clipped():
+    assert document_parser.parse_page_range("1-3, 7", 10) == [0, 1, 2, 6]
+    assert document_parser.parse_page_range("9-40,2", 10) == [1, 8, 9]
+    assert document_parser.parse_page_range(None, 3) == [0, 1, 2]
+    for spec in ("0", "5-2", "a-b", "30"):
+        with pytest.raises(ValueError):
+            document_parser.parse_page_range(spec, 10)
+
+
+@pytest.mark.asyncio
+async def test_only_selected_pages_are_converted_once(store, converted):
+    meta, _ = store.put("paper.pdf", PDF)
+
+    events = [e async for e in document_parser.prepare_pdf(store, meta["id"], "1-10")]
+    assert [(e["done"], e["total"]) for e in events if e["type"] == "progress"][0] == (0, 10)
+    assert events[-2] == {"type": "progress", "done": 10, "total": 10}
+    assert events[-1]["pages"] == list(range(10))
+    assert sorted(p for batch in converted for p in batch) == list(range(10))
+    assert all(len(batch) <= 4 for batch in converted)
+
+    converted.clear()
+    async for _ in document_parser.prepare_pdf(store, meta["id"], "5-12"):
+        pass
+    assert sorted(p for batch in converted for p in batch) == [10, 11]
+    assert store.read_pages(meta["id"], [4, 11]) == "# page 5\n\n# page 12"
+    assert store.get(meta["id"])["page_count"] == 20
+
+
+@pytest.mark.asyncio
+async def test_time_limit_keeps_pages_that_finish_late(store, converted, monkeypatch):
+    convert = document_parser._convert_pages
+    monkeypatch.setattr(document_parser, "_convert_pages", lambda path, pages: time.sleep(0.2) or convert(path, pages))
+    meta, _ = store.put("paper.pdf", PDF)
+
+    with pytest.raises(asyncio.TimeoutError):
+        async for _ in document_parser.prepare_pdf(store, meta["id"], "1-4", timeout=0.05):
+            pass
+    await asyncio.sleep(0.4)
+    assert store.cached_pages(meta["id"]) == {0, 1, 2, 3}
+
+
+@pytest.mark.asyncio
+async def test_upload_converts_the_requested_pages_for_messages(store, converted):
+    from ..main import FileAttachment, attachment_refs, resolve_attachments, upload_file
+
+    uploaded = await upload_file(UploadFile(io.BytesIO(PDF), filename="paper.pdf"), pages="2-3", current_user="u")
+    assert (uploaded["file_type"], uploaded["page_count"], uploaded["pages"]) == ("pdf", 20, "2-3")
+    assert uploaded["char_count"] == len("# page 2\n\n# page 3")
+
+    attachments = [FileAttachment(filename="paper.pdf", file_type="pdf", id=uploaded["id"], pages="2-3")]
+    resolved = await resolve_attachments(attachments)
+    assert resolved[0].content == "# page 2\n\n# page 3"
+    assert attachment_refs(attachments)[0]["pages"] == "2-3"
+    assert sorted(p for batch in converted for p in batch) == [1, 2]
+
+    with pytest.raises(HTTPException) as bad_range:
+        await resolve_attachments([FileAttachment(filename="paper.pdf", file_type="pdf", id=uploaded["id"], pages="99")])
+    assert bad_range.value.status_code == 400
@@ -0,0 +1,95 @@
+"""Tests for the persistent content-hash embedding cache."""
+
+from __future__ import annotations
+
+from ..embedding_cache import CachedEmbeddings, EmbeddingCache, cache_key
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[len(t) / 10, 0.333333] for t in texts]
+
+
+def test_repeats_are_served_from_cache(tmp_path):
+    model = CountingEmbeddings()
+    cache = EmbeddingCache(tmp_path / "cache.sqlite3")
+    embeddings = CachedEmbeddings(model, cache, "model-a")
+
+    first = embeddings.embed_documents(["hello", "world", "hello"])
+    second = embeddings.embed_documents(["world", "hello"])
+
+    assert model.embedded == ["hello", "world"]
+    assert second == [first[1], first[0]]
+    # float16 precision whether or not the vector came from the cache
+    assert first[0][1] == 0.333251953125
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 3
+    assert stats["entries"] == 2
+
+
+def test_cache_persists_and_is_scoped_by_model(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    EmbeddingCache(path).put_many({cache_key("model-a", "x"): b"\x00<\x00<"})
+
+    model = CountingEmbeddings()
+    reopened = EmbeddingCache(path)
+    assert CachedEmbeddings(model, reopened, "model-a").embed_query("x") == [1.0, 1.0]
+    CachedEmbeddings(model, reopened, "model-b").embed_query("x")
+    assert model.embedded == ["x"]
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = EmbeddingCache(tmp_path / "cache.sqlite3", max_bytes=40)
+    embeddings = CachedEmbeddings(CountingEmbeddings(), cache, "m")
+
+    for text in ["a", "b", "c", "d", "e"]:
+        embeddings.embed_query(text)  # 4 bytes each
+    embeddings.embed_query("a")  # touch "a" so it is most recently used
+    for text in ["f", "g", "h", "i", "j", "k"]:
+        embeddings.embed_query(text)
+
+    assert cache.stats()["bytes"] <= 40
+    assert cache.get_many([cache_key("m", "a")])
+    assert not cache.get_many([cache_key("m", "b")])
+
+
+def test_eviction_reads_only_the_oldest_entries(tmp_path):
+    cache = EmbeddingCache(tmp_path / "cache.sqlite3", max_bytes=10_000)
+    cache.put_many({cache_key("m", str(n)): b"\x00<\x00<" for n in range(2000)})
+
+    class CountingConnection:
+        def __init__(self, conn):
+            self.conn = conn
+            self.fetched = 0
+
+        def execute(self, sql, *args):
+            cursor = self.conn.execute(sql, *args)
+            if "ORDER BY last_used" not in sql:
+                return cursor
+            outer = self
+
+            class CountingCursor:
+                def fetchmany(self, size):
+                    rows = cursor.fetchmany(size)
+                    outer.fetched += len(rows)
+                    return rows
+
+                def close(self):
+                    cursor.close()
+
+            return CountingCursor()
+
+        def __getattr__(self, name):
+            return getattr(self.conn, name)
+
+    counting = CountingConnection(cache._conn)
+    cache._conn = counting
+    cache.max_bytes = 7_500  # 8000 bytes stored; evicts down to the target
+    cache.put_many({cache_key("m", "new"): b"\x00<\x00<"})
+
+    assert cache.stats()["bytes"] <= 7_500
+    assert 0 < counting.fetched < 2000
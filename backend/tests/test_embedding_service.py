@@ -0,0 +1,69 @@
+"""Tests for the micro-batched embedding service."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from ..embedding_service import BatchedEmbeddings, EmbeddingService
+
+
+class RecordingEmbeddings:
+    def __init__(self, gate=None):
+        self.batches = []
+        self.gate = gate
+
+    def embed_documents(self, texts):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.batches.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_a_batch():
+    model = RecordingEmbeddings()
+    service = EmbeddingService(model, max_batch_size=64, max_wait_ms=50)
+    try:
+        results = await asyncio.gather(*(service.aembed(["x" * i]) for i in range(1, 9)))
+    finally:
+        service.shutdown()
+
+    assert results == [[[float(i)]] for i in range(1, 9)]
+    assert len(model.batches) == 1
+    stats = service.stats()
+    assert stats["requests"] == 8
+    assert stats["max_batch_size"] == 8
+
+
+def test_batches_are_bounded_by_size():
+    gate = threading.Event()
+    model = RecordingEmbeddings(gate)
+    service = EmbeddingService(model, max_batch_size=3, max_wait_ms=1000)
+    try:
+        blocker = service.submit(["first"])
+        futures = [service.submit([str(i)]) for i in range(6)]
+        gate.set()
+        assert blocker.result(5) == [[5.0]]
+        assert [f.result(5) for f in futures] == [[[1.0]]] * 6
+    finally:
+        service.shutdown()
+
+    assert all(len(batch) <= 3 for batch in model.batches)
+
+
+def test_failures_propagate_to_every_caller():
+    class Failing:
+        def embed_documents(self, texts):
+            raise ValueError("model crashed")
+
+    service = EmbeddingService(Failing(), max_wait_ms=0)
+    try:
+        with pytest.raises(ValueError):
+            BatchedEmbeddings(service).embed_query("hello")
+    finally:
+        service.shutdown()
+
+    assert service.stats()["errors"] == 1
@@ -12,15 +12,12 @@ def test_storage_add_assistant_message_allows_stage_omission_for_chat_only():
     from .. import storage
 
     conversation_id = "00000000-0000-0000-0000-000000000001"
-    conversation = {"id": conversation_id, "messages": []}
     saved = []
 
-    def save_spy(conv):
-        saved.append(conv)
+    def append_spy(conv_id, message):
+        saved.append(message)
 
-    with patch.object(storage, "get_conversation", return_value=conversation), patch.object(
-        storage, "save_conversation", side_effect=save_spy
-    ):
+    with patch.object(storage, "_append_message", side_effect=append_spy):
         storage.add_assistant_message(
             conversation_id,
             stage1=[{"model": "m1", "response": "r1"}],
@@ -29,8 +26,8 @@ def test_storage_add_assistant_message_allows_stage_omission_for_chat_only():
             metadata={"execution_mode": "chat_only"},
         )
 
-    assert saved, "Expected conversation to be saved"
-    msg = saved[0]["messages"][-1]
+    assert saved, "Expected message to be saved"
+    msg = saved[0]
     assert msg["role"] == "assistant"
     assert msg["stage1"] == [{"model": "m1", "response": "r1"}]
     assert "stage2" not in msg
@@ -45,15 +42,12 @@ def test_storage_add_assistant_message_allows_stage3_omission_for_chat_ranking()
     from .. import storage
 
     conversation_id = "00000000-0000-0000-0000-000000000002"
-    conversation = {"id": conversation_id, "messages": []}
     saved = []
 
-    def save_spy(conv):
-        saved.append(conv)
+    def append_spy(conv_id, message):
+        saved.append(message)
 
-    with patch.object(storage, "get_conversation", return_value=conversation), patch.object(
-        storage, "save_conversation", side_effect=save_spy
-    ):
+    with patch.object(storage, "_append_message", side_effect=append_spy):
         storage.add_assistant_message(
             conversation_id,
             stage1=[{"model": "m1", "response": "r1"}],
@@ -62,7 +56,7 @@ def test_storage_add_assistant_message_allows_stage3_omission_for_chat_ranking()
             metadata={"execution_mode": "chat_ranking"},
         )
 
-    msg = saved[0]["messages"][-1]
+    msg = saved[0]
     assert msg["stage1"]
     assert msg["stage2"] == [{"model": "m1", "ranking": "1. Response A"}]
     assert "stage3" not in msg
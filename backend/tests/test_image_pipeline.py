@@ -0,0 +1,64 @@
+"""Tests for image downscaling, metadata stripping and the prepared-image cache."""
+
+from __future__ import annotations
+
+import base64
+import io
+
+import pytest
+
+from .. import image_pipeline
+from ..attachment_store import AttachmentStore
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _jpeg(size=(4000, 3000), orientation=None) -> bytes:
+    image = Image.effect_noise(size, 64).convert("RGB")
+    exif = Image.Exif()
+    exif[0x010F] = "CameraMaker"
+    if orientation:
+        exif[0x0112] = orientation
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=95, exif=exif.tobytes())
+    return out.getvalue()
+
+
+def test_large_photo_is_downscaled_and_stripped():
+    original = _jpeg(orientation=6)  # stored landscape, displayed rotated 90 degrees
+
+    data, mime_type = image_pipeline.prepare_image(original)
+    prepared = Image.open(io.BytesIO(data))
+
+    assert mime_type == "image/jpeg"
+    assert prepared.size == (image_pipeline.IMAGE_MAX_DIMENSION * 3 // 4, image_pipeline.IMAGE_MAX_DIMENSION)
+    assert not prepared.getexif() and "icc_profile" not in prepared.info
+    assert len(data) < len(original) / 4
+
+
+def test_transparency_is_kept_as_png():
+    image = Image.new("RGBA", (64, 64), (255, 0, 0, 0))
+    out = io.BytesIO()
+    image.save(out, format="PNG")
+
+    data, mime_type = image_pipeline.prepare_image(out.getvalue())
+    assert mime_type == "image/png"
+    assert Image.open(io.BytesIO(data)).mode == "RGBA"
+
+
+def test_store_prepares_each_image_once_per_settings(tmp_path, monkeypatch):
+    store = AttachmentStore(str(tmp_path / "attachments"))
+    prepared = []
+    prepare = image_pipeline.prepare_image
+    monkeypatch.setattr(image_pipeline, "prepare_image", lambda data: prepared.append(1) or prepare(data))
+
+    meta, _ = store.put("photo.jpg", _jpeg(size=(2000, 1000)))
+    first = store.load_content(meta["id"])[1]
+    assert store.load_content(meta["id"])[1] == first
+    assert len(prepared) == 1
+
+    monkeypatch.setattr(image_pipeline, "IMAGE_MAX_DIMENSION", 500)
+    smaller = store.load_content(meta["id"])[1]
+    assert len(prepared) == 2
+    payload = base64.b64decode(smaller.split(",", 1)[1])
+    assert Image.open(io.BytesIO(payload)).size == (500, 250)
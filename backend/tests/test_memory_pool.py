@@ -0,0 +1,193 @@
+"""Tests for the shared embeddings singleton and the open vector store pool."""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+
+
+class FakeEmbeddings:
+    instances = 0
+
+    def __init__(self, model_name=None):
+        FakeEmbeddings.instances += 1
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return [[0.0] for _ in texts]
+
+
+class FakeChroma:
+    opened = []
+
+    def __init__(self, client, collection_name, embedding_function):
+        FakeChroma.opened.append(collection_name)
+        self.client = client
+        self.embedding_function = embedding_function
+
+    def as_retriever(self, search_kwargs=None):
+        return object()
+
+
+class FakeCollection:
+    def __init__(self):
+        self.upserts = []
+
+    def upsert(self, ids, embeddings, documents):
+        self.upserts.append((documents, embeddings))
+
+
+class FakeClient:
+    closed = []
+
+    def __init__(self, path):
+        self.path = path
+
+    def get_or_create_collection(self, name, embedding_function=None):
+        return FakeCollection()
+
+    def close(self):
+        FakeClient.closed.append(os.path.basename(self.path))
+
+
+class FakeChromadb:
+    PersistentClient = FakeClient
+
+
+@pytest.fixture
+def memory(tmp_path, monkeypatch):
+    from .. import memory as mem
+
+    FakeEmbeddings.instances = 0
+    FakeChroma.opened = []
+    FakeClient.closed = []
+    monkeypatch.setenv("ENABLE_MEMORY", "true")
+    monkeypatch.setenv("ENABLE_OPENAI_EMBEDDINGS", "false")
+    monkeypatch.setattr(mem, "_MEMORY_AVAILABLE", True)
+    monkeypatch.setattr(mem, "HuggingFaceEmbeddings", FakeEmbeddings)
+    monkeypatch.setattr(mem, "Chroma", FakeChroma)
+    monkeypatch.setattr(mem, "chromadb", FakeChromadb)
+    monkeypatch.setattr(mem, "MEMORY_DIR", tmp_path)
+    monkeypatch.setattr(mem, "get_embedding_cache", lambda create=True: None)
+    monkeypatch.setattr(mem, "_embeddings", None)
+    monkeypatch.setattr(mem, "_service", None)
+    monkeypatch.setattr(mem, "_store_pool", mem._StorePool(max_open=2, idle_seconds=60))
+    yield mem
+    mem.shutdown()
+
+
+def test_embeddings_are_loaded_once(memory):
+    assert memory.warm_up() is True
+    memory.CouncilMemorySystem("a")
+    memory.CouncilMemorySystem("b")
+
+    assert FakeEmbeddings.instances == 1
+    assert memory.get_embeddings().batches == [["warm up"]]
+
+
+def test_stores_are_reused_and_bounded(memory):
+    first = memory.CouncilMemorySystem("a").vectorstore
+    assert memory.CouncilMemorySystem("a").vectorstore is first
+
+    memory.CouncilMemorySystem("b")
+    memory.CouncilMemorySystem("c")  # evicts "a", the least recently used
+
+    assert len(memory._store_pool) == 2
+    assert FakeClient.closed == ["a"]
+    memory.CouncilMemorySystem("a")
+    assert FakeChroma.opened == ["conv_a", "conv_b", "conv_c", "conv_a"]
+    assert FakeClient.closed == ["a", "b"]
+
+
+def test_idle_stores_are_evicted(memory, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(memory.time, "monotonic", lambda: now[0])
+
+    memory.CouncilMemorySystem("a")
+    now[0] += 61
+    memory.CouncilMemorySystem("b")
+
+    assert len(memory._store_pool) == 1
+    assert FakeClient.closed == ["a"]
+    memory.release_store("b")
+    assert len(memory._store_pool) == 0
+    assert FakeClient.closed == ["a", "b"]
+
+
+def test_close_without_close_method_stops_the_cached_system(memory):
+    class System:
+        stopped = False
+
+        def stop(self):
+            System.stopped = True
+
+    class LegacyClient:
+        _identifer_to_system = {}
+
+        def __init__(self):
+            self._identifier = "/data/memory/a"
+            self._system = System()
+            LegacyClient._identifer_to_system[self._identifier] = self._system
+
+    memory._close_chroma_client(LegacyClient())
+    assert System.stopped
+    assert LegacyClient._identifer_to_system == {}
+
+
+def test_mmap_backend_bypasses_chroma(memory, tmp_path, monkeypatch):
+    pytest.importorskip("numpy")
+    from .. import vector_index
+
+    monkeypatch.setattr(memory, "MEMORY_BACKEND", "mmap")
+    monkeypatch.setattr(vector_index, "INDEX_DIR", tmp_path / "index")
+    vector_index.reset_vector_index()
+    try:
+        mem = memory.CouncilMemorySystem("a")
+        mem.save_exchange("hi", "hello")
+
+        assert mem.get_context("hi") == "User: hi\nAssistant: hello"
+        assert FakeChroma.opened == []
+    finally:
+        vector_index.reset_vector_index()
+
+
+def test_replacing_the_embedding_service_reopens_stores(memory, monkeypatch):
+    memory.CouncilMemorySystem("a")
+    first = memory.get_embedding_service()
+
+    monkeypatch.setattr(memory, "_embeddings_config", lambda: (False, "changed"))
+    assert memory.get_embedding_service() is not first
+    assert len(memory._store_pool) == 0
+    assert FakeClient.closed == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_async_memory_awaits_the_batcher(memory, tmp_path, monkeypatch):
+    pytest.importorskip("numpy")
+    from .. import vector_index
+
+    monkeypatch.setattr(memory, "MEMORY_BACKEND", "mmap")
+    monkeypatch.setattr(vector_index, "INDEX_DIR", tmp_path / "index")
+    vector_index.reset_vector_index()
+
+    def no_blocking_embed(*args, **kwargs):
+        raise AssertionError("async callers must not block on EmbeddingService.embed")
+
+    try:
+        mem = memory.CouncilMemorySystem("a")
+        monkeypatch.setattr(memory.EmbeddingService, "embed", no_blocking_embed)
+        await mem.asave_exchange("hi", "hello")
+
+        assert await mem.aget_context("hi") == "User: hi\nAssistant: hello"
+    finally:
+        vector_index.reset_vector_index()
+
+
+def test_chroma_add_embedded_upserts_into_the_store_collection(memory):
+    mem = memory.CouncilMemorySystem("a")
+    mem.add_embedded(["User: hi\nAssistant: hello"], [[0.5]])
+
+    assert mem.collection is memory._store_pool.get("a", None).collection
+    assert mem.collection.upserts == [(["User: hi\nAssistant: hello"], [[0.5]])]
@@ -0,0 +1,93 @@
+"""Tests for the durable memory write-behind queue."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+
+class FakeService:
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+
+class FakeStore:
+    saved = {}
+    failures = {}
+
+    def __init__(self, conversation_id):
+        self.conversation_id = conversation_id
+
+    def add_embedded(self, texts, vectors):
+        if FakeStore.failures.get(self.conversation_id, 0) > 0:
+            FakeStore.failures[self.conversation_id] -= 1
+            raise OSError("store busy")
+        FakeStore.saved.setdefault(self.conversation_id, []).extend(texts)
+
+
+@pytest.fixture
+def mq(tmp_path, monkeypatch):
+    from .. import memory, memory_queue
+
+    service = FakeService()
+    FakeStore.saved = {}
+    FakeStore.failures = {}
+    monkeypatch.setattr(memory, "get_embedding_service", lambda: service)
+    monkeypatch.setattr(memory, "CouncilMemorySystem", FakeStore)
+    monkeypatch.setattr(memory_queue, "RETRY_BASE_SECONDS", 0.01)
+    queue = memory_queue.MemoryWriteQueue(tmp_path / "journal.jsonl", batch_size=8, max_retries=2)
+    queue.service = service
+    yield queue
+    queue.shutdown(timeout=5)
+
+
+def test_exchanges_are_written_in_batches(mq):
+    for i in range(3):
+        mq.enqueue("a" if i % 2 == 0 else "b", f"q{i}", f"a{i}")
+
+    assert mq.flush(timeout=5)
+    assert FakeStore.saved == {
+        "a": ["User: q0\nAssistant: a0", "User: q2\nAssistant: a2"],
+        "b": ["User: q1\nAssistant: a1"],
+    }
+    assert sum(len(c) for c in mq.service.calls) == 3
+    assert mq.stats()["written"] == 3
+    assert not mq.journal_path.exists()
+
+
+def test_failed_writes_are_retried_then_dropped(mq):
+    FakeStore.failures = {"a": 1, "b": 10}
+    mq.enqueue("a", "q", "ok after retry")
+    mq.enqueue("b", "q", "never stored")
+
+    assert mq.flush(timeout=5)
+    assert FakeStore.saved == {"a": ["User: q\nAssistant: ok after retry"]}
+    stats = mq.stats()
+    assert stats["dropped"] == 1
+    assert stats["queue_depth"] == 0
+
+
+def test_unwritten_exchanges_are_replayed_from_journal(mq, tmp_path):
+    from ..memory_queue import MemoryWriteQueue
+
+    journal = tmp_path / "journal.jsonl"
+    journal.write_text(
+        json.dumps({"id": "1", "c": "a", "u": "q1", "a": "a1"}) + "\n"
+        + json.dumps({"id": "2", "c": "a", "u": "q2", "a": "a2"}) + "\n"
+        + json.dumps({"done": "1"}) + "\n",
+        encoding="utf-8",
+    )
+
+    restarted = MemoryWriteQueue(journal, batch_size=8)
+    restarted.start()
+    try:
+        assert restarted.flush(timeout=5)
+    finally:
+        restarted.shutdown(timeout=5)
+
+    assert FakeStore.saved == {"a": ["User: q2\nAssistant: a2"]}
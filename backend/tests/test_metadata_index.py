@@ -0,0 +1,75 @@
+"""Tests for the JSON storage conversation metadata index."""
+
+from __future__ import annotations
+
+import json
+import os
+
+import pytest
+
+
+def _cid(n: int) -> str:
+    return f"00000000-0000-0000-0000-{n:012d}"
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    from .. import storage as storage_module
+
+    monkeypatch.setattr(storage_module, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(storage_module, "is_using_database", lambda: False)
+    monkeypatch.setattr(storage_module, "CONVERSATION_FORMAT", "json")
+    return storage_module
+
+
+def test_list_uses_index_and_tracks_writes(storage, monkeypatch):
+    for n in range(3):
+        storage.create_conversation(_cid(n), username="u")
+    storage.add_user_message(_cid(1), "hello")
+    storage.update_conversation_title(_cid(1), "Greeting")
+    storage.delete_conversation(_cid(2))
+
+    def no_file_reads(*args, **kwargs):
+        raise AssertionError("list_conversations must not parse conversation files")
+
+    monkeypatch.setattr(storage, "_json_get_conversation", no_file_reads)
+    monkeypatch.setattr(json, "load", no_file_reads)
+
+    listed = {c["id"]: c for c in storage.list_conversations()}
+    assert set(listed) == {_cid(0), _cid(1)}
+    assert listed[_cid(1)]["title"] == "Greeting"
+    assert listed[_cid(1)]["message_count"] == 1
+    assert listed[_cid(1)]["username"] == "u"
+
+
+def test_list_pages_newest_first(storage, tmp_path):
+    for n in range(5):
+        path = os.path.join(tmp_path, f"{_cid(n)}.json")
+        storage.create_conversation(_cid(n))
+        conversation = storage.get_conversation(_cid(n))
+        conversation["created_at"] = f"2026-01-0{n + 1}T00:00:00"
+        storage.save_conversation(conversation)
+        assert os.path.exists(path)
+
+    page = storage.list_conversations(limit=2, offset=1)
+    assert [c["id"] for c in page] == [_cid(3), _cid(2)]
+
+
+def test_verify_detects_and_repairs_drift(storage, tmp_path):
+    storage.create_conversation(_cid(1))
+    storage.create_conversation(_cid(2))
+
+    # Written behind the index's back
+    with open(os.path.join(tmp_path, f"{_cid(3)}.json"), "w") as f:
+        json.dump({"id": _cid(3), "created_at": "2026-01-01", "title": "t", "messages": []}, f)
+    with open(os.path.join(tmp_path, f"{_cid(1)}.json"), "w") as f:
+        json.dump({"id": _cid(1), "created_at": "2026-01-01", "title": "edited", "messages": [{}, {}]}, f)
+    os.remove(os.path.join(tmp_path, f"{_cid(2)}.json"))
+
+    report = storage.verify_metadata_index(repair=True)
+    assert report == {"missing": [_cid(3)], "stale": [_cid(1)], "orphaned": [_cid(2)]}
+
+    assert storage.verify_metadata_index() == {"missing": [], "stale": [], "orphaned": []}
+    listed = {c["id"]: c for c in storage.list_conversations()}
+    assert listed[_cid(1)]["message_count"] == 2
+    assert storage.rebuild_metadata_index() == 2
@@ -0,0 +1,98 @@
+"""Tests for the Prometheus metrics subsystem."""
+
+from __future__ import annotations
+
+import httpx
+import pytest
+
+pytest.importorskip("prometheus_client")
+
+from prometheus_client import REGISTRY  # noqa: E402
+
+from .. import config, metrics, openrouter  # noqa: E402
+
+
+def _value(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_upstream_call_records_latency_ttfb_and_429s(monkeypatch):
+    monkeypatch.setattr(openrouter, "INITIAL_BACKOFF_SECONDS", 0)
+    monkeypatch.setattr(config, "COUNCIL_MODELS", ["openai/gpt-4o"])
+    responses = iter([
+        httpx.Response(429, json={"error": {"message": "slow down"}}),
+        httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]}),
+        httpx.Response(429, json={"error": {"message": "slow down"}}),
+    ])
+    transport = httpx.MockTransport(lambda request: next(responses))
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: real_client(transport=transport, **kwargs))
+
+    before = {
+        "ok": _value("council_upstream_request_seconds_count", router="openrouter", model="openai/gpt-4o", outcome="ok"),
+        "ttfb": _value("council_upstream_ttfb_seconds_count", router="openrouter", model="openai/gpt-4o"),
+        "429": _value("council_upstream_rate_limited_total", router="openrouter"),
+        "errors": _value("council_upstream_errors_total", router="openrouter", error_type="rate_limit"),
+        "other": _value("council_upstream_request_seconds_count", router="openrouter", model="other", outcome="error"),
+    }
+
+    messages = [{"role": "user", "content": "hi"}]
+    assert (await openrouter.query_model("openai/gpt-4o", messages))["content"] == "ok"
+    # A model that is not configured is labelled "other"
+    failed = await openrouter.query_model("someone/unlisted-model", messages, retry_on_rate_limit=False)
+    assert failed["error_type"] == "rate_limit"
+
+    assert _value("council_upstream_request_seconds_count", router="openrouter", model="openai/gpt-4o", outcome="ok") == before["ok"] + 1
+    # One time-to-first-byte sample per attempt
+    assert _value("council_upstream_ttfb_seconds_count", router="openrouter", model="openai/gpt-4o") == before["ttfb"] + 2
+    assert _value("council_upstream_rate_limited_total", router="openrouter") == before["429"] + 2
+    assert _value("council_upstream_errors_total", router="openrouter", error_type="rate_limit") == before["errors"] + 1
+    assert _value("council_upstream_request_seconds_count", router="openrouter", model="other", outcome="error") == before["other"] + 1
+
+
+@pytest.mark.asyncio
+async def test_stream_gauges_and_stage_durations():
+    closed = []
+
+    async def events():
+        try:
+            yield "data: 1\n\n"
+            yield "data: 2\n\n"
+        finally:
+            closed.append(True)
+
+    @metrics.timed_stage("stage2")
+    async def stage():
+        return "done"
+
+    stages_before = _value("council_stage_seconds_count", stage="stage2")
+    assert await stage() == "done"
+    assert _value("council_stage_seconds_count", stage="stage2") == stages_before + 1
+
+    stream = metrics.track_stream(events(), council=True)
+    assert await stream.__anext__() == "data: 1\n\n"
+    assert _value("council_sse_connections") == 1
+    assert _value("council_councils_in_flight") == 1
+
+    # Client disconnect: the wrapper is closed mid-stream
+    await stream.aclose()
+    assert closed == [True]
+    assert _value("council_sse_connections") == 0
+    assert _value("council_councils_in_flight") == 0
+
+
+def test_metrics_endpoint(monkeypatch):
+    from fastapi.testclient import TestClient
+    from ..main import app
+
+    metrics.observe_storage("get_conversation", 0.004)
+    client = TestClient(app)
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'council_storage_operation_seconds_count{operation="get_conversation"}' in response.text
+
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+    assert client.get("/metrics").status_code == 503
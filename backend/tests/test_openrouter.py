@@ -108,5 +108,6 @@ class TestMultimodalSupport:
 
             # Verify the payload structure
             call_args = mock_client.post.call_args
-            payload = call_args.kwargs.get('json') or call_args[1].get('json')
+            payload = json.loads(bytes(call_args.kwargs['content']))
+            assert payload["model"] == "openai/gpt-4o"
             assert payload["messages"] == messages
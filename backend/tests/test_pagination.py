@@ -0,0 +1,133 @@
+"""Tests for cursor-paginated conversation lists and windowed message reads."""
+
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+def _cid(n: int) -> str:
+    return f"00000000-0000-0000-0000-{n:012d}"
+
+
+@pytest.fixture(params=["json", "sqlite", "database"])
+def storage(request, tmp_path, monkeypatch):
+    from .. import storage as storage_module
+
+    monkeypatch.setattr(storage_module, "DATA_DIR", str(tmp_path / "conversations"))
+    monkeypatch.setattr(storage_module, "is_using_database", lambda: False)
+    monkeypatch.setattr(storage_module, "is_using_sqlite", lambda: False)
+    engine = None
+    if request.param == "sqlite":
+        monkeypatch.setattr(storage_module, "SQLITE_PATH", str(tmp_path / "council.sqlite3"))
+        monkeypatch.setattr(storage_module, "is_using_sqlite", lambda: True)
+    elif request.param == "database":
+        from ..database import Base
+        from .. import models  # noqa: F401
+
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine)
+        monkeypatch.setattr(storage_module, "SessionLocal", sessionmaker(bind=engine, autoflush=False))
+        monkeypatch.setattr(storage_module, "is_using_database", lambda: True)
+    yield storage_module
+    if request.param == "sqlite":
+        storage_module._sqlite().close()
+    if engine is not None:
+        engine.dispose()
+
+
+def _pages(storage, limit, username=None):
+    pages, cursor = [], None
+    for _ in range(20):
+        rows, cursor = storage.list_conversations_page(limit, cursor=cursor, username=username)
+        pages.append([c["id"] for c in rows])
+        if cursor is None:
+            return pages
+    raise AssertionError(f"cursor did not advance: {pages[-2:]}")
+
+
+def test_cursor_pages_cover_the_list_in_order(storage):
+    for n in range(7):
+        storage.create_conversation(_cid(n), username="alice" if n % 2 else "bob")
+
+    expected = [c["id"] for c in storage.list_conversations()]
+    pages = _pages(storage, 3)
+    assert [len(p) for p in pages] == [3, 3, 1]
+    assert [cid for page in pages for cid in page] == expected
+
+    alice = _pages(storage, 2, username="alice")
+    assert [cid for page in alice for cid in page] == [cid for cid in expected if int(cid[-1]) % 2]
+
+
+def test_exact_multiple_has_no_trailing_cursor(storage):
+    for n in range(4):
+        storage.create_conversation(_cid(n))
+    assert [len(p) for p in _pages(storage, 2)] == [2, 2]
+
+    last = storage.list_conversations()[-1]
+    after_last = storage.encode_cursor(last["created_at"], last["id"])
+    assert storage.list_conversations_page(2, cursor=after_last) == ([], None)
+
+
+def test_invalid_cursor_is_rejected(storage):
+    with pytest.raises(ValueError):
+        storage.list_conversations_page(10, cursor="not-a-cursor")
+
+
+def test_window_starts_at_a_user_message(storage):
+    storage.create_conversation(_cid(1))
+    for n in range(3):
+        storage.add_user_message(_cid(1), f"q{n}")
+        storage.add_assistant_message(_cid(1), stage1=[], stage3={"response": f"a{n}"})
+
+    window = storage.get_conversation_window(_cid(1), 2)
+    assert window["message_offset"] == 4
+    assert window["message_count"] == 6
+    assert [m["role"] for m in window["messages"]] == ["user", "assistant"]
+
+    # An odd limit would start at an assistant reply; the window is widened by one.
+    window = storage.get_conversation_window(_cid(1), 3)
+    assert window["message_offset"] == 2
+    assert [m.get("content") for m in window["messages"]][0] == "q1"
+
+    assert storage.get_conversation_window(_cid(2), 2) is None
+
+
+def test_get_messages_reads_a_slice(storage):
+    storage.create_conversation(_cid(1))
+    for n in range(5):
+        storage.add_user_message(_cid(1), f"m{n}")
+
+    messages, total = storage.get_messages(_cid(1), offset=1, limit=3)
+    assert [m["content"] for m in messages] == ["m1", "m2", "m3"]
+    assert total == 5
+    assert storage.get_messages(_cid(1), offset=0, limit=0) == ([], 5)
+    assert storage.get_messages(_cid(2)) is None
+    assert storage.count_messages(_cid(1)) == 5
+    assert storage.count_messages(_cid(2)) is None
+
+
+@pytest.mark.asyncio
+async def test_api_list_sets_next_cursor_and_messages_window(storage):
+    from fastapi import Response
+    from ..main import get_conversation_messages, list_conversations
+
+    for n in range(3):
+        storage.create_conversation(_cid(n))
+    for n in range(5):
+        storage.add_user_message(_cid(0), f"m{n}")
+
+    response = Response()
+    rows = await list_conversations(response, limit=2, offset=0, cursor=None, username=None, current_user="u")
+    assert len(rows) == 2
+    cursor = response.headers["X-Next-Cursor"]
+    response = Response()
+    rows = await list_conversations(response, limit=2, offset=0, cursor=cursor, username=None, current_user="u")
+    assert len(rows) == 1 and "X-Next-Cursor" not in response.headers
+
+    page = await get_conversation_messages(_cid(0), before=None, limit=2, current_user="u")
+    assert ([m["content"] for m in page["messages"]], page["offset"], page["total"]) == (["m3", "m4"], 3, 5)
+    page = await get_conversation_messages(_cid(0), before=1, limit=2, current_user="u")
+    assert ([m["content"] for m in page["messages"]], page["offset"]) == (["m0"], 0)
@@ -0,0 +1,138 @@
+"""Tests for optional zstd compression of stored payloads."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from .. import payload_codec
+
+pytest.importorskip("zstandard")
+
+CID = "00000000-0000-0000-0000-000000000001"
+
+
+def _answer(n: int) -> dict:
+    return {
+        "role": "assistant",
+        "stage1": [{"model": f"m{i}", "response": f"Answer {n}: the council agrees on point {i}. " * 20} for i in range(3)],
+        "stage3": {"model": "m0", "response": f"Final answer {n}. " * 30},
+    }
+
+
+@pytest.fixture
+def zstd(tmp_path, monkeypatch):
+    monkeypatch.setattr(payload_codec, "PAYLOAD_COMPRESSION", "zstd")
+    monkeypatch.setattr(payload_codec, "PAYLOAD_ZSTD_DICT_DIR", str(tmp_path / "dicts"))
+    monkeypatch.setattr(payload_codec, "PAYLOAD_ZSTD_DICT", "")
+    monkeypatch.setattr(payload_codec, "_local", threading.local())
+    monkeypatch.setattr(payload_codec, "_dictionaries", {})
+    return payload_codec
+
+
+def test_pack_round_trips_and_leaves_small_values_plain(zstd):
+    message = _answer(1)
+    packed = zstd.pack(message)
+    assert set(packed) == {zstd.ENVELOPE_KEY}
+    assert len(json.dumps(packed)) < len(json.dumps(message)) / 2
+    assert zstd.unpack(packed) == message
+
+    small = {"role": "user", "content": "hi"}
+    assert zstd.pack(small) is small
+    assert isinstance(zstd.encode_payload(small), str)
+    assert zstd.decode_payload(zstd.encode_payload(message)) == message
+
+
+def test_disabled_compression_still_reads_compressed_payloads(zstd, monkeypatch):
+    packed, frame = zstd.pack(_answer(1)), zstd.encode_payload(_answer(2))
+    monkeypatch.setattr(payload_codec, "PAYLOAD_COMPRESSION", "none")
+    assert zstd.pack(_answer(1)) == _answer(1)
+    assert zstd.unpack(packed) == _answer(1)
+    assert zstd.decode_payload(frame) == _answer(2)
+
+
+def test_trained_dictionary_is_found_by_id_on_read(zstd, monkeypatch):
+    path = zstd.save_dictionary(zstd.train_dictionary([_answer(n) for n in range(200)], 4096))
+    monkeypatch.setattr(payload_codec, "PAYLOAD_ZSTD_DICT", os.path.basename(path))
+    frame = zstd.encode_payload(_answer(500))
+    assert f"{zstd.zstandard.get_frame_parameters(frame).dict_id}{zstd.DICT_SUFFIX}" == os.path.basename(path)
+
+    # A fresh process that no longer compresses with this dictionary can still read it
+    monkeypatch.setattr(payload_codec, "PAYLOAD_ZSTD_DICT", "")
+    monkeypatch.setattr(payload_codec, "_local", threading.local())
+    monkeypatch.setattr(payload_codec, "_dictionaries", {})
+    assert zstd.decode_payload(frame) == _answer(500)
+
+    # ... but not once the dictionary is gone
+    monkeypatch.setattr(payload_codec, "PAYLOAD_ZSTD_DICT_DIR", os.path.dirname(os.path.dirname(path)))
+    monkeypatch.setattr(payload_codec, "_local", threading.local())
+    monkeypatch.setattr(payload_codec, "_dictionaries", {})
+    with pytest.raises(RuntimeError):
+        zstd.decode_payload(frame)
+
+
+@pytest.fixture(params=["json", "sqlite", "database"])
+def storage(request, tmp_path, monkeypatch, zstd):
+    from .. import storage as storage_module
+
+    monkeypatch.setattr(storage_module, "DATA_DIR", str(tmp_path / "conversations"))
+    monkeypatch.setattr(storage_module, "is_using_database", lambda: False)
+    monkeypatch.setattr(storage_module, "is_using_sqlite", lambda: False)
+    engine = None
+    if request.param == "sqlite":
+        monkeypatch.setattr(storage_module, "SQLITE_PATH", str(tmp_path / "council.sqlite3"))
+        monkeypatch.setattr(storage_module, "is_using_sqlite", lambda: True)
+    elif request.param == "database":
+        from ..database import Base
+        from .. import models  # noqa: F401
+
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine)
+        monkeypatch.setattr(storage_module, "SessionLocal", sessionmaker(bind=engine, autoflush=False))
+        monkeypatch.setattr(storage_module, "is_using_database", lambda: True)
+    yield storage_module
+    if request.param == "sqlite":
+        storage_module._sqlite().close()
+    if engine is not None:
+        engine.dispose()
+
+
+def _raw_payloads(storage):
+    """Stored message payloads exactly as they are on disk / in the column."""
+    if storage.is_using_sqlite():
+        conn = storage._sqlite()._conn()
+        return [row[0] for row in conn.execute("SELECT payload FROM messages ORDER BY seq")]
+    if storage.is_using_database():
+        db = storage.SessionLocal()
+        try:
+            return [row.payload for row in storage._db_message_query(db, CID)]
+        finally:
+            db.close()
+    with open(storage.get_conversation_path(CID, ".jsonl"), encoding="utf-8") as f:
+        return [json.loads(line)["data"] for line in f if '"op":"message"' in line]
+
+
+def test_storage_compresses_messages_transparently(storage, monkeypatch):
+    storage.create_conversation(CID)
+    storage.add_user_message(CID, "short question")
+    storage.add_assistant_message(CID, **{k: v for k, v in _answer(1).items() if k != "role"})
+
+    plain, compressed = _raw_payloads(storage)
+    # Short payloads stay plain; the long answer is a zstd BLOB (SQLite) or a JSON envelope
+    assert (json.loads(plain) if isinstance(plain, str) else plain) == {"role": "user", "content": "short question"}
+    assert isinstance(compressed, bytes) or set(compressed) == {payload_codec.ENVELOPE_KEY}
+
+    monkeypatch.setattr(payload_codec, "PAYLOAD_COMPRESSION", "none")
+    storage.add_user_message(CID, "after switching compression off " * 20)
+    storage.get_conversation_cache().clear()
+    messages = storage.get_conversation(CID)["messages"]
+    assert messages[1] == _answer(1)
+    assert [m["role"] for m in messages] == ["user", "assistant", "user"]
+    messages, total = storage.get_messages(CID, offset=1, limit=1)
+    assert (messages, total) == ([_answer(1)], 3)
@@ -0,0 +1,103 @@
+"""Tests for request bodies encoded once per stage."""
+
+from __future__ import annotations
+
+import json
+
+import httpx
+import pytest
+
+from .. import ollama, openrouter, request_body
+from ..request_body import SharedBody
+
+MESSAGES = [
+    {"role": "system", "content": "Relevant past exchanges: ünïcödé ✓"},
+    {"role": "user", "content": [
+        {"type": "text", "text": "What is in this image?"},
+        {"type": "image_url", "image_url": {"url": "data:image/jpeg;base64," + "A" * 4096}},
+    ]},
+]
+
+
+def test_body_matches_the_payload_it_replaces():
+    body = SharedBody({"messages": MESSAGES, "max_tokens": 8192, "temperature": 0.3})
+    for model in ("openai/gpt-4o", 'odd "model" id'):
+        request = body.for_model(model)
+        decoded = json.loads(bytes(request))
+        assert decoded == {"model": model, "messages": MESSAGES, "max_tokens": 8192, "temperature": 0.3}
+        assert list(decoded) == ["model", "messages", "max_tokens", "temperature"]
+        assert request.headers["Content-Length"] == str(len(bytes(request)))
+
+    assert json.loads(bytes(SharedBody({}).for_model("m"))) == {"model": "m"}
+    with pytest.raises(ValueError):
+        SharedBody({"model": "m"})
+
+
+def test_stdlib_fallback_without_orjson(monkeypatch):
+    monkeypatch.setattr(request_body, "orjson", None)
+    assert json.loads(bytes(SharedBody({"messages": MESSAGES}).for_model("m")))["messages"] == MESSAGES
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("client", [openrouter, ollama])
+async def test_a_stage_encodes_the_messages_once(client, monkeypatch):
+    encoded = []
+    dumps = request_body.dumps
+    monkeypatch.setattr(request_body, "dumps", lambda value: encoded.append(value) or dumps(value))
+
+    sent = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(json.loads(request.read()))
+        assert "transfer-encoding" not in request.headers
+        if client is ollama:
+            return httpx.Response(200, json={"message": {"content": "ok"}})
+        return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+
+    transport = httpx.MockTransport(handler)
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: real_client(transport=transport, **kwargs))
+
+    models = ["a/one", "b/two", "c/three"]
+    results = await client.query_models_parallel(models, MESSAGES, temperature=0.5)
+
+    assert all(results[m]["content"] == "ok" for m in models)
+    assert sorted(p["model"] for p in sent) == models
+    assert all(p["messages"] == MESSAGES for p in sent)
+    # One encoding of the shared fields, plus one tiny one per model id
+    assert sum(1 for value in encoded if isinstance(value, dict)) == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_hints_only_for_models_that_need_them(monkeypatch):
+    from .. import config
+
+    monkeypatch.setattr(config, "OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
+    encoded = []
+    dumps = request_body.dumps
+    monkeypatch.setattr(request_body, "dumps", lambda value: encoded.append(value) or dumps(value))
+
+    history = [{"role": "user", "content": "Earlier question"}, {"role": "assistant", "content": "Earlier answer"}]
+    messages = [*history, {"role": "user", "content": "Follow-up"}]
+    body = openrouter.shared_body(messages)
+
+    hinted = json.loads(bytes(body.for_model("anthropic/claude-sonnet-4")))
+    plain = json.loads(bytes(body.for_model("openai/gpt-4o")))
+    json.loads(bytes(body.for_model("anthropic/claude-haiku-4")))
+
+    assert hinted["messages"][1]["content"] == [
+        {"type": "text", "text": "Earlier answer", "cache_control": {"type": "ephemeral"}}
+    ]
+    assert hinted["messages"][2] == plain["messages"][2] == messages[2]
+    assert plain["messages"] == messages
+    assert hinted["usage"] == plain["usage"] == {"include": True}
+    assert messages[1]["content"] == "Earlier answer"
+    # Two variants, each encoded once
+    assert sum(1 for value in encoded if isinstance(value, dict)) == 2
+
+
+def test_usage_with_cached_prompt_tokens():
+    data = {"usage": {"prompt_tokens": 1200, "completion_tokens": 30, "prompt_tokens_details": {"cached_tokens": 1024}}}
+    assert openrouter.parse_usage(data) == {"prompt_tokens": 1200, "completion_tokens": 30, "cached_tokens": 1024}
+    assert openrouter.parse_usage({"usage": {"prompt_tokens": 5}})["cached_tokens"] == 0
+    assert openrouter.parse_usage({}) is None
@@ -2,6 +2,7 @@
 
 from unittest.mock import AsyncMock, Mock
 
+import httpx
 import pytest
 
 
@@ -84,3 +85,34 @@ def test_dispatch_rejects_unknown_router_type():
 
     with pytest.raises(ValueError):
         router_dispatch.build_message_content("hybrid", text="x", images=None)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("router_type", ["openrouter", "ollama"])
+async def test_upstream_usage_reaches_the_caller(router_type, monkeypatch):
+    from .. import router_dispatch
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if router_type == "ollama":
+            return httpx.Response(200, json={
+                "message": {"content": "ok"},
+                "prompt_eval_count": 26, "eval_count": 298,
+                "total_duration": 5_043_500_667, "load_duration": 5_025_959, "eval_duration": 4_709_213_000,
+            })
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": "ok"}}],
+            "usage": {"prompt_tokens": 26, "completion_tokens": 298, "prompt_tokens_details": {"cached_tokens": 0}},
+        })
+
+    real_client = httpx.AsyncClient
+    transport = httpx.MockTransport(handler)
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: real_client(transport=transport, **kwargs))
+
+    result = await router_dispatch.query_model(
+        router_type, model="m", messages=[{"role": "user", "content": "hi"}]
+    )
+
+    counts = {"prompt_tokens": 26, "completion_tokens": 298, "cached_tokens": 0}
+    if router_type == "ollama":
+        counts.update(total_ms=5043.5, load_ms=5.0, eval_ms=4709.2)
+    assert result["usage"] == counts
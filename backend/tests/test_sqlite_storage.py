@@ -0,0 +1,88 @@
+"""Tests for the SQLite storage backend."""
+
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+
+def _cid(n: int) -> str:
+    return f"00000000-0000-0000-0000-{n:012d}"
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    from .. import storage as storage_module
+
+    monkeypatch.setattr(storage_module, "SQLITE_PATH", str(tmp_path / "council.sqlite3"))
+    monkeypatch.setattr(storage_module, "is_using_sqlite", lambda: True)
+    yield storage_module
+    storage_module._sqlite().close()
+
+
+def test_round_trip_matches_json_shape(storage):
+    created = storage.create_conversation(_cid(1), models=["a/b"], chairman="a/b", username="u", execution_mode="chat_only")
+    storage.add_user_message(_cid(1), "hello")
+    storage.add_assistant_message(_cid(1), stage1=[{"model": "a/b", "response": "hi"}], metadata={"partial": True})
+    storage.update_conversation_title(_cid(1), "Greeting")
+
+    conversation = storage.get_conversation(_cid(1))
+    assert conversation["created_at"] == created["created_at"]
+    assert conversation["title"] == "Greeting"
+    assert conversation["models"] == ["a/b"]
+    assert conversation["execution_mode"] == "chat_only"
+    assert conversation["router_type"] == "openrouter"
+    assert conversation["messages"] == [
+        {"role": "user", "content": "hello"},
+        {"role": "assistant", "stage1": [{"model": "a/b", "response": "hi"}], "metadata": {"partial": True}},
+    ]
+    assert storage.list_conversations() == [
+        {"id": _cid(1), "created_at": created["created_at"], "title": "Greeting", "message_count": 2, "username": "u"}
+    ]
+
+
+def test_save_replaces_messages_and_delete_cascades(storage):
+    storage.create_conversation(_cid(1))
+    for n in range(3):
+        storage.add_user_message(_cid(1), f"m{n}")
+
+    conversation = storage.get_conversation(_cid(1))
+    conversation["messages"] = conversation["messages"][:1]
+    storage.save_conversation(conversation)
+    assert storage.list_conversations()[0]["message_count"] == 1
+    storage.add_user_message(_cid(1), "next")
+    assert [m["content"] for m in storage.get_conversation(_cid(1))["messages"]] == ["m0", "next"]
+
+    assert storage.delete_conversation(_cid(1))
+    assert not storage.delete_conversation(_cid(1))
+    conn = storage._sqlite()._conn()
+    assert conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 0
+
+
+def test_missing_conversation(storage):
+    assert storage.get_conversation(_cid(9)) is None
+    with pytest.raises(ValueError):
+        storage.add_user_message(_cid(9), "hello")
+    with pytest.raises(ValueError):
+        storage.update_conversation_title(_cid(9), "t")
+
+
+def test_concurrent_appends_from_threads(storage):
+    storage.create_conversation(_cid(1))
+
+    def worker(n):
+        for i in range(10):
+            storage.add_user_message(_cid(1), f"{n}-{i}")
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    messages = storage.get_conversation(_cid(1))["messages"]
+    assert len(messages) == 40
+    assert storage.list_conversations()[0]["message_count"] == 40
+    for n in range(4):
+        assert [m["content"] for m in messages if m["content"].startswith(f"{n}-")] == [f"{n}-{i}" for i in range(10)]
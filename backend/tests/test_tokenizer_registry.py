@@ -0,0 +1,102 @@
+"""Tests for the cached tokenizer registry (offline BPE files, negative caching, batching)."""
+
+from __future__ import annotations
+
+import hashlib
+
+import pytest
+
+
+class FakeEncoding:
+    def __init__(self):
+        self.batch_calls = 0
+
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+    def encode_batch(self, texts, disallowed_special=()):
+        self.batch_calls += 1
+        return [t.split() for t in texts]
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    from .. import tokenizer_registry as tr
+
+    if not tr.TIKTOKEN_AVAILABLE:
+        pytest.skip("tiktoken not installed")
+
+    monkeypatch.setattr(tr, "TOKENIZER_DIR", tmp_path / "tokenizers")
+    monkeypatch.setattr(tr, "BUNDLED_DIR", tmp_path / "bundled")
+    monkeypatch.setenv("TIKTOKEN_CACHE_DIR", str(tmp_path / "cache"))
+    tr.reset_registry()
+    yield tr
+    tr.reset_registry()
+
+
+def test_encoder_is_cached_per_family(registry, monkeypatch):
+    calls = []
+    fake = FakeEncoding()
+
+    def fake_get_encoding(name):
+        calls.append(name)
+        return fake
+
+    monkeypatch.setattr(registry.tiktoken, "get_encoding", fake_get_encoding)
+
+    assert registry.count_tokens("a b c", "openai/gpt-4") == 3
+    assert registry.count_tokens("a b", "gpt-4") == 2
+    assert registry.count_tokens("a", "anthropic/claude-sonnet-4.5") == 1
+    assert calls == ["cl100k_base"]
+
+
+def test_failures_are_negatively_cached(registry, monkeypatch):
+    calls = []
+
+    def failing_get_encoding(name):
+        calls.append(name)
+        raise ConnectionError("no network")
+
+    monkeypatch.setattr(registry.tiktoken, "get_encoding", failing_get_encoding)
+
+    assert registry.count_tokens("x" * 40) == 10
+    assert registry.count_tokens("x" * 40) == 10
+    assert registry.count_tokens_many(["x" * 8, "x" * 4]) == [2, 1]
+    assert len(calls) == 1
+
+
+def test_failure_is_retried_after_ttl(registry, monkeypatch):
+    calls = []
+
+    def failing_get_encoding(name):
+        calls.append(name)
+        raise ConnectionError("no network")
+
+    monkeypatch.setattr(registry.tiktoken, "get_encoding", failing_get_encoding)
+    monkeypatch.setattr(registry, "FAILURE_TTL_SECONDS", 0.0)
+
+    registry.count_tokens("hello")
+    registry.count_tokens("hello")
+    assert len(calls) == 2
+
+
+def test_local_bpe_file_seeds_tiktoken_cache(registry, tmp_path, monkeypatch):
+    local_dir = tmp_path / "tokenizers"
+    local_dir.mkdir()
+    (local_dir / "cl100k_base.tiktoken").write_bytes(b"local-bpe")
+    monkeypatch.setattr(registry.tiktoken, "get_encoding", lambda name: FakeEncoding())
+
+    registry.get_encoding("gpt-4")
+
+    url = registry.ENCODING_URLS["cl100k_base"]
+    cached = tmp_path / "cache" / hashlib.sha1(url.encode()).hexdigest()
+    assert cached.read_bytes() == b"local-bpe"
+
+
+def test_count_tokens_many_uses_single_batch(registry, monkeypatch):
+    fake = FakeEncoding()
+    monkeypatch.setattr(registry.tiktoken, "get_encoding", lambda name: fake)
+
+    assert registry.count_tokens_many(["a b", "c", ""]) == [2, 1, 0]
+    assert fake.batch_calls == 1
+    assert registry.count_tokens_many([]) == []
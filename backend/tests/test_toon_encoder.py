@@ -0,0 +1,64 @@
+"""Tests for the schema-specialised TOON table encoder."""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from ..toon_encoder import TABULAR_SCHEMAS, decode_toon, encode_for_llm, encode_tabular, is_toon_available
+
+TRICKY_VALUES = [
+    "plain text",
+    "Hello, world",
+    'multi\nline "quoted" text: yes',
+    "",
+    "  leading space",
+    "trailing tab\t",
+    "123",
+    "-4.5e10",
+    "true",
+    "null",
+    "- list item",
+    "# heading",
+    "x[1] and {y}",
+    "back\\slash",
+    "pipe | separated",
+    "control \x01 \x7f chars",
+    "unicode é 中文 🚀",
+    "```python\nprint('hi')\n```",
+]
+
+
+def _random_text(rng: random.Random) -> str:
+    alphabet = "ab ,:\"\\[]{}#-\n\t\r|.0123456789eé中"
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+
+
+@pytest.mark.skipif(not is_toon_available(), reason="python-toon not installed")
+@pytest.mark.parametrize("fields", TABULAR_SCHEMAS)
+def test_matches_python_toon_byte_for_byte(fields):
+    from toon import encode as toon_encode
+
+    rng = random.Random(42)
+    values = TRICKY_VALUES + [_random_text(rng) for _ in range(300)]
+    rows = [{fields[0]: f"Response {i}", fields[1]: value} for i, value in enumerate(values)]
+
+    fast = encode_tabular(rows)
+
+    assert fast == toon_encode(rows)
+    assert decode_toon(fast) == rows
+
+
+def test_non_matching_shapes_are_rejected():
+    assert encode_tabular([]) is None
+    assert encode_tabular([{"model": "m", "ranking": "r", "parsed_ranking": []}]) is None
+    assert encode_tabular([{"response": "r", "model": "m"}]) is None
+    assert encode_tabular([{"model": "m", "response": 1}]) is None
+    assert encode_tabular([{"model": "m", "response": "a"}, {"model": "m"}]) is None
+
+
+@pytest.mark.skipif(not is_toon_available(), reason="python-toon not installed")
+def test_encode_for_llm_falls_back_for_other_shapes():
+    data = [{"role": "user", "content": "hi"}]
+    assert decode_toon(encode_for_llm(data)) == data
@@ -0,0 +1,131 @@
+"""Tests for background TOON savings statistics and the shared Stage 1 encoding."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_stats_are_computed_off_loop_and_visible_across_tasks(monkeypatch):
+    from .. import council
+
+    monkeypatch.setattr(council, "TOON_STATS_SAMPLE_RATE", 1.0)
+    council.reset_token_stats()
+
+    async def stage_task():
+        # Stage tasks run in a copied context (asyncio.create_task)
+        council.format_with_toon([{"model": "m", "ranking": "1. Response A"}], "stage3")
+
+    await asyncio.create_task(stage_task())
+
+    stats = await council.collect_token_stats()
+    assert stats["stage3"] is not None
+    assert stats["total"]["json_tokens"] == stats["stage3"]["json_tokens"]
+
+
+@pytest.mark.asyncio
+async def test_unsampled_requests_skip_stats(monkeypatch):
+    from .. import council
+
+    monkeypatch.setattr(council, "TOON_STATS_SAMPLE_RATE", 0.0)
+    calls = []
+    monkeypatch.setattr(council, "get_savings_stats", lambda *a: calls.append(a))
+    council.reset_token_stats()
+
+    text = council.format_with_toon([{"model": "m", "ranking": "r"}], "stage3")
+
+    assert text
+    assert (await council.collect_token_stats())["total"] is None
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_stage1_block_is_encoded_once_per_request(monkeypatch):
+    from .. import council
+
+    encoded = []
+    original = council.encode_for_llm
+
+    def counting_encode(data):
+        encoded.append(data)
+        return original(data)
+
+    monkeypatch.setattr(council, "encode_for_llm", counting_encode)
+    council.reset_token_stats()
+
+    stage1 = [
+        {"model": "m1", "response": "Answer one"},
+        {"model": "m2", "response": "  "},
+        {"model": "m3", "response": "Answer three"},
+    ]
+    text_a, mapping_a = council.encode_stage1_block(stage1)
+    text_b, mapping_b = council.encode_stage1_block([stage1[0], stage1[2]])
+
+    assert text_a == text_b
+    assert mapping_a == mapping_b == {"Response A": "m1", "Response B": "m3"}
+    assert len(encoded) == 1
+
+
+@pytest.mark.asyncio
+async def test_chairman_prompt_keeps_model_names(monkeypatch):
+    from .. import council, router_dispatch
+
+    prompts = []
+
+    async def fake_query_model(router_type, model, messages, **kwargs):
+        prompts.append(messages[0]["content"])
+        return {"content": "final"}
+
+    monkeypatch.setattr(router_dispatch, "query_model", fake_query_model)
+    council.reset_token_stats()
+
+    stage1 = [
+        {"model": "m1", "response": "Answer one"},
+        {"model": "m2", "response": ""},
+        {"model": "m3", "response": "Answer three"},
+    ]
+    await council.stage3_synthesize_final("q", stage1, [], chairman="judge")
+
+    expected = council.encode_for_llm([
+        {"model": "m1", "response": "Answer one"},
+        {"model": "m3", "response": "Answer three"},
+    ])
+    assert f"Data in TOON format:\n{expected}" in prompts[0]
+    assert "Response A" not in prompts[0]
+    assert council.encode_chairman_stage1_block(stage1) == expected
+
+
+@pytest.mark.asyncio
+async def test_provider_usage_is_added_up_per_stage(monkeypatch):
+    from .. import council, router_dispatch
+
+    council.reset_token_stats()
+
+    async def stage1_models(router_type, models, messages, **kwargs):
+        return {
+            "a": {"content": "x", "usage": {"prompt_tokens": 1000, "completion_tokens": 10, "cached_tokens": 800}},
+            "b": {"content": "y", "usage": None},
+            "c": {"error": True, "error_type": "timeout"},
+        }
+
+    async def chairman(router_type, **kwargs):
+        return {"content": "z", "usage": {"prompt_tokens": 500, "completion_tokens": 50, "cached_tokens": 0}}
+
+    monkeypatch.setattr(router_dispatch, "query_models_parallel", stage1_models)
+    monkeypatch.setattr(router_dispatch, "query_model", chairman)
+
+    stage1_results, _ = await council.stage1_collect_responses("q", models=["a", "b", "c"])
+    stage3_result = await council.stage3_synthesize_final("q", stage1_results, [], chairman="a")
+
+    # Kept with each stage result...
+    assert stage1_results[0]["usage"]["cached_tokens"] == 800
+    assert "usage" not in stage1_results[1]
+    assert stage3_result["usage"]["completion_tokens"] == 50
+
+    # ...and summed per stage and per model for the turn
+    usage = (await council.collect_token_stats())["usage"]
+    assert usage["stages"]["stage1"] == {"prompt_tokens": 1000, "completion_tokens": 10, "cached_tokens": 800, "calls": 1}
+    assert usage["models"]["a"] == {"prompt_tokens": 1500, "completion_tokens": 60, "cached_tokens": 800, "calls": 2}
+    assert usage["total"] == {"prompt_tokens": 1500, "completion_tokens": 60, "cached_tokens": 800, "calls": 2}
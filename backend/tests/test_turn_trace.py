@@ -0,0 +1,125 @@
+"""Tests for the per-turn timing trace (`timeline`)."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from .. import openrouter, turn_trace
+
+
+def test_spans_are_compact_and_only_recorded_inside_a_turn(monkeypatch):
+    with turn_trace.span("tool", "outside") as fields:
+        assert fields is None
+
+    async def turn():
+        trace = turn_trace.start()
+        with turn_trace.span("tool", "calculator"):
+            turn_trace.annotate(queue=3)
+        with pytest.raises(RuntimeError):
+            with turn_trace.span("tool", "web_search:brave"):
+                raise RuntimeError("down")
+        # Tasks created after start() record into the same trace
+        await asyncio.create_task(asyncio.to_thread(lambda: turn_trace.add("memory", "lookup", trace.started)))
+        return trace.snapshot()
+
+    snapshot = asyncio.run(turn())
+    assert [(s["kind"], s["name"]) for s in snapshot["spans"]] == [
+        ("tool", "calculator"), ("tool", "web_search:brave"), ("memory", "lookup")
+    ]
+    assert snapshot["spans"][0] == {"kind": "tool", "name": "calculator", "start": 0, "dur": 0, "queue": 3}
+    assert snapshot["spans"][1]["error"] == "RuntimeError"
+    assert isinstance(snapshot["t0"], int) and snapshot["dropped"] == 0
+    assert turn_trace.current() is None
+
+    monkeypatch.setattr(turn_trace, "TRACE_MAX_SPANS", 1)
+    trace = turn_trace.TurnTrace()
+    for _ in range(3):
+        trace.add("storage", "save_conversation", trace.started, trace.started)
+    assert len(trace.spans) == 1 and trace.snapshot()["dropped"] == 2
+
+
+@pytest.mark.asyncio
+async def test_model_call_span_has_queue_ttfb_completion_and_retries(monkeypatch):
+    monkeypatch.setattr(openrouter, "INITIAL_BACKOFF_SECONDS", 0)
+    responses = iter([
+        httpx.Response(429, json={"error": {"message": "slow down"}}),
+        httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]}),
+    ])
+    transport = httpx.MockTransport(lambda request: next(responses))
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: real_client(transport=transport, **kwargs))
+
+    trace = turn_trace.start()
+    messages = [{"role": "user", "content": "hi"}]
+    assert (await openrouter.query_model("openai/gpt-4o", messages, stage="STAGE3"))["content"] == "ok"
+
+    never = asyncio.Event()
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: real_client(
+        transport=httpx.MockTransport(lambda request: never.wait()), **kwargs
+    ))
+    task = asyncio.create_task(openrouter.query_model("slow/model", messages))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    ok, cut_off = trace.snapshot()["spans"]
+    assert ok["kind"] == "model" and ok["name"] == "openai/gpt-4o" and ok["stage"] == "STAGE3"
+    assert ok["retries"] == 1
+    assert {"queue", "ttfb", "completion"} <= set(ok)
+    assert "error" not in ok and "connect" not in ok  # No real connection under MockTransport
+    assert cut_off["name"] == "slow/model" and cut_off["error"] == "cancelled"
+    assert "ttfb" not in cut_off
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_and_stores_the_timeline():
+    from ..main import send_message_stream
+    from .. import storage
+
+    conversation_id = "00000000-0000-0000-0000-000000000050"
+    saved = []
+
+    async def mock_stage1_streaming(*args, **kwargs):
+        turn_trace.add("model", "m1", turn_trace.current().started)
+        yield {"model": "m1", "response": "r1"}
+
+    with patch.object(storage, "get_conversation", return_value={
+        "id": conversation_id,
+        "messages": [{"role": "user", "content": "earlier"}],
+        "models": None,
+        "chairman": None,
+        "execution_mode": "chat_only",
+    }), patch.object(storage, "add_user_message"), patch.object(
+        storage, "add_assistant_message", side_effect=lambda *args: saved.append(args)
+    ), patch("backend.main.stage1_collect_responses_streaming", mock_stage1_streaming), patch(
+        "backend.main.collect_token_stats", new=AsyncMock(return_value={})
+    ):
+
+        class MockRequest:
+            content = "Test query"
+            attachments = None
+            web_search = False
+            web_search_provider = None
+
+        response = await send_message_stream(conversation_id, MockRequest(), current_user="guest")
+        events = [
+            json.loads(chunk[len("data: "):])
+            async for chunk in response.body_iterator
+            if chunk.startswith("data: ")
+        ]
+
+    assert [e["type"] for e in events][-2:] == ["timeline", "complete"]
+    sent = events[-2]["data"]["spans"]
+    assert ("storage", "add_user_message") in [(s["kind"], s["name"]) for s in sent]
+    assert ("model", "m1") in [(s["kind"], s["name"]) for s in sent]
+    # Includes the save of the message; the stored copy was taken before it
+    assert ("storage", "add_assistant_message") in [(s["kind"], s["name"]) for s in sent]
+    stored = saved[0][4]["timeline"]["spans"]
+    assert [s["name"] for s in stored] == ["add_user_message", "m1"]
+    assert "queue" in stored[0]  # Wait for a storage thread
@@ -0,0 +1,123 @@
+"""Tests for the memory-mapped vector index backend."""
+
+from __future__ import annotations
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ..vector_index import ConversationIndex, ModelMismatchError, VectorIndex
+
+
+class KeywordEmbeddings:
+    """Axis-aligned vectors: texts mentioning the same keyword are similar."""
+
+    KEYWORDS = ["python", "rust", "cooking", "travel"]
+
+    def _vector(self, text):
+        return [1.0 if k in text else 0.01 for k in self.KEYWORDS]
+
+    def embed_documents(self, texts):
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+def test_search_is_scoped_to_conversation_and_ranked(tmp_path):
+    index = VectorIndex(tmp_path)
+    embeddings = KeywordEmbeddings()
+    a = ConversationIndex(index, "a", embeddings)
+    b = ConversationIndex(index, "b", embeddings)
+
+    a.add_texts(["about python", "about rust", "about cooking"])
+    b.add_texts(["about travel"])
+
+    assert a.search("python tips", k=1) == ["about python"]
+    assert a.search("rust", k=2)[0] == "about rust"
+    assert len(a.search("anything", k=10)) == 3
+    assert b.search("python", k=3) == ["about travel"]
+    assert ConversationIndex(index, "missing", embeddings).search("python") == []
+
+
+def test_index_survives_reload_and_torn_writes(tmp_path):
+    embeddings = KeywordEmbeddings()
+    index = VectorIndex(tmp_path)
+    ConversationIndex(index, "a", embeddings).add_texts(["about python", "about rust"])
+
+    # Simulate a crash after the vector append but mid-way through the sidecar line
+    with open(tmp_path / "vectors.f16", "ab") as f:
+        f.write(np.zeros(4, dtype="<f2").tobytes())
+    with open(tmp_path / "meta.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"c": "a", "t": "about coo')
+
+    reloaded = VectorIndex(tmp_path)
+    assert len(reloaded) == 2
+    assert reloaded.dim == 4
+
+    ConversationIndex(reloaded, "a", embeddings).add_texts(["about cooking"])
+    again = VectorIndex(tmp_path)
+    assert ConversationIndex(again, "a", embeddings).search("cooking", k=1) == ["about cooking"]
+
+
+def test_dimension_mismatch_is_rejected(tmp_path):
+    index = VectorIndex(tmp_path)
+    index.add("a", ["x"], [[1.0, 0.0]])
+
+    with pytest.raises(ValueError):
+        index.add("a", ["y"], [[1.0, 0.0, 0.0]])
+
+
+def test_index_built_with_another_model_is_refused(tmp_path):
+    VectorIndex(tmp_path, model="model-a").add("a", ["x"], [[1.0, 0.0]])
+
+    assert VectorIndex(tmp_path, model="model-a").count("a") == 1
+    with pytest.raises(ModelMismatchError):
+        VectorIndex(tmp_path, model="model-b")
+
+
+def test_get_vector_index_rejects_a_model_switch(tmp_path, monkeypatch):
+    from .. import vector_index
+
+    monkeypatch.setattr(vector_index, "INDEX_DIR", tmp_path)
+    vector_index.reset_vector_index()
+    try:
+        vector_index.get_vector_index("model-a").add("a", ["x"], [[1.0, 0.0]])
+        with pytest.raises(ModelMismatchError):
+            vector_index.get_vector_index("model-b")
+    finally:
+        vector_index.reset_vector_index()
+
+
+def test_removed_conversations_are_tombstoned_and_compacted(tmp_path, monkeypatch):
+    from .. import vector_index
+
+    monkeypatch.setattr(vector_index, "COMPACT_DEAD_FRACTION", 0.9)
+    embeddings = KeywordEmbeddings()
+    index = VectorIndex(tmp_path)
+    ConversationIndex(index, "a", embeddings).add_texts(["about python", "about rust"])
+    ConversationIndex(index, "b", embeddings).add_texts(["about cooking", "about travel", "about python"])
+
+    assert index.remove("a") == 2
+    assert ConversationIndex(index, "a", embeddings).search("python") == []
+    reloaded = VectorIndex(tmp_path)
+    assert (reloaded.count("a"), reloaded.count("b"), len(reloaded)) == (0, 3, 3)
+
+    assert reloaded.compact() == 2
+    assert "about rust" not in (tmp_path / "meta.1.jsonl").read_text(encoding="utf-8")
+    assert not (tmp_path / "meta.jsonl").exists()
+    again = VectorIndex(tmp_path)
+    assert again.generation == 1
+    assert ConversationIndex(again, "b", embeddings).search("travel", k=1) == ["about travel"]
+    ConversationIndex(again, "c", embeddings).add_texts(["about rust"])
+    assert ConversationIndex(VectorIndex(tmp_path), "c", embeddings).search("rust") == ["about rust"]
+
+
+def test_remove_compacts_once_enough_rows_are_dead(tmp_path):
+    index = VectorIndex(tmp_path)
+    index.add("a", ["x"], [[1.0, 0.0]])
+    index.add("b", ["y", "z"], [[0.0, 1.0], [1.0, 1.0]])
+
+    index.remove("a")
+    assert index.generation == 1
+    assert len(VectorIndex(tmp_path)) == 2
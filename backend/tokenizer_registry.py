@@ -0,0 +1,241 @@
+"""Process-wide tokenizer registry for token accounting.
+
+tiktoken downloads BPE rank files on first use, which fails (slowly, every time)
+on hosts without internet access. This registry:
+
+- resolves a model id to its encoding family once and caches the encoder;
+- seeds tiktoken's cache from bundled or locally configured `<encoding>.tiktoken`
+  files, so encoders load without network access;
+- remembers load failures for a while instead of retrying on every call;
+- exposes batched counting on top of `Encoding.encode_batch`.
+
+Bundled files live in `backend/tokenizer_data/` (populated at Docker build time via
+`python -m backend.tokenizer_registry fetch backend/tokenizer_data`). Additional files
+can be placed in `TOKENIZER_DIR` (default: `data/tokenizers`).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    tiktoken = None
+    TIKTOKEN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# cl100k_base is used by GPT-4 and is a reasonable approximation for Claude/Gemini etc.
+DEFAULT_ENCODING = "cl100k_base"
+
+# Official BPE locations. tiktoken caches files under sha1(url), which is what we seed.
+ENCODING_URLS = {
+    "r50k_base": "https://openaipublic.blob.core.windows.net/encodings/r50k_base.tiktoken",
+    "p50k_base": "https://openaipublic.blob.core.windows.net/encodings/p50k_base.tiktoken",
+    "cl100k_base": "https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken",
+    "o200k_base": "https://openaipublic.blob.core.windows.net/encodings/o200k_base.tiktoken",
+}
+
+BUNDLED_DIR = Path(__file__).parent / "tokenizer_data"
+TOKENIZER_DIR = Path(os.getenv("TOKENIZER_DIR", "data/tokenizers"))
+
+# How long a failed encoder load is remembered before we try again (seconds)
+FAILURE_TTL_SECONDS = float(os.getenv("TOKENIZER_FAILURE_TTL", "600"))
+
+# Fallback estimate when no encoder is available: ~4 characters per token
+CHARS_PER_TOKEN = 4
+
+_encoders: Dict[str, Any] = {}
+_failures: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap character-based token estimate."""
+    return len(text) // CHARS_PER_TOKEN
+
+
+@lru_cache(maxsize=512)
+def resolve_encoding_name(model: str) -> str:
+    """
+    Map a model id (optionally provider-prefixed, e.g. "openai/gpt-4o") to an encoding name.
+
+    Unknown models fall back to DEFAULT_ENCODING.
+    """
+    if not TIKTOKEN_AVAILABLE:
+        return DEFAULT_ENCODING
+
+    name = (model or "").rsplit("/", 1)[-1]
+    try:
+        return tiktoken.encoding_name_for_model(name)
+    except KeyError:
+        return DEFAULT_ENCODING
+
+
+def _cache_dir() -> Path:
+    """tiktoken cache directory (TIKTOKEN_CACHE_DIR, defaulting under TOKENIZER_DIR)."""
+    configured = os.environ.get("TIKTOKEN_CACHE_DIR")
+    if configured:
+        return Path(configured)
+    cache_dir = TOKENIZER_DIR / ".cache"
+    os.environ["TIKTOKEN_CACHE_DIR"] = str(cache_dir)
+    return cache_dir
+
+
+def _find_local_bpe(encoding_name: str) -> Optional[Path]:
+    """Find a local `<encoding>.tiktoken` file (configured dir first, then bundled)."""
+    for directory in (TOKENIZER_DIR, BUNDLED_DIR):
+        candidate = directory / f"{encoding_name}.tiktoken"
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def _seed_cache(encoding_name: str) -> bool:
+    """
+    Copy a local BPE file into tiktoken's cache so that loading needs no network.
+
+    Returns:
+        True if the cache holds a file for this encoding after the call
+    """
+    url = ENCODING_URLS.get(encoding_name)
+    if url is None:
+        return False
+
+    cache_dir = _cache_dir()
+    cached = cache_dir / hashlib.sha1(url.encode()).hexdigest()
+    if cached.is_file():
+        return True
+
+    source = _find_local_bpe(encoding_name)
+    if source is None:
+        return False
+
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = cached.with_suffix(".tmp")
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, cached)
+        logger.info("[TOKENIZER] Seeded %s from %s", encoding_name, source)
+        return True
+    except OSError as e:
+        logger.warning("[TOKENIZER] Failed to seed %s from %s: %s", encoding_name, source, e)
+        return False
+
+
+def get_encoding(model: str = "gpt-4") -> Optional[Any]:
+    """
+    Get a cached tiktoken encoder for a model.
+
+    Returns:
+        tiktoken Encoding, or None if tiktoken is missing or the encoding
+        could not be loaded recently (negative cache)
+    """
+    if not TIKTOKEN_AVAILABLE:
+        return None
+
+    encoding_name = resolve_encoding_name(model)
+    enc = _encoders.get(encoding_name)
+    if enc is not None:
+        return enc
+
+    with _lock:
+        enc = _encoders.get(encoding_name)
+        if enc is not None:
+            return enc
+
+        failed_at = _failures.get(encoding_name)
+        if failed_at is not None and time.monotonic() - failed_at < FAILURE_TTL_SECONDS:
+            return None
+
+        _seed_cache(encoding_name)
+        try:
+            enc = tiktoken.get_encoding(encoding_name)
+        except Exception as e:
+            _failures[encoding_name] = time.monotonic()
+            logger.warning(
+                "[TOKENIZER] Failed to load %s, using estimates for %.0fs: %s",
+                encoding_name, FAILURE_TTL_SECONDS, e,
+            )
+            return None
+
+        _failures.pop(encoding_name, None)
+        _encoders[encoding_name] = enc
+        return enc
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """Count tokens in text (character estimate if no encoder is available)."""
+    if not text:
+        return 0
+
+    enc = get_encoding(model)
+    if enc is None:
+        return estimate_tokens(text)
+
+    try:
+        return len(enc.encode(text, disallowed_special=()))
+    except Exception as e:
+        logger.warning("Token counting failed: %s", e)
+        return estimate_tokens(text)
+
+
+def count_tokens_many(texts: Sequence[str], model: str = "gpt-4") -> List[int]:
+    """
+    Count tokens for several texts in one call using `encode_batch`.
+
+    Returns:
+        Token counts in the same order as `texts`
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+
+    enc = get_encoding(model)
+    if enc is None:
+        return [estimate_tokens(t) for t in texts]
+
+    try:
+        return [len(tokens) for tokens in enc.encode_batch(texts, disallowed_special=())]
+    except Exception as e:
+        logger.warning("Batch token counting failed: %s", e)
+        return [estimate_tokens(t) for t in texts]
+
+
+def reset_registry() -> None:
+    """Drop cached encoders and remembered failures (used by tests and after config changes)."""
+    with _lock:
+        _encoders.clear()
+        _failures.clear()
+    resolve_encoding_name.cache_clear()
+
+
+def fetch_encodings(target_dir: str, names: Sequence[str] = ("cl100k_base", "o200k_base")) -> None:
+    """Download BPE files into `target_dir` (run where network is available, e.g. image build)."""
+    from tiktoken.load import read_file
+
+    target = Path(target_dir)
+    target.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        data = read_file(ENCODING_URLS[name])
+        (target / f"{name}.tiktoken").write_bytes(data)
+        print(f"{name}: {len(data)} bytes -> {target}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "fetch":
+        fetch_encodings(sys.argv[2], sys.argv[3:] or ("cl100k_base", "o200k_base"))
+    else:
+        print("Usage: python -m backend.tokenizer_registry fetch <dir> [encoding ...]")
+        sys.exit(1)
@@ -9,6 +9,7 @@ This module provides functions to:
 
 import json
 import logging
+import re
 from typing import Any
 
 try:
@@ -18,21 +19,101 @@ except ImportError:
     TOON_AVAILABLE = False
     logging.warning("python-toon not installed. TOON encoding disabled.")
 
-try:
-    import tiktoken
-    TIKTOKEN_AVAILABLE = True
-except ImportError:
-    TIKTOKEN_AVAILABLE = False
+from . import tokenizer_registry
+
+TIKTOKEN_AVAILABLE = tokenizer_registry.TIKTOKEN_AVAILABLE
+if not TIKTOKEN_AVAILABLE:
     logging.warning("tiktoken not installed. Token counting disabled.")
 
 logger = logging.getLogger(__name__)
 
 
+# Tabular shapes the council encodes on every turn. Rows matching one of these exactly
+# (same keys, same order, string values) go through encode_tabular instead of python-toon.
+TABULAR_SCHEMAS = (
+    ("label", "content"),
+    ("model", "response"),
+    ("model", "ranking"),
+)
+
+# Quoting rules for comma-delimited TOON string cells (same as python-toon)
+_NUMERIC_LIKE_RE = re.compile(r"[+-]?[0-9]+(?:\.[0-9]+)?(?:e[+-]?[0-9]+)?", re.IGNORECASE)
+_NEEDS_QUOTE_RE = re.compile(r'[:"\\\[\]{}\x00-\x1f,]|^[-#]|^[ \t]|[ \t]\Z')
+_OTHER_CONTROL_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_RESERVED_LITERALS = frozenset(("null", "true", "false"))
+
+
+def _encode_cell(value: str) -> str:
+    """Encode one string cell, quoting and escaping only when required."""
+    if (
+        not value
+        or value in _RESERVED_LITERALS
+        or _NEEDS_QUOTE_RE.search(value)
+        or _NUMERIC_LIKE_RE.fullmatch(value)
+    ):
+        escaped = (
+            value.replace("\\", "\\\\")
+            .replace('"', '\\"')
+            .replace("\n", "\\n")
+            .replace("\r", "\\r")
+            .replace("\t", "\\t")
+        )
+        if _OTHER_CONTROL_RE.search(escaped):
+            escaped = _OTHER_CONTROL_RE.sub(lambda m: f"\\u{ord(m.group()):04x}", escaped)
+        return '"' + escaped + '"'
+    return value
+
+
+def encode_tabular(rows: list) -> str | None:
+    """
+    Encode a list of flat string records as a TOON table in one pass.
+
+    Produces the same text as python-toon for the shapes in TABULAR_SCHEMAS.
+
+    Args:
+        rows: List of dicts
+
+    Returns:
+        TOON-formatted string, or None if rows don't match a known schema
+    """
+    if not rows or not isinstance(rows, list):
+        return None
+
+    first = rows[0]
+    if not isinstance(first, dict):
+        return None
+    fields = tuple(first)
+    if fields not in TABULAR_SCHEMAS:
+        return None
+
+    parts = [f"[{len(rows)}]{{{','.join(fields)}}}:"]
+    append = parts.append
+    for row in rows:
+        if not isinstance(row, dict) or tuple(row) != fields:
+            return None
+        cells = []
+        for value in row.values():
+            if not isinstance(value, str):
+                return None
+            cells.append(_encode_cell(value))
+        append("  " + ",".join(cells))
+
+    text = "\n".join(parts)
+    if not text.isascii():
+        # Unpaired surrogates are not valid TOON (python-toon raises as well)
+        try:
+            text.encode("utf-8")
+        except UnicodeEncodeError as e:
+            raise ValueError("String contains an unpaired surrogate and cannot be encoded") from e
+    return text
+
+
 def encode_for_llm(data: dict | list) -> str:
     """
     Convert Python data to TOON format for LLM consumption.
 
-    Falls back to JSON if TOON is not available.
+    Known council tables use the single-pass encode_tabular; other data goes
+    through python-toon. Falls back to JSON if TOON is not available.
 
     Args:
         data: Python dict or list to encode
@@ -45,7 +126,9 @@ def encode_for_llm(data: dict | list) -> str:
         return json.dumps(data, ensure_ascii=False)
 
     try:
-        result = toon_encode(data)
+        result = encode_tabular(data) if isinstance(data, list) else None
+        if result is None:
+            result = toon_encode(data)
         logger.info(f"[TOON] Encoded {len(data) if isinstance(data, list) else 1} items, {len(result)} chars")
         return result
     except Exception as e:
@@ -75,31 +158,30 @@ def decode_toon(toon_str: str) -> dict | list:
 
 def count_tokens(text: str, model: str = "gpt-4") -> int:
     """
-    Count tokens in text using tiktoken.
+    Count tokens in text using the cached tokenizer registry.
 
     Args:
         text: Text to count tokens for
         model: Model name for tokenizer selection
 
     Returns:
-        Number of tokens (or estimated count if tiktoken unavailable)
+        Number of tokens (or estimated count if no tokenizer is available)
     """
-    if not TIKTOKEN_AVAILABLE:
-        # Rough estimate: ~4 characters per token
-        return len(text) // 4
+    return tokenizer_registry.count_tokens(text, model)
 
-    try:
-        # Try to get encoding for specific model
-        try:
-            enc = tiktoken.encoding_for_model(model)
-        except KeyError:
-            # Fall back to cl100k_base (used by GPT-4, Claude, etc.)
-            enc = tiktoken.get_encoding("cl100k_base")
 
-        return len(enc.encode(text))
-    except Exception as e:
-        logger.warning(f"Token counting failed: {e}")
-        return len(text) // 4
+def count_tokens_many(texts: list[str], model: str = "gpt-4") -> list[int]:
+    """
+    Count tokens for several texts in one batched call.
+
+    Args:
+        texts: Texts to count tokens for
+        model: Model name for tokenizer selection
+
+    Returns:
+        Token counts in the same order as texts
+    """
+    return tokenizer_registry.count_tokens_many(texts, model)
 
 
 def get_savings_stats(original_data: dict | list, toon_text: str | None = None) -> dict:
@@ -115,12 +197,13 @@ def get_savings_stats(original_data: dict | list, toon_text: str | None = None)
     """
     # Get JSON representation
     json_text = json.dumps(original_data, ensure_ascii=False)
-    json_tokens = count_tokens(json_text)
 
     # Get TOON representation
     if toon_text is None:
         toon_text = encode_for_llm(original_data)
-    toon_tokens = count_tokens(toon_text)
+
+    # Count both in one batch
+    json_tokens, toon_tokens = count_tokens_many([json_text, toon_text])
 
     # Calculate savings
     if json_tokens > 0:
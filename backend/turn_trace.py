@@ -0,0 +1,122 @@
+"""Per-turn timing trace (the `timeline` of a council turn).
+
+A turn's coarse `stage*_duration` values do not say why it was slow: a 429
+retry, a slow TLS handshake, a model that took 80 s to its first byte, a slow
+search tool or a storage write stuck behind the thread pool. `start()` begins a
+trace for the current turn. The model calls, tools, memory lookups, storage
+operations and council stages of that turn (including asyncio tasks created
+after `start()`, which copy the context) then add spans to it.
+
+Spans are dicts with times in whole milliseconds since the start of the turn,
+and only the fields that apply:
+- kind: "stage", "model", "tool", "memory" or "storage"
+- name: stage, model id, tool name or operation
+- start, dur
+- model calls: queue (call start to first request), connect (TCP + TLS) and
+  ttfb (request to response headers, including connect) of the last attempt,
+  completion (response headers to end), retries (after 429), stage
+- storage: queue (wait for a storage thread)
+- error: error_type, or "cancelled" (e.g. a model cut off by a stage timeout)
+
+`snapshot()` returns {"t0": turn start (epoch ms), "spans": [...], "dropped": n}.
+It is sent as the `timeline` SSE event and stored in the message metadata. The
+stored copy cannot include the write that stores it. At most TRACE_MAX_SPANS
+spans are kept per turn.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import time
+from typing import Any, Dict, List, Optional
+
+TRACE_MAX_SPANS = 300
+
+_trace_var: contextvars.ContextVar[Optional["TurnTrace"]] = contextvars.ContextVar("turn_trace", default=None)
+_span_var: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("turn_span", default=None)
+
+
+def to_ms(seconds: float) -> int:
+    return int(round(seconds * 1000))
+
+
+class TurnTrace:
+    """Spans of one turn. Shared by the turn's tasks, so it is only appended to."""
+
+    __slots__ = ("started", "epoch", "spans", "dropped")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.epoch = time.time()
+        self.spans: List[Dict[str, Any]] = []
+        self.dropped = 0
+
+    def add(self, kind: str, name: str, start: float, end: float, **fields: Any) -> Optional[Dict[str, Any]]:
+        """Add a span from perf_counter() times; fields that are None are left out."""
+        if len(self.spans) >= TRACE_MAX_SPANS:
+            self.dropped += 1
+            return None
+        span = {"kind": kind, "name": name, "start": to_ms(start - self.started), "dur": to_ms(end - start)}
+        span.update((key, value) for key, value in fields.items() if value is not None)
+        self.spans.append(span)
+        return span
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "t0": to_ms(self.epoch),
+            "spans": sorted((dict(span) for span in self.spans), key=lambda span: span["start"]),
+            "dropped": self.dropped,
+        }
+
+
+def start() -> TurnTrace:
+    """Begin tracing the current turn (replaces any trace of this context)."""
+    trace = TurnTrace()
+    _trace_var.set(trace)
+    return trace
+
+
+def current() -> Optional[TurnTrace]:
+    return _trace_var.get()
+
+
+def add(kind: str, name: str, start: float, end: Optional[float] = None, **fields: Any) -> None:
+    """Add a span to the current turn's trace, if any."""
+    trace = _trace_var.get()
+    if trace is not None:
+        trace.add(kind, name, start, time.perf_counter() if end is None else end, **fields)
+
+
+@contextlib.contextmanager
+def span(kind: str, name: str):
+    """
+    Record the enclosed code as a span of the current turn.
+
+    Yields the span's extra fields (a dict, or None outside a turn); code inside
+    can add to them, e.g. via `annotate()`. An exception is recorded as error.
+    """
+    trace = _trace_var.get()
+    if trace is None:
+        yield None
+        return
+    fields: Dict[str, Any] = {}
+    token = _span_var.set(fields)
+    started = time.perf_counter()
+    try:
+        yield fields
+    except BaseException as e:
+        fields.setdefault("error", "cancelled" if isinstance(e, asyncio.CancelledError) else type(e).__name__)
+        raise
+    finally:
+        _span_var.reset(token)
+        trace.add(kind, name, started, time.perf_counter(), **fields)
+
+
+def annotate(**fields: Any) -> None:
+    """Add fields to the innermost open span() of this task, if any."""
+    current_fields = _span_var.get()
+    if current_fields is not None:
+        current_fields.update(fields)
+
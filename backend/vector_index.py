@@ -0,0 +1,435 @@
+"""Memory-mapped vector index for conversation memory (MEMORY_BACKEND=mmap).
+
+An alternative to one Chroma directory per conversation. All conversations share
+a single index directory (`MEMORY_INDEX_DIR`, default `data/memory_index`):
+
+- `vectors.f16`: append-only matrix of L2-normalised float16 rows, memory-mapped
+  for search;
+- `meta.jsonl`: one line per row with the conversation id and stored text;
+- `deleted.jsonl`: tombstones of deleted conversations;
+- `index.json`: header with the embedding dimension, model id and file generation.
+
+Rows of a conversation are located through per-conversation offsets built from the
+sidecar at load time, and top-k search is a single NumPy dot product over them.
+An index built with another embedding model is refused rather than mixed with new
+vectors. Compaction rewrites the files without deleted rows under the next
+generation's names (`vectors.<n>.f16`, ...).
+
+Migrate existing Chroma stores with:
+    python -m backend.vector_index migrate [--memory-dir data/memory]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = Path(os.getenv("MEMORY_INDEX_DIR", "data/memory_index"))
+
+VECTORS_FILE = "vectors{}.f16"
+META_FILE = "meta{}.jsonl"
+TOMBSTONES_FILE = "deleted{}.jsonl"
+HEADER_FILE = "index.json"
+ROW_DTYPE = "<f2"
+
+# Compact once this fraction of the rows belongs to deleted conversations
+COMPACT_DEAD_FRACTION = 0.25
+
+
+class ModelMismatchError(ValueError):
+    """The index on disk was built with a different embedding model."""
+
+
+class VectorIndex:
+    """Append-only float16 vector index shared by all conversations."""
+
+    def __init__(self, directory: Path, dim: Optional[int] = None, model: str = ""):
+        self.directory = Path(directory)
+        self.dim = dim
+        self.model = model
+        self.generation = 0
+        self._offsets: Dict[str, List[int]] = {}
+        self._texts: List[Optional[str]] = []  # None for rows of deleted conversations
+        self._rows = 0
+        self._dead = 0
+        self._mmap = None
+        self._mapped_rows = 0
+        self._lock = threading.RLock()
+        self._load()
+
+    def _file(self, pattern: str, generation: Optional[int] = None) -> Path:
+        generation = self.generation if generation is None else generation
+        return self.directory / pattern.format(f".{generation}" if generation else "")
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self._file(VECTORS_FILE)
+
+    @property
+    def _meta_path(self) -> Path:
+        return self._file(META_FILE)
+
+    @property
+    def _tombstones_path(self) -> Path:
+        return self._file(TOMBSTONES_FILE)
+
+    @property
+    def _header_path(self) -> Path:
+        return self.directory / HEADER_FILE
+
+    def _load(self) -> None:
+        if self._header_path.exists():
+            header = json.loads(self._header_path.read_text(encoding="utf-8"))
+            if self.dim is not None and header["dim"] != self.dim:
+                raise ValueError(
+                    f"Index at {self.directory} has dim {header['dim']}, expected {self.dim}"
+                )
+            stored_model = header.get("model") or ""
+            if self.model and stored_model and stored_model != self.model:
+                raise ModelMismatchError(
+                    f"Index at {self.directory} was built with embedding model {stored_model!r}, "
+                    f"current model is {self.model!r}"
+                )
+            self.dim = header["dim"]
+            self.model = stored_model or self.model
+            self.generation = header.get("generation", 0)
+
+        if not self._meta_path.exists():
+            return
+
+        # Rows of a conversation added before it was deleted
+        deleted: Dict[str, int] = {}
+        if self._tombstones_path.exists():
+            with open(self._tombstones_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.endswith("\n"):
+                        record = json.loads(line)
+                        deleted[record["c"]] = max(deleted.get(record["c"], 0), record["rows"])
+
+        valid_bytes = 0
+        with open(self._meta_path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    record = None
+                if record is None or not line.endswith(b"\n"):
+                    # A torn final line from an interrupted append
+                    break
+                row = len(self._texts)
+                if row < deleted.get(record["c"], 0):
+                    self._texts.append(None)
+                    self._dead += 1
+                else:
+                    self._offsets.setdefault(record["c"], []).append(row)
+                    self._texts.append(record["t"])
+                valid_bytes += len(line)
+        if valid_bytes < self._meta_path.stat().st_size:
+            with open(self._meta_path, "r+b") as f:
+                f.truncate(valid_bytes)
+
+        # Vectors are written before metadata, so the sidecar decides how many rows are valid
+        self._rows = len(self._texts)
+        if self.dim:
+            stored_rows = self._vectors_path.stat().st_size // (self.dim * 2) if self._vectors_path.exists() else 0
+            if stored_rows < self._rows:
+                raise ValueError(f"Index at {self.directory} is missing vectors for {self._rows - stored_rows} rows")
+            if stored_rows > self._rows:
+                with open(self._vectors_path, "r+b") as f:
+                    f.truncate(self._rows * self.dim * 2)
+
+    def _write_header(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._header_path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({"dim": self.dim, "model": self.model, "generation": self.generation}), encoding="utf-8"
+        )
+        os.replace(tmp_path, self._header_path)
+
+    def _matrix(self):
+        """Memory-mapped view of all rows (remapped when the file has grown)."""
+        if self._rows == 0:
+            return None
+        if self._mmap is None or self._mapped_rows < self._rows:
+            self._mmap = np.memmap(
+                self._vectors_path, dtype=ROW_DTYPE, mode="r", shape=(self._rows, self.dim)
+            )
+            self._mapped_rows = self._rows
+        return self._mmap
+
+    def __len__(self) -> int:
+        return self._rows - self._dead
+
+    def conversation_ids(self) -> List[str]:
+        return list(self._offsets)
+
+    def count(self, conversation_id: str) -> int:
+        return len(self._offsets.get(conversation_id, ()))
+
+    def add(self, conversation_id: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """Append texts and their embeddings for a conversation."""
+        if len(texts) != len(vectors):
+            raise ValueError("texts and vectors must have the same length")
+        if not texts:
+            return
+
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2:
+            raise ValueError("vectors must be a 2-D sequence")
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = (matrix / np.where(norms == 0, 1, norms)).astype(ROW_DTYPE)
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+                self._write_header()
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dim vectors, got {matrix.shape[1]}")
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self._vectors_path, "ab") as f:
+                f.write(matrix.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._meta_path, "a", encoding="utf-8") as f:
+                for text in texts:
+                    f.write(json.dumps({"c": conversation_id, "t": text}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            rows = self._offsets.setdefault(conversation_id, [])
+            for text in texts:
+                rows.append(self._rows)
+                self._texts.append(text)
+                self._rows += 1
+
+    def remove(self, conversation_id: str) -> int:
+        """
+        Forget a conversation's rows (e.g. after it was deleted).
+
+        A tombstone is appended and the rows are dropped from the files at the next
+        compaction, which runs once COMPACT_DEAD_FRACTION of the rows are dead.
+
+        Returns:
+            Number of removed rows
+        """
+        with self._lock:
+            rows = self._offsets.pop(conversation_id, None)
+            if not rows:
+                return 0
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self._tombstones_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"c": conversation_id, "rows": self._rows}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            for row in rows:
+                self._texts[row] = None
+            self._dead += len(rows)
+            if self._dead >= self._rows * COMPACT_DEAD_FRACTION:
+                self.compact()
+            return len(rows)
+
+    def compact(self) -> int:
+        """
+        Rewrite the index without the rows of deleted conversations.
+
+        The live rows are written to files of the next generation, which the header
+        switches to atomically; a crash before that leaves the current files in use.
+
+        Returns:
+            Number of dropped rows
+        """
+        with self._lock:
+            if not self._dead:
+                return 0
+            live = [row for row, text in enumerate(self._texts) if text is not None]
+            generation = self.generation + 1
+            vectors_path = self._file(VECTORS_FILE, generation)
+            meta_path = self._file(META_FILE, generation)
+
+            conversation_of = {row: cid for cid, rows in self._offsets.items() for row in rows}
+            with open(vectors_path, "wb") as f:
+                if live:
+                    f.write(np.ascontiguousarray(self._matrix()[live]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(meta_path, "w", encoding="utf-8") as f:
+                for row in live:
+                    f.write(json.dumps({"c": conversation_of[row], "t": self._texts[row]}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            old_files = [self._vectors_path, self._meta_path, self._tombstones_path]
+            dropped = self._dead
+            self.generation = generation
+            self._write_header()
+
+            self._offsets = {}
+            for new_row, row in enumerate(live):
+                self._offsets.setdefault(conversation_of[row], []).append(new_row)
+            self._texts = [self._texts[row] for row in live]
+            self._rows = len(live)
+            self._dead = 0
+            self._mmap = None
+            self._mapped_rows = 0
+            for path in old_files:
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            logger.info("[MEMORY] Compacted vector index: dropped %d rows, %d remain", dropped, self._rows)
+            return dropped
+
+    def search(self, conversation_id: str, query_vector: Sequence[float], k: int = 3) -> List[str]:
+        """Return up to k stored texts of a conversation, most similar first."""
+        with self._lock:
+            rows = list(self._offsets.get(conversation_id, ()))
+            if not rows:
+                return []
+            candidates = self._matrix()[rows]
+            texts = [self._texts[row] for row in rows]
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        scores = candidates.astype(np.float32) @ query
+
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [texts[i] for i in top]
+
+
+_index: Optional[VectorIndex] = None
+_index_lock = threading.Lock()
+_rejected_models: set = set()
+
+
+def get_vector_index(model: str = "") -> VectorIndex:
+    """
+    Process-wide index instance in INDEX_DIR.
+
+    Raises:
+        ModelMismatchError: If the index was built with a different embedding model
+            (vectors from different models are not comparable; point MEMORY_INDEX_DIR
+            elsewhere or remove the index to start over)
+    """
+    global _index
+    index = _index
+    if index is not None and (not model or not index.model or index.model == model):
+        if model and not index.model:
+            index.model = model
+        return index
+    with _index_lock:
+        if _index is None or (model and _index.model and _index.model != model):
+            try:
+                _index = VectorIndex(INDEX_DIR, model=model)
+            except ModelMismatchError as e:
+                if model not in _rejected_models:
+                    _rejected_models.add(model)
+                    logger.error("[MEMORY] Vector index disabled: %s", e)
+                raise
+        elif model and not _index.model:
+            _index.model = model
+        return _index
+
+
+def remove_conversation(conversation_id: str) -> int:
+    """Drop a conversation from the index in INDEX_DIR (no-op if there is no index)."""
+    if _index is None and not (INDEX_DIR / HEADER_FILE).exists():
+        return 0
+    return get_vector_index().remove(conversation_id)
+
+
+def reset_vector_index() -> None:
+    """Forget the loaded index (tests and after migrations)."""
+    global _index
+    with _index_lock:
+        _index = None
+        _rejected_models.clear()
+
+
+class ConversationIndex:
+    """Per-conversation view of the shared index with an embeddings function."""
+
+    def __init__(self, index: VectorIndex, conversation_id: str, embeddings: Any):
+        self.index = index
+        self.conversation_id = conversation_id
+        self.embeddings = embeddings
+
+    def add_texts(self, texts: List[str]) -> None:
+        self.add_embedded(texts, self.embeddings.embed_documents(texts))
+
+    def add_embedded(self, texts: List[str], vectors: List[List[float]]) -> None:
+        self.index.add(self.conversation_id, texts, vectors)
+
+    def search(self, query: str, k: int = 3) -> List[str]:
+        if not self.index.count(self.conversation_id):
+            return []
+        return self.search_by_vector(self.embeddings.embed_query(query), k)
+
+    def search_by_vector(self, vector: Sequence[float], k: int = 3) -> List[str]:
+        return self.index.search(self.conversation_id, vector, k)
+
+
+def migrate_from_chroma(memory_dir: Path, index: VectorIndex) -> Dict[str, int]:
+    """
+    Copy documents and stored embeddings from per-conversation Chroma stores.
+
+    Conversations already present in the index are skipped, so the migration can be re-run.
+
+    Returns:
+        Number of migrated rows per conversation id
+    """
+    from langchain_community.vectorstores import Chroma
+
+    migrated: Dict[str, int] = {}
+    for store_path in sorted(p for p in Path(memory_dir).iterdir() if p.is_dir()):
+        conversation_id = store_path.name
+        if index.count(conversation_id):
+            continue
+        store = Chroma(
+            collection_name=f"conv_{conversation_id}",
+            persist_directory=str(store_path),
+        )
+        data = store.get(include=["documents", "embeddings"])
+        documents = data.get("documents") or []
+        embeddings = data.get("embeddings")
+        if embeddings is None or not len(documents):
+            continue
+        index.add(conversation_id, list(documents), [list(v) for v in embeddings])
+        migrated[conversation_id] = len(documents)
+        logger.info("[MEMORY] Migrated %d rows for %s", len(documents), conversation_id)
+    return migrated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory vector index tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="copy existing Chroma stores into the mmap index")
+    migrate.add_argument("--memory-dir", default="data/memory")
+    migrate.add_argument("--index-dir", default=str(INDEX_DIR))
+    compact = sub.add_parser("compact", help="drop rows of deleted conversations")
+    compact.add_argument("--index-dir", default=str(INDEX_DIR))
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        print(f"Dropped {VectorIndex(Path(args.index_dir)).compact()} rows")
+    else:
+        result = migrate_from_chroma(Path(args.memory_dir), VectorIndex(Path(args.index_dir)))
+        print(f"Migrated {sum(result.values())} rows from {len(result)} conversations")
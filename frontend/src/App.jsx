@@ -12,8 +12,14 @@ import { api } from './api';
 import { exportToMarkdown, generateFilename } from './utils/exportMarkdown';
 import './App.css';
 
+// Conversations per sidebar page and messages loaded when opening a conversation
+const CONVERSATION_PAGE_SIZE = 50;
+const MESSAGE_WINDOW = 20;
+
 function App() {
   const [conversations, setConversations] = useState([]);
+  const [conversationsCursor, setConversationsCursor] = useState(null);
+  const loadedConversationCountRef = useRef(0);
   const [currentConversationId, setCurrentConversationId] = useState(null);
   const [currentConversation, setCurrentConversation] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
@@ -136,20 +142,57 @@ function App() {
 
   const loadConversations = async () => {
     try {
-      const convs = await api.listConversations();
+      // Refresh as many conversations as are already shown (at least one page)
+      const limit = Math.min(500, Math.max(CONVERSATION_PAGE_SIZE, loadedConversationCountRef.current));
+      const { conversations: convs, nextCursor } = await api.listConversationsPage({ limit });
+      loadedConversationCountRef.current = convs.length;
       setConversations(convs);
+      setConversationsCursor(nextCursor);
     } catch (error) {
       console.error('加载对话列表失败:', error);
     }
   };
 
+  const loadMoreConversations = async () => {
+    if (!conversationsCursor) return;
+    try {
+      const { conversations: page, nextCursor } = await api.listConversationsPage({
+        limit: CONVERSATION_PAGE_SIZE,
+        cursor: conversationsCursor,
+      });
+      setConversations((prev) => {
+        const known = new Set(prev.map((conv) => conv.id));
+        const merged = [...prev, ...page.filter((conv) => !known.has(conv.id))];
+        loadedConversationCountRef.current = merged.length;
+        return merged;
+      });
+      setConversationsCursor(nextCursor);
+    } catch (error) {
+      console.error('加载对话列表失败:', error);
+    }
+  };
+
+  const loadEarlierMessages = async () => {
+    const conv = currentConversation;
+    if (!conv || !conv.message_offset) return;
+    try {
+      const page = await api.getMessages(conv.id, { before: conv.message_offset, limit: MESSAGE_WINDOW });
+      setCurrentConversation((prev) => {
+        if (!prev || prev.id !== conv.id || prev.message_offset !== conv.message_offset) return prev;
+        return { ...prev, messages: [...page.messages, ...prev.messages], message_offset: page.offset };
+      });
+    } catch (error) {
+      console.error('加载消息失败:', error);
+    }
+  };
+
   const loadConversation = async (id) => {
     try {
       // Check if we have streaming state for this conversation
       const streamingState = streamingStateRef.current.get(id);
       if (streamingState) {
         // Restore streaming state (has intermediate results)
-        const conv = await api.getConversation(id);
+        const conv = await api.getConversation(id, { messagesLimit: MESSAGE_WINDOW });
         setCurrentConversation({
           ...conv,
           messages: streamingState.messages
@@ -158,7 +201,7 @@ function App() {
         return;
       }
 
-      const conv = await api.getConversation(id);
+      const conv = await api.getConversation(id, { messagesLimit: MESSAGE_WINDOW });
       setCurrentConversation(conv);
     } catch (error) {
       console.error('加载对话失败:', error);
@@ -286,6 +329,9 @@ function App() {
     try {
       // Optimistically add user message to UI
       const userMessage = { role: 'user', content };
+      if (attachments?.length) {
+        userMessage.attachments = attachments.map(({ id, filename, file_type }) => ({ id, filename, file_type }));
+      }
       setCurrentConversation((prev) => ({
         ...prev,
         messages: [...prev.messages, userMessage],
@@ -514,7 +560,7 @@ function App() {
               // Auto-upload to Google Drive if configured
               if (driveStatus.configured && pendingMessageRef.current) {
                 const userContent = pendingMessageRef.current;
-                const msgIndex = prev.messages.length - 1;
+                const msgIndex = (prev.message_offset || 0) + prev.messages.length - 1;
                 const md = exportToMarkdown(userContent, newLastMsg);
                 api.uploadToDrive(generateFilename(msgIndex), md)
                   .then((result) => {
@@ -544,6 +590,19 @@ function App() {
             });
             break;
 
+          case 'timeline':
+            // Per-call timing spans of the turn (also stored in message metadata)
+            updateStreamingState((prev) => {
+              const lastIdx = prev.messages.length - 1;
+              const lastMsg = prev.messages[lastIdx];
+              const newLastMsg = {
+                ...lastMsg,
+                metadata: { ...(lastMsg.metadata || {}), timeline: event.data }
+              };
+              return { ...prev, messages: [...prev.messages.slice(0, -1), newLastMsg] };
+            });
+            break;
+
           case 'title_complete':
             // Reload conversations to get updated title
             loadConversations();
@@ -672,6 +731,8 @@ function App() {
         onDeleteConversation={handleDeleteConversation}
         onDeleteAllConversations={handleDeleteAllConversations}
         onUpdateTitle={handleUpdateTitle}
+        hasMore={Boolean(conversationsCursor)}
+        onLoadMore={loadMoreConversations}
       />
       <ErrorBoundary>
         <ChatInterface
@@ -679,6 +740,7 @@ function App() {
           onSendMessage={handleSendMessage}
           onAbort={handleAbortStream}
           onUploadFile={api.uploadFile}
+          onLoadEarlier={loadEarlierMessages}
           isLoading={isLoading}
           webSearchAvailable={webSearchAvailable}
           tavilyEnabled={tavilyEnabled}
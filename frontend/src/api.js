@@ -75,6 +75,60 @@ async function authFetch(url, options = {}) {
   return response;
 }
 
+/**
+ * SHA-256 of a file as hex (the attachment id the backend assigns), or null
+ * where WebCrypto is unavailable (plain-HTTP origins other than localhost).
+ * @param {File} file
+ * @returns {Promise<string|null>}
+ */
+async function sha256Hex(file) {
+  if (!globalThis.crypto?.subtle) return null;
+  const digest = await crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('');
+}
+
+/**
+ * Read a `data: <json>` SSE response body, calling onEvent with each parsed event.
+ * @param {Response} response
+ * @param {Function} onEvent
+ */
+async function readEventStream(response, onEvent) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  const parse = (line, final) => {
+    if (!line.startsWith('data: ')) return null;
+    try {
+      return JSON.parse(line.slice(6));
+    } catch (e) {
+      // An incomplete final chunk is expected when the stream is cut off
+      if (!final) console.error('解析 SSE 事件失败:', e);
+      return null;
+    }
+  };
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+
+    // Keep the last incomplete line in the buffer
+    buffer = lines.pop() || '';
+
+    for (const line of lines) {
+      const event = parse(line, false);
+      if (event) onEvent(event);
+    }
+  }
+
+  // Process any remaining data in buffer
+  const event = parse(buffer, true);
+  if (event) onEvent(event);
+}
+
 export const api = {
   /**
    * Get authentication status from backend.
@@ -90,11 +144,29 @@ export const api = {
   },
 
   /**
-   * Upload and parse a file. Requires authentication.
+   * Upload a file to the attachment store. Requires authentication.
+   * Files the server already has (same SHA-256) are not sent again.
+   * PDFs are converted on the server; their conversion progress is reported to onProgress.
    * @param {File} file - The file to upload
-   * @returns {Promise<{filename: string, file_type: string, content: string, char_count: number}>}
+   * @param {Object} options - Optional settings
+   * @param {string} options.pages - PDF page range to convert, e.g. "1-5,8" (default all pages)
+   * @param {Function} options.onProgress - Called with (done, total) pages while a PDF is converted
+   * @returns {Promise<{id: string, filename: string, file_type: string, char_count: number, byte_size: number}>}
    */
-  async uploadFile(file) {
+  async uploadFile(file, options = {}) {
+    const isPdf = file.name.toLowerCase().endsWith('.pdf');
+    const id = await sha256Hex(file);
+    if (id) {
+      const existing = await authFetch(`${API_BASE}/api/attachments/${id}`);
+      if (existing.ok) {
+        const meta = await existing.json();
+        // A PDF is only complete once all its pages are converted (char_count is set then)
+        if (!isPdf || (meta.char_count != null && !options.pages)) {
+          return { ...meta, filename: file.name };
+        }
+      }
+    }
+
     const formData = new FormData();
     formData.append('file', file);
 
@@ -104,7 +176,14 @@ export const api = {
       headers['Authorization'] = `Bearer ${token}`;
     }
 
-    const response = await fetch(`${API_BASE}/api/upload`, {
+    const params = new URLSearchParams();
+    if (isPdf) {
+      params.set('stream', 'true');
+      if (options.pages) params.set('pages', options.pages);
+    }
+    const query = params.toString() ? `?${params}` : '';
+
+    const response = await fetch(`${API_BASE}/api/upload${query}`, {
       method: 'POST',
       headers,
       body: formData,
@@ -120,7 +199,25 @@ export const api = {
       throw new Error(error.detail || '上传文件失败');
     }
 
-    return response.json();
+    if (!isPdf) {
+      return response.json();
+    }
+
+    // PDF: SSE stream of conversion progress, ending in the attachment or an error
+    let result = null;
+    await readEventStream(response, (event) => {
+      if (event.type === 'progress') {
+        options.onProgress?.(event.done, event.total);
+      } else if (event.type === 'complete') {
+        result = event.data;
+      } else if (event.type === 'error') {
+        throw new Error(event.message || '解析文件失败');
+      }
+    });
+    if (!result) {
+      throw new Error('解析文件失败');
+    }
+    return result;
   },
 
   /**
@@ -254,12 +351,36 @@ export const api = {
     return response.json();
   },
 
+  /**
+   * List one page of conversations, newest first. Requires authentication.
+   * @param {Object} options
+   * @param {number} options.limit - Page size
+   * @param {string} options.cursor - nextCursor of the previous page
+   * @returns {Promise<{conversations: Object[], nextCursor: string|null}>}
+   */
+  async listConversationsPage({ limit = 50, cursor = null } = {}) {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (cursor) params.set('cursor', cursor);
+    const response = await authFetch(`${API_BASE}/api/conversations?${params}`);
+    if (!response.ok) {
+      throw new Error('获取对话列表失败');
+    }
+    return {
+      conversations: await response.json(),
+      nextCursor: response.headers.get('X-Next-Cursor'),
+    };
+  },
+
   /**
    * Get a specific conversation. Requires authentication.
+   * @param {string} conversationId
+   * @param {Object} options
+   * @param {number} options.messagesLimit - Only load the most recent messages
    */
-  async getConversation(conversationId) {
+  async getConversation(conversationId, { messagesLimit } = {}) {
+    const query = messagesLimit ? `?messages_limit=${messagesLimit}` : '';
     const response = await authFetch(
-      `${API_BASE}/api/conversations/${conversationId}`
+      `${API_BASE}/api/conversations/${conversationId}${query}`
     );
     if (!response.ok) {
       throw new Error('获取对话失败');
@@ -267,6 +388,26 @@ export const api = {
     return response.json();
   },
 
+  /**
+   * Load earlier messages of a conversation. Requires authentication.
+   * @param {string} conversationId
+   * @param {Object} options
+   * @param {number} options.before - Position of the first message already loaded
+   * @param {number} options.limit - Number of messages to load
+   * @returns {Promise<{messages: Object[], offset: number, total: number}>}
+   */
+  async getMessages(conversationId, { before, limit = 20 } = {}) {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (before !== undefined && before !== null) params.set('before', String(before));
+    const response = await authFetch(
+      `${API_BASE}/api/conversations/${conversationId}/messages?${params}`
+    );
+    if (!response.ok) {
+      throw new Error('获取消息失败');
+    }
+    return response.json();
+  },
+
   /**
    * Send a message in a conversation. Requires authentication.
    */
@@ -344,7 +485,7 @@ export const api = {
    * @param {string} conversationId - The conversation ID
    * @param {string} content - The message content
    * @param {function} onEvent - Callback function for each event: (eventType, data) => void
-   * @param {Array} attachments - Optional array of file attachments
+   * @param {Array} attachments - Optional array of uploaded attachments (as returned by uploadFile)
    * @param {string} webSearchProvider - Web search provider: 'off', 'duckduckgo', 'tavily', 'exa', or 'brave'
    * @param {Object} options - Optional fetch options (e.g., { signal })
    * @returns {Promise<void>}
@@ -352,7 +493,10 @@ export const api = {
   async sendMessageStream(conversationId, content, onEvent, attachments = null, webSearchProvider = 'off', options = {}) {
     const body = { content };
     if (attachments && attachments.length > 0) {
-      body.attachments = attachments;
+      // Attachments are sent by id; the server loads their content
+      body.attachments = attachments.map(({ id, filename, file_type, mime_type, pages }) => ({
+        id, filename, file_type, mime_type, pages,
+      }));
     }
     if (webSearchProvider && webSearchProvider !== 'off') {
       body.web_search_provider = webSearchProvider;
@@ -374,43 +518,14 @@ export const api = {
       throw new Error('发送消息失败');
     }
 
-    const reader = response.body.getReader();
-    const decoder = new TextDecoder();
-    let buffer = '';
-
-    while (true) {
-      const { done, value } = await reader.read();
-      if (done) break;
-
-      buffer += decoder.decode(value, { stream: true });
-      const lines = buffer.split('\n');
-
-      // Keep the last incomplete line in the buffer
-      buffer = lines.pop() || '';
-
-      for (const line of lines) {
-        if (line.startsWith('data: ')) {
-          const data = line.slice(6);
-          try {
-            const event = JSON.parse(data);
-            onEvent(event.type, event);
-          } catch (e) {
-            console.error('解析 SSE 事件失败:', e);
-          }
-        }
-      }
-    }
-
-    // Process any remaining data in buffer
-    if (buffer.startsWith('data: ')) {
-      const data = buffer.slice(6);
+    await readEventStream(response, (event) => {
       try {
-        const event = JSON.parse(data);
         onEvent(event.type, event);
-      } catch {
-        // Ignore incomplete final chunk
+      } catch (e) {
+        // A failing handler must not end the stream
+        console.error('处理 SSE 事件失败:', e);
       }
-    }
+    });
   },
 
   /**
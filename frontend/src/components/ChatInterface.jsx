@@ -92,6 +92,7 @@ export default function ChatInterface({
   onSendMessage,
   onAbort,
   onUploadFile,
+  onLoadEarlier,
   isLoading,
   webSearchAvailable = false,
   tavilyEnabled = false,
@@ -102,6 +103,7 @@ export default function ChatInterface({
   const [input, setInput] = useState('');
   const [attachments, setAttachments] = useState([]);
   const [isUploading, setIsUploading] = useState(false);
+  const [parseProgress, setParseProgress] = useState(null); // { done, total } while a PDF is converted
   const [webSearchProvider, setWebSearchProvider] = useState('off'); // 'off', 'duckduckgo', 'tavily', 'exa', 'brave'
   const [driveStatus, setDriveStatus] = useState({ enabled: false, configured: false });
   const [driveUploading, setDriveUploading] = useState({});
@@ -141,10 +143,28 @@ export default function ChatInterface({
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   };
 
+  // Earlier messages are prepended (offset decreases); keep the scroll position then
+  const messageOffsetRef = useRef(0);
+  const [loadingEarlier, setLoadingEarlier] = useState(false);
+
   useEffect(() => {
-    scrollToBottom();
+    const offset = conversation?.message_offset || 0;
+    const prepended = conversation?.id === messageOffsetRef.conversationId && offset < messageOffsetRef.current;
+    messageOffsetRef.current = offset;
+    messageOffsetRef.conversationId = conversation?.id;
+    if (!prepended) scrollToBottom();
   }, [conversation]);
 
+  const handleLoadEarlier = async () => {
+    if (!onLoadEarlier || loadingEarlier) return;
+    setLoadingEarlier(true);
+    try {
+      await onLoadEarlier();
+    } finally {
+      setLoadingEarlier(false);
+    }
+  };
+
   // 根据内容自动调整输入框高度
   const adjustTextareaHeight = () => {
     const textarea = textareaRef.current;
@@ -163,6 +183,7 @@ export default function ChatInterface({
     if (input.trim() && !isLoading && !isUploading) {
       onSendMessage(input, attachments.length > 0 ? attachments : null, webSearchProvider);
       setInput('');
+      attachments.forEach((att) => att.preview && URL.revokeObjectURL(att.preview));
       setAttachments([]);
       // Keep webSearchProvider value for next query
     }
@@ -209,14 +230,19 @@ export default function ChatInterface({
     setIsUploading(true);
     try {
       for (const file of files) {
-        const result = await onUploadFile(file);
-        setAttachments((prev) => [...prev, result]);
+        const result = await onUploadFile(file, {
+          onProgress: (done, total) => setParseProgress({ done, total }),
+        });
+        // Thumbnails come from the local file; the server only returns an id
+        const preview = result.file_type === 'image' ? URL.createObjectURL(file) : null;
+        setAttachments((prev) => [...prev, { ...result, preview }]);
       }
     } catch (error) {
       console.error('文件上传失败:', error);
       alert(`文件上传失败: ${error.message}`);
     } finally {
       setIsUploading(false);
+      setParseProgress(null);
       // 清空文件输入框
       if (fileInputRef.current) {
         fileInputRef.current.value = '';
@@ -225,7 +251,10 @@ export default function ChatInterface({
   };
 
   const handleRemoveAttachment = (index) => {
-    setAttachments((prev) => prev.filter((_, i) => i !== index));
+    setAttachments((prev) => {
+      if (prev[index]?.preview) URL.revokeObjectURL(prev[index].preview);
+      return prev.filter((_, i) => i !== index);
+    });
   };
 
   if (!conversation) {
@@ -239,9 +268,22 @@ export default function ChatInterface({
     );
   }
 
+  // Only the most recent messages may be loaded; positions are relative to the whole conversation
+  const messageOffset = conversation.message_offset || 0;
+
   return (
     <div className="chat-interface">
       <div className="messages-container">
+        {messageOffset > 0 && onLoadEarlier && (
+          <button
+            type="button"
+            className="load-earlier-btn"
+            onClick={handleLoadEarlier}
+            disabled={loadingEarlier}
+          >
+            {loadingEarlier ? '加载中...' : `加载更早的消息（${messageOffset}）`}
+          </button>
+        )}
         {conversation.messages.length === 0 ? (
           <div className="empty-state">
             <h2>开始新对话</h2>
@@ -249,7 +291,7 @@ export default function ChatInterface({
           </div>
         ) : (
           conversation.messages.map((msg, index) => (
-            <div key={index} className="message-group">
+            <div key={messageOffset + index} className="message-group">
               {msg.role === 'user' ? (
                 <div className="user-message">
                   <div className="message-label">你</div>
@@ -257,6 +299,15 @@ export default function ChatInterface({
                     <div className="markdown-content">
                       <ReactMarkdown remarkPlugins={[remarkGfm]} skipHtml>{msg.content}</ReactMarkdown>
                     </div>
+                    {msg.attachments?.length > 0 && (
+                      <div className="message-attachments">
+                        {msg.attachments.map((att) => (
+                          <span key={att.id} className="message-attachment">
+                            {FILE_TYPE_LABELS[att.file_type] || '文件'} {att.filename}
+                          </span>
+                        ))}
+                      </div>
+                    )}
                   </div>
                 </div>
               ) : (
@@ -326,7 +377,7 @@ export default function ChatInterface({
                           const userMsg = conversation.messages[index - 1];
                           const userContent = userMsg?.content || '问题';
                           const md = exportToMarkdown(userContent, msg);
-                          downloadMarkdown(md, generateFilename(index));
+                          downloadMarkdown(md, generateFilename(messageOffset + index));
                         }}
                       >
                         <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" strokeWidth="2" strokeLinecap="round" strokeLinejoin="round">
@@ -339,9 +390,9 @@ export default function ChatInterface({
 
                       {/* Google Drive 上传按钮 */}
                       {driveStatus.configured && (
-                        driveUploaded[index] ? (
+                        driveUploaded[messageOffset + index] ? (
                           <a
-                            href={driveUploaded[index]}
+                            href={driveUploaded[messageOffset + index]}
                             target="_blank"
                             rel="noopener noreferrer"
                             className="export-button drive-uploaded"
@@ -357,11 +408,11 @@ export default function ChatInterface({
                             onClick={() => {
                               const userMsg = conversation.messages[index - 1];
                               const userContent = userMsg?.content || '问题';
-                              uploadToDrive(index, userContent, msg);
+                              uploadToDrive(messageOffset + index, userContent, msg);
                             }}
-                            disabled={driveUploading[index]}
+                            disabled={driveUploading[messageOffset + index]}
                           >
-                            {driveUploading[index] ? (
+                            {driveUploading[messageOffset + index] ? (
                               <>
                                 <div className="spinner-small"></div>
                                 上传中...
@@ -403,7 +454,7 @@ export default function ChatInterface({
                 <div key={index} className={`attachment-item ${att.file_type === 'image' ? 'attachment-image' : ''}`}>
                   {att.file_type === 'image' ? (
                     <img
-                      src={att.content}
+                      src={att.preview}
                       alt={att.filename}
                       className="attachment-thumbnail"
                     />
@@ -458,6 +509,11 @@ export default function ChatInterface({
                 </svg>
               )}
             </button>
+            {parseProgress && (
+              <span className="parse-progress">
+                解析 PDF {parseProgress.done}/{parseProgress.total} 页
+              </span>
+            )}
 
             <textarea
               ref={textareaRef}
@@ -15,8 +15,11 @@ export default function Sidebar({
   onDeleteConversation,
   onDeleteAllConversations,
   onUpdateTitle,
+  hasMore = false,
+  onLoadMore,
 }) {
   const [deletingIds, setDeletingIds] = useState(new Set());
+  const [loadingMore, setLoadingMore] = useState(false);
   const [version, setVersion] = useState('');
   const [users, setUsers] = useState(['全部']);
   const [userFilter, setUserFilter] = useState('全部');
@@ -148,6 +151,15 @@ export default function Sidebar({
     }, 300);
   };
 
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    try {
+      await onLoadMore();
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   return (
     <div className="sidebar">
       <div className="sidebar-header">
@@ -302,6 +314,16 @@ export default function Sidebar({
             </div>
           ))
         )}
+        {hasMore && onLoadMore && (
+          <button
+            type="button"
+            className="load-more-btn"
+            onClick={handleLoadMore}
+            disabled={loadingMore}
+          >
+            {loadingMore ? '加载中...' : '加载更多'}
+          </button>
+        )}
       </div>
 
       {/* Portal for dropdown menu - rendered outside scrollable container */}
@@ -403,6 +425,8 @@ Sidebar.propTypes = {
   onDeleteConversation: PropTypes.func.isRequired,
   onDeleteAllConversations: PropTypes.func.isRequired,
   onUpdateTitle: PropTypes.func,
+  hasMore: PropTypes.bool,
+  onLoadMore: PropTypes.func,
 };
 
 Sidebar.defaultProps = {
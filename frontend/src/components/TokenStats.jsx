@@ -2,20 +2,44 @@ import { memo, useState } from 'react';
 import PropTypes from 'prop-types';
 import './TokenStats.css';
 
+const USAGE_STAGE_LABELS = {
+  stage1: '阶段 1',
+  stage2: '阶段 2',
+  stage3: '阶段 3',
+  search: '搜索改写',
+  title: '标题生成',
+};
+
+const usageShape = PropTypes.shape({
+  prompt_tokens: PropTypes.number,
+  completion_tokens: PropTypes.number,
+  cached_tokens: PropTypes.number,
+  calls: PropTypes.number,
+});
+
 const TokenStats = memo(function TokenStats({ tokenStats }) {
   const [showTooltip, setShowTooltip] = useState(false);
 
-  if (!tokenStats || !tokenStats.total) {
+  if (!tokenStats) {
     return null;
   }
 
   const { total, stage1, stage2, stage3 } = tokenStats;
-  const savedPercent = total.saved_percent || 0;
-  const jsonTokens = total.json_tokens || 0;
-  const toonTokens = total.toon_tokens || 0;
+  const savedPercent = total?.saved_percent || 0;
+  const jsonTokens = total?.json_tokens || 0;
+  const toonTokens = total?.toon_tokens || 0;
+  const hasSavings = savedPercent > 0 && jsonTokens > 0;
 
-  // Only show if there are actual savings
-  if (savedPercent <= 0 || jsonTokens === 0) {
+  // Token counts reported by the providers; cached = prompt tokens served from their prompt cache
+  const usage = tokenStats.usage;
+  const promptTokens = usage?.total?.prompt_tokens || 0;
+  const completionTokens = usage?.total?.completion_tokens || 0;
+  const cachedTokens = usage?.total?.cached_tokens || 0;
+  const cachedPercent = promptTokens > 0 ? (cachedTokens / promptTokens) * 100 : 0;
+  const hasUsage = promptTokens + completionTokens > 0;
+
+  // Only show if there are actual savings or usage
+  if (!hasSavings && !hasUsage) {
     return null;
   }
 
@@ -26,6 +50,10 @@ const TokenStats = memo(function TokenStats({ tokenStats }) {
     return num.toString();
   };
 
+  const usageText = (counts) =>
+    `${counts.prompt_tokens.toLocaleString()} / ${counts.completion_tokens.toLocaleString()}`
+    + (counts.cached_tokens > 0 ? `（缓存 ${counts.cached_tokens.toLocaleString()}）` : '');
+
   return (
     <div
       className="token-stats"
@@ -47,40 +75,70 @@ const TokenStats = memo(function TokenStats({ tokenStats }) {
           <path d="M12 2v4M12 18v4M4.93 4.93l2.83 2.83M16.24 16.24l2.83 2.83M2 12h4M18 12h4M4.93 19.07l2.83-2.83M16.24 7.76l2.83-2.83"/>
         </svg>
         <span className="token-text">
-          节省 {savedPercent.toFixed(0)}% token（{formatNumber(jsonTokens)} → {formatNumber(toonTokens)}）
+          {hasSavings && `节省 ${savedPercent.toFixed(0)}% token（${formatNumber(jsonTokens)} → ${formatNumber(toonTokens)}）`}
+          {hasSavings && hasUsage && ' · '}
+          {hasUsage && `输入 ${formatNumber(promptTokens)} / 输出 ${formatNumber(completionTokens)}`}
+          {cachedTokens > 0 && `，缓存命中 ${cachedPercent.toFixed(0)}%`}
         </span>
       </div>
 
       {showTooltip && (
         <div className="token-stats-tooltip">
-          <div className="tooltip-header">TOON Token 节省</div>
-          <div className="tooltip-content">
-            <div className="tooltip-row">
-              <span className="tooltip-label">总计:</span>
-              <span className="tooltip-value">{jsonTokens.toLocaleString()} → {toonTokens.toLocaleString()} ({savedPercent.toFixed(1)}%)</span>
-            </div>
-            {stage1 && stage1.json_tokens > 0 && (
-              <div className="tooltip-row">
-                <span className="tooltip-label">阶段 1（历史）:</span>
-                <span className="tooltip-value">{stage1.json_tokens.toLocaleString()} → {stage1.toon_tokens.toLocaleString()} ({stage1.saved_percent.toFixed(1)}%)</span>
+          {hasUsage && (
+            <>
+              <div className="tooltip-header">Token 用量（输入 / 输出）</div>
+              <div className="tooltip-content">
+                <div className="tooltip-row">
+                  <span className="tooltip-label">总计:</span>
+                  <span className="tooltip-value">{usageText(usage.total)}</span>
+                </div>
+                {Object.entries(usage.stages || {}).map(([name, counts]) => (
+                  <div className="tooltip-row" key={`stage-${name}`}>
+                    <span className="tooltip-label">{USAGE_STAGE_LABELS[name] || name}:</span>
+                    <span className="tooltip-value">{usageText(counts)}</span>
+                  </div>
+                ))}
+                {Object.entries(usage.models || {}).map(([name, counts]) => (
+                  <div className="tooltip-row" key={`model-${name}`}>
+                    <span className="tooltip-label">{name.split('/').pop()}:</span>
+                    <span className="tooltip-value">{usageText(counts)} · {counts.calls} 次</span>
+                  </div>
+                ))}
               </div>
-            )}
-            {stage2 && stage2.json_tokens > 0 && (
-              <div className="tooltip-row">
-                <span className="tooltip-label">阶段 2（回答）:</span>
-                <span className="tooltip-value">{stage2.json_tokens.toLocaleString()} → {stage2.toon_tokens.toLocaleString()} ({stage2.saved_percent.toFixed(1)}%)</span>
+            </>
+          )}
+          {hasSavings && (
+            <>
+              <div className="tooltip-header">TOON Token 节省</div>
+              <div className="tooltip-content">
+                <div className="tooltip-row">
+                  <span className="tooltip-label">总计:</span>
+                  <span className="tooltip-value">{jsonTokens.toLocaleString()} → {toonTokens.toLocaleString()} ({savedPercent.toFixed(1)}%)</span>
+                </div>
+                {stage1 && stage1.json_tokens > 0 && (
+                  <div className="tooltip-row">
+                    <span className="tooltip-label">阶段 1（历史）:</span>
+                    <span className="tooltip-value">{stage1.json_tokens.toLocaleString()} → {stage1.toon_tokens.toLocaleString()} ({stage1.saved_percent.toFixed(1)}%)</span>
+                  </div>
+                )}
+                {stage2 && stage2.json_tokens > 0 && (
+                  <div className="tooltip-row">
+                    <span className="tooltip-label">阶段 2（回答）:</span>
+                    <span className="tooltip-value">{stage2.json_tokens.toLocaleString()} → {stage2.toon_tokens.toLocaleString()} ({stage2.saved_percent.toFixed(1)}%)</span>
+                  </div>
+                )}
+                {stage3 && stage3.json_tokens > 0 && (
+                  <div className="tooltip-row">
+                    <span className="tooltip-label">阶段 3（排序）:</span>
+                    <span className="tooltip-value">{stage3.json_tokens.toLocaleString()} → {stage3.toon_tokens.toLocaleString()} ({stage3.saved_percent.toFixed(1)}%)</span>
+                  </div>
+                )}
               </div>
-            )}
-            {stage3 && stage3.json_tokens > 0 && (
-              <div className="tooltip-row">
-                <span className="tooltip-label">阶段 3（排序）:</span>
-                <span className="tooltip-value">{stage3.json_tokens.toLocaleString()} → {stage3.toon_tokens.toLocaleString()} ({stage3.saved_percent.toFixed(1)}%)</span>
+              <div className="tooltip-footer">
+                TOON 格式相比 JSON 可减少 token 使用量
               </div>
-            )}
-          </div>
-          <div className="tooltip-footer">
-            TOON 格式相比 JSON 可减少 token 使用量
-          </div>
+            </>
+          )}
         </div>
       )}
     </div>
@@ -109,6 +167,11 @@ TokenStats.propTypes = {
       toon_tokens: PropTypes.number,
       saved_percent: PropTypes.number,
     }),
+    usage: PropTypes.shape({
+      total: usageShape,
+      stages: PropTypes.objectOf(usageShape),
+      models: PropTypes.objectOf(usageShape),
+    }),
   }),
 };
 